@@ -0,0 +1,171 @@
+# archive.py (Hot/cold tiering of old leaves and feedback)
+# Decided leaves that ended, and feedback given, before the archive horizon
+# (ARCHIVE_HORIZON_DAYS, default 365) are moved out of DynamoDB into one compressed archive
+# object per user in S3; tools/archive_cold_items.py runs the move. get_leaves and
+# get_feedback read the hot items only, unless called with ?history=true, which reads through
+# to the archive as well.
+#
+# An archive object (archive/<userId>/<version>-<uuid>.ndjson.gz) is one gzip member per entity, each
+# holding NDJSON of the items in DynamoDB attribute-value form, so the whole object is also a
+# valid gzip stream. The manifest, one HRMS_Archive item per user, records the object key, its
+# version and each entity's byte range and item count, so a history read is a GetItem plus a
+# single ranged GET of that entity's member.
+#
+# Moving a user's cold items (archive_user):
+#   1. merge them (by id) with what is already archived and upload the result as a new version,
+#   2. switch the manifest to it with a put conditional on the previous version (a concurrent
+#      run loses and deletes its own object; the random key suffix keeps two runs building the
+#      same version from writing to one key), then tag the previous object superseded: a history
+#      read that loaded the old manifest a moment earlier can still fetch it, and the bucket's
+#      lifecycle rule deletes superseded objects after a day (ARCHIVE_SUPERSEDED_TAG),
+#   3. delete the items from the hot table. Leaves are marked archivedAt first, so the stream
+#      consumer (leave_reports) ignores their REMOVE and the aggregates keep counting them.
+# A crash between steps leaves items in both tiers: reads prefer the hot copy and the next run
+# finishes the move.
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from common_utils import (dynamodb_client, s3_client, storage, mirror_storage, update_entity, batch_write_all,
+                          utc_now_iso, ENTITY_ID_ATTRIBUTES, ARCHIVE_TABLE, INTERNAL_BUCKET_NAME)
+
+ARCHIVE_BUCKET = os.environ.get('ARCHIVE_BUCKET', INTERNAL_BUCKET_NAME) # Private; never the documents bucket
+ARCHIVE_SUPERSEDED_TAG = {'Key': 'hrms-superseded', 'Value': 'true'} # Matched by the lifecycle rule in template.yaml
+ARCHIVE_PREFIX = os.environ.get('ARCHIVE_PREFIX', 'archive/')
+ARCHIVE_HORIZON_DAYS = int(os.environ.get('ARCHIVE_HORIZON_DAYS', '365'))
+ARCHIVED_ENTITIES = ('leave', 'feedback') # In object order
+# Which stored items are cold: (filter expression with :cutoff, names, values). Pending leaves
+# stay hot whatever their dates, since the approval queue and decisions work on them.
+COLD_FILTERS = {
+    'leave': ('#s IN (:approved, :rejected) AND endDate < :cutoff', {'#s': 'status'},
+              {':approved': {'S': 'Approved'}, ':rejected': {'S': 'Rejected'}}),
+    'feedback': ('#ts >= :epoch AND #ts < :cutoff', {'#ts': 'timestamp'}, {':epoch': {'S': '1970'}}),
+}
+MARKED_ENTITIES = ('leave',) # Hot tables read by the stream consumer
+
+def cutoff_date(horizon_days=ARCHIVE_HORIZON_DAYS, now=None):
+    """Items dated before this day (YYYY-MM-DD) are cold."""
+    return ((now or datetime.now(timezone.utc)) - timedelta(days=horizon_days)).strftime('%Y-%m-%d')
+
+def history_requested(event):
+    """True for ?history=true (or 1): the caller wants archived items too."""
+    value = (event.get('queryStringParameters') or {}).get('history', '')
+    return value.lower() in ('true', '1')
+
+def cold_scan_args(entity, cutoff):
+    """Scan arguments for the cold items of an entity in the active layout."""
+    expression, names, values = COLD_FILTERS[entity]
+    args = storage.scan_args(entity)
+    if args.get('FilterExpression'): # Single table: keep the layout's own entity filter
+        expression = f"({args['FilterExpression']}) AND {expression}"
+    return dict(args, FilterExpression=expression, ExpressionAttributeNames=names,
+                ExpressionAttributeValues=dict(args.get('ExpressionAttributeValues') or {}, **values,
+                                               **{':cutoff': {'S': cutoff}}))
+
+def _item_id(entity, item):
+    return item[ENTITY_ID_ATTRIBUTES[entity]]['S']
+
+def _encode(items):
+    return gzip.compress(b''.join(json.dumps(item, separators=(',', ':')).encode('utf-8') + b'\n' for item in items))
+
+def _decode(data):
+    return [json.loads(line) for line in gzip.decompress(data).splitlines() if line.strip()]
+
+def _bucket():
+    if not ARCHIVE_BUCKET:
+        raise RuntimeError('ARCHIVE_BUCKET (or INTERNAL_BUCKET_NAME) must name a private bucket.')
+    return ARCHIVE_BUCKET
+
+def load_manifest(user_id, consistent=False):
+    response = dynamodb_client.get_item(TableName=ARCHIVE_TABLE, Key={'userId': {'S': user_id}},
+                                        ConsistentRead=consistent)
+    return response.get('Item')
+
+def _segment(manifest, entity):
+    segment = manifest.get('segments', {}).get('M', {}).get(entity)
+    if not segment:
+        return None
+    return {name: int(value['N']) for name, value in segment['M'].items()}
+
+def read_archive(user_id, entity):
+    """A user's archived items of one entity: the manifest (consistent read, so never a version
+    older than the last switch), then one ranged GET of its member."""
+    manifest = load_manifest(user_id, consistent=True)
+    segment = manifest and _segment(manifest, entity)
+    if not segment or not segment['count']:
+        return []
+    start, end = segment['offset'], segment['offset'] + segment['length'] - 1
+    response = s3_client.get_object(Bucket=_bucket(), Key=manifest['s3Key']['S'], Range=f'bytes={start}-{end}')
+    return _decode(response['Body'].read())
+
+def with_archived(entity, user_id, hot_items):
+    """Hot items followed by the archived ones that are not (or no longer) also hot."""
+    hot_ids = {_item_id(entity, storage.attributes(item)) for item in hot_items}
+    return list(hot_items) + [item for item in read_archive(user_id, entity) if _item_id(entity, item) not in hot_ids]
+
+def _read_all(manifest):
+    data = s3_client.get_object(Bucket=_bucket(), Key=manifest['s3Key']['S'])['Body'].read()
+    archived = {}
+    for entity in ARCHIVED_ENTITIES:
+        segment = _segment(manifest, entity)
+        if segment and segment['count']:
+            archived[entity] = _decode(data[segment['offset']:segment['offset'] + segment['length']])
+    return archived
+
+def _delete_hot(user_id, cold_items):
+    for entity, items in cold_items.items():
+        if entity in MARKED_ENTITIES:
+            for item in items:
+                if 'archivedAt' in item:
+                    continue
+                try:
+                    update_entity(entity, user_id, _item_id(entity, item),
+                                  UpdateExpression='SET archivedAt = :now', ConditionExpression='attribute_exists(userId)',
+                                  ExpressionAttributeValues={':now': {'S': utc_now_iso()}})
+                except dynamodb_client.exceptions.ConditionalCheckFailedException:
+                    pass # Already deleted
+        for layout in filter(None, (storage, mirror_storage)):
+            batch_write_all(layout.table(entity), [
+                {'DeleteRequest': {'Key': layout.key(entity, user_id, _item_id(entity, item))}} for item in items])
+
+def archive_user(user_id, cold_items):
+    """Moves one user's cold items ({entity: [stored items]}) to their archive object.
+
+    Returns the manifest item written, or None if a concurrent run updated the manifest first.
+    """
+    manifest = load_manifest(user_id, consistent=True)
+    archived = _read_all(manifest) if manifest else {}
+    version = int(manifest['version']['N']) + 1 if manifest else 1
+    key = f'{ARCHIVE_PREFIX}{user_id}/{version:06d}-{uuid.uuid4().hex}.ndjson.gz' # Unique per run
+
+    body, segments = b'', {}
+    for entity in ARCHIVED_ENTITIES:
+        merged = {_item_id(entity, item): item for item in archived.get(entity, [])}
+        for item in cold_items.get(entity, []):
+            attributes = {k: v for k, v in storage.attributes(item).items() if k != 'archivedAt'}
+            merged[_item_id(entity, attributes)] = attributes
+        member = _encode([merged[item_id] for item_id in sorted(merged)])
+        segments[entity] = {'M': {'offset': {'N': str(len(body))}, 'length': {'N': str(len(member))},
+                                  'count': {'N': str(len(merged))}}}
+        body += member
+    s3_client.put_object(Bucket=_bucket(), Key=key, Body=body, ContentType='application/x-ndjson',
+                         ContentEncoding='gzip')
+
+    item = {'userId': {'S': user_id}, 's3Key': {'S': key}, 'version': {'N': str(version)},
+            'segments': {'M': segments}, 'updatedAt': {'S': utc_now_iso()}}
+    condition = {'ConditionExpression': 'attribute_not_exists(userId)'} if not manifest else {
+        'ConditionExpression': 'version = :previous', 'ExpressionAttributeValues': {':previous': manifest['version']}}
+    try:
+        dynamodb_client.put_item(TableName=ARCHIVE_TABLE, Item=item, **condition)
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        s3_client.delete_object(Bucket=ARCHIVE_BUCKET, Key=key) # This run's own object, never published
+        return None
+    if manifest: # Readers may still hold the old manifest: leave the object to the lifecycle rule
+        try:
+            s3_client.put_object_tagging(Bucket=ARCHIVE_BUCKET, Key=manifest['s3Key']['S'],
+                                         Tagging={'TagSet': [ARCHIVE_SUPERSEDED_TAG]})
+        except Exception as e:
+            print(f"Could not mark the previous archive object of {user_id} superseded: {e}")
+    _delete_hot(user_id, cold_items)
+    return item
@@ -0,0 +1,201 @@
+# audit.py (Write-behind audit log of who changed what)
+# Write handlers record an event per successful call without waiting on S3: the event is
+# appended to an in-memory buffer and a background thread ships the buffer as one
+# gzip-compressed NDJSON object once it holds AUDIT_FLUSH_BYTES or its oldest event is
+# AUDIT_FLUSH_SECONDS old. A failed upload is kept and retried (up to AUDIT_MAX_BUFFER_BYTES).
+#
+# Lambda freezes the container between invocations, so no timer can fire there, and a frozen
+# container can be reclaimed without running any shutdown code. So @audited uploads the
+# invocation's events (and waits for an upload already in flight) before the handler returns:
+# one PUT per audited write, and nothing is left in memory to lose. AUDIT_BATCH_INVOCATIONS=true
+# opts into batching across invocations instead: only a batch that is due is uploaded, which
+# costs one PUT per AUDIT_FLUSH_SECONDS of traffic per container, but events recorded after the
+# last flush of a container that is then reclaimed are lost. The self-hosted server flushes on
+# shutdown, and so does interpreter exit.
+#
+# Objects are partitioned by the time of their first event, so queries only list the hours
+# they cover (see tools/query_audit_log.py):
+#   audit/year=2026/month=10/day=19/hour=14/20261019T140512Z-<writer>-000042.ndjson.gz
+# One JSON line per event: ts, action, actor, target, status, requestId, sourceIp, details.
+import atexit
+import functools
+import gzip
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from common_utils import get_user_id_from_event, decode_response_body, s3_client, INTERNAL_BUCKET_NAME
+
+AUDIT_ENABLED = os.environ.get('AUDIT_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+AUDIT_BUCKET = os.environ.get('AUDIT_BUCKET', INTERNAL_BUCKET_NAME) # Private; never the documents bucket
+AUDIT_PREFIX = os.environ.get('AUDIT_PREFIX', 'audit/')
+AUDIT_FLUSH_BYTES = int(os.environ.get('AUDIT_FLUSH_BYTES', str(256 * 1024))) # Uncompressed NDJSON
+AUDIT_FLUSH_SECONDS = float(os.environ.get('AUDIT_FLUSH_SECONDS', '30'))
+AUDIT_MAX_BUFFER_BYTES = int(os.environ.get('AUDIT_MAX_BUFFER_BYTES', str(8 * 1024 * 1024)))
+# Lambda only: keep events buffered across invocations (fewer PUTs, may lose the tail on reclaim)
+AUDIT_BATCH_INVOCATIONS = os.environ.get('AUDIT_BATCH_INVOCATIONS', 'false').lower() in ('1', 'true', 'yes')
+UPLOAD_RETRY_SECONDS = 2.0
+IN_LAMBDA = 'AWS_LAMBDA_FUNCTION_NAME' in os.environ
+
+def object_key(prefix, started_at, writer_id, sequence):
+    """Time-partitioned key of an audit object whose first event happened at started_at (epoch seconds)."""
+    t = datetime.fromtimestamp(started_at, timezone.utc)
+    return (f'{prefix}year={t:%Y}/month={t:%m}/day={t:%d}/hour={t:%H}/'
+            f'{t:%Y%m%dT%H%M%SZ}-{writer_id}-{sequence:06d}.ndjson.gz')
+
+class AuditLog:
+    """Buffers audit events in memory and uploads them to S3 in compressed batches."""
+
+    def __init__(self, bucket, prefix=AUDIT_PREFIX, flush_bytes=AUDIT_FLUSH_BYTES, flush_seconds=AUDIT_FLUSH_SECONDS,
+                 max_buffer_bytes=AUDIT_MAX_BUFFER_BYTES, enabled=AUDIT_ENABLED,
+                 batch_invocations=AUDIT_BATCH_INVOCATIONS):
+        if enabled and not bucket:
+            raise RuntimeError('AUDIT_BUCKET (or INTERNAL_BUCKET_NAME) must name a private bucket; '
+                               'set AUDIT_ENABLED=false to run without an audit log.')
+        self.bucket = bucket
+        self.prefix = prefix
+        self.flush_bytes = flush_bytes
+        self.flush_seconds = flush_seconds
+        self.max_buffer_bytes = max_buffer_bytes
+        self.enabled = enabled
+        self.batch_invocations = batch_invocations
+        self.writer_id = uuid.uuid4().hex[:12] # Keeps keys from concurrent containers apart
+        self.stats = {'events': 0, 'objects': 0, 'raw_bytes': 0, 'stored_bytes': 0, 'failed_uploads': 0, 'dropped': 0}
+        self._lines, self._size, self._oldest = [], 0, None
+        self._retry_at = 0.0
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._upload_lock = threading.Lock() # Held for the whole upload, so waiting on it waits for one in flight
+        self._thread = None
+        self._closed = False
+
+    def record(self, action, actor, target=None, status=None, request_id=None, source_ip=None, details=None):
+        """Buffers one event; never blocks on I/O."""
+        if not self.enabled:
+            return
+        now = time.time()
+        line = json.dumps({
+            'ts': datetime.fromtimestamp(now, timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+            'action': action, 'actor': actor, 'target': target, 'status': status,
+            'requestId': request_id, 'sourceIp': source_ip, 'details': details or {}
+        }, separators=(',', ':'), default=str).encode('utf-8') + b'\n'
+        with self._lock:
+            if self._oldest is None:
+                self._oldest = now
+            self._lines.append(line)
+            self._size += len(line)
+            self.stats['events'] += 1
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name='audit-flusher', daemon=True)
+                self._thread.start()
+            if self._size >= self.flush_bytes:
+                self._wake.notify()
+
+    def _due(self, now):
+        return bool(self._lines) and now >= self._retry_at and \
+            (self._size >= self.flush_bytes or now - self._oldest >= self.flush_seconds)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._closed and not self._due(time.time()):
+                    wait = None
+                    if self._lines:
+                        wait = max(0.01, max(self._oldest + self.flush_seconds, self._retry_at) - time.time())
+                    self._wake.wait(wait)
+                if self._closed:
+                    return
+            self.flush(only_if_due=True)
+
+    def flush(self, only_if_due=False):
+        """Uploads everything buffered as one object; returns its key (None if nothing was written)."""
+        with self._upload_lock:
+            with self._lock:
+                if not self._lines or (only_if_due and not self._due(time.time())):
+                    return None
+                lines, oldest = self._lines, self._oldest
+                self._lines, self._size, self._oldest = [], 0, None
+            return self._upload(lines, oldest)
+
+    def _upload(self, lines, oldest):
+        raw = b''.join(lines)
+        body = gzip.compress(raw, compresslevel=6)
+        key = object_key(self.prefix, oldest, self.writer_id, next(self._sequence))
+        try:
+            s3_client.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType='application/x-ndjson',
+                                 ContentEncoding='gzip', Metadata={'events': str(len(lines))})
+        except Exception as e:
+            print(f"Audit log upload of {len(lines)} events failed, will retry: {e}")
+            self._requeue(lines, oldest)
+            return None
+        with self._lock:
+            self.stats['objects'] += 1
+            self.stats['raw_bytes'] += len(raw)
+            self.stats['stored_bytes'] += len(body)
+        return key
+
+    def _requeue(self, lines, oldest):
+        with self._lock:
+            self.stats['failed_uploads'] += 1
+            self._retry_at = time.time() + UPLOAD_RETRY_SECONDS
+            self._lines = lines + self._lines
+            self._size += sum(len(line) for line in lines)
+            self._oldest = oldest if self._oldest is None else min(oldest, self._oldest)
+            while self._size > self.max_buffer_bytes and len(self._lines) > 1: # Oldest events go first
+                self._size -= len(self._lines.pop(0))
+                self.stats['dropped'] += 1
+
+    def flush_before_freeze(self):
+        """End-of-invocation hook: finishes an upload in flight and uploads what is buffered (only a
+        batch that is due when batching across invocations)."""
+        self.flush(only_if_due=self.batch_invocations)
+
+    def close(self):
+        """Stops the background thread and uploads whatever is still buffered."""
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._retry_at = 0.0
+        self.flush()
+
+audit_log = AuditLog(AUDIT_BUCKET)
+atexit.register(audit_log.close)
+
+def _request_context(event, context):
+    request_context = event.get('requestContext') or {}
+    request_id = getattr(context, 'aws_request_id', None) or request_context.get('requestId')
+    return request_id, (request_context.get('identity') or {}).get('sourceIp')
+
+def audited(action, target=None):
+    """Decorator for write handlers: records each successful (2xx) call in the audit log.
+
+    target(request_body, response_body) returns the id (or list of ids) acted on; by default it
+    is the caller. Only the names of the submitted fields are recorded, never their values.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            response = handler(event, context)
+            if audit_log.enabled and 200 <= response['statusCode'] < 300:
+                try:
+                    actor = get_user_id_from_event(event)
+                    request_body = json.loads(event.get('body') or '{}')
+                    request_body = request_body if isinstance(request_body, dict) else {}
+                    request_id, source_ip = _request_context(event, context)
+                    audit_log.record(
+                        action, actor,
+                        target=target(request_body, decode_response_body(response)) if target else actor,
+                        status=response['statusCode'], request_id=request_id, source_ip=source_ip,
+                        details={'fields': sorted(k for k in request_body if k != 'userId')}
+                    )
+                except Exception as e:
+                    print(f"Could not record audit event for {action}: {e}")
+            if IN_LAMBDA:
+                audit_log.flush_before_freeze()
+            return response
+        return wrapper
+    return decorator
@@ -1,7 +1,39 @@
 # auth_handler.py
+import hashlib
 import json
-from common_utils import get_response, cognito_client, COGNITO_USER_POOL_ID, COGNITO_CLIENT_ID
+import os
+import time
+from common_utils import get_response, negotiated, error_response, cognito_client, token_verifier, TTLCache, COGNITO_USER_POOL_ID, COGNITO_CLIENT_ID
+from memory_profile import sample_memory
+from profiling import profiled
+from warmup import handles_warmup
 
+# Recently refreshed sessions, keyed by a hash of the refresh token. A client (or several
+# browser tabs) refreshing again within the TTL gets the same still-valid tokens back
+# without another REFRESH_TOKEN_AUTH round trip to Cognito.
+REFRESH_CACHE_TTL_SECONDS = int(os.environ.get('REFRESH_CACHE_TTL_SECONDS', '60'))
+REFRESH_MIN_REMAINING_SECONDS = 300 # Never hand out cached tokens closer than this to expiry
+refresh_cache = TTLCache(max_entries=1024, ttl_seconds=REFRESH_CACHE_TTL_SECONDS)
+
+def _session_body(message, id_token, access_token, refresh_token=None):
+    """Login/refresh response body: tokens, the verified user ID and the remaining token lifetime."""
+    claims = token_verifier.verify(id_token, token_use='id')
+    body = {
+        'message': message,
+        'idToken': id_token,
+        'accessToken': access_token,
+        'userId': claims['sub'], # Cognito Sub
+        'expiresAt': int(claims['exp']),
+        'expiresIn': max(0, int(claims['exp'] - time.time())) # Seconds left, so clients can refresh early
+    }
+    if refresh_token:
+        body['refreshToken'] = refresh_token
+    return body
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
 def register_user(event, context):
     """Lambda function to handle user registration via Cognito."""
     try:
@@ -31,8 +63,12 @@ def register_user(event, context):
         return get_response(400, {'message': 'Password does not meet requirements.'})
     except Exception as e:
         print(f"Signup error: {e}")
-        return get_response(500, {'message': f'Internal server error: {str(e)}'})
+        return error_response(e)
 
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
 def login_user(event, context):
     """Lambda function to handle user login via Cognito."""
     try:
@@ -54,19 +90,9 @@ def login_user(event, context):
         id_token = authentication_result['IdToken']
         access_token = authentication_result['AccessToken']
 
-        # Extract user ID (sub) from ID token (requires decoding JWT, not shown here for brevity)
-        # For simplicity, let's assume Cognito provides it directly or you decode on frontend
-        # In a real flow, you'd decode the JWT to get the 'sub' claim (user ID)
-        # For demo, we'll return a dummy userId or rely on client to get it from token
-        # A more robust way is to use AdminInitiateAuth and AdminRespondToAuthChallenge if used by backend
-        
-        # For now, let's just return some info and the token
-        return get_response(200, {
-            'message': 'Login successful!',
-            'idToken': id_token,
-            'accessToken': access_token,
-            'userId': email # Placeholder: In real scenario, this would be Cognito Sub
-        })
+        # The ID token is verified locally (cached JWKS) and its 'sub' claim is the user ID
+        return get_response(200, _session_body('Login successful!', id_token, access_token,
+                                               authentication_result.get('RefreshToken')))
 
     except cognito_client.exceptions.NotAuthorizedException:
         return get_response(401, {'message': 'Invalid email or password.'})
@@ -74,6 +100,103 @@ def login_user(event, context):
         return get_response(401, {'message': 'User not found.'})
     except Exception as e:
         print(f"Login error: {e}")
-        return get_response(500, {'message': f'Internal server error: {str(e)}'})
+        return error_response(e)
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+def confirm_signup(event, context):
+    """Lambda function to confirm user signup with a verification code."""
+    try:
+        body = json.loads(event['body'])
+        email = body['email']
+        code = body['code']
+
+        # Call Cognito User Pool to confirm the user's account
+        cognito_client.confirm_sign_up(
+            ClientId=COGNITO_CLIENT_ID,
+            Username=email,
+            ConfirmationCode=code
+        )
+        return get_response(200, {'message': 'Account confirmed successfully!'})
+
+    except cognito_client.exceptions.UserNotFoundException:
+        return get_response(400, {'message': 'User not found. Please sign up again.'})
+    except cognito_client.exceptions.CodeMismatchException:
+        return get_response(400, {'message': 'Invalid verification code. Please try again.'})
+    except cognito_client.exceptions.ExpiredCodeException:
+        return get_response(400, {'message': 'Verification code expired. Please request a new one.'})
+    except cognito_client.exceptions.NotAuthorizedException:
+        return get_response(400, {'message': 'User is already confirmed or not authorized.'}) # Can happen if user tries to confirm confirmed account
+    except Exception as e:
+        print(f"Confirm signup error: {e}")
+        return error_response(e)
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+def resend_code(event, context):
+    """Lambda function to resend a verification code to the user."""
+    try:
+        body = json.loads(event['body'])
+        email = body['email']
+
+        # Call Cognito User Pool to resend the confirmation code
+        cognito_client.resend_confirmation_code(
+            ClientId=COGNITO_CLIENT_ID,
+            Username=email
+        )
+        return get_response(200, {'message': 'Verification code resent successfully!'})
+
+    except cognito_client.exceptions.UserNotFoundException:
+        return get_response(400, {'message': 'User not found. Please sign up again.'})
+    except cognito_client.exceptions.LimitExceededException:
+        # Per-user attempt limit: retrying won't help until Cognito's window passes
+        return get_response(429, {'message': 'Attempt limit exceeded, please try again later.'},
+                            headers={'Retry-After': '60'})
+    except Exception as e:
+        print(f"Resend code error: {e}")
+        return error_response(e)
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+def refresh_session(event, context):
+    """Lambda function to renew ID/access tokens with a refresh token (no password round trip)."""
+    try:
+        body = json.loads(event['body'])
+        refresh_token = body['refreshToken']
+
+        cache_key = hashlib.sha256(refresh_token.encode('utf-8')).hexdigest()
+        cached = refresh_cache.get(cache_key)
+        if cached:
+            id_token, access_token = cached
+            session = _session_body('Session refreshed.', id_token, access_token)
+            if session['expiresIn'] > REFRESH_MIN_REMAINING_SECONDS:
+                return get_response(200, session)
+
+        response = cognito_client.initiate_auth(
+            ClientId=COGNITO_CLIENT_ID,
+            AuthFlow='REFRESH_TOKEN_AUTH',
+            AuthParameters={'REFRESH_TOKEN': refresh_token}
+        )
+        authentication_result = response['AuthenticationResult']
+        id_token = authentication_result['IdToken']
+        access_token = authentication_result['AccessToken']
+        session = _session_body('Session refreshed.', id_token, access_token)
+        refresh_cache.set(cache_key, (id_token, access_token),
+                          min(REFRESH_CACHE_TTL_SECONDS, session['expiresIn'] - REFRESH_MIN_REMAINING_SECONDS))
+        return get_response(200, session)
+
+    except (KeyError, TypeError, json.JSONDecodeError):
+        return get_response(400, {'message': 'refreshToken is required.'})
+    except cognito_client.exceptions.NotAuthorizedException:
+        return get_response(401, {'message': 'Refresh token is invalid or expired. Please log in again.'})
+    except Exception as e:
+        print(f"Refresh error: {e}")
+        return error_response(e)
 
-# You would map /auth/signup to register_user and /auth/login to login_user
\ No newline at end of file
+# You would map /auth/signup to register_user, /auth/login to login_user and /auth/refresh to refresh_session
\ No newline at end of file
@@ -1,50 +1,623 @@
 # common_utils.py (A helper file for common logic)
+import base64
+import contextvars
+import functools
 import json
 import os
+import random
+import re
+import threading
+import time
 import uuid
-import boto3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from token_utils import CognitoTokenVerifier, TokenError
+from resilience import wrap_client, get_metrics as get_resilience_metrics, DependencyUnavailableError
+
+# Set HRMS_LOCAL_BACKENDS=1 to run the handlers against the in-memory stand-ins (local runs, benchmarks)
+USE_LOCAL_BACKENDS = os.environ.get('HRMS_LOCAL_BACKENDS') == '1'
+# Set HRMS_SQLITE_PATH to keep the tables in an embedded SQLite file instead of DynamoDB (on-prem)
+SQLITE_PATH = os.environ.get('HRMS_SQLITE_PATH')
+# Local runs and benchmarks only: lets a request without a token name its caller with a userId
+# query/body parameter. Anyone could then act as anyone, so it is off unless the stand-ins are in use.
+ALLOW_USER_ID_PARAM = os.environ.get('HRMS_ALLOW_USER_ID_PARAM', '1' if USE_LOCAL_BACKENDS else '0') == '1'
 
 # Initialize AWS clients
-cognito_client = boto3.client('cognito-idp', region_name=os.environ.get('AWS_REGION'))
-dynamodb_client = boto3.client('dynamodb', region_name=os.environ.get('AWS_REGION'))
-s3_client = boto3.client('s3', region_name=os.environ.get('AWS_REGION'))
+if USE_LOCAL_BACKENDS:
+    from local_backends import create_local_clients, create_local_queue_clients
+    cognito_client, dynamodb_client, s3_client = create_local_clients()
+    sqs_client, ses_client = create_local_queue_clients()
+else:
+    import boto3
+    from botocore.config import Config
+    # Retries are owned by resilience.py (budgeted, jittered); botocore makes a single attempt
+    boto_config = Config(retries={'mode': 'standard', 'max_attempts': 1}, connect_timeout=3, read_timeout=10)
+    cognito_client = boto3.client('cognito-idp', region_name=os.environ.get('AWS_REGION'), config=boto_config)
+    dynamodb_client = None if SQLITE_PATH else \
+        boto3.client('dynamodb', region_name=os.environ.get('AWS_REGION'), config=boto_config)
+    s3_client = boto3.client('s3', region_name=os.environ.get('AWS_REGION'), config=boto_config)
+    sqs_client = None if SQLITE_PATH else \
+        boto3.client('sqs', region_name=os.environ.get('AWS_REGION'), config=boto_config)
+    ses_client = boto3.client('ses', region_name=os.environ.get('AWS_REGION'), config=boto_config)
+if SQLITE_PATH:
+    from sqlite_backend import create_sqlite_client, create_sqlite_queue_client
+    dynamodb_client = create_sqlite_client(SQLITE_PATH)
+    sqs_client = create_sqlite_queue_client(SQLITE_PATH) # Job queues in the same file (jobs.py)
+
+# Every call goes through per-dependency rate limiting, retry budgets and circuit breakers
+cognito_client = wrap_client(cognito_client, 'cognito')
+dynamodb_client = wrap_client(dynamodb_client, 'dynamodb')
+s3_client = wrap_client(s3_client, 's3')
+sqs_client = wrap_client(sqs_client, 'sqs')
+ses_client = wrap_client(ses_client, 'ses')
 
 # Get table names from environment variables
 PROFILES_TABLE = os.environ.get('PROFILES_TABLE', 'HRMS_Profiles')
 LEAVES_TABLE = os.environ.get('LEAVES_TABLE', 'HRMS_Leaves')
 FEEDBACK_TABLE = os.environ.get('FEEDBACK_TABLE', 'HRMS_Feedback')
 DOCUMENTS_TABLE = os.environ.get('DOCUMENTS_TABLE', 'HRMS_Documents')
+ORG_CLOSURE_TABLE = os.environ.get('ORG_CLOSURE_TABLE', 'HRMS_OrgClosure')
+IDEMPOTENCY_TABLE = os.environ.get('IDEMPOTENCY_TABLE', 'HRMS_Idempotency')
+LEAVE_AGGREGATES_TABLE = os.environ.get('LEAVE_AGGREGATES_TABLE', 'HRMS_LeaveAggregates')
+ARCHIVE_TABLE = os.environ.get('ARCHIVE_TABLE', 'HRMS_Archive') # Per-user manifests of the S3 archive (archive.py)
+DOCUMENT_USAGE_TABLE = os.environ.get('DOCUMENT_USAGE_TABLE', 'HRMS_DocumentUsage') # Per-user document byte counters
+LEAVE_GUARDS_TABLE = os.environ.get('LEAVE_GUARDS_TABLE', 'HRMS_LeaveGuards') # Serializes leave submissions per user
+MAIN_TABLE = os.environ.get('MAIN_TABLE', 'HRMS_Main') # Single-table layout (see the storage layouts below)
+STORAGE_LAYOUT = os.environ.get('STORAGE_LAYOUT', 'multi') # multi | dual | single
+# Leaves by (userId, startDate). A leave lasts at most MAX_LEAVE_DAYS, which bounds the index
+# queries of the overlap check (leave_manager.py) and of department coverage (staffing_coverage.py).
+LEAVE_START_INDEX = 'LeaveStartIndex'
+MAX_LEAVE_DAYS = int(os.environ.get('MAX_LEAVE_DAYS', '366'))
 S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME', 'f13tech-hrms-documents') # Replace with your S3 bucket name
+# Private bucket for the audit log, archives and profiles. Documents get public download URLs, so
+# this data never falls back to S3_BUCKET_NAME: outside local runs it must be configured.
+INTERNAL_BUCKET_NAME = os.environ.get('INTERNAL_BUCKET_NAME', 'hrms-internal-local' if USE_LOCAL_BACKENDS else '')
 COGNITO_USER_POOL_ID = os.environ.get('COGNITO_USER_POOL_ID')
 COGNITO_CLIENT_ID = os.environ.get('COGNITO_CLIENT_ID')
+DEFAULT_LEAVE_APPROVER_ID = os.environ.get('DEFAULT_LEAVE_APPROVER_ID') # Approver for employees without a manager
+JOB_QUEUE_URL = os.environ.get('JOB_QUEUE_URL', 'hrms-jobs') # Background jobs (jobs.py)
+NOTIFICATION_SENDER = os.environ.get('NOTIFICATION_SENDER') # SES-verified From address; unset = log notifications
+
+# Verifies Cognito tokens in-process; the JWKS is cached for the life of the warm container.
+# Local runs verify against the stand-in pool's keys so no network call is ever made.
+token_verifier = CognitoTokenVerifier(
+    os.environ.get('AWS_REGION', 'us-east-1'), COGNITO_USER_POOL_ID, COGNITO_CLIENT_ID,
+    jwks_loader=cognito_client.jwks if USE_LOCAL_BACKENDS else None
+)
+
+# Response bodies are JSON unless the request's Accept header prefers MessagePack (e.g. internal
+# services reading long listings): handlers wrapped in @negotiated record the negotiated encoding
+# for get_response, which then returns the MessagePack bytes base64-encoded with isBase64Encoded
+# set, as API Gateway expects for binary media types (declared on the API in template.yaml).
+# MessagePack needs the msgpack package's C extension (e.g. from a Lambda layer), imported the
+# first time a request asks for it; without it every response is JSON.
+RESPONSE_ENCODINGS = {'application/json': 'json', 'application/msgpack': 'msgpack', 'application/x-msgpack': 'msgpack'}
+_response_encoding = contextvars.ContextVar('response_encoding', default=None)
+_msgpack = None # The msgpack module once imported, False if it isn't installed
+
+def msgpack_module():
+    """The msgpack package, imported on first use; None when it isn't installed."""
+    global _msgpack
+    if _msgpack is None:
+        try:
+            import msgpack
+            _msgpack = msgpack
+        except ImportError:
+            _msgpack = False
+    return _msgpack or None
+
+def negotiate_encoding(accept):
+    """'msgpack' when an Accept header ranks MessagePack above JSON (and msgpack is installed), else 'json'.
+
+    Ties go to the first listed.
+    """
+    best, best_q = 'json', 0.0
+    for part in (accept or '').split(','):
+        media_type, *params = [p.strip() for p in part.split(';')]
+        encoding = RESPONSE_ENCODINGS.get(media_type.lower())
+        if not encoding or (encoding == 'msgpack' and not msgpack_module()):
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def negotiated(handler):
+    """Decorator for API handlers: get_response encodes bodies as the request's Accept header prefers."""
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        token = _response_encoding.set(negotiate_encoding(get_header(event, 'Accept')))
+        try:
+            return handler(event, context)
+        finally:
+            _response_encoding.reset(token)
+    return wrapper
 
-def get_response(status_code, body):
+def get_response(status_code, body, headers=None):
     """Helper to format API Gateway responses."""
+    response_headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*', # Adjust for production
+        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,Idempotency-Key'
+    }
+    encoding = _response_encoding.get()
+    if encoding:
+        response_headers['Vary'] = 'Accept'
+    if headers:
+        response_headers.update(headers)
+    if encoding == 'msgpack':
+        response_headers['Content-Type'] = 'application/msgpack'
+        return {
+            'statusCode': status_code,
+            'headers': response_headers,
+            'body': base64.b64encode(msgpack_module().packb(body, use_bin_type=True)).decode('ascii'),
+            'isBase64Encoded': True
+        }
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*', # Adjust for production
-            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'
-        },
+        'headers': response_headers,
         'body': json.dumps(body)
     }
 
+def decode_response_body(response):
+    """The body a get_response() response was built from, whichever encoding it was sent in."""
+    if response.get('isBase64Encoded'):
+        return msgpack_module().unpackb(base64.b64decode(response['body']), raw=False)
+    return json.loads(response['body'])
+
+def error_response(e):
+    """Response for an unexpected handler error: 503 + Retry-After while a dependency sheds load, else 500."""
+    if isinstance(e, DependencyUnavailableError):
+        return get_response(503, {'message': 'Service temporarily unavailable. Please retry shortly.'},
+                            headers={'Retry-After': str(e.retry_after)})
+    return get_response(500, {'message': f'Internal server error: {str(e)}'})
+
+def get_header(event, name):
+    """Case-insensitive lookup of a request header (API Gateway preserves the client's casing)."""
+    headers = event.get('headers') or {}
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+def get_bearer_token(event):
+    """Returns the token from an 'Authorization: Bearer <token>' (or bare token) header, if any."""
+    authorization = get_header(event, 'Authorization')
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(' ')
+    return token.strip() if scheme.lower() == 'bearer' else authorization.strip()
+
 def get_user_id_from_event(event):
-    """Extracts user ID from API Gateway event (e.g., from Cognito authorizer)."""
-    # In a real setup, API Gateway with Cognito authorizer would put user info here:
-    # event['requestContext']['authorizer']['claims']['sub']
-    # For now, we'll assume userId is passed in the body/query string for simplicity
-    # or handle it based on event structure
-    if 'requestContext' in event and 'authorizer' in event['requestContext'] and 'claims' in event['requestContext']['authorizer']:
-        return event['requestContext']['authorizer']['claims'].get('sub') # Cognito user ID
-    if 'queryStringParameters' in event and 'userId' in event['queryStringParameters']:
-        return event['queryStringParameters']['userId']
-    if 'body' in event:
+    """Extracts user ID from API Gateway event.
+
+    Prefers the claims of the API Gateway Cognito authorizer, then a Cognito token in the
+    Authorization header (verified locally, no network call). Only with ALLOW_USER_ID_PARAM
+    (local runs) does a request without any token fall back to a userId in the query string
+    or JSON body.
+    """
+    authorizer = (event.get('requestContext') or {}).get('authorizer') or {}
+    claims = authorizer.get('claims') or {}
+    if claims.get('sub'):
+        return claims['sub'] # Cognito user ID
+
+    token = get_bearer_token(event)
+    if token:
+        try:
+            claims = token_verifier.verify(token)
+        except TokenError as e:
+            print(f"Rejected bearer token: {e}")
+            return None # A bad token never falls through to the userId parameter
+        except Exception as e:
+            print(f"Token verification unavailable: {e}")
+            return None
+        # Kept where the authorizer puts them, so later lookups (e.g. is_hr) don't verify again
+        event['requestContext'] = dict(event.get('requestContext') or {}, authorizer={'claims': claims})
+        return claims['sub']
+
+    if not ALLOW_USER_ID_PARAM:
+        return None
+    query_params = event.get('queryStringParameters') or {}
+    if query_params.get('userId'):
+        return query_params['userId']
+    if event.get('body'):
         try:
             body = json.loads(event['body'])
-            return body.get('userId')
+            if isinstance(body, dict) and body.get('userId'):
+                return body['userId']
         except json.JSONDecodeError:
             pass
-    return None # Or handle unauthorized access
\ No newline at end of file
+    return None # Or handle unauthorized access
+
+# Callers in one of these Cognito groups act as HR: they may change reporting lines and look
+# at any part of the organisation, not just their own reports.
+HR_GROUPS = frozenset(re.split(r'[,\s]+', os.environ.get('HR_GROUPS', 'HR,Admin').strip())) - {''}
+
+def get_caller_groups(event):
+    """The caller's Cognito groups, from the authorizer's (or a verified token's) "cognito:groups" claim.
+
+    API Gateway passes the claim on as a string ("HR,Admin" or "[HR Admin]"), local runs as a list.
+    """
+    claims = ((event.get('requestContext') or {}).get('authorizer') or {}).get('claims') or {}
+    groups = claims.get('cognito:groups') or []
+    if isinstance(groups, str):
+        groups = re.split(r'[,\s]+', groups.strip().strip('[]'))
+    return {group for group in groups if group}
+
+def is_hr(event):
+    """Whether the caller is in one of HR_GROUPS."""
+    return bool(get_caller_groups(event) & HR_GROUPS)
+
+class TTLCache:
+    """Small thread-safe LRU cache with per-entry expiry, kept for the life of a warm container."""
+
+    def __init__(self, max_entries=1024, ttl_seconds=60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl_seconds=None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry else default
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+def utc_now_iso():
+    """Current UTC time as an ISO-8601 string (sorts chronologically as a DynamoDB string key)."""
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+def encode_cursor(last_evaluated_key):
+    """Turns a DynamoDB LastEvaluatedKey into an opaque, URL-safe pagination token."""
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; returns None for a missing token and raises ValueError for a malformed one."""
+    if not token:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid pagination token.')
+
+def requested_fields(event, allowed):
+    """Parses '?fields=a,b' against an allow-list; returns the field names (None when absent) or raises ValueError."""
+    raw = (event.get('queryStringParameters') or {}).get('fields')
+    if not raw:
+        return None
+    fields = list(dict.fromkeys(f.strip() for f in raw.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown or not fields:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown) or '(none given)'}. Allowed: {', '.join(allowed)}.")
+    return fields
+
+def with_projection(request_args, fields):
+    """Adds a ProjectionExpression for `fields` to query/get_item arguments (no-op for None).
+
+    Names go through #placeholders since several of ours (status, timestamp, ...) are reserved words.
+    """
+    if not fields:
+        return request_args
+    names = dict(request_args.get('ExpressionAttributeNames') or {})
+    placeholders = []
+    for i, field in enumerate(fields):
+        names[f'#p{i}'] = field
+        placeholders.append(f'#p{i}')
+    return dict(request_args, ProjectionExpression=', '.join(placeholders), ExpressionAttributeNames=names)
+
+def decode_fields(item, fields):
+    """Plain values for just `fields` of a DynamoDB item (S -> str, N -> int/float); absent attributes are skipped."""
+    decoded = {}
+    for field in fields:
+        value = item.get(field)
+        if value is None:
+            continue
+        if 'S' in value:
+            decoded[field] = value['S']
+        elif 'N' in value:
+            decoded[field] = int(value['N']) if value['N'].lstrip('-').isdigit() else float(value['N'])
+    return decoded
+
+def batch_write_all(table_name, write_requests, max_attempts=8):
+    """Sends PutRequest/DeleteRequest entries in BatchWriteItem chunks of 25, retrying UnprocessedItems with backoff."""
+    for start in range(0, len(write_requests), 25):
+        pending = {table_name: write_requests[start:start + 25]}
+        for attempt in range(max_attempts):
+            unprocessed = dynamodb_client.batch_write_item(RequestItems=pending).get('UnprocessedItems') or {}
+            if not unprocessed:
+                break
+            pending = unprocessed
+            time.sleep(min(1.0, 0.05 * (2 ** attempt)) * random.random()) # Full jitter
+        else:
+            raise RuntimeError(f'BatchWriteItem left unprocessed items for {table_name} after {max_attempts} attempts.')
+
+def _batch_get_chunk(table_name, spec, max_attempts):
+    items, pending = [], {table_name: spec}
+    for attempt in range(max_attempts):
+        response = dynamodb_client.batch_get_item(RequestItems=pending)
+        items.extend(response.get('Responses', {}).get(table_name, []))
+        pending = response.get('UnprocessedKeys') or {}
+        if not pending:
+            return items
+        time.sleep(min(1.0, 0.05 * (2 ** attempt)) * random.random()) # Full jitter
+    raise RuntimeError(f'BatchGetItem left unprocessed keys for {table_name} after {max_attempts} attempts.')
+
+def batch_get_all(table_name, keys, projection=None, attribute_names=None, consistent=False, max_attempts=8,
+                  max_workers=1):
+    """Fetches keys with BatchGetItem in chunks of 100, retrying UnprocessedKeys with backoff; returns the items found.
+
+    With max_workers > 1 the chunks are requested concurrently (the items then come back in no particular order).
+    """
+    specs = []
+    for start in range(0, len(keys), 100):
+        spec = {'Keys': keys[start:start + 100], 'ConsistentRead': consistent}
+        if projection:
+            spec['ProjectionExpression'] = projection
+        if attribute_names:
+            spec['ExpressionAttributeNames'] = attribute_names
+        specs.append(spec)
+    if max_workers <= 1 or len(specs) <= 1:
+        return [item for spec in specs for item in _batch_get_chunk(table_name, spec, max_attempts)]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(specs))) as pool:
+        chunks = pool.map(lambda spec: _batch_get_chunk(table_name, spec, max_attempts), specs)
+        return [item for chunk in chunks for item in chunk]
+
+# Storage layouts for the per-user entities. Every entity is keyed by userId, so they can live
+# either in their own tables (multi, the default) or together in one table (single), where a
+# user's profile, leaves, feedback and documents form one item collection:
+#   PK = USER#<userId>, SK = PROFILE | LEAVE#<leaveId> | FEEDBACK#<feedbackId> | DOC#<documentId>
+# and a user's full record is a single paginated Query. Items keep their userId/<id> attributes
+# in both layouts, so GSIs (ApprovalQueueIndex) and API responses look the same.
+# STORAGE_LAYOUT=dual is the online migration step: reads stay on the per-entity tables while
+# writes also go to the single table; tools/migrate_single_table.py copies and verifies the rest.
+ENTITY_TABLES = {'profile': PROFILES_TABLE, 'leave': LEAVES_TABLE, 'feedback': FEEDBACK_TABLE,
+                 'document': DOCUMENTS_TABLE}
+ENTITY_ID_ATTRIBUTES = {'profile': None, 'leave': 'leaveId', 'feedback': 'feedbackId', 'document': 'documentId'}
+ENTITY_SORT_PREFIXES = {'profile': 'PROFILE', 'leave': 'LEAVE#', 'feedback': 'FEEDBACK#', 'document': 'DOC#'}
+
+class MultiTableLayout:
+    """One table per entity, keyed by userId (+ the entity's id attribute)."""
+    name = 'multi'
+
+    def table(self, entity):
+        return ENTITY_TABLES[entity]
+
+    def key(self, entity, user_id, item_id=None):
+        key = {'userId': {'S': user_id}}
+        if ENTITY_ID_ATTRIBUTES[entity]:
+            key[ENTITY_ID_ATTRIBUTES[entity]] = {'S': item_id}
+        return key
+
+    def item(self, entity, attributes):
+        """The item to store for an entity's attributes (which include userId and its id attribute)."""
+        return dict(attributes)
+
+    def attributes(self, item):
+        """Inverse of item(): the entity's own attributes."""
+        return item
+
+    def update_args(self, entity, user_id, item_id, update_args):
+        """update_item arguments for this layout (an update may create the item, e.g. a first profile save)."""
+        return update_args
+
+    def query_args(self, entity, user_id):
+        return {'TableName': self.table(entity), 'KeyConditionExpression': 'userId = :uid',
+                'ExpressionAttributeValues': {':uid': {'S': user_id}}}
+
+    def scan_args(self, entity):
+        return {'TableName': self.table(entity)}
+
+    def entity_of(self, table_name, item):
+        """Which entity a stored item (e.g. a stream image) from table_name is, or None if not served from it."""
+        for entity, table in ENTITY_TABLES.items():
+            if table == table_name:
+                return entity
+        return None
+
+class SingleTableLayout(MultiTableLayout):
+    """All entities in MAIN_TABLE under PK=USER#<userId>, SK=<entity prefix><id>."""
+    name = 'single'
+
+    def table(self, entity):
+        return MAIN_TABLE
+
+    def key(self, entity, user_id, item_id=None):
+        return {'PK': {'S': f'USER#{user_id}'}, 'SK': {'S': ENTITY_SORT_PREFIXES[entity] + (item_id or '')}}
+
+    def item(self, entity, attributes):
+        id_attribute = ENTITY_ID_ATTRIBUTES[entity]
+        item_id = attributes[id_attribute]['S'] if id_attribute else None
+        return dict(attributes, **self.key(entity, attributes['userId']['S'], item_id))
+
+    def attributes(self, item):
+        return {k: v for k, v in item.items() if k not in ('PK', 'SK')}
+
+    def update_args(self, entity, user_id, item_id, update_args):
+        # userId/<id> aren't key attributes here, so SET them in case the update creates the item
+        args = dict(update_args)
+        values = dict(args.get('ExpressionAttributeValues') or {}, **{':layout_uid': {'S': user_id}})
+        assignments = 'userId = :layout_uid'
+        if ENTITY_ID_ATTRIBUTES[entity]:
+            values[':layout_id'] = {'S': item_id}
+            assignments += f', {ENTITY_ID_ATTRIBUTES[entity]} = :layout_id'
+        expression = args['UpdateExpression']
+        if re.search(r'\bSET\b', expression):
+            args['UpdateExpression'] = re.sub(r'\bSET\b', f'SET {assignments},', expression, count=1)
+        else:
+            args['UpdateExpression'] = f'SET {assignments} {expression}'
+        args['ExpressionAttributeValues'] = values
+        return args
+
+    def query_args(self, entity, user_id):
+        return {'TableName': MAIN_TABLE, 'KeyConditionExpression': 'PK = :pk AND begins_with(SK, :sk)',
+                'ExpressionAttributeValues': {':pk': {'S': f'USER#{user_id}'},
+                                              ':sk': {'S': ENTITY_SORT_PREFIXES[entity]}}}
+
+    def scan_args(self, entity):
+        return {'TableName': MAIN_TABLE, 'FilterExpression': 'begins_with(SK, :sk)',
+                'ExpressionAttributeValues': {':sk': {'S': ENTITY_SORT_PREFIXES[entity]}}}
+
+    def entity_of(self, table_name, item):
+        if table_name != MAIN_TABLE:
+            return None
+        sort_key = item.get('SK', {}).get('S', '')
+        for entity, prefix in ENTITY_SORT_PREFIXES.items():
+            if sort_key.startswith(prefix):
+                return entity
+        return None
+
+LAYOUTS = {'multi': MultiTableLayout(), 'single': SingleTableLayout()}
+storage = LAYOUTS['single' if STORAGE_LAYOUT == 'single' else 'multi'] # Reads (and primary writes)
+mirror_storage = LAYOUTS['single'] if STORAGE_LAYOUT == 'dual' else None # Secondary writes while migrating
+
+def put_entity(entity, attributes, **put_args):
+    """Writes an entity item to the active layout (and, while migrating, to the single table too)."""
+    dynamodb_client.put_item(TableName=storage.table(entity), Item=storage.item(entity, attributes), **put_args)
+    mirror_put(entity, attributes)
+
+def mirror_put(entity, attributes):
+    """Repeats a put on the single table while migrating (a no-op otherwise)."""
+    if mirror_storage:
+        try:
+            dynamodb_client.put_item(TableName=mirror_storage.table(entity),
+                                     Item=mirror_storage.item(entity, attributes))
+        except Exception as e:
+            print(f"Dual-write of {entity} to {mirror_storage.table(entity)} failed (the verifier will repair it): {e}")
+
+def mirror_update(entity, user_id, item_id=None, **update_args):
+    """Repeats an update on the single table while migrating; items not copied there yet are skipped."""
+    if not mirror_storage:
+        return
+    condition = update_args.pop('ConditionExpression', None)
+    update_args['ConditionExpression'] = (f'attribute_exists(PK) AND ({condition})' if condition
+                                          else 'attribute_exists(PK)')
+    try:
+        dynamodb_client.update_item(TableName=mirror_storage.table(entity),
+                                    Key=mirror_storage.key(entity, user_id, item_id),
+                                    **mirror_storage.update_args(entity, user_id, item_id, update_args))
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        pass # Not migrated yet: the copy step brings the whole, already-updated item over
+    except Exception as e:
+        print(f"Dual-write update of {entity} failed (the verifier will repair it): {e}")
+
+def update_entity(entity, user_id, item_id=None, **update_args):
+    """update_item on an entity in the active layout (mirrored while migrating); returns the response."""
+    response = dynamodb_client.update_item(TableName=storage.table(entity), Key=storage.key(entity, user_id, item_id),
+                                           **storage.update_args(entity, user_id, item_id, update_args))
+    mirror_update(entity, user_id, item_id, **update_args)
+    return response
+
+def get_user_record(user_id, layout=None):
+    """A user's profile, leaves, feedback and documents as stored items (layout keys removed).
+
+    Single table: one paginated Query over the user's item collection. Per-entity tables:
+    a GetItem and three Queries.
+    """
+    layout = layout or storage
+    record = {'profile': None, 'leave': [], 'feedback': [], 'document': []}
+    if layout.name == 'single':
+        query_args = {'TableName': MAIN_TABLE, 'KeyConditionExpression': 'PK = :pk',
+                      'ExpressionAttributeValues': {':pk': {'S': f'USER#{user_id}'}}}
+        while True:
+            response = dynamodb_client.query(**query_args)
+            for item in response.get('Items', []):
+                entity = layout.entity_of(MAIN_TABLE, item)
+                if entity == 'profile':
+                    record['profile'] = layout.attributes(item)
+                elif entity:
+                    record[entity].append(layout.attributes(item))
+            if not response.get('LastEvaluatedKey'):
+                return record
+            query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    record['profile'] = dynamodb_client.get_item(TableName=layout.table('profile'),
+                                                 Key=layout.key('profile', user_id)).get('Item')
+    for entity in ('leave', 'feedback', 'document'):
+        query_args = layout.query_args(entity, user_id)
+        while True:
+            response = dynamodb_client.query(**query_args)
+            record[entity].extend(response.get('Items', []))
+            if not response.get('LastEvaluatedKey'):
+                break
+            query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return record
+
+# Profiles read by get_profile (and pre-loaded by warm-up pings) are cached for the life of a warm
+# container. update_profile drops the entry in its own container; other containers may serve the
+# old profile for up to PROFILE_CACHE_TTL_SECONDS (0 disables the cache).
+PROFILE_CACHE_TTL_SECONDS = float(os.environ.get('PROFILE_CACHE_TTL_SECONDS', '30'))
+profile_cache = TTLCache(max_entries=int(os.environ.get('PROFILE_CACHE_MAX_ENTRIES', '2048')),
+                         ttl_seconds=PROFILE_CACHE_TTL_SECONDS)
+
+def load_profile(user_id):
+    """A user's stored profile attributes (layout keys removed), or None; found profiles are cached."""
+    cached = profile_cache.get(user_id)
+    if cached is not None:
+        return cached
+    item = dynamodb_client.get_item(TableName=storage.table('profile'), Key=storage.key('profile', user_id)).get('Item')
+    if item:
+        item = storage.attributes(item)
+        profile_cache.set(user_id, item)
+    return item
+
+PROFILE_BATCH_WORKERS = int(os.environ.get('PROFILE_BATCH_WORKERS', '4')) # Concurrent BatchGetItem calls
+
+def load_profiles(user_ids):
+    """{userId: stored profile attributes} for the given users (missing profiles are left out).
+
+    Cached profiles are served from profile_cache; the rest are read with concurrent BatchGetItem
+    calls of up to 100 keys and cached in turn.
+    """
+    profiles, misses = {}, []
+    for user_id in dict.fromkeys(user_ids):
+        cached = profile_cache.get(user_id)
+        if cached is not None:
+            profiles[user_id] = cached
+        else:
+            misses.append(user_id)
+    items = batch_get_all(storage.table('profile'), [storage.key('profile', u) for u in misses],
+                          max_workers=PROFILE_BATCH_WORKERS)
+    for item in items:
+        item = storage.attributes(item)
+        profile_cache.set(item['userId']['S'], item)
+        profiles[item['userId']['S']] = item
+    return profiles
@@ -1,9 +1,205 @@
 # document_manager.py
+# Storage quota: every user has one counter item in DOCUMENT_USAGE_TABLE (bytesUsed, documentCount).
+# upload_document adds the document's fileSize in the same transaction that writes its metadata,
+# with a condition that the total stays within DOCUMENT_QUOTA_BYTES, so concurrent uploads can't
+# overshoot the quota and the counter never drifts from the metadata. /documents/usage reads the
+# counter (one GetItem).
+# The client uploads the file with the presigned POST returned by upload_document, whose policy
+# (content-length-range) makes S3 reject a file larger than the declared fileSize, so the quota
+# checked against fileSize holds for what is actually stored.
+# Post-processing: upload_document enqueues a document.uploaded job (jobs.py), delayed by
+# DOCUMENT_PROCESSING_DELAY_SECONDS to give the client time to upload the file. The job reads the
+# object's stored size and type (HeadObject), records them on the metadata with processedAt,
+# and corrects the usage counter by the difference from the declared fileSize. An object that
+# isn't there yet fails the job, which is retried with backoff and dead-lettered in the end.
+# Reconciliation: reconcile_usage totals every user's objects in S3 and compares them with the
+# counter; reconcile_document_usage runs it on a schedule (template.yaml) and
+# tools/reconcile_document_usage.py by hand. Users with documents not processed yet are skipped,
+# since their counter still holds the declared sizes.
 import json
+import os
 import uuid
 import base64 # For handling file uploads (if passed directly)
-from common_utils import get_response, get_user_id_from_event, dynamodb_client, s3_client, DOCUMENTS_TABLE, S3_BUCKET_NAME
+from concurrent.futures import ThreadPoolExecutor
+from common_utils import (get_response, negotiated, error_response, get_user_id_from_event, dynamodb_client, s3_client,
+                          storage, mirror_put, requested_fields, with_projection, decode_fields, S3_BUCKET_NAME,
+                          utc_now_iso, mirror_update, DOCUMENT_USAGE_TABLE)
+from jobs import enqueue, job
+from resilience import error_code
+from idempotency import idempotent
+from audit import audited
+from memory_profile import sample_memory
+from profiling import profiled
+from warmup import handles_warmup
 
+# Attributes a client may select with ?fields= on get_documents (all of them by default)
+DOCUMENT_FIELDS = ('userId', 'documentId', 'fileName', 'fileType', 'fileSize', 'uploadDate', 's3Key', 's3Bucket',
+                   'downloadUrl')
+DOCUMENT_QUOTA_BYTES = int(os.environ.get('DOCUMENT_QUOTA_BYTES', str(1024 ** 3))) # 0 disables the quota
+DOCUMENT_PROCESSING_DELAY_SECONDS = int(os.environ.get('DOCUMENT_PROCESSING_DELAY_SECONDS', '30')) # SQS allows 0-900
+DOCUMENT_UPLOAD_EXPIRES_SECONDS = int(os.environ.get('DOCUMENT_UPLOAD_EXPIRES_SECONDS', '900')) # Presigned POST lifetime
+
+class QuotaExceededError(Exception):
+    """The upload would take the user's documents over DOCUMENT_QUOTA_BYTES."""
+
+class DocumentNotStoredError(Exception):
+    """The document's S3 object doesn't exist (yet); its post-processing job is retried."""
+
+def get_usage(user_id):
+    """(bytesUsed, documentCount) of a user's documents, from their usage counter."""
+    item = dynamodb_client.get_item(TableName=DOCUMENT_USAGE_TABLE, Key={'userId': {'S': user_id}}).get('Item') or {}
+    return int(item.get('bytesUsed', {}).get('N', '0')), int(item.get('documentCount', {}).get('N', '0'))
+
+def _quota_message(user_id, file_size):
+    used, _ = get_usage(user_id)
+    return {'message': 'Document storage quota exceeded.', 'bytesUsed': used, 'quotaBytes': DOCUMENT_QUOTA_BYTES,
+            'fileSize': file_size}
+
+def save_document(user_id, attributes, file_size):
+    """Writes a document's metadata and adds its size to the user's usage counter in one transaction.
+
+    Raises QuotaExceededError (and writes nothing) when the counter would pass DOCUMENT_QUOTA_BYTES.
+    """
+    if DOCUMENT_QUOTA_BYTES and file_size > DOCUMENT_QUOTA_BYTES:
+        raise QuotaExceededError()
+    usage_update = {
+        'TableName': DOCUMENT_USAGE_TABLE,
+        'Key': {'userId': {'S': user_id}},
+        'UpdateExpression': 'ADD bytesUsed :size, documentCount :one',
+        'ExpressionAttributeValues': {':size': {'N': str(file_size)}, ':one': {'N': '1'}}
+    }
+    if DOCUMENT_QUOTA_BYTES:
+        usage_update['ConditionExpression'] = 'attribute_not_exists(bytesUsed) OR bytesUsed <= :room'
+        usage_update['ExpressionAttributeValues'][':room'] = {'N': str(DOCUMENT_QUOTA_BYTES - file_size)}
+    try:
+        dynamodb_client.transact_write_items(TransactItems=[
+            {'Put': {'TableName': storage.table('document'), 'Item': storage.item('document', attributes)}},
+            {'Update': usage_update}
+        ])
+    except dynamodb_client.exceptions.TransactionCanceledException as e:
+        reasons = e.response.get('CancellationReasons', [])
+        if len(reasons) > 1 and reasons[1].get('Code') == 'ConditionalCheckFailed':
+            raise QuotaExceededError() from e
+        raise
+    mirror_put('document', attributes) # No-op unless migrating layouts
+
+@job('document.uploaded')
+def process_uploaded_document(payload):
+    """Records a document's stored size and type and corrects the usage counter (a background job)."""
+    user_id, document_id, declared_size = payload['userId'], payload['documentId'], int(payload['fileSize'])
+    try:
+        head = s3_client.head_object(Bucket=payload['s3Bucket'], Key=payload['s3Key'])
+    except Exception as e:
+        if error_code(e) in ('404', 'NoSuchKey', 'NotFound'):
+            raise DocumentNotStoredError(f"s3://{payload['s3Bucket']}/{payload['s3Key']} not uploaded yet") from e
+        raise
+    stored_size = int(head['ContentLength'])
+    update = {'UpdateExpression': 'SET storedSize = :size, storedType = :type, processedAt = :now',
+              'ConditionExpression': 'attribute_exists(documentId) AND attribute_not_exists(processedAt)',
+              'ExpressionAttributeValues': {':size': {'N': str(stored_size)},
+                                            ':type': {'S': head.get('ContentType') or 'binary/octet-stream'},
+                                            ':now': {'S': utc_now_iso()}}}
+    items = [{'Update': {'TableName': storage.table('document'), 'Key': storage.key('document', user_id, document_id),
+                         **storage.update_args('document', user_id, document_id, dict(update))}}]
+    if stored_size != declared_size: # In the same transaction, so a retried job can't correct it twice
+        items.append({'Update': {'TableName': DOCUMENT_USAGE_TABLE, 'Key': {'userId': {'S': user_id}},
+                                 'UpdateExpression': 'ADD bytesUsed :diff',
+                                 'ExpressionAttributeValues': {':diff': {'N': str(stored_size - declared_size)}}}})
+    try:
+        dynamodb_client.transact_write_items(TransactItems=items)
+    except dynamodb_client.exceptions.TransactionCanceledException as e:
+        reasons = e.response.get('CancellationReasons', [])
+        if reasons and reasons[0].get('Code') == 'ConditionalCheckFailed':
+            return # Deleted since, or already processed by an earlier delivery
+        raise
+    mirror_update('document', user_id, document_id, **update)
+
+def upload_form(s3_key, file_type, file_size):
+    """Presigned POST {'url', 'fields'} for one object, refused by S3 if the file is larger than file_size."""
+    return s3_client.generate_presigned_post(
+        Bucket=S3_BUCKET_NAME, Key=s3_key, Fields={'Content-Type': file_type},
+        Conditions=[{'Content-Type': file_type}, ['content-length-range', 0, file_size]],
+        ExpiresIn=DOCUMENT_UPLOAD_EXPIRES_SECONDS)
+
+def _scan_all(**scan_args):
+    while True:
+        response = dynamodb_client.scan(**scan_args)
+        yield from response.get('Items', [])
+        if not response.get('LastEvaluatedKey'):
+            return
+        scan_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def load_usage_counters():
+    """({userId: (bytesUsed, documentCount) or None} for every user with a counter or a document,
+    the users with a document whose upload hasn't been processed yet)."""
+    counters = {item['userId']['S']: (int(item.get('bytesUsed', {}).get('N', '0')),
+                                      int(item.get('documentCount', {}).get('N', '0')))
+                for item in _scan_all(TableName=DOCUMENT_USAGE_TABLE)}
+    pending = set()
+    for item in _scan_all(**dict(storage.scan_args('document'), ProjectionExpression='userId, processedAt')):
+        counters.setdefault(item['userId']['S'], None)
+        if 'processedAt' not in item:
+            pending.add(item['userId']['S'])
+    return counters, pending
+
+def stored_usage(user_id):
+    """(bytes, objects) stored under the user's prefix in S3."""
+    total, count, args = 0, 0, {'Bucket': S3_BUCKET_NAME, 'Prefix': f'{user_id}/'}
+    while True:
+        response = s3_client.list_objects_v2(**args)
+        for obj in response.get('Contents', []):
+            total += obj['Size']
+            count += 1
+        if not response.get('IsTruncated'):
+            return total, count
+        args['ContinuationToken'] = response['NextContinuationToken']
+
+def repair_usage(user_id, counter, actual):
+    """Sets the counter to the S3 totals unless it changed since it was read; returns True when set."""
+    values = {':bytes': {'N': str(actual[0])}, ':count': {'N': str(actual[1])}, ':now': {'S': utc_now_iso()}}
+    if counter is None:
+        condition = 'attribute_not_exists(bytesUsed)'
+    else:
+        condition = 'bytesUsed = :seen_bytes AND documentCount = :seen_count'
+        values.update({':seen_bytes': {'N': str(counter[0])}, ':seen_count': {'N': str(counter[1])}})
+    try:
+        dynamodb_client.update_item(TableName=DOCUMENT_USAGE_TABLE, Key={'userId': {'S': user_id}},
+                                    UpdateExpression='SET bytesUsed = :bytes, documentCount = :count, '
+                                                     'reconciledAt = :now',
+                                    ConditionExpression=condition, ExpressionAttributeValues=values)
+        return True
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        return False
+
+def reconcile_usage(repair=False, tolerance_bytes=0, workers=8):
+    """Compares every user's usage counter with their objects in S3 (and with repair, fixes it).
+
+    Returns {'users', 'pending', 'drifted': [(userId, counter, (bytes, objects))], 'repaired', 'conflicts'}.
+    """
+    counters, pending = load_usage_counters()
+    checked = [user_id for user_id in sorted(counters) if user_id not in pending]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        actual = dict(zip(checked, pool.map(stored_usage, checked)))
+    result = {'users': len(checked), 'pending': len(pending), 'drifted': [], 'repaired': 0, 'conflicts': 0}
+    for user_id in checked:
+        used, count = counters[user_id] or (0, 0)
+        stored, objects = actual[user_id]
+        if abs(used - stored) <= tolerance_bytes and count == objects:
+            continue
+        result['drifted'].append((user_id, counters[user_id], actual[user_id]))
+        if repair:
+            if repair_usage(user_id, counters[user_id], actual[user_id]):
+                result['repaired'] += 1
+            else:
+                result['conflicts'] += 1 # Changed while reconciling; left for the next run
+    return result
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+@idempotent('upload_document')
+@audited('document.upload', target=lambda request, response: response['documentId'])
 def upload_document(event, context):
     """Lambda function to handle document uploads (metadata to DynamoDB, file to S3)."""
     user_id = get_user_id_from_event(event)
@@ -15,8 +211,13 @@ def upload_document(event, context):
         
         file_name = body['fileName']
         file_type = body['fileType']
-        file_size = body['fileSize'] # Size in bytes, for metadata
-        upload_date = body['uploadDate']
+        try:
+            file_size = int(body['fileSize']) # Size in bytes, for metadata and the quota
+        except (TypeError, ValueError):
+            return get_response(400, {'message': 'fileSize must be a number of bytes.'})
+        if file_size < 0:
+            return get_response(400, {'message': 'fileSize must not be negative.'})
+        upload_date = body.get('uploadDate') or utc_now_iso() # Sent by the frontend; DocumentTimelineIndex sort key
         
         # In a real scenario, the file itself might be base64 encoded in the request body
         # or the frontend would get a pre-signed S3 URL to upload directly.
@@ -37,38 +238,46 @@ def upload_document(event, context):
 
         # Store document metadata in DynamoDB
         document_id = str(uuid.uuid4())
-        dynamodb_client.put_item(
-            TableName=DOCUMENTS_TABLE,
-            Item={
-                'userId': {'S': user_id},
-                'documentId': {'S': document_id}, # Sort Key
-                'fileName': {'S': file_name},
-                'fileType': {'S': file_type},
-                'fileSize': {'N': str(file_size)}, # Store as Number
-                'uploadDate': {'S': upload_date},
-                's3Key': {'S': s3_object_key},
-                's3Bucket': {'S': S3_BUCKET_NAME},
-                'downloadUrl': {'S': f"https://{S3_BUCKET_NAME}.s3.amazonaws.com/{s3_object_key}"} # Public URL
-            }
-        )
-        return get_response(200, {'message': 'Document metadata saved successfully!', 'documentId': document_id, 's3Key': s3_object_key})
+        save_document(user_id, {
+            'userId': {'S': user_id},
+            'documentId': {'S': document_id}, # Sort Key
+            'fileName': {'S': file_name},
+            'fileType': {'S': file_type},
+            'fileSize': {'N': str(file_size)}, # Store as Number
+            'uploadDate': {'S': upload_date},
+            's3Key': {'S': s3_object_key},
+            's3Bucket': {'S': S3_BUCKET_NAME},
+            'downloadUrl': {'S': f"https://{S3_BUCKET_NAME}.s3.amazonaws.com/{s3_object_key}"} # Public URL
+        }, file_size)
+        enqueue('document.uploaded', {'userId': user_id, 'documentId': document_id, 'fileSize': file_size,
+                                      's3Bucket': S3_BUCKET_NAME, 's3Key': s3_object_key},
+                delay_seconds=DOCUMENT_PROCESSING_DELAY_SECONDS)
+        return get_response(200, {'message': 'Document metadata saved successfully!', 'documentId': document_id, 's3Key': s3_object_key,
+                                  'upload': upload_form(s3_object_key, file_type, file_size)})
 
+    except QuotaExceededError:
+        return get_response(413, _quota_message(user_id, file_size))
+    except ValueError as e:
+        return get_response(400, {'message': f'Invalid request body: {e}'})
     except Exception as e:
         print(f"Error uploading document for {user_id}: {e}")
-        return get_response(500, {'message': f'Internal server error: {str(e)}'})
+        return error_response(e)
 
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
 def get_documents(event, context):
-    """Lambda function to retrieve all document metadata for a user."""
+    """Lambda function to retrieve all document metadata for a user (?fields=fileName,uploadDate to select attributes)."""
     user_id = get_user_id_from_event(event)
     if not user_id:
         return get_response(401, {'message': 'Unauthorized: User ID missing.'})
 
     try:
-        response = dynamodb_client.query(
-            TableName=DOCUMENTS_TABLE,
-            KeyConditionExpression='userId = :uid',
-            ExpressionAttributeValues={':uid': {'S': user_id}}
-        )
+        fields = requested_fields(event, DOCUMENT_FIELDS)
+        response = dynamodb_client.query(**with_projection(storage.query_args('document', user_id), fields))
+        if fields:
+            return get_response(200, {'documents': [decode_fields(item, fields) for item in response.get('Items', [])]})
         documents = []
         for item in response.get('Items', []):
             doc_data = {
@@ -84,6 +293,48 @@ def get_documents(event, context):
             }
             documents.append(doc_data)
         return get_response(200, {'documents': documents})
+    except ValueError as e:
+        return get_response(400, {'message': str(e)})
     except Exception as e:
         print(f"Error getting documents for {user_id}: {e}")
-        return get_response(500, {'message': f'Internal server error: {str(e)}'})
\ No newline at end of file
+        return error_response(e)
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+def get_document_usage(event, context):
+    """Lambda function to report a user's document storage use against their quota."""
+    user_id = get_user_id_from_event(event)
+    if not user_id:
+        return get_response(401, {'message': 'Unauthorized: User ID missing.'})
+
+    try:
+        used, count = get_usage(user_id)
+        return get_response(200, {
+            'bytesUsed': used,
+            'documentCount': count,
+            'quotaBytes': DOCUMENT_QUOTA_BYTES or None,
+            'bytesRemaining': max(0, DOCUMENT_QUOTA_BYTES - used) if DOCUMENT_QUOTA_BYTES else None
+        })
+    except Exception as e:
+        print(f"Error getting document usage for {user_id}: {e}")
+        return error_response(e)
+
+@handles_warmup
+@sample_memory
+@profiled
+def reconcile_document_usage(event, context):
+    """Lambda function run on a schedule: reconciles the usage counters with S3.
+
+    The schedule's input sets {"repair": true|false, "toleranceBytes": n}.
+    """
+    result = reconcile_usage(repair=bool(event.get('repair')), tolerance_bytes=int(event.get('toleranceBytes') or 0))
+    for user_id, counter, (stored, objects) in result['drifted']:
+        used, count = counter or (0, 0)
+        print(f"{user_id}: counter {used} bytes / {count} documents, S3 {stored} bytes / {objects} objects "
+              f"(drift {used - stored:+d} bytes)")
+    summary = {'users': result['users'], 'pending': result['pending'], 'drifted': len(result['drifted']),
+               'repaired': result['repaired'], 'conflicts': result['conflicts']}
+    print(f"Reconciled document usage: {summary}")
+    return summary
@@ -1,8 +1,24 @@
 # feedback_manager.py
 import json
 import uuid # For generating unique IDs
-from common_utils import get_response, get_user_id_from_event, dynamodb_client, FEEDBACK_TABLE
+from common_utils import (get_response, negotiated, error_response, get_user_id_from_event, dynamodb_client, storage,
+                          put_entity, requested_fields, with_projection, decode_fields, utc_now_iso)
+from idempotency import idempotent
+from audit import audited
+from archive import history_requested, with_archived
+from memory_profile import sample_memory
+from profiling import profiled
+from warmup import handles_warmup
 
+# Attributes a client may select with ?fields= on get_feedback (all of them by default)
+FEEDBACK_FIELDS = ('userId', 'feedbackId', 'feedback', 'timestamp')
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+@idempotent('submit_feedback')
+@audited('feedback.submit', target=lambda request, response: response['feedbackId'])
 def submit_feedback(event, context):
     """Lambda function to submit performance feedback."""
     user_id = get_user_id_from_event(event)
@@ -13,40 +29,48 @@ def submit_feedback(event, context):
         body = json.loads(event['body'])
         feedback_id = str(uuid.uuid4())
         feedback_text = body['feedback']
-        timestamp = body.get('timestamp', '') # Should be provided by frontend
-
-        dynamodb_client.put_item(
-            TableName=FEEDBACK_TABLE,
-            Item={
-                'userId': {'S': user_id},
-                'feedbackId': {'S': feedback_id}, # Sort Key
-                'feedback': {'S': feedback_text},
-                'timestamp': {'S': timestamp}
-            }
-        )
+        timestamp = body.get('timestamp') or utc_now_iso() # Sent by the frontend; FeedbackTimelineIndex sort key
+
+        put_entity('feedback', {
+            'userId': {'S': user_id},
+            'feedbackId': {'S': feedback_id}, # Sort Key
+            'feedback': {'S': feedback_text},
+            'timestamp': {'S': timestamp}
+        })
         return get_response(200, {'message': 'Feedback submitted successfully!', 'feedbackId': feedback_id})
 
     except Exception as e:
         print(f"Error submitting feedback for {user_id}: {e}")
-        return get_response(500, {'message': f'Internal server error: {str(e)}'})
+        return error_response(e)
 
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
 def get_feedback(event, context):
-    """Lambda function to retrieve all feedback for a user."""
+    """Lambda function to retrieve all feedback for a user (?fields=feedbackId,timestamp to select attributes).
+
+    Only hot (not yet archived) feedback by default; ?history=true adds the archived items.
+    """
     user_id = get_user_id_from_event(event)
     if not user_id:
         return get_response(401, {'message': 'Unauthorized: User ID missing.'})
 
     try:
-        response = dynamodb_client.query(
-            TableName=FEEDBACK_TABLE,
-            KeyConditionExpression='userId = :uid',
-            ExpressionAttributeValues={':uid': {'S': user_id}}
-        )
+        fields = requested_fields(event, FEEDBACK_FIELDS)
+        response = dynamodb_client.query(**with_projection(storage.query_args('feedback', user_id), fields))
+        items = response.get('Items', [])
+        if history_requested(event):
+            items = with_archived('feedback', user_id, items)
+        if fields:
+            return get_response(200, {'feedback': [decode_fields(item, fields) for item in items]})
         feedback_list = []
-        for item in response.get('Items', []):
-            feedback_data = {k: v['S'] for k, v in item.items()}
+        for item in items:
+            feedback_data = {k: v['S'] for k, v in storage.attributes(item).items()}
             feedback_list.append(feedback_data)
         return get_response(200, {'feedback': feedback_list})
+    except ValueError as e:
+        return get_response(400, {'message': str(e)})
     except Exception as e:
         print(f"Error getting feedback for {user_id}: {e}")
-        return get_response(500, {'message': f'Internal server error: {str(e)}'})
\ No newline at end of file
+        return error_response(e)
\ No newline at end of file
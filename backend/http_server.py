@@ -0,0 +1,402 @@
+# http_server.py (Self-hosted HTTP mode for on-prem / container deployments)
+# Serves the API routes declared in template.yaml without API Gateway or Lambda:
+#   1. an asyncio server parses HTTP/1.1 (keep-alive, Content-Length or chunked bodies,
+#      Expect: 100-continue) and builds the same proxy event API Gateway sends,
+#   2. routes that use the Cognito authorizer have their ID token verified (token_utils) and
+#      its claims put in requestContext.authorizer, as the authorizer would,
+#   3. the handler runs on a thread pool (default) or a process pool (--processes), so slow
+#      DynamoDB/S3/Cognito calls never block the event loop,
+#   4. its proxy response is written back; a handler exceeding --request-timeout gets 504.
+# SIGTERM/SIGINT stop accepting connections, close idle keep-alive connections and let
+# in-flight requests finish for up to --shutdown-grace seconds, then the audit log buffers are flushed.
+# With --job-workers N the server also runs background jobs (jobs.py): a JobWorker polls the job
+# queue and runs N jobs at a time in this process, and finishes the running ones on shutdown.
+#
+#   python backend/http_server.py [--port 8080] [--workers 32] [--processes] [--job-workers 4]
+#
+# Only Api events are served; the stream consumer (process_leave_stream) has no HTTP route.
+# With HRMS_LOCAL_BACKENDS=1 each process has its own in-memory stand-ins, so use threads there.
+import argparse
+import asyncio
+import base64
+import importlib
+import json
+import multiprocessing.util
+import os
+import re
+import signal
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from email.utils import formatdate
+from http import HTTPStatus
+from urllib.parse import parse_qsl, unquote, urlsplit
+from common_utils import get_response, get_bearer_token, token_verifier
+from audit import audit_log
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'template.yaml')
+MAX_BODY_BYTES = 6 * 1024 * 1024 # Lambda's synchronous invocation payload limit
+MAX_HEADER_BYTES = 64 * 1024
+HANDLER_TIMEOUT_SECONDS = 30 # Globals.Function.Timeout in template.yaml
+
+RESOURCE_LINE = re.compile(r'^  ([A-Za-z0-9]+):\s*(#.*)?$')
+HANDLER_LINE = re.compile(r'^\s+Handler:\s*([A-Za-z0-9_.]+)')
+PATH_LINE = re.compile(r'^\s+Path:\s*(\S+)')
+METHOD_LINE = re.compile(r'^\s+Method:\s*([A-Za-z]+)')
+AUTH_NONE_LINE = re.compile(r'^\s+Auth:\s*NONE\b')
+
+class HttpError(Exception):
+    """A request that can't be parsed or served; answered with `status` and the connection closed."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def load_routes(template_path=TEMPLATE):
+    """{(METHOD, path): (handler 'module.function', requires auth)} for the Api events in the SAM template."""
+    routes = {}
+    handler, events = None, []
+
+    def flush():
+        for event in events:
+            if handler and event['method']:
+                routes[(event['method'], event['path'])] = (handler, event['auth'])
+
+    with open(template_path) as f:
+        for line in f:
+            if RESOURCE_LINE.match(line):
+                flush()
+                handler, events = None, []
+            elif HANDLER_LINE.match(line):
+                handler = HANDLER_LINE.match(line).group(1)
+            elif PATH_LINE.match(line):
+                events.append({'path': PATH_LINE.match(line).group(1), 'method': None, 'auth': True})
+            elif METHOD_LINE.match(line) and events:
+                events[-1]['method'] = METHOD_LINE.match(line).group(1).upper()
+            elif AUTH_NONE_LINE.match(line) and events:
+                events[-1]['auth'] = False
+    flush()
+    return routes
+
+class LambdaContext:
+    """The parts of the Lambda context object a handler may read."""
+
+    def __init__(self, function_name, timeout_seconds):
+        self.function_name = function_name
+        self.function_version = '$LATEST'
+        self.aws_request_id = str(uuid.uuid4())
+        self.memory_limit_in_mb = '0'
+        self._deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+_handlers = {}
+
+def _handler(name):
+    if name not in _handlers:
+        module, function = name.rsplit('.', 1)
+        _handlers[name] = getattr(importlib.import_module(module), function)
+    return _handlers[name]
+
+def invoke(handler_name, event, requires_auth, timeout_seconds=HANDLER_TIMEOUT_SECONDS):
+    """Runs one handler (in a pool worker) as API Gateway + Lambda would; returns its proxy response."""
+    if requires_auth:
+        token = get_bearer_token(event)
+        try:
+            claims = token_verifier.verify(token, token_use='id') if token else None
+        except Exception as e:
+            print(f"Authorizer rejected token: {e}")
+            claims = None
+        if not claims:
+            return get_response(401, {'message': 'Unauthorized'})
+        event['requestContext']['authorizer'] = {'claims': {k: ','.join(v) if isinstance(v, list) else str(v)
+                                                                for k, v in claims.items()}}
+    try:
+        return _handler(handler_name)(event, LambdaContext(handler_name, timeout_seconds))
+    except Exception as e:
+        print(f"Unhandled error in {handler_name}: {e}")
+        return get_response(502, {'message': 'Internal server error'})
+
+def _init_worker():
+    """Process-pool initializer: the worker uploads its buffered audit events when it exits."""
+    multiprocessing.util.Finalize(audit_log, audit_log.close, exitpriority=10)
+
+def build_event(method, target, headers, body, source_ip):
+    """API Gateway (REST, proxy integration) event for a request."""
+    url = urlsplit(target)
+    path = unquote(url.path) or '/'
+    single_headers, multi_headers = {}, {}
+    for name, value in headers:
+        single_headers[name] = value
+        multi_headers.setdefault(name, []).append(value)
+    query, multi_query = {}, {}
+    for name, value in parse_qsl(url.query, keep_blank_values=True):
+        query[name] = value
+        multi_query.setdefault(name, []).append(value)
+    encoded = False
+    if body:
+        try:
+            body = body.decode('utf-8')
+        except UnicodeDecodeError:
+            body, encoded = base64.b64encode(body).decode('ascii'), True
+    return {
+        'resource': path,
+        'path': path,
+        'httpMethod': method,
+        'headers': single_headers or None,
+        'multiValueHeaders': multi_headers or None,
+        'queryStringParameters': query or None,
+        'multiValueQueryStringParameters': multi_query or None,
+        'pathParameters': None,
+        'stageVariables': None,
+        'requestContext': {
+            'requestId': str(uuid.uuid4()),
+            'httpMethod': method,
+            'path': path,
+            'resourcePath': path,
+            'stage': 'local',
+            'requestTimeEpoch': int(time.time() * 1000),
+            'identity': {'sourceIp': source_ip, 'userAgent': single_headers.get('User-Agent')}
+        },
+        'body': body or None,
+        'isBase64Encoded': encoded
+    }
+
+def _header(headers, name):
+    lowered = name.lower()
+    for key, value in headers:
+        if key.lower() == lowered:
+            return value
+    return None
+
+class HTTPServer:
+    """asyncio HTTP/1.1 front end dispatching API routes to handlers on a worker pool."""
+
+    def __init__(self, routes, host='0.0.0.0', port=8080, workers=32, use_processes=False, request_timeout=30.0,
+                 keep_alive_timeout=5.0, header_timeout=10.0, shutdown_grace=30.0, job_workers=0):
+        self.routes = routes
+        self.paths = {path for _, path in routes}
+        self.host, self.port = host, port
+        self.request_timeout = request_timeout
+        self.keep_alive_timeout = keep_alive_timeout
+        self.header_timeout = header_timeout
+        self.shutdown_grace = shutdown_grace
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if use_processes else \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix='handler')
+        self._server = None
+        self._connections = {} # task -> 'idle' | 'busy'
+        self._draining = False
+        self._stopped = None
+        self.job_workers = job_workers
+        self._job_worker = None
+
+    async def start(self):
+        self._stopped = asyncio.Event()
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port, limit=MAX_HEADER_BYTES,
+                                                  backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"Serving {len(self.routes)} routes on http://{self.host}:{self.port}")
+        if self.job_workers:
+            import job_worker # Only servers running jobs import every job handler module
+            self._job_worker = job_worker.start_worker(self.job_workers)
+            print(f"Running background jobs from {self._job_worker.queue_url} on {self.job_workers} threads")
+
+    def request_stop(self):
+        """Starts a graceful shutdown (safe to call from a signal handler or another thread's loop callback)."""
+        if self._stopped and not self._stopped.is_set():
+            self._stopped.set()
+
+    async def serve_until_stopped(self):
+        await self._stopped.wait()
+        await self.shutdown()
+
+    async def shutdown(self):
+        self._draining = True
+        self._server.close()
+        await self._server.wait_closed()
+        for task, state in list(self._connections.items()):
+            if state == 'idle':
+                task.cancel() # Waiting for a keep-alive request that we no longer want
+        pending = list(self._connections)
+        if pending:
+            _, still_running = await asyncio.wait(pending, timeout=self.shutdown_grace)
+            for task in still_running:
+                task.cancel()
+            if still_running:
+                print(f"Shutdown grace period over; dropped {len(still_running)} connections")
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self._job_worker:
+            await asyncio.get_running_loop().run_in_executor(None, self._job_worker.stop) # Blocks up to a poll
+        audit_log.close() # Process workers flush their own buffers as they exit (_init_worker)
+        print("Server stopped")
+
+    async def _serve_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections[task] = 'idle'
+        peer = writer.get_extra_info('peername')
+        source_ip = peer[0] if peer else '127.0.0.1'
+        try:
+            while not self._draining:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), self.keep_alive_timeout)
+                except asyncio.TimeoutError:
+                    break # Idle keep-alive connection
+                if not request_line:
+                    break # Client closed the connection
+                if not request_line.strip():
+                    continue # Tolerate stray CRLF between pipelined requests
+                self._connections[task] = 'busy'
+                try:
+                    method, target, version, headers, body = await asyncio.wait_for(
+                        self._read_request(request_line, reader, writer), self.header_timeout)
+                except asyncio.TimeoutError:
+                    await self._write(writer, get_response(408, {'message': 'Request timeout'}), False)
+                    break
+                except HttpError as e:
+                    await self._write(writer, get_response(e.status, {'message': str(e)}), False)
+                    break
+                connection = (_header(headers, 'Connection') or '').lower()
+                keep_alive = (connection != 'close') if version == 'HTTP/1.1' else (connection == 'keep-alive')
+                response = await self._dispatch(method, target, headers, body, source_ip)
+                keep_alive = keep_alive and not self._draining
+                await self._write(writer, response, keep_alive, head_only=method == 'HEAD')
+                if not keep_alive:
+                    break
+                self._connections[task] = 'idle'
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def _read_request(self, request_line, reader, writer):
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            raise HttpError(400, 'Malformed request line')
+        if version not in ('HTTP/1.0', 'HTTP/1.1'):
+            raise HttpError(505, 'HTTP version not supported')
+        headers, header_bytes = [], len(request_line)
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError: # Line longer than the stream limit
+                raise HttpError(431, 'Request header fields too large')
+            header_bytes += len(line)
+            if header_bytes > MAX_HEADER_BYTES:
+                raise HttpError(431, 'Request header fields too large')
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, sep, value = line.decode('latin-1').partition(':')
+            if not sep:
+                raise HttpError(400, 'Malformed header line')
+            headers.append((name.strip(), value.strip()))
+
+        if (_header(headers, 'Expect') or '').lower() == '100-continue':
+            writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+            await writer.drain()
+        if (_header(headers, 'Transfer-Encoding') or '').lower() == 'chunked':
+            body = await self._read_chunked(reader)
+        else:
+            try:
+                length = int(_header(headers, 'Content-Length') or 0)
+            except ValueError:
+                raise HttpError(400, 'Invalid Content-Length')
+            if length > MAX_BODY_BYTES:
+                raise HttpError(413, 'Request body too large')
+            body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, version, headers, body
+
+    async def _read_chunked(self, reader):
+        chunks, size = [], 0
+        while True:
+            try:
+                chunk_size = int((await reader.readline()).split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                raise HttpError(400, 'Malformed chunked body')
+            if chunk_size == 0:
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass # Trailers are ignored
+                return b''.join(chunks)
+            size += chunk_size
+            if size > MAX_BODY_BYTES:
+                raise HttpError(413, 'Request body too large')
+            chunks.append(await reader.readexactly(chunk_size))
+            await reader.readexactly(2) # CRLF after each chunk
+
+    async def _dispatch(self, method, target, headers, body, source_ip):
+        path = unquote(urlsplit(target).path).rstrip('/') or '/'
+        route = self.routes.get((method, path))
+        if route is None and method == 'HEAD':
+            route = self.routes.get(('GET', path))
+        if route is None:
+            if path not in self.paths:
+                return get_response(404, {'message': 'Not Found'})
+            if method == 'OPTIONS':
+                return get_response(200, {}) # CORS preflight, answered with the handlers' CORS headers
+            allowed = ','.join(sorted(m for m, p in self.routes if p == path))
+            return get_response(405, {'message': 'Method Not Allowed'}, headers={'Allow': allowed})
+
+        event = build_event(method, target, headers, body, source_ip)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.pool, invoke, route[0], event, route[1])
+        try:
+            # The worker can't be interrupted; it finishes in the background after a 504
+            return await asyncio.wait_for(future, self.request_timeout)
+        except asyncio.TimeoutError:
+            print(f"{route[0]} exceeded {self.request_timeout}s")
+            return get_response(504, {'message': 'Endpoint request timed out'})
+        except Exception as e: # e.g. a process pool worker died
+            print(f"Error dispatching {route[0]}: {e}")
+            return get_response(502, {'message': 'Internal server error'})
+
+    async def _write(self, writer, response, keep_alive, head_only=False):
+        status = int(response.get('statusCode', 200))
+        body = response.get('body') or ''
+        body = base64.b64decode(body) if response.get('isBase64Encoded') else body.encode('utf-8')
+        headers = [(k, str(v)) for k, v in (response.get('headers') or {}).items()]
+        for name, values in (response.get('multiValueHeaders') or {}).items():
+            headers.extend((name, str(v)) for v in values)
+        try:
+            reason = HTTPStatus(status).phrase
+        except ValueError:
+            reason = 'Unknown'
+        lines = [f'HTTP/1.1 {status} {reason}', f'Date: {formatdate(usegmt=True)}',
+                 f'Content-Length: {len(body)}', f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines.extend(f'{name}: {value}' for name, value in headers
+                     if name.lower() not in ('content-length', 'connection', 'transfer-encoding'))
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (b'' if head_only else body))
+        await writer.drain()
+
+async def serve(server):
+    await server.start()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, server.request_stop)
+    await server.serve_until_stopped()
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the HRMS API routes from template.yaml over HTTP.')
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', '8080')))
+    parser.add_argument('--workers', type=int, default=32, help='handler threads (or processes)')
+    parser.add_argument('--processes', action='store_true', help='run handlers on a process pool')
+    parser.add_argument('--request-timeout', type=float, default=HANDLER_TIMEOUT_SECONDS)
+    parser.add_argument('--keep-alive-timeout', type=float, default=5.0, help='idle seconds before closing')
+    parser.add_argument('--header-timeout', type=float, default=10.0, help='seconds to receive a full request')
+    parser.add_argument('--shutdown-grace', type=float, default=30.0, help='seconds to finish in-flight requests')
+    parser.add_argument('--job-workers', type=int, default=0, help='threads running background jobs (0: none)')
+    parser.add_argument('--template', default=TEMPLATE)
+    args = parser.parse_args()
+
+    server = HTTPServer(load_routes(args.template), host=args.host, port=args.port, workers=args.workers,
+                        use_processes=args.processes, request_timeout=args.request_timeout,
+                        keep_alive_timeout=args.keep_alive_timeout, header_timeout=args.header_timeout,
+                        shutdown_grace=args.shutdown_grace, job_workers=args.job_workers)
+    asyncio.run(serve(server))
+
+if __name__ == '__main__':
+    main()
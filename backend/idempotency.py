@@ -0,0 +1,175 @@
+# idempotency.py (Idempotency-Key support for the write handlers)
+# A client that retries a POST after a timeout sends the same Idempotency-Key header and gets
+# the original response back instead of creating a second leave/feedback/document row.
+#
+# Records live in HRMS_Idempotency, keyed by "<userId>#<operation>#<Idempotency-Key>":
+#   1. A conditional put claims the key (status IN_PROGRESS, short lease). If the put fails
+#      the existing record comes back with the error (ReturnValuesOnConditionCheckFailure),
+#      so a replay costs one request and never touches the business tables.
+#   2. The handler runs; its response is stored on the record (status COMPLETED) with a TTL.
+#      5xx responses release the key so the retry can run the handler again.
+# The stored response keeps the decoded body, not the bytes sent, and a replay encodes it for
+# the retry's own Accept header (@negotiated runs outside this decorator).
+# A warm-container LRU answers repeats without any DynamoDB call, and duplicates arriving
+# concurrently in the same process wait on the first one instead of racing the put.
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from common_utils import (get_response, error_response, get_header, get_user_id_from_event, decode_response_body,
+                          dynamodb_client, TTLCache, IDEMPOTENCY_TABLE)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+IN_PROGRESS_LEASE_SECONDS = 60 # A crashed invocation's claim expires after this (>= function timeout)
+IN_PROGRESS_WAIT_SECONDS = 2.0 # How long a duplicate waits for the first request before answering 409
+MAX_KEY_LENGTH = 255
+STATUS_IN_PROGRESS, STATUS_COMPLETED = 'IN_PROGRESS', 'COMPLETED'
+
+completed_cache = TTLCache(max_entries=1024, ttl_seconds=IDEMPOTENCY_TTL_SECONDS) # record key -> (hash, stored)
+_in_flight = {} # record key -> threading.Event set when the first request finishes
+_in_flight_lock = threading.Lock()
+
+def _request_hash(event):
+    return hashlib.sha256((event.get('body') or '').encode('utf-8')).hexdigest()
+
+def _stored(response):
+    """What is recorded of a response: status, headers and the body before encoding."""
+    headers = {k: v for k, v in (response.get('headers') or {}).items() if k not in ('Content-Type', 'Vary')}
+    return {'statusCode': response['statusCode'], 'headers': headers, 'data': decode_response_body(response)}
+
+def _replay(stored, request_hash, stored_hash):
+    if request_hash != stored_hash:
+        return get_response(422, {'message': f'{IDEMPOTENCY_HEADER} was already used with a different request body.'})
+    if 'data' not in stored: # Recorded before bodies were stored decoded: replayed as sent
+        return dict(stored, headers=dict(stored.get('headers') or {}, **{'Idempotent-Replayed': 'true'}))
+    return get_response(stored['statusCode'], stored['data'], headers=dict(stored['headers'], **{'Idempotent-Replayed': 'true'}))
+
+def _claim(record_key, request_hash):
+    """Conditionally creates the IN_PROGRESS record; returns None if claimed, else the existing record."""
+    now = int(time.time())
+    try:
+        dynamodb_client.put_item(
+            TableName=IDEMPOTENCY_TABLE,
+            Item={
+                'idempotencyKey': {'S': record_key},
+                'status': {'S': STATUS_IN_PROGRESS},
+                'requestHash': {'S': request_hash},
+                'leaseExpiresAt': {'N': str(now + IN_PROGRESS_LEASE_SECONDS)},
+                'expiresAt': {'N': str(now + IDEMPOTENCY_TTL_SECONDS)} # DynamoDB TTL attribute
+            },
+            # Free key, a TTL-expired record DynamoDB hasn't deleted yet, or an abandoned claim
+            ConditionExpression='attribute_not_exists(idempotencyKey) OR expiresAt < :now OR '
+                                '(#s = :in_progress AND leaseExpiresAt < :now)',
+            ExpressionAttributeNames={'#s': 'status'},
+            ExpressionAttributeValues={':now': {'N': str(now)}, ':in_progress': {'S': STATUS_IN_PROGRESS}},
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+        return None
+    except dynamodb_client.exceptions.ConditionalCheckFailedException as e:
+        return e.response.get('Item') or _load(record_key) or {}
+
+def _load(record_key):
+    response = dynamodb_client.get_item(TableName=IDEMPOTENCY_TABLE, Key={'idempotencyKey': {'S': record_key}},
+                                        ConsistentRead=True)
+    return response.get('Item')
+
+def _complete(record_key, stored):
+    dynamodb_client.update_item(
+        TableName=IDEMPOTENCY_TABLE,
+        Key={'idempotencyKey': {'S': record_key}},
+        UpdateExpression='SET #s = :completed, #r = :response REMOVE leaseExpiresAt',
+        ExpressionAttributeNames={'#s': 'status', '#r': 'response'},
+        ExpressionAttributeValues={':completed': {'S': STATUS_COMPLETED}, ':response': {'S': json.dumps(stored)}}
+    )
+
+def _release(record_key):
+    dynamodb_client.delete_item(
+        TableName=IDEMPOTENCY_TABLE,
+        Key={'idempotencyKey': {'S': record_key}},
+        ConditionExpression='#s = :in_progress',
+        ExpressionAttributeNames={'#s': 'status'},
+        ExpressionAttributeValues={':in_progress': {'S': STATUS_IN_PROGRESS}}
+    )
+
+def _existing_response(record_key, record, request_hash):
+    """Response for a request whose key is already claimed: the stored result, or 409 if still running."""
+    deadline = time.monotonic() + IN_PROGRESS_WAIT_SECONDS
+    while record.get('status', {}).get('S') == STATUS_IN_PROGRESS and time.monotonic() < deadline:
+        time.sleep(0.1)
+        record = _load(record_key) or {}
+    if record.get('status', {}).get('S') != STATUS_COMPLETED:
+        if not record: # Released after a 5xx while we waited; the client should simply retry
+            return get_response(409, {'message': 'The original request failed; please retry.'},
+                                headers={'Retry-After': '1'})
+        return get_response(409, {'message': 'A request with this Idempotency-Key is still in progress.'},
+                            headers={'Retry-After': '1'})
+    stored_hash = record['requestHash']['S']
+    stored = json.loads(record['response']['S'])
+    completed_cache.set(record_key, (stored_hash, stored))
+    return _replay(stored, request_hash, stored_hash)
+
+def idempotent(operation):
+    """Decorator for write handlers: requests carrying an Idempotency-Key run the handler at most once.
+
+    Requests without the header (or without a caller identity) run the handler unchanged.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            key = get_header(event, IDEMPOTENCY_HEADER)
+            user_id = get_user_id_from_event(event)
+            if not key or not user_id:
+                return handler(event, context)
+            if len(key) > MAX_KEY_LENGTH:
+                return get_response(400, {'message': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters.'})
+
+            record_key = f'{user_id}#{operation}#{key}'
+            request_hash = _request_hash(event)
+            cached = completed_cache.get(record_key)
+            if cached:
+                return _replay(cached[1], request_hash, cached[0])
+
+            with _in_flight_lock:
+                first = _in_flight.get(record_key)
+                if first is None:
+                    _in_flight[record_key] = done = threading.Event()
+            if first is not None: # Same key already running in this process: wait for its result
+                first.wait(IN_PROGRESS_WAIT_SECONDS)
+                cached = completed_cache.get(record_key)
+                if cached:
+                    return _replay(cached[1], request_hash, cached[0])
+                return _existing_response(record_key, _load(record_key) or {}, request_hash)
+
+            try:
+                try:
+                    existing = _claim(record_key, request_hash)
+                    if existing is not None:
+                        return _existing_response(record_key, existing, request_hash)
+                except Exception as e:
+                    print(f"Idempotency store error for {operation}: {e}")
+                    return error_response(e)
+
+                try:
+                    response = handler(event, context)
+                except Exception:
+                    _release(record_key)
+                    raise
+                try:
+                    if response['statusCode'] >= 500:
+                        _release(record_key)
+                    else:
+                        stored = _stored(response)
+                        _complete(record_key, stored)
+                        completed_cache.set(record_key, (request_hash, stored))
+                except Exception as e:
+                    print(f"Could not record idempotency result for {record_key}: {e}")
+                return response
+            finally:
+                with _in_flight_lock:
+                    _in_flight.pop(record_key, None)
+                done.set()
+        return wrapper
+    return decorator
@@ -0,0 +1,28 @@
+# job_worker.py (Runs background jobs from the job queue; see jobs.py)
+# The Lambda is the job queue's SQS event source (BatchSize 10, ReportBatchItemFailures): every
+# batch runs concurrently and only the jobs that failed are reported back, so the rest are deleted
+# and the failed ones are retried after their backoff, then dead-lettered. Importing the modules
+# below registers their @job handlers.
+import leave_manager # Registers leave.submitted
+import document_manager # Registers document.uploaded
+from jobs import run_batch, JobWorker, JOB_QUEUE_URL, JOB_WORKER_THREADS
+from memory_profile import sample_memory
+from profiling import profiled
+from warmup import handles_warmup
+
+@handles_warmup
+@sample_memory
+@profiled
+def process_jobs(event, context):
+    """Lambda function to run a batch of jobs delivered by SQS."""
+    messages = [(record['messageId'], record['receiptHandle'], record['body'],
+                 int(record.get('attributes', {}).get('ApproximateReceiveCount', '1')))
+                for record in event.get('Records', [])]
+    failed = run_batch(JOB_QUEUE_URL, messages, JOB_WORKER_THREADS)
+    if failed:
+        print(f"{len(failed)} of {len(messages)} jobs failed and will be retried")
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id, *_ in failed]}
+
+def start_worker(threads=JOB_WORKER_THREADS):
+    """A JobWorker polling the job queue in this process (self-hosted and local runs)."""
+    return JobWorker(JOB_QUEUE_URL, threads).start()
@@ -0,0 +1,172 @@
+# jobs.py (Background jobs: slow side effects run after the response, off the request path)
+# A handler calls enqueue(job_type, payload) once its own work is done; that is one SendMessage
+# on the job queue (SQS; SQLite or in-memory stand-ins on-prem and locally, see common_utils).
+# Modules register what runs a job type with @job(job_type); job_worker.py imports them.
+#
+# Workers take batches of up to 10 messages and run them concurrently on JOB_WORKER_THREADS
+# threads. A job that raises is retried: its message is made visible again after an exponential
+# backoff (JOB_RETRY_BASE_SECONDS doubled per attempt, from ApproximateReceiveCount), and after
+# the queue's maxReceiveCount receives SQS moves it to the dead-letter queue (RedrivePolicy in
+# template.yaml). A job running longer than the queue's VisibilityTimeout (60 s) is delivered
+# again, so jobs must be quick, and idempotent anyway: SQS delivers at least once.
+#   - Lambda: job_worker.process_jobs is the queue's event source; failed jobs are returned in
+#     batchItemFailures, so only they are retried.
+#   - Self-hosted / local: JobWorker long-polls the queue, keeps every thread busy and deletes
+#     finished messages in batches (http_server.py --job-workers runs one in-process).
+#
+# Message body: {"type": "leave.submitted", "payload": {...}, "enqueuedAt": "<ISO-8601>"}
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from common_utils import sqs_client, ses_client, utc_now_iso, JOB_QUEUE_URL, NOTIFICATION_SENDER
+
+JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', '8'))
+JOB_RETRY_BASE_SECONDS = int(os.environ.get('JOB_RETRY_BASE_SECONDS', '5'))
+JOB_RETRY_MAX_SECONDS = 900
+RECEIVE_BATCH = 10 # ReceiveMessage / DeleteMessageBatch limit
+RECEIVE_WAIT_SECONDS = 5 # Long polling; also the longest JobWorker.stop waits for a poll to return
+DELETE_DELAY_SECONDS = 1.0 # Longest a finished job waits for its message to be deleted in a batch
+
+JOB_HANDLERS = {} # job type -> function(payload)
+
+def job(job_type):
+    """Registers the decorated function(payload) as what runs jobs of job_type."""
+    def register(fn):
+        JOB_HANDLERS[job_type] = fn
+        return fn
+    return register
+
+def enqueue(job_type, payload, delay_seconds=0):
+    """Queues a job; returns its message id, or None when the queue couldn't be reached.
+
+    Never raises: the request that triggered the job has already done its own work, so a lost
+    side effect is logged rather than failing it.
+    """
+    body = json.dumps({'type': job_type, 'payload': payload, 'enqueuedAt': utc_now_iso()}, separators=(',', ':'))
+    try:
+        return sqs_client.send_message(QueueUrl=JOB_QUEUE_URL, MessageBody=body,
+                                       DelaySeconds=delay_seconds)['MessageId']
+    except Exception as e:
+        print(f"Could not enqueue {job_type} job: {e}")
+        return None
+
+def send_notification(to_address, subject, text):
+    """Emails a notification through SES from NOTIFICATION_SENDER (only logged while that is unset)."""
+    if not NOTIFICATION_SENDER:
+        print(f"Notification to {to_address} (NOTIFICATION_SENDER not set, not sent): {subject}")
+        return
+    ses_client.send_email(Source=NOTIFICATION_SENDER, Destination={'ToAddresses': [to_address]},
+                          Message={'Subject': {'Data': subject}, 'Body': {'Text': {'Data': text}}})
+
+def retry_delay(receive_count):
+    """Seconds before a job that failed on its receive_count-th delivery is tried again."""
+    return min(JOB_RETRY_BASE_SECONDS * 2 ** (max(receive_count, 1) - 1), JOB_RETRY_MAX_SECONDS)
+
+def run_job(body):
+    message = json.loads(body)
+    handler = JOB_HANDLERS.get(message.get('type'))
+    if handler is None:
+        raise LookupError(f"No handler registered for job type {message.get('type')!r}")
+    handler(message.get('payload') or {})
+
+def attempt(queue_url, message_id, receipt_handle, body, receive_count):
+    """Runs one job; True when done. A failed job's message is hidden for its retry delay."""
+    try:
+        run_job(body)
+        return True
+    except Exception as e:
+        print(f"Job {message_id} failed on attempt {receive_count}: {e}")
+    try:
+        sqs_client.change_message_visibility(QueueUrl=queue_url, ReceiptHandle=receipt_handle,
+                                             VisibilityTimeout=retry_delay(receive_count))
+    except Exception as e:
+        print(f"Could not delay the retry of job {message_id} (it reappears after the visibility timeout): {e}")
+    return False
+
+def run_batch(queue_url, messages, threads=JOB_WORKER_THREADS):
+    """Runs (message id, receipt handle, body, receive count) jobs concurrently; returns the failed ones."""
+    if not messages:
+        return []
+    with ThreadPoolExecutor(max_workers=min(threads, len(messages))) as pool:
+        done = list(pool.map(lambda message: attempt(queue_url, *message), messages))
+    return [message for message, ok in zip(messages, done) if not ok]
+
+class JobWorker:
+    """Polls a job queue and runs its jobs on a thread pool until stopped (self-hosted and local runs)."""
+
+    def __init__(self, queue_url=JOB_QUEUE_URL, threads=JOB_WORKER_THREADS, wait_seconds=RECEIVE_WAIT_SECONDS):
+        self.queue_url = queue_url
+        self.threads = threads
+        self.wait_seconds = wait_seconds
+        self.stats = {'received': 0, 'succeeded': 0, 'failed': 0}
+        self._slots = threading.Semaphore(threads) # One per idle thread; a poll asks for at most that many
+        self._finished, self._lock = [], threading.Lock() # Receipt handles of done jobs, deleted in batches
+        self._finished_since = None
+        self._stopping = threading.Event()
+        self._pool = self._poller = None
+
+    def start(self):
+        self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='job')
+        self._poller = threading.Thread(target=self._poll, name='job-poller', daemon=True)
+        self._poller.start()
+        return self
+
+    def stop(self):
+        """Stops polling, waits for running jobs and deletes the finished ones."""
+        self._stopping.set()
+        if self._poller:
+            self._poller.join()
+            self._pool.shutdown(wait=True)
+        self._delete_finished(force=True)
+
+    def _poll(self):
+        while not self._stopping.is_set():
+            if not self._slots.acquire(timeout=1):
+                continue
+            free = 1
+            while free < RECEIVE_BATCH and self._slots.acquire(blocking=False):
+                free += 1
+            try:
+                response = sqs_client.receive_message(QueueUrl=self.queue_url, MaxNumberOfMessages=free,
+                                                      WaitTimeSeconds=self.wait_seconds,
+                                                      AttributeNames=['ApproximateReceiveCount'])
+                messages = response.get('Messages', [])
+            except Exception as e:
+                print(f"Receiving jobs from {self.queue_url} failed: {e}")
+                messages = []
+                self._stopping.wait(1)
+            for _ in range(free - len(messages)):
+                self._slots.release()
+            for message in messages:
+                self._pool.submit(self._run, message)
+            self._delete_finished()
+
+    def _run(self, message):
+        try:
+            ok = attempt(self.queue_url, message['MessageId'], message['ReceiptHandle'], message['Body'],
+                         int(message['Attributes']['ApproximateReceiveCount']))
+            with self._lock:
+                self.stats['received'] += 1
+                self.stats['succeeded' if ok else 'failed'] += 1
+                if ok:
+                    self._finished_since = self._finished_since or time.monotonic()
+                    self._finished.append(message['ReceiptHandle'])
+        finally:
+            self._slots.release()
+
+    def _delete_finished(self, force=False):
+        """Deletes finished messages, RECEIVE_BATCH per call, once a batch is full or has waited long enough."""
+        with self._lock:
+            if not self._finished or not (force or len(self._finished) >= RECEIVE_BATCH
+                                          or time.monotonic() - self._finished_since >= DELETE_DELAY_SECONDS):
+                return
+            finished, self._finished, self._finished_since = self._finished, [], None
+        for start in range(0, len(finished), RECEIVE_BATCH):
+            entries = [{'Id': str(i), 'ReceiptHandle': handle}
+                       for i, handle in enumerate(finished[start:start + RECEIVE_BATCH])]
+            try:
+                sqs_client.delete_message_batch(QueueUrl=self.queue_url, Entries=entries)
+            except Exception as e:
+                print(f"Deleting {len(entries)} finished jobs failed (they will run again): {e}")
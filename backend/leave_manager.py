@@ -1,8 +1,156 @@
 # leave_manager.py
 import json
 import uuid # For generating unique IDs
-from common_utils import get_response, get_user_id_from_event, dynamodb_client, LEAVES_TABLE
+from datetime import date, timedelta
+from common_utils import (get_response, negotiated, error_response, get_user_id_from_event, dynamodb_client,
+                          encode_cursor, decode_cursor, utc_now_iso, storage, mirror_put, mirror_update,
+                          requested_fields, with_projection, decode_fields, DEFAULT_LEAVE_APPROVER_ID,
+                          load_profile, LEAVE_GUARDS_TABLE, LEAVE_START_INDEX, MAX_LEAVE_DAYS)
+from jobs import enqueue, job, send_notification
+from org_manager import get_manager_id
+from idempotency import idempotent
+from audit import audited
+from archive import history_requested, with_archived
+from memory_profile import sample_memory
+from profiling import profiled
+from warmup import handles_warmup
 
+# Pending leaves carry pendingApproverId/queuedAt, the keys of the sparse ApprovalQueueIndex GSI.
+# Deciding a leave REMOVEs both attributes, which drops it from the index, so an approver's
+# queue is a single Query that never touches decided history.
+APPROVAL_QUEUE_INDEX = 'ApprovalQueueIndex'
+LEAVE_DECISIONS = ('Approved', 'Rejected')
+TRANSACTION_CHUNK_SIZE = 100 # TransactWriteItems limit
+# Attributes a client may select with ?fields= on get_leaves (all stored attributes by default)
+LEAVE_FIELDS = ('userId', 'leaveId', 'leaveType', 'startDate', 'endDate', 'reason', 'status', 'submittedAt',
+                'approverId', 'decidedBy', 'decidedAt', 'decisionComment')
+
+# Overlap check on submit. Two leaves overlap when each starts on or before the other ends.
+# Leaves last at most MAX_LEAVE_DAYS, so every leave overlapping [start, end] starts within
+# [start - MAX_LEAVE_DAYS, end]: one bounded Query of LeaveStartIndex (userId, startDate) whose
+# cost depends on the leaves in that window, not on the length of the history. Rejected leaves
+# don't count. The GSI is eventually consistent, so each user's submissions are serialized on a
+# guard item in HRMS_LeaveGuards: the check reads its version (consistent read), and the leave is
+# written in a transaction that bumps the version only if it is unchanged, so of two concurrent
+# submissions one loses, re-checks and sees the other. The guard also keeps the ranges of the
+# user's last RECENT_LEAVES_KEPT submissions, covering leaves the GSI doesn't show yet.
+RECENT_LEAVES_KEPT = 10
+SUBMIT_ATTEMPTS = 3
+
+class LeaveOverlapError(Exception):
+    """The leave overlaps the user's existing (pending or approved) leaves."""
+
+    def __init__(self, leave_ids):
+        super().__init__(f"Overlaps leave(s) {', '.join(leave_ids)}")
+        self.leave_ids = leave_ids
+
+class LeaveGuardContentionError(Exception):
+    """Other submissions by the same user kept winning the guard item."""
+
+def _parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a YYYY-MM-DD date.')
+
+def _read_guard(user_id):
+    """(version or None, recent submissions as stored) of a user's leave guard item."""
+    item = dynamodb_client.get_item(TableName=LEAVE_GUARDS_TABLE, Key={'userId': {'S': user_id}},
+                                    ConsistentRead=True).get('Item') or {}
+    version = int(item['version']['N']) if 'version' in item else None
+    return version, item.get('recent', {}).get('L', [])
+
+def find_overlaps(user_id, start_date, end_date, recent=()):
+    """Sorted ids of the user's pending/approved leaves overlapping [start_date, end_date] (ISO dates)."""
+    window_start = (date.fromisoformat(start_date) - timedelta(days=MAX_LEAVE_DAYS)).isoformat()
+    query_args = {
+        'TableName': storage.table('leave'),
+        'IndexName': LEAVE_START_INDEX,
+        'KeyConditionExpression': 'userId = :uid AND startDate BETWEEN :from AND :to',
+        'FilterExpression': 'endDate >= :start',
+        'ProjectionExpression': 'leaveId, #s',
+        'ExpressionAttributeNames': {'#s': 'status'},
+        'ExpressionAttributeValues': {':uid': {'S': user_id}, ':from': {'S': window_start}, ':to': {'S': end_date},
+                                      ':start': {'S': start_date}}
+    }
+    conflicts, seen = set(), set()
+    while True:
+        response = dynamodb_client.query(**query_args)
+        for item in response.get('Items', []):
+            seen.add(item['leaveId']['S'])
+            if item.get('status', {}).get('S') != 'Rejected':
+                conflicts.add(item['leaveId']['S'])
+        if not response.get('LastEvaluatedKey'):
+            break
+        query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    for entry in recent: # Just submitted, possibly not in the GSI yet
+        entry = entry['M']
+        if entry['leaveId']['S'] not in seen and entry['startDate']['S'] <= end_date \
+                and entry['endDate']['S'] >= start_date:
+            conflicts.add(entry['leaveId']['S'])
+    return sorted(conflicts)
+
+def save_leave(item):
+    """Writes a new leave unless it overlaps the user's pending or approved leaves.
+
+    Raises LeaveOverlapError with the conflicting ids, or LeaveGuardContentionError when
+    concurrent submissions by the same user kept invalidating the check.
+    """
+    user_id, start_date, end_date = item['userId']['S'], item['startDate']['S'], item['endDate']['S']
+    submitted = {'M': {'leaveId': item['leaveId'], 'startDate': item['startDate'], 'endDate': item['endDate']}}
+    for _ in range(SUBMIT_ATTEMPTS):
+        version, recent = _read_guard(user_id)
+        conflicts = find_overlaps(user_id, start_date, end_date, recent)
+        if conflicts:
+            raise LeaveOverlapError(conflicts)
+        guard_update = {
+            'TableName': LEAVE_GUARDS_TABLE,
+            'Key': {'userId': {'S': user_id}},
+            'UpdateExpression': 'SET version = :next, recent = :recent',
+            'ExpressionAttributeValues': {':next': {'N': str((version or 0) + 1)},
+                                          ':recent': {'L': [submitted] + recent[:RECENT_LEAVES_KEPT - 1]}}
+        }
+        if version is None:
+            guard_update['ConditionExpression'] = 'attribute_not_exists(version)'
+        else:
+            guard_update['ConditionExpression'] = 'version = :seen'
+            guard_update['ExpressionAttributeValues'][':seen'] = {'N': str(version)}
+        try:
+            dynamodb_client.transact_write_items(TransactItems=[
+                {'Put': {'TableName': storage.table('leave'), 'Item': storage.item('leave', item)}},
+                {'Update': guard_update}
+            ])
+        except dynamodb_client.exceptions.TransactionCanceledException as e:
+            reasons = e.response.get('CancellationReasons', [])
+            if len(reasons) > 1 and reasons[1].get('Code') == 'ConditionalCheckFailed':
+                continue # Another submission by this user got in first: check again
+            if any(r.get('Code') == 'TransactionConflict' for r in reasons):
+                continue # One is writing the guard right now: check again once it has
+            raise
+        mirror_put('leave', item) # No-op unless migrating layouts
+        return
+    raise LeaveGuardContentionError()
+
+@job('leave.submitted')
+def notify_approver(payload):
+    """Emails the approver of a newly submitted leave (a background job, enqueued by submit_leave)."""
+    approver = load_profile(payload['approverId']) or {}
+    to_address = approver.get('email', {}).get('S')
+    if not to_address:
+        print(f"Approver {payload['approverId']} has no email address; leave {payload['leaveId']} not notified")
+        return
+    employee = (load_profile(payload['userId']) or {}).get('name', {}).get('S') or payload['userId']
+    text = (f"{employee} requested {payload['leaveType']} leave from {payload['startDate']} to {payload['endDate']}."
+            + (f"\nReason: {payload['reason']}" if payload.get('reason') else '')
+            + "\nIt is waiting in your approval queue.")
+    send_notification(to_address, f"Leave request from {employee}", text)
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+@idempotent('submit_leave')
+@audited('leave.submit', target=lambda request, response: response['leaveId'])
 def submit_leave(event, context):
     """Lambda function to submit a leave request."""
     user_id = get_user_id_from_event(event)
@@ -15,49 +163,220 @@ def submit_leave(event, context):
         leave_type = body['leaveType']
         start_date = body['startDate']
         end_date = body['endDate']
+        start, end = _parse_date(start_date, 'startDate'), _parse_date(end_date, 'endDate')
+        if end < start:
+            return get_response(400, {'message': 'endDate must not be before startDate.'})
+        if (end - start).days >= MAX_LEAVE_DAYS:
+            return get_response(400, {'message': f'A leave request can cover at most {MAX_LEAVE_DAYS} days.'})
         reason = body.get('reason', '')
-        status = body.get('status', 'Pending')
-        submitted_at = body.get('submittedAt', '') # Should be provided by frontend
-        
-        # Put item in DynamoDB
-        dynamodb_client.put_item(
-            TableName=LEAVES_TABLE,
-            Item={
-                'userId': {'S': user_id},
-                'leaveId': {'S': leave_id}, # Sort Key
-                'leaveType': {'S': leave_type},
-                'startDate': {'S': start_date},
-                'endDate': {'S': end_date},
-                'reason': {'S': reason},
-                'status': {'S': status},
-                'submittedAt': {'S': submitted_at}
-            }
-        )
-        return get_response(200, {'message': 'Leave request submitted successfully!', 'leaveId': leave_id})
+        submitted_at = body.get('submittedAt') or utc_now_iso() # Sent by the frontend; LeaveTimelineIndex sort key
+        # New requests always start as Pending; status only changes through update_leave_status
+        approver_id = get_manager_id(user_id) or DEFAULT_LEAVE_APPROVER_ID
+        if approver_id == user_id:
+            approver_id = None # Nobody approves their own leave (e.g. the default approver's)
+
+        item = {
+            'userId': {'S': user_id},
+            'leaveId': {'S': leave_id}, # Sort Key
+            'leaveType': {'S': leave_type},
+            'startDate': {'S': start_date},
+            'endDate': {'S': end_date},
+            'reason': {'S': reason},
+            'status': {'S': 'Pending'},
+            'submittedAt': {'S': submitted_at}
+        }
+        if approver_id:
+            item['approverId'] = {'S': approver_id}
+            item['pendingApproverId'] = {'S': approver_id} # ApprovalQueueIndex partition key
+            item['queuedAt'] = {'S': utc_now_iso()} # ApprovalQueueIndex sort key (oldest first)
+
+        # Put item in DynamoDB, unless it overlaps the employee's other leaves
+        save_leave(item)
+        if approver_id: # The approver's email goes out from the job queue, off the request path
+            enqueue('leave.submitted', {'userId': user_id, 'leaveId': leave_id, 'approverId': approver_id,
+                                        'leaveType': leave_type, 'startDate': start_date, 'endDate': end_date,
+                                        'reason': reason})
+        return get_response(200, {'message': 'Leave request submitted successfully!', 'leaveId': leave_id,
+                                  'approverId': approver_id})
 
+    except LeaveOverlapError as e:
+        return get_response(409, {'message': 'The leave overlaps existing leave requests.',
+                                  'conflictingLeaveIds': e.leave_ids})
+    except LeaveGuardContentionError: # 5xx, so @idempotent releases the key and the retry runs again
+        return get_response(503, {'message': 'Other leave requests are being submitted; please retry.'},
+                            headers={'Retry-After': '1'})
+    except ValueError as e:
+        return get_response(400, {'message': str(e)})
     except Exception as e:
         print(f"Error submitting leave for {user_id}: {e}")
-        return get_response(500, {'message': f'Internal server error: {str(e)}'})
+        return error_response(e)
 
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
 def get_leaves(event, context):
-    """Lambda function to retrieve all leave requests for a user."""
+    """Lambda function to retrieve all leave requests for a user (?fields=leaveId,status to select attributes).
+
+    Only hot (not yet archived) leaves by default; ?history=true adds the archived ones.
+    """
     user_id = get_user_id_from_event(event)
     if not user_id:
         return get_response(401, {'message': 'Unauthorized: User ID missing.'})
 
     try:
-        response = dynamodb_client.query(
-            TableName=LEAVES_TABLE,
-            KeyConditionExpression='userId = :uid',
-            ExpressionAttributeValues={':uid': {'S': user_id}}
-        )
+        fields = requested_fields(event, LEAVE_FIELDS)
+        response = dynamodb_client.query(**with_projection(storage.query_args('leave', user_id), fields))
+        items = response.get('Items', [])
+        if history_requested(event):
+            items = with_archived('leave', user_id, items)
+        if fields:
+            return get_response(200, {'leaves': [decode_fields(item, fields) for item in items]})
         leaves = []
-        for item in response.get('Items', []):
-            leave_data = {k: v['S'] for k, v in item.items()}
+        for item in items:
+            leave_data = {k: v['S'] for k, v in storage.attributes(item).items()}
             leaves.append(leave_data)
         return get_response(200, {'leaves': leaves})
+    except ValueError as e:
+        return get_response(400, {'message': str(e)})
     except Exception as e:
         print(f"Error getting leaves for {user_id}: {e}")
-        return get_response(500, {'message': f'Internal server error: {str(e)}'})
+        return error_response(e)
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+def get_approval_queue(event, context):
+    """Lambda function to list the pending leave requests waiting on the caller's decision."""
+    approver_id = get_user_id_from_event(event)
+    if not approver_id:
+        return get_response(401, {'message': 'Unauthorized: User ID missing.'})
 
-# Additional functions (e.g., update_leave_status, delete_leave) can be added here
\ No newline at end of file
+    try:
+        params = event.get('queryStringParameters') or {}
+        query_args = {
+            'TableName': storage.table('leave'),
+            'IndexName': APPROVAL_QUEUE_INDEX,
+            'KeyConditionExpression': 'pendingApproverId = :aid',
+            'ExpressionAttributeValues': {':aid': {'S': approver_id}},
+            'Limit': min(int(params.get('limit', 100)), 500)
+        }
+        start_key = decode_cursor(params.get('nextToken'))
+        if start_key:
+            query_args['ExclusiveStartKey'] = start_key
+        response = dynamodb_client.query(**query_args)
+        leaves = []
+        for item in response.get('Items', []):
+            leave_data = {k: v['S'] for k, v in storage.attributes(item).items()}
+            leaves.append(leave_data)
+        return get_response(200, {'leaves': leaves, 'nextToken': encode_cursor(response.get('LastEvaluatedKey'))})
+    except ValueError as e:
+        return get_response(400, {'message': str(e)})
+    except Exception as e:
+        print(f"Error getting approval queue for {approver_id}: {e}")
+        return error_response(e)
+
+def _decision_update(approver_id, decision, comment, decided_at):
+    """update_item arguments that only succeed while the leave is Pending on this approver."""
+    return {
+        'UpdateExpression': 'SET #s = :decision, decidedBy = :aid, decidedAt = :now, decisionComment = :comment '
+                            'REMOVE pendingApproverId, queuedAt',
+        'ConditionExpression': '#s = :pending AND pendingApproverId = :aid',
+        'ExpressionAttributeNames': {'#s': 'status'}, # 'status' is a DynamoDB reserved word
+        'ExpressionAttributeValues': {
+            ':decision': {'S': decision},
+            ':pending': {'S': 'Pending'},
+            ':aid': {'S': approver_id},
+            ':now': {'S': decided_at},
+            ':comment': {'S': comment}
+        }
+    }
+
+NOT_DECIDABLE = 'Not pending or not assigned to you.'
+NOT_DECIDED_RETRY = 'Not decided this time (conflicting updates); please retry.'
+DECISION_ATTEMPTS = 3 # Per chunk
+
+def _apply_decisions(approver_id, targets, decision, comment):
+    """Decides (employeeId, leaveId) pairs in transactions of up to 100.
+
+    Returns (decided, failed), failed as (employeeId, leaveId, reason). A transaction is
+    all-or-nothing: when leaves fail their status check (already decided, withdrawn or owned by
+    another approver) they are identified from CancellationReasons and the rest of the chunk is
+    retried, as it is after a TransactionConflict with a concurrent write. What still isn't
+    decided after DECISION_ATTEMPTS, or after an error once earlier chunks were committed, is
+    reported as failed so the caller learns exactly what was decided.
+    """
+    decided, failed = [], []
+    update = _decision_update(approver_id, decision, comment, utc_now_iso())
+    for start in range(0, len(targets), TRANSACTION_CHUNK_SIZE):
+        chunk = targets[start:start + TRANSACTION_CHUNK_SIZE]
+        for _ in range(DECISION_ATTEMPTS):
+            try:
+                dynamodb_client.transact_write_items(TransactItems=[
+                    {'Update': dict(update, TableName=storage.table('leave'),
+                                    Key=storage.key('leave', employee_id, leave_id))}
+                    for employee_id, leave_id in chunk
+                ])
+                decided.extend(chunk)
+                for employee_id, leave_id in chunk:
+                    mirror_update('leave', employee_id, leave_id, **update) # No-op unless migrating layouts
+                chunk = []
+            except dynamodb_client.exceptions.TransactionCanceledException as e:
+                reasons = e.response.get('CancellationReasons', [])
+                rejected = {t for t, r in zip(chunk, reasons) if r.get('Code') == 'ConditionalCheckFailed'}
+                failed.extend((employee_id, leave_id, NOT_DECIDABLE) for employee_id, leave_id in rejected)
+                chunk = [t for t in chunk if t not in rejected]
+            except Exception:
+                if not decided:
+                    raise # Nothing committed: the whole request can simply be retried
+                chunk += targets[start + TRANSACTION_CHUNK_SIZE:] # This chunk's rest and every later chunk
+                failed.extend((employee_id, leave_id, NOT_DECIDED_RETRY) for employee_id, leave_id in chunk)
+                return decided, failed
+            if not chunk:
+                break
+        failed.extend((employee_id, leave_id, NOT_DECIDED_RETRY) for employee_id, leave_id in chunk)
+    return decided, failed
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+@audited('leave.decide', target=lambda request, response: [d['leaveId'] for d in response['decided']])
+def update_leave_status(event, context):
+    """Lambda function for an approver to approve or reject one or many pending leave requests.
+
+    Body: {"decision": "Approved" | "Rejected", "comment": "...",
+           "leaves": [{"employeeId": "...", "leaveId": "..."}, ...]}
+    (a single {"employeeId", "leaveId"} pair at the top level is accepted too).
+    """
+    approver_id = get_user_id_from_event(event)
+    if not approver_id:
+        return get_response(401, {'message': 'Unauthorized: User ID missing.'})
+
+    try:
+        body = json.loads(event['body'])
+        decision = body.get('decision') or body.get('status')
+        if decision not in LEAVE_DECISIONS:
+            return get_response(400, {'message': f'decision must be one of {", ".join(LEAVE_DECISIONS)}.'})
+        entries = body.get('leaves') or [{'employeeId': body.get('employeeId'), 'leaveId': body.get('leaveId')}]
+        targets = list(dict.fromkeys((e.get('employeeId'), e.get('leaveId')) for e in entries))
+        if not all(employee_id and leave_id for employee_id, leave_id in targets):
+            return get_response(400, {'message': 'Each leave needs an employeeId and a leaveId.'})
+
+        own = [(e, l) for e, l in targets if e == approver_id] # Never decided, whoever they are assigned to
+        decided, failed = _apply_decisions(approver_id, [t for t in targets if t not in own], decision,
+                                           body.get('comment', ''))
+        retry = any(reason == NOT_DECIDED_RETRY for _, _, reason in failed)
+        status_code = 200 if decided or not (failed or own) else 503 if retry else 409
+        return get_response(status_code, {
+            'message': f'{len(decided)} leave request(s) {decision.lower()}.',
+            'decided': [{'employeeId': e, 'leaveId': l} for e, l in decided],
+            'failed': [{'employeeId': e, 'leaveId': l, 'reason': 'You cannot decide your own leave request.'}
+                       for e, l in own] +
+                      [{'employeeId': e, 'leaveId': l, 'reason': reason} for e, l, reason in failed]
+        }, headers={'Retry-After': '1'} if status_code == 503 else None)
+
+    except Exception as e:
+        print(f"Error updating leave status by {approver_id}: {e}")
+        return error_response(e)
\ No newline at end of file
@@ -0,0 +1,292 @@
+# leave_reports.py (Leave aggregates maintained from DynamoDB Streams)
+# process_leave_stream consumes the HRMS_Leaves and HRMS_Profiles streams (HRMS_Main in the
+# single-table layout, see common_utils) and keeps one counter item per (month, department)
+# in HRMS_LeaveAggregates, so get_leave_summary answers with a single Query returning one
+# item per department instead of scanning HRMS_Leaves.
+#
+# Items in HRMS_LeaveAggregates:
+#   pk=MONTH#<YYYY-MM>, sk=DEPT#<department>   counters "<leaveType>#<status>" and "total"
+#   pk=LEAVE#<userId>#<leaveId>, sk=LEDGER     what that leave currently contributes, plus the
+#                                              stream sequence number of the last event applied
+# The ledger makes the consumer safe to replay: events at or below a leave's recorded sequence
+# number are skipped, and each change is applied as "new contribution minus ledger contribution".
+# Ledger rows and counter deltas are written together in TransactWriteItems, with deltas
+# merged in memory so each counter item is written once per transaction. Leaves are counted
+# under their start month and the employee's current department; a department change in
+# HRMS_Profiles moves that employee's leaves to the new department. Leaves deleted after being
+# archived to S3 (marked archivedAt, see archive.py) keep counting under the department they
+# had then.
+#
+# Access: HR sees every department; a manager (someone with direct reports) only their own.
+from collections import defaultdict
+from common_utils import (get_response, negotiated, error_response, get_user_id_from_event, dynamodb_client,
+                          batch_get_all, utc_now_iso, storage, load_profile, is_hr, LEAVE_AGGREGATES_TABLE)
+from org_manager import has_reports
+from memory_profile import sample_memory
+from profiling import profiled
+from warmup import handles_warmup
+
+UNASSIGNED_DEPARTMENT = 'Unassigned'
+TOTAL_COUNTER = 'total'
+TRANSACTION_LIMIT = 100 # TransactWriteItems items per call
+SUMMARY_FORBIDDEN_MESSAGE = 'Forbidden: the leave summary is for HR, and for managers of their own department.'
+
+def _month(date):
+    return date[:7] if len(date) >= 7 and date[4] == '-' else 'unknown'
+
+def contribution(leave, department):
+    """(month, department, counter) a leave image is counted under, or None for no leave."""
+    if not leave:
+        return None
+    status = leave.get('status', {}).get('S') or 'Pending'
+    leave_type = leave.get('leaveType', {}).get('S') or 'Other'
+    return (_month(leave.get('startDate', {}).get('S', '')), department or UNASSIGNED_DEPARTMENT,
+            f'{leave_type}#{status}')
+
+def _ledger_key(user_id, leave_id):
+    return {'pk': {'S': f'LEAVE#{user_id}#{leave_id}'}, 'sk': {'S': 'LEDGER'}}
+
+def _ledger_contribution(ledger):
+    if not ledger or 'counter' not in ledger:
+        return None
+    return ledger['month']['S'], ledger['department']['S'], ledger['counter']['S']
+
+def _table_name(record):
+    # arn:aws:dynamodb:<region>:<account>:table/<TableName>/stream/<label>
+    return record.get('eventSourceARN', '').split(':table/', 1)[-1].split('/', 1)[0]
+
+def _departments(user_ids):
+    profiles = batch_get_all(storage.table('profile'), [storage.key('profile', u) for u in user_ids],
+                             projection='userId, department')
+    return {p['userId']['S']: p.get('department', {}).get('S') for p in profiles}
+
+def _current_leaves(user_id):
+    """All of one employee's leaves as stored now (used when their department changes)."""
+    leaves, query_args = [], dict(
+        storage.query_args('leave', user_id),
+        ProjectionExpression='userId, leaveId, leaveType, startDate, #s',
+        ExpressionAttributeNames={'#s': 'status'},
+        ConsistentRead=True
+    )
+    while True:
+        response = dynamodb_client.query(**query_args)
+        leaves.extend(response.get('Items', []))
+        if not response.get('LastEvaluatedKey'):
+            return leaves
+        query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def _collect_changes(records):
+    """Groups a batch's records per leave; returns ({(userId, leaveId): change}, {userId: department}).
+
+    Each change holds the leave's events as (seq, image), an optional 'current' image and the
+    sequence numbers of the records it came from. A profile department change re-evaluates the
+    employee's stored leaves as 'current' images, leaving their ledger sequence numbers as they are.
+    """
+    changes = {}
+    departments = {}
+    for record in records:
+        seq = record['dynamodb']['SequenceNumber']
+        image = record['dynamodb'].get('NewImage')
+        old_image = record['dynamodb'].get('OldImage')
+        entity = storage.entity_of(_table_name(record), image or old_image)
+        if entity == 'profile':
+            user_id = (image or old_image)['userId']['S']
+            department = (image or {}).get('department', {}).get('S')
+            departments[user_id] = department
+            if department != (old_image or {}).get('department', {}).get('S'):
+                for leave in _current_leaves(user_id):
+                    change = changes.setdefault((user_id, leave['leaveId']['S']), {'events': [], 'sources': []})
+                    change['current'] = leave
+                    change['sources'].append(seq)
+            continue
+        if entity != 'leave':
+            continue # Other entities sharing the single table, or a stream this layout doesn't read from
+        if image is None and 'archivedAt' in old_image:
+            continue # Moved to the S3 archive (archive.py), so it still counts
+        leave = image or old_image
+        change = changes.setdefault((leave['userId']['S'], leave['leaveId']['S']), {'events': [], 'sources': []})
+        change['events'].append((int(seq), image))
+        change['sources'].append(seq)
+    return changes, departments
+
+def _plan(changes, departments):
+    """Applies the batch to each leave's ledger in memory.
+
+    Returns [(leave key, stored ledger, new ledger item, old contribution, new contribution)]
+    for the leaves whose counted contribution changes.
+    """
+    keys = list(changes)
+    ledgers = {}
+    for ledger in batch_get_all(LEAVE_AGGREGATES_TABLE, [_ledger_key(*k) for k in keys], consistent=True):
+        ledgers[ledger['pk']['S']] = ledger
+    missing = {user_id for user_id, _ in keys if user_id not in departments}
+    if missing:
+        departments.update(_departments(list(missing)))
+
+    plan = []
+    for user_id, leave_id in keys:
+        change = changes[(user_id, leave_id)]
+        ledger = ledgers.get(f'LEAVE#{user_id}#{leave_id}')
+        applied_seq = int(ledger['seq']['N']) if ledger and 'seq' in ledger else -1
+        image, last_seq, touched = None, applied_seq, False
+        if 'current' in change:
+            image, touched = change['current'], True
+        for seq, event_image in change['events']:
+            if seq > last_seq: # Older or replayed events are already reflected in the ledger
+                image, last_seq, touched = event_image, seq, True
+        if not touched:
+            continue
+        old = _ledger_contribution(ledger)
+        new = contribution(image, departments.get(user_id))
+        if old == new:
+            continue # Nothing counted changes (e.g. only the reason was edited)
+        item = dict(_ledger_key(user_id, leave_id), seq={'N': str(max(last_seq, 0))},
+                    version={'N': str(int(ledger['version']['N']) + 1 if ledger else 1)},
+                    updatedAt={'S': utc_now_iso()})
+        if new:
+            item.update(month={'S': new[0]}, department={'S': new[1]}, counter={'S': new[2]})
+        plan.append(((user_id, leave_id), ledger, item, old, new))
+    return plan
+
+def _transaction(entries):
+    """TransactWriteItems items for a group of ledger changes: one Put per ledger, one Update per counter item."""
+    deltas = defaultdict(lambda: defaultdict(int))
+    items = []
+    for _, ledger, item, old, new in entries:
+        for sign, counted in ((-1, old), (1, new)):
+            if counted:
+                month, department, counter = counted
+                deltas[(month, department)][counter] += sign
+                deltas[(month, department)][TOTAL_COUNTER] += sign
+        put = {'TableName': LEAVE_AGGREGATES_TABLE, 'Item': item}
+        if ledger:
+            put.update(ConditionExpression='version = :v', ExpressionAttributeValues={':v': ledger['version']})
+        else:
+            put['ConditionExpression'] = 'attribute_not_exists(pk)'
+        items.append({'Put': put})
+    for (month, department), counters in deltas.items():
+        counters = {name: delta for name, delta in counters.items() if delta}
+        if not counters:
+            continue
+        names, values, adds = {'#m': 'month', '#d': 'department'}, {':m': {'S': month}, ':d': {'S': department}}, []
+        for i, (name, delta) in enumerate(sorted(counters.items())):
+            names[f'#c{i}'] = name
+            values[f':c{i}'] = {'N': str(delta)}
+            adds.append(f'#c{i} :c{i}')
+        items.append({'Update': {
+            'TableName': LEAVE_AGGREGATES_TABLE,
+            'Key': {'pk': {'S': f'MONTH#{month}'}, 'sk': {'S': f'DEPT#{department}'}},
+            'UpdateExpression': 'SET #m = :m, #d = :d ADD ' + ', '.join(adds),
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values
+        }})
+    return items
+
+def _counter_keys(entry):
+    return {(c[0], c[1]) for c in entry[3:] if c}
+
+def apply_changes(changes, departments):
+    """Writes the ledger/counter updates for a set of leave changes; returns the leave keys that failed."""
+    failed = []
+    group, group_keys = [], set()
+    for entry in _plan(changes, departments) + [None]:
+        if entry is not None:
+            keys = group_keys | _counter_keys(entry)
+            if len(group) + 1 + len(keys) <= TRANSACTION_LIMIT:
+                group.append(entry)
+                group_keys = keys
+                continue
+        if group:
+            try:
+                dynamodb_client.transact_write_items(TransactItems=_transaction(group))
+            except Exception as e:
+                # A concurrent ledger update (version check) or a service error: retry these leaves
+                print(f"Leave aggregate transaction failed for {len(group)} leaves: {e}")
+                failed.extend(leave_key for leave_key, *_ in group)
+        if entry is not None:
+            group, group_keys = [entry], _counter_keys(entry)
+    return failed
+
+def reconcile_leaves(leaves):
+    """Re-counts stored leave items (e.g. to backfill leaves that predate the stream); returns failed leave keys."""
+    changes = {(leave['userId']['S'], leave['leaveId']['S']): {'events': [], 'sources': [], 'current': leave}
+               for leave in leaves}
+    return apply_changes(changes, {})
+
+@handles_warmup
+@sample_memory
+@profiled
+def process_leave_stream(event, context):
+    """Lambda function (DynamoDB Streams trigger) folding leave/profile changes into the aggregates.
+
+    Returns batchItemFailures so Lambda retries from the earliest record whose changes weren't stored.
+    """
+    records = event.get('Records', [])
+    try:
+        changes, departments = _collect_changes(records)
+        failed = apply_changes(changes, departments)
+    except Exception as e:
+        print(f"Error applying leave aggregate batch: {e}")
+        return {'batchItemFailures': [{'itemIdentifier': records[0]['dynamodb']['SequenceNumber']}] if records else []}
+
+    if failed:
+        earliest = min((seq for leave_key in failed for seq in changes[leave_key]['sources']), key=int)
+        return {'batchItemFailures': [{'itemIdentifier': earliest}]}
+    print(f"Applied {len(changes)} leave changes from {len(records)} stream records")
+    return {'batchItemFailures': []}
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+def get_leave_summary(event, context):
+    """Lambda function to return leave counts per department for a month (?month=YYYY-MM, default current).
+
+    HR gets every department; a manager gets only their own department, anyone else a 403.
+    """
+    user_id = get_user_id_from_event(event)
+    if not user_id:
+        return get_response(401, {'message': 'Unauthorized: User ID missing.'})
+
+    query_params = event.get('queryStringParameters') or {}
+    month = query_params.get('month') or utc_now_iso()[:7]
+    if _month(month) != month:
+        return get_response(400, {'message': 'month must be in YYYY-MM format.'})
+
+    try:
+        query_args = {
+            'TableName': LEAVE_AGGREGATES_TABLE,
+            'KeyConditionExpression': 'pk = :pk',
+            'ExpressionAttributeValues': {':pk': {'S': f'MONTH#{month}'}}
+        }
+        if not is_hr(event):
+            own_department = ((load_profile(user_id) or {}).get('department') or {}).get('S')
+            if not (own_department and has_reports(user_id)):
+                return get_response(403, {'message': SUMMARY_FORBIDDEN_MESSAGE})
+            query_args['KeyConditionExpression'] += ' AND sk = :sk'
+            query_args['ExpressionAttributeValues'][':sk'] = {'S': f'DEPT#{own_department}'}
+        departments = []
+        totals = defaultdict(int)
+        while True:
+            response = dynamodb_client.query(**query_args)
+            for item in response.get('Items', []):
+                by_type = defaultdict(dict)
+                for name, value in item.items():
+                    if '#' in name and 'N' in value and int(value['N']):
+                        leave_type, status = name.split('#', 1)
+                        by_type[leave_type][status] = int(value['N'])
+                        totals[status] += int(value['N'])
+                departments.append({
+                    'department': item['department']['S'],
+                    'total': int(item.get(TOTAL_COUNTER, {}).get('N', '0')),
+                    'byType': by_type
+                })
+            if not response.get('LastEvaluatedKey'):
+                break
+            query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        departments = [d for d in departments if d['total']]
+        return get_response(200, {'month': month, 'departments': departments,
+                                  'total': sum(d['total'] for d in departments), 'byStatus': totals})
+    except Exception as e:
+        print(f"Error getting leave summary for {month}: {e}")
+        return error_response(e)
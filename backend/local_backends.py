@@ -0,0 +1,1396 @@
+# local_backends.py (In-memory stand-ins for DynamoDB, S3 and Cognito used by local runs and benchmarks)
+import base64
+import bisect
+import copy
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from decimal import Decimal
+from types import SimpleNamespace
+
+
+class LocalClientError(Exception):
+    """Mimics botocore's ClientError so handlers can inspect e.response['Error']['Code']."""
+    code = 'ClientError'
+
+    def __init__(self, message='', operation_name='', response=None):
+        super().__init__(message)
+        self.operation_name = operation_name
+        self.response = response or {'Error': {'Code': self.code, 'Message': message}}
+
+
+_ERROR_CLASSES = {}
+
+
+def _error_class(code):
+    """One exception class per error code, shared by every stand-in (like client.exceptions.<Code>)."""
+    if code not in _ERROR_CLASSES:
+        _ERROR_CLASSES[code] = type(code, (LocalClientError,), {'code': code})
+    return _ERROR_CLASSES[code]
+
+
+ConditionalCheckFailedException = _error_class('ConditionalCheckFailedException')
+TransactionCanceledException = _error_class('TransactionCanceledException')
+ResourceNotFoundException = _error_class('ResourceNotFoundException')
+ValidationException = _error_class('ValidationException')
+ProvisionedThroughputExceededException = _error_class('ProvisionedThroughputExceededException')
+ThrottlingException = _error_class('ThrottlingException')
+NoSuchKey = _error_class('NoSuchKey')
+
+
+class _Max:
+    """Sorts after every other value (used as an open upper bound in key tuples)."""
+    def __lt__(self, other): return False
+    def __gt__(self, other): return True
+    def __le__(self, other): return self is other
+    def __ge__(self, other): return True
+    def __eq__(self, other): return self is other
+    def __hash__(self): return 0
+
+
+_MAX = _Max()
+
+
+def _av_value(av):
+    """Converts a DynamoDB AttributeValue into a comparable Python value."""
+    if av is None:
+        return None
+    if 'S' in av:
+        return av['S']
+    if 'N' in av:
+        return Decimal(av['N'])
+    if 'BOOL' in av:
+        return av['BOOL']
+    if 'B' in av:
+        return av['B']
+    if 'NULL' in av:
+        return None
+    if 'SS' in av:
+        return frozenset(av['SS'])
+    if 'NS' in av:
+        return frozenset(Decimal(n) for n in av['NS'])
+    return repr(av)
+
+
+def _number_av(value):
+    value = Decimal(value)
+    return {'N': str(int(value)) if value == value.to_integral_value() else str(value)}
+
+
+class _LocalService:
+    """Request counting, simulated latency and fault injection shared by the stand-ins."""
+    OPERATIONS = ()
+
+    def _init_service(self, latency_ms):
+        # Same shape as boto3's client.meta, so wrappers can tell API calls from helpers
+        self.meta = SimpleNamespace(method_to_api_mapping={
+            method: ''.join(part.title() for part in method.split('_')) for method in self.OPERATIONS})
+        self.latency = latency_ms / 1000.0
+        self.request_counts = Counter()
+        self._faults = []
+        self._fault_lock = threading.Lock()
+        self._random = random.Random(0)
+
+    def inject_faults(self, error_code, rate=1.0, operations=None, count=None, latency_ms=0):
+        """Makes matching calls fail with error_code (e.g. 'ProvisionedThroughputExceededException').
+
+        rate is the probability a matching call fails, operations limits it to API names such as
+        {'PutItem'}, count stops after that many injected failures, and latency_ms delays each
+        failure (e.g. to mimic a timeout). Returns the fault so it can be passed to clear_faults.
+        """
+        fault = {'code': error_code, 'rate': rate, 'operations': set(operations or ()), 'remaining': count,
+                 'latency': latency_ms / 1000.0, 'injected': 0}
+        with self._fault_lock:
+            self._faults.append(fault)
+        return fault
+
+    def clear_faults(self, fault=None):
+        with self._fault_lock:
+            self._faults = [f for f in self._faults if fault is not None and f is not fault]
+
+    def _call(self, operation):
+        self.request_counts[operation] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if not self._faults:
+            return
+        with self._fault_lock:
+            for fault in self._faults:
+                if fault['operations'] and operation not in fault['operations']:
+                    continue
+                if fault['remaining'] == 0 or self._random.random() >= fault['rate']:
+                    continue
+                if fault['remaining'] is not None:
+                    fault['remaining'] -= 1
+                fault['injected'] += 1
+                break
+            else:
+                return
+        if fault['latency']:
+            time.sleep(fault['latency'])
+        self.request_counts[f"{operation}:{fault['code']}"] += 1
+        raise _error_class(fault['code'])(f"Injected {fault['code']}", operation)
+
+
+def _copy_item(item):
+    return {k: (dict(v) if ('S' in v or 'N' in v) else copy.deepcopy(v)) for k, v in item.items()}
+
+
+# ----------------------------------------------------------------------
+# Expression parsing (the subset of DynamoDB expression syntax the handlers use)
+# ----------------------------------------------------------------------
+_TOKEN_RE = re.compile(r'\s*(<>|<=|>=|=|<|>|\(|\)|,|\+|-|#[\w]+|:[\w]+|[A-Za-z_][\w.]*)')
+_KEYWORDS = {'AND', 'OR', 'NOT', 'BETWEEN', 'IN', 'SET', 'ADD', 'REMOVE', 'DELETE'}
+
+
+def _tokenize(expression):
+    tokens, pos = [], 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN_RE.match(expression, pos)
+        if not match:
+            raise ValidationException(f'Invalid expression near: {expression[pos:]}')
+        tokens.append(match.group(1))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, expression, names, values):
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def peek_keyword(self):
+        token = self.peek()
+        return token.upper() if token and token.upper() in _KEYWORDS else None
+
+    def take(self, expected=None):
+        token = self.peek()
+        if token is None or (expected and token.upper() != expected):
+            raise ValidationException(f'Expected {expected or "token"}, got {token}')
+        self.pos += 1
+        return token
+
+    def name(self, token):
+        if token.startswith('#'):
+            if token not in self.names:
+                raise ValidationException(f'Unresolved attribute name {token}')
+            return self.names[token]
+        return token
+
+    def operand(self):
+        token = self.take()
+        if token.startswith(':'):
+            if token not in self.values:
+                raise ValidationException(f'Unresolved attribute value {token}')
+            return ('value', self.values[token])
+        if self.peek() == '(' and token.lower() in ('if_not_exists', 'list_append', 'size'):
+            self.take('(')
+            args = [self.operand()]
+            while self.peek() == ',':
+                self.take(',')
+                args.append(self.operand())
+            self.take(')')
+            return ('call', token.lower(), args)
+        return ('path', self.name(token))
+
+    # Condition grammar: or -> and -> not -> primary
+    def condition(self):
+        node = self.conjunction()
+        while self.peek_keyword() == 'OR':
+            self.take('OR')
+            node = ('or', node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.peek_keyword() == 'AND':
+            self.take('AND')
+            node = ('and', node, self.negation())
+        return node
+
+    def negation(self):
+        if self.peek_keyword() == 'NOT':
+            self.take('NOT')
+            return ('not', self.negation())
+        return self.primary()
+
+    def primary(self):
+        token = self.peek()
+        if token == '(':
+            self.take('(')
+            node = self.condition()
+            self.take(')')
+            return node
+        if token and token.lower() in ('attribute_exists', 'attribute_not_exists', 'begins_with', 'contains') \
+                and self.pos + 1 < len(self.tokens) and self.tokens[self.pos + 1] == '(':
+            func = self.take().lower()
+            self.take('(')
+            args = [self.operand()]
+            while self.peek() == ',':
+                self.take(',')
+                args.append(self.operand())
+            self.take(')')
+            return ('func', func, args)
+        left = self.operand()
+        keyword = self.peek_keyword()
+        if keyword == 'BETWEEN':
+            self.take('BETWEEN')
+            low = self.operand()
+            self.take('AND')
+            return ('between', left, low, self.operand())
+        if keyword == 'IN':
+            self.take('IN')
+            self.take('(')
+            options = [self.operand()]
+            while self.peek() == ',':
+                self.take(',')
+                options.append(self.operand())
+            self.take(')')
+            return ('in', left, options)
+        op = self.take()
+        if op not in ('=', '<>', '<', '<=', '>', '>='):
+            raise ValidationException(f'Unsupported comparator {op}')
+        return ('cmp', op, left, self.operand())
+
+
+def _resolve(operand, item):
+    kind = operand[0]
+    if kind == 'value':
+        return operand[1]
+    if kind == 'path':
+        return item.get(operand[1])
+    if kind == 'call' and operand[1] == 'size':
+        value = _resolve(operand[2][0], item)
+        if value is None:
+            return None
+        inner = value.get('S') or value.get('B') or value.get('L') or value.get('M') or value.get('SS') or []
+        return {'N': str(len(inner))}
+    raise ValidationException(f'Unsupported operand {operand}')
+
+
+def _evaluate(node, item):
+    kind = node[0]
+    if kind == 'and':
+        return _evaluate(node[1], item) and _evaluate(node[2], item)
+    if kind == 'or':
+        return _evaluate(node[1], item) or _evaluate(node[2], item)
+    if kind == 'not':
+        return not _evaluate(node[1], item)
+    if kind == 'func':
+        func, args = node[1], node[2]
+        if func == 'attribute_exists':
+            return args[0][1] in item
+        if func == 'attribute_not_exists':
+            return args[0][1] not in item
+        target, probe = _av_value(_resolve(args[0], item)), _av_value(_resolve(args[1], item))
+        if target is None:
+            return False
+        if func == 'begins_with':
+            return isinstance(target, (str, bytes)) and target.startswith(probe)
+        return probe in target
+    if kind == 'between':
+        value = _av_value(_resolve(node[1], item))
+        low, high = _av_value(_resolve(node[2], item)), _av_value(_resolve(node[3], item))
+        return value is not None and low <= value <= high
+    if kind == 'in':
+        value = _av_value(_resolve(node[1], item))
+        return value is not None and value in [_av_value(_resolve(o, item)) for o in node[2]]
+    if kind == 'cmp':
+        op = node[1]
+        left, right = _av_value(_resolve(node[2], item)), _av_value(_resolve(node[3], item))
+        if op == '=':
+            return left is not None and left == right
+        if op == '<>':
+            return left != right
+        if left is None or right is None or type(left) is not type(right):
+            return False
+        return {'<': left < right, '<=': left <= right, '>': left > right, '>=': left >= right}[op]
+    raise ValidationException(f'Unsupported condition {node}')
+
+
+def _flatten_and(node):
+    if node[0] == 'and':
+        return _flatten_and(node[1]) + _flatten_and(node[2])
+    return [node]
+
+
+def _apply_update(item, expression, names, values):
+    """Applies an UpdateExpression (SET/ADD/REMOVE/DELETE clauses) to item in place."""
+    parser = _Parser(expression, names, values)
+    while parser.peek() is not None:
+        clause = parser.take().upper()
+        while True:
+            if clause == 'SET':
+                path = parser.name(parser.take())
+                parser.take('=')
+                value = _update_value(parser.operand(), item)
+                if parser.peek() in ('+', '-'):
+                    sign = parser.take()
+                    other = _update_value(parser.operand(), item)
+                    delta = Decimal(other['N']) if sign == '+' else -Decimal(other['N'])
+                    value = _number_av(Decimal(value['N']) + delta)
+                item[path] = value
+            elif clause == 'REMOVE':
+                item.pop(parser.name(parser.take()), None)
+            elif clause in ('ADD', 'DELETE'):
+                path = parser.name(parser.take())
+                value = parser.operand()[1]
+                current = item.get(path)
+                if 'N' in value:
+                    base = Decimal(current['N']) if current else Decimal(0)
+                    item[path] = _number_av(base + Decimal(value['N']))
+                else:
+                    set_type = 'SS' if 'SS' in value else 'NS'
+                    members = set(current[set_type]) if current else set()
+                    members = members | set(value[set_type]) if clause == 'ADD' else members - set(value[set_type])
+                    if members:
+                        item[path] = {set_type: sorted(members)}
+                    else:
+                        item.pop(path, None)
+            else:
+                raise ValidationException(f'Unsupported update clause {clause}')
+            if parser.peek() == ',':
+                parser.take(',')
+                continue
+            break
+
+
+def _update_value(operand, item):
+    if operand[0] == 'call':
+        name, args = operand[1], operand[2]
+        if name == 'if_not_exists':
+            existing = _resolve(args[0], item)
+            return existing if existing is not None else _resolve(args[1], item)
+        if name == 'list_append':
+            first, second = _resolve(args[0], item) or {'L': []}, _resolve(args[1], item) or {'L': []}
+            return {'L': first['L'] + second['L']}
+    return _resolve(operand, item)
+
+
+def _project(item, expression, names):
+    if not expression:
+        return _copy_item(item)
+    wanted = [names.get(p.strip(), p.strip()) if names else p.strip() for p in expression.split(',')]
+    return {k: dict(item[k]) if ('S' in item[k] or 'N' in item[k]) else copy.deepcopy(item[k])
+            for k in wanted if k in item}
+
+
+# ----------------------------------------------------------------------
+# DynamoDB
+# ----------------------------------------------------------------------
+class _Partition:
+    """Items of one partition kept in sort-key order so range conditions can bisect."""
+    __slots__ = ('keys', 'items')
+
+    def __init__(self):
+        self.keys = []
+        self.items = {}
+
+    def put(self, sort_tuple, item):
+        if sort_tuple not in self.items:
+            bisect.insort(self.keys, sort_tuple)
+        self.items[sort_tuple] = item
+
+    def delete(self, sort_tuple):
+        if sort_tuple in self.items:
+            del self.items[sort_tuple]
+            del self.keys[bisect.bisect_left(self.keys, sort_tuple)]
+
+
+class _Table:
+    def __init__(self, name, hash_key, range_key=None, indexes=None):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        # index name -> (hash attribute, range attribute or None)
+        self.indexes = dict(indexes or {})
+        self.partitions = {}
+        self.index_partitions = {index: {} for index in self.indexes}
+        self.stream = None  # Set to a list to record change events (see enable_stream)
+
+    def key_of(self, item):
+        key = {self.hash_key: item[self.hash_key]}
+        if self.range_key:
+            key[self.range_key] = item[self.range_key]
+        return key
+
+    def locate(self, key):
+        if self.hash_key not in key or (self.range_key and self.range_key not in key):
+            raise ValidationException(f'The provided key element does not match the schema of {self.name}')
+        hash_value = _av_value(key[self.hash_key])
+        sort_tuple = (_av_value(key[self.range_key]),) if self.range_key else ()
+        return hash_value, sort_tuple
+
+    def get(self, key):
+        hash_value, sort_tuple = self.locate(key)
+        partition = self.partitions.get(hash_value)
+        return partition.items.get(sort_tuple) if partition else None
+
+    def _index_entry(self, index, item):
+        index_hash, index_range = self.indexes[index]
+        if index_hash not in item or (index_range and index_range not in item):
+            return None  # Sparse index: items missing the index key are not projected
+        primary = (_av_value(item[self.hash_key]),) + self.locate(item)[1]
+        sort_tuple = ((_av_value(item[index_range]),) if index_range else ()) + primary
+        return _av_value(item[index_hash]), sort_tuple
+
+    def put(self, item):
+        old = self.get(item)
+        if old is not None:
+            self._unindex(old)
+        hash_value, sort_tuple = self.locate(item)
+        self.partitions.setdefault(hash_value, _Partition()).put(sort_tuple, item)
+        for index in self.indexes:
+            entry = self._index_entry(index, item)
+            if entry:
+                self.index_partitions[index].setdefault(entry[0], _Partition()).put(entry[1], item)
+        self._record('MODIFY' if old is not None else 'INSERT', old, item)
+        return old
+
+    def delete(self, key):
+        old = self.get(key)
+        if old is None:
+            return None
+        self._unindex(old)
+        hash_value, sort_tuple = self.locate(old)
+        partition = self.partitions[hash_value]
+        partition.delete(sort_tuple)
+        if not partition.keys:
+            del self.partitions[hash_value]
+        self._record('REMOVE', old, None)
+        return old
+
+    def _unindex(self, item):
+        for index in self.indexes:
+            entry = self._index_entry(index, item)
+            if entry and entry[0] in self.index_partitions[index]:
+                partition = self.index_partitions[index][entry[0]]
+                partition.delete(entry[1])
+                if not partition.keys:
+                    del self.index_partitions[index][entry[0]]
+
+    def _record(self, event_name, old, new):
+        if self.stream is None:
+            return
+        record = {
+            'eventID': uuid.uuid4().hex,
+            'eventName': event_name,
+            'eventSource': 'aws:dynamodb',
+            'dynamodb': {
+                'Keys': self.key_of(new or old),
+                'SequenceNumber': str(len(self.stream) + 1),
+                'StreamViewType': 'NEW_AND_OLD_IMAGES',
+            },
+            'eventSourceARN': f'arn:aws:dynamodb:local:000000000000:table/{self.name}/stream/local',
+        }
+        if new is not None:
+            record['dynamodb']['NewImage'] = _copy_item(new)
+        if old is not None:
+            record['dynamodb']['OldImage'] = _copy_item(old)
+        self.stream.append(record)
+
+
+class LocalDynamoDB(_LocalService):
+    """A thread-safe, in-memory subset of the boto3 low-level DynamoDB client.
+
+    Supports the calls and expression syntax the handlers use, counts requests per
+    operation and can add a fixed per-call latency to approximate network round trips.
+    """
+    OPERATIONS = ('get_item', 'put_item', 'update_item', 'delete_item', 'query', 'scan', 'batch_get_item',
+                  'batch_write_item', 'transact_write_items')
+
+    def __init__(self, tables=None, latency_ms=0):
+        self._lock = threading.RLock()
+        self._tables = {}
+        self._init_service(latency_ms)
+        self.exceptions = SimpleNamespace(
+            ClientError=LocalClientError,
+            ConditionalCheckFailedException=ConditionalCheckFailedException,
+            TransactionCanceledException=TransactionCanceledException,
+            ResourceNotFoundException=ResourceNotFoundException,
+            ProvisionedThroughputExceededException=ProvisionedThroughputExceededException,
+            ThrottlingException=ThrottlingException,
+        )
+        for name, schema in (tables or {}).items():
+            self.add_table(name, schema['hash'], schema.get('range'), schema.get('indexes'))
+
+    def add_table(self, name, hash_key, range_key=None, indexes=None):
+        with self._lock:
+            self._tables[name] = _Table(name, hash_key, range_key, indexes)
+
+    def enable_stream(self, table_name):
+        """Starts recording NEW_AND_OLD_IMAGES change records for a table; returns the record list."""
+        table = self._table(table_name)
+        table.stream = []
+        return table.stream
+
+    def _table(self, name):
+        if name not in self._tables:
+            raise ResourceNotFoundException(f'Requested resource not found: Table: {name} not found')
+        return self._tables[name]
+
+    def _check(self, table, key, condition, names, values, return_old='NONE'):
+        if not condition:
+            return
+        current = table.get(key) or {}
+        if not _evaluate(_Parser(condition, names, values).condition(), current):
+            error = ConditionalCheckFailedException('The conditional request failed', 'ConditionalCheck')
+            if return_old == 'ALL_OLD' and current:
+                error.response['Item'] = _copy_item(current) # ReturnValuesOnConditionCheckFailure
+            raise error
+
+    # Single-item operations
+    def get_item(self, TableName, Key, ProjectionExpression=None, ExpressionAttributeNames=None, ConsistentRead=False):
+        self._call('GetItem')
+        with self._lock:
+            item = self._table(TableName).get(Key)
+            return {'Item': _project(item, ProjectionExpression, ExpressionAttributeNames)} if item else {}
+
+    def put_item(self, TableName, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, ReturnValues='NONE', ReturnValuesOnConditionCheckFailure='NONE'):
+        self._call('PutItem')
+        with self._lock:
+            table = self._table(TableName)
+            self._check(table, Item, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues,
+                        ReturnValuesOnConditionCheckFailure)
+            old = table.put(_copy_item(Item))
+            return {'Attributes': _copy_item(old)} if old and ReturnValues == 'ALL_OLD' else {}
+
+    def update_item(self, TableName, Key, UpdateExpression, ConditionExpression=None,
+                    ExpressionAttributeNames=None, ExpressionAttributeValues=None, ReturnValues='NONE',
+                    ReturnValuesOnConditionCheckFailure='NONE'):
+        self._call('UpdateItem')
+        with self._lock:
+            table = self._table(TableName)
+            self._check(table, Key, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues,
+                        ReturnValuesOnConditionCheckFailure)
+            old = table.get(Key)
+            item = _copy_item(old) if old else _copy_item(Key)
+            _apply_update(item, UpdateExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+            table.put(item)
+            if ReturnValues in ('ALL_NEW', 'UPDATED_NEW'):
+                return {'Attributes': _copy_item(item)}
+            if ReturnValues == 'ALL_OLD' and old:
+                return {'Attributes': _copy_item(old)}
+            return {}
+
+    def delete_item(self, TableName, Key, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues='NONE'):
+        self._call('DeleteItem')
+        with self._lock:
+            table = self._table(TableName)
+            self._check(table, Key, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+            old = table.delete(Key)
+            return {'Attributes': _copy_item(old)} if old and ReturnValues == 'ALL_OLD' else {}
+
+    # Multi-item reads
+    def query(self, TableName, KeyConditionExpression, IndexName=None, FilterExpression=None,
+              ProjectionExpression=None, ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+              Limit=None, ExclusiveStartKey=None, ScanIndexForward=True, Select=None, ConsistentRead=False):
+        self._call('Query')
+        with self._lock:
+            table = self._table(TableName)
+            if IndexName:
+                if IndexName not in table.indexes:
+                    raise ValidationException(f'The table does not have the specified index: {IndexName}')
+                hash_key, range_key = table.indexes[IndexName]
+                partitions = table.index_partitions[IndexName]
+            else:
+                hash_key, range_key, partitions = table.hash_key, table.range_key, table.partitions
+
+            parser = _Parser(KeyConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+            hash_value, range_condition = None, None
+            for clause in _flatten_and(parser.condition()):
+                if clause[0] == 'cmp' and clause[1] == '=' and clause[2] == ('path', hash_key):
+                    hash_value = _av_value(clause[3][1])
+                else:
+                    range_condition = clause
+            if hash_value is None:
+                raise ValidationException('Query condition missed key schema element')
+
+            partition = partitions.get(hash_value)
+            keys = partition.keys if partition else []
+            start, end = self._key_range(keys, range_condition)
+            if ExclusiveStartKey:
+                if IndexName:
+                    start_tuple = table._index_entry(IndexName, ExclusiveStartKey)[1]
+                else:
+                    start_tuple = table.locate(ExclusiveStartKey)[1]
+                if ScanIndexForward:
+                    start = max(start, bisect.bisect_right(keys, start_tuple))
+                else:
+                    end = min(end, bisect.bisect_left(keys, start_tuple))
+            positions = range(start, end) if ScanIndexForward else range(end - 1, start - 1, -1)
+
+            filter_node = _Parser(FilterExpression, ExpressionAttributeNames, ExpressionAttributeValues).condition() \
+                if FilterExpression else None
+            items, scanned, last = [], 0, None
+            for position in positions:
+                item = partition.items[keys[position]]
+                if range_condition is not None and not _evaluate(range_condition, item):
+                    continue
+                scanned += 1
+                if filter_node is None or _evaluate(filter_node, item):
+                    items.append(_project(item, ProjectionExpression, ExpressionAttributeNames))
+                if Limit and scanned >= Limit:
+                    if position != positions[-1]:
+                        last = item
+                    break
+            response = {'Count': len(items), 'ScannedCount': scanned}
+            if Select != 'COUNT':
+                response['Items'] = items
+            if last is not None:
+                last_key = table.key_of(last)
+                if IndexName:
+                    last_key[hash_key] = last[hash_key]
+                    if range_key:
+                        last_key[range_key] = last[range_key]
+                response['LastEvaluatedKey'] = _copy_item(last_key)
+            return response
+
+    @staticmethod
+    def _key_range(keys, condition):
+        """Narrows a sorted partition to the [start, end) slice a sort-key condition can match."""
+        if condition is None:
+            return 0, len(keys)
+        kind = condition[0]
+        if kind == 'between':
+            low, high = _av_value(condition[2][1]), _av_value(condition[3][1])
+            return bisect.bisect_left(keys, (low,)), bisect.bisect_right(keys, (high, _MAX))
+        if kind == 'func' and condition[1] == 'begins_with':
+            prefix = _av_value(condition[2][1][1])
+            return bisect.bisect_left(keys, (prefix,)), bisect.bisect_left(keys, (prefix + '\U0010ffff',))
+        if kind == 'cmp':
+            op, value = condition[1], _av_value(condition[3][1])
+            if op == '=':
+                return bisect.bisect_left(keys, (value,)), bisect.bisect_right(keys, (value, _MAX))
+            if op == '<':
+                return 0, bisect.bisect_left(keys, (value,))
+            if op == '<=':
+                return 0, bisect.bisect_right(keys, (value, _MAX))
+            if op == '>':
+                return bisect.bisect_right(keys, (value, _MAX)), len(keys)
+            if op == '>=':
+                return bisect.bisect_left(keys, (value,)), len(keys)
+        return 0, len(keys)
+
+    def scan(self, TableName, IndexName=None, FilterExpression=None, ProjectionExpression=None,
+             ExpressionAttributeNames=None, ExpressionAttributeValues=None, Limit=None,
+             ExclusiveStartKey=None, Segment=None, TotalSegments=None, Select=None, ConsistentRead=False):
+        self._call('Scan')
+        with self._lock:
+            table = self._table(TableName)
+            partitions = table.index_partitions[IndexName] if IndexName else table.partitions
+            # Deterministic order: partitions by hash value string, then sort order
+            ordered = []
+            for hash_value in sorted(partitions, key=str):
+                if TotalSegments and hash(str(hash_value)) % TotalSegments != (Segment or 0):
+                    continue
+                partition = partitions[hash_value]
+                ordered.extend(partition.items[k] for k in partition.keys)
+            start = 0
+            if ExclusiveStartKey:
+                marker = table.locate(ExclusiveStartKey)
+                for position, item in enumerate(ordered):
+                    if table.locate(item) == marker:
+                        start = position + 1
+                        break
+            filter_node = _Parser(FilterExpression, ExpressionAttributeNames, ExpressionAttributeValues).condition() \
+                if FilterExpression else None
+            items, scanned, last = [], 0, None
+            for position in range(start, len(ordered)):
+                item = ordered[position]
+                scanned += 1
+                if filter_node is None or _evaluate(filter_node, item):
+                    items.append(_project(item, ProjectionExpression, ExpressionAttributeNames))
+                if Limit and scanned >= Limit and position < len(ordered) - 1:
+                    last = item
+                    break
+            response = {'Count': len(items), 'ScannedCount': scanned}
+            if Select != 'COUNT':
+                response['Items'] = items
+            if last is not None:
+                response['LastEvaluatedKey'] = _copy_item(table.key_of(last))
+            return response
+
+    # Batch and transactional operations
+    def batch_get_item(self, RequestItems):
+        self._call('BatchGetItem')
+        if sum(len(spec['Keys']) for spec in RequestItems.values()) > 100:
+            raise ValidationException('Too many items requested for the BatchGetItem call')
+        with self._lock:
+            responses = {}
+            for table_name, spec in RequestItems.items():
+                table = self._table(table_name)
+                found = responses.setdefault(table_name, [])
+                for key in spec['Keys']:
+                    item = table.get(key)
+                    if item:
+                        found.append(_project(item, spec.get('ProjectionExpression'),
+                                              spec.get('ExpressionAttributeNames')))
+            return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, RequestItems):
+        self._call('BatchWriteItem')
+        if sum(len(requests) for requests in RequestItems.values()) > 25:
+            raise ValidationException('Too many items requested for the BatchWriteItem call')
+        with self._lock:
+            for table_name, requests in RequestItems.items():
+                table = self._table(table_name)
+                for request in requests:
+                    if 'PutRequest' in request:
+                        table.put(_copy_item(request['PutRequest']['Item']))
+                    else:
+                        table.delete(request['DeleteRequest']['Key'])
+            return {'UnprocessedItems': {}}
+
+    def transact_write_items(self, TransactItems, ClientRequestToken=None):
+        self._call('TransactWriteItems')
+        if len(TransactItems) > 100:
+            raise ValidationException('Member must have length less than or equal to 100')
+        with self._lock:
+            reasons, failed = [], False
+            for entry in TransactItems:
+                (action, spec), = entry.items()
+                table = self._table(spec['TableName'])
+                key = spec.get('Key') or table.key_of(spec['Item'])
+                try:
+                    self._check(table, key, spec.get('ConditionExpression'),
+                                spec.get('ExpressionAttributeNames'), spec.get('ExpressionAttributeValues'))
+                    reasons.append({'Code': 'None'})
+                except ConditionalCheckFailedException:
+                    failed = True
+                    reasons.append({'Code': 'ConditionalCheckFailed', 'Message': 'The conditional request failed'})
+            if failed:
+                codes = ', '.join(r['Code'] for r in reasons)
+                raise TransactionCanceledException(
+                    f'Transaction cancelled, please refer cancellation reasons for specific reasons [{codes}]',
+                    'TransactWriteItems',
+                    {'Error': {'Code': 'TransactionCanceledException', 'Message': codes},
+                     'CancellationReasons': reasons})
+            for entry in TransactItems:
+                (action, spec), = entry.items()
+                table = self._table(spec['TableName'])
+                if action == 'Put':
+                    table.put(_copy_item(spec['Item']))
+                elif action == 'Delete':
+                    table.delete(spec['Key'])
+                elif action == 'Update':
+                    old = table.get(spec['Key'])
+                    item = _copy_item(old) if old else _copy_item(spec['Key'])
+                    _apply_update(item, spec['UpdateExpression'], spec.get('ExpressionAttributeNames'),
+                                  spec.get('ExpressionAttributeValues'))
+                    table.put(item)
+            return {}
+
+    def get_paginator(self, operation_name):
+        return _Paginator(getattr(self, operation_name))
+
+
+class _Paginator:
+    """Minimal stand-in for boto3 paginators over LastEvaluatedKey."""
+
+    def __init__(self, method):
+        self.method = method
+
+    def paginate(self, **kwargs):
+        while True:
+            page = self.method(**kwargs)
+            yield page
+            if not page.get('LastEvaluatedKey'):
+                return
+            kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+
+# ----------------------------------------------------------------------
+# S3
+# ----------------------------------------------------------------------
+class _Body:
+    def __init__(self, data):
+        self._data = data
+
+    def read(self, amount=None):
+        if amount is None:
+            data, self._data = self._data, b''
+            return data
+        data, self._data = self._data[:amount], self._data[amount:]
+        return data
+
+    def iter_chunks(self, chunk_size=1024 * 1024):
+        while self._data:
+            yield self.read(chunk_size)
+
+
+class LocalS3(_LocalService):
+    """An in-memory subset of the boto3 S3 client (objects are stored per bucket as bytes)."""
+    OPERATIONS = ('put_object', 'get_object', 'head_object', 'delete_object', 'list_objects_v2', 'put_object_tagging')
+
+    def __init__(self, latency_ms=0):
+        self._lock = threading.RLock()
+        self._buckets = {}
+        self._init_service(latency_ms)
+        self.exceptions = SimpleNamespace(ClientError=LocalClientError, NoSuchKey=NoSuchKey)
+
+    def put_object(self, Bucket, Key, Body=b'', ContentType=None, ContentEncoding=None, Metadata=None, **kwargs):
+        self._call('PutObject')
+        data = Body.encode('utf-8') if isinstance(Body, str) else (Body.read() if hasattr(Body, 'read') else Body)
+        with self._lock:
+            self._buckets.setdefault(Bucket, {})[Key] = {
+                'Body': bytes(data),
+                'ContentType': ContentType or 'binary/octet-stream',
+                'ContentEncoding': ContentEncoding,
+                'Metadata': dict(Metadata or {}),
+                'LastModified': time.time(),
+            }
+        return {'ETag': f'"{uuid.uuid4().hex}"'}
+
+    def _object(self, Bucket, Key):
+        obj = self._buckets.get(Bucket, {}).get(Key)
+        if obj is None:
+            raise NoSuchKey('The specified key does not exist.', 'GetObject')
+        return obj
+
+    def get_object(self, Bucket, Key, Range=None):
+        self._call('GetObject')
+        with self._lock:
+            obj = self._object(Bucket, Key)
+        data = obj['Body']
+        if Range:
+            start, _, end = Range.replace('bytes=', '').partition('-')
+            data = data[int(start):int(end) + 1 if end else None]
+        return {'Body': _Body(data), 'ContentLength': len(data), 'ContentType': obj['ContentType'],
+                'ContentEncoding': obj['ContentEncoding'], 'Metadata': dict(obj['Metadata'])}
+
+    def head_object(self, Bucket, Key):
+        self._call('HeadObject')
+        with self._lock:
+            obj = self._object(Bucket, Key)
+        return {'ContentLength': len(obj['Body']), 'ContentType': obj['ContentType'], 'Metadata': dict(obj['Metadata'])}
+
+    def put_object_tagging(self, Bucket, Key, Tagging):
+        self._call('PutObjectTagging')
+        with self._lock:
+            self._object(Bucket, Key)['Tags'] = {t['Key']: t['Value'] for t in Tagging['TagSet']}
+        return {}
+
+    def delete_object(self, Bucket, Key):
+        self._call('DeleteObject')
+        with self._lock:
+            self._buckets.get(Bucket, {}).pop(Key, None)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix='', ContinuationToken=None, MaxKeys=1000, StartAfter=None):
+        self._call('ListObjectsV2')
+        with self._lock:
+            keys = sorted(k for k in self._buckets.get(Bucket, {}) if k.startswith(Prefix))
+            objects = self._buckets.get(Bucket, {})
+            marker = ContinuationToken or StartAfter
+            if marker:
+                keys = keys[bisect.bisect_right(keys, marker):]
+            page = keys[:MaxKeys]
+            response = {
+                'KeyCount': len(page),
+                'Contents': [{'Key': k, 'Size': len(objects[k]['Body'])} for k in page],
+                'IsTruncated': len(keys) > MaxKeys,
+            }
+            if response['IsTruncated']:
+                response['NextContinuationToken'] = page[-1]
+            return response
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn=3600):
+        return f"http://localhost/{Params['Bucket']}/{Params['Key']}?method={ClientMethod}&expires={ExpiresIn}"
+
+    def generate_presigned_post(self, Bucket, Key, Fields=None, Conditions=None, ExpiresIn=3600):
+        policy = json.dumps({'conditions': [{'bucket': Bucket}, {'key': Key}] + list(Conditions or []),
+                             'expires': ExpiresIn}, separators=(',', ':'))
+        return {'url': f'http://localhost/{Bucket}',
+                'fields': dict(Fields or {}, key=Key, policy=base64.b64encode(policy.encode('utf-8')).decode('ascii'))}
+
+
+# ----------------------------------------------------------------------
+# SQS and SES
+# ----------------------------------------------------------------------
+MAX_SQS_BATCH = 10 # SendMessageBatch / ReceiveMessage / DeleteMessageBatch limit
+MAX_VISIBILITY_TIMEOUT = 12 * 60 * 60
+
+
+def _sqs_md5(body):
+    return hashlib.md5(body.encode('utf-8')).hexdigest()
+
+
+class _Queue:
+    """Messages of one queue, with a heap of (visible at, sequence, message id) to find visible ones."""
+
+    def __init__(self, url, visibility_timeout=30, dead_letter_url=None, max_receives=None):
+        self.url = url
+        self.visibility_timeout = visibility_timeout
+        self.dead_letter_url = dead_letter_url
+        self.max_receives = max_receives
+        self.messages = {} # message id -> message
+        self.heap = [] # Entries go stale when a message is received, deleted or its visibility changes
+
+    def push(self, message, visible_at, sequence):
+        message['visible_at'] = visible_at
+        heapq.heappush(self.heap, (visible_at, sequence, message['MessageId']))
+
+
+class LocalSQS(_LocalService):
+    """An in-memory subset of the boto3 SQS client: standard queues with visibility timeouts,
+    delays, long polling and redrive to a dead-letter queue after max_receives receives.
+    """
+    OPERATIONS = ('send_message', 'send_message_batch', 'receive_message', 'delete_message', 'delete_message_batch',
+                  'change_message_visibility', 'get_queue_attributes', 'purge_queue')
+
+    def __init__(self, queues=None, latency_ms=0):
+        self._lock = threading.Lock()
+        self._arrived = threading.Condition(self._lock)
+        self._queues = {}
+        self._sequence = itertools.count()
+        self._init_service(latency_ms)
+        names = ['QueueDoesNotExist', 'ReceiptHandleIsInvalid', 'MessageNotInflight',
+                 'TooManyEntriesInBatchRequest', 'EmptyBatchRequest', 'InvalidParameterValue']
+        self.exceptions = SimpleNamespace(ClientError=LocalClientError, **{n: _error_class(n) for n in names})
+        for url, config in (queues or {}).items():
+            self.add_queue(url, **config)
+
+    def add_queue(self, url, visibility_timeout=30, dead_letter_url=None, max_receives=None):
+        """Creates a queue, or reconfigures an existing one (keeping its messages)."""
+        with self._lock:
+            queue = self._queues.get(url)
+            if queue is None:
+                self._queues[url] = _Queue(url, visibility_timeout, dead_letter_url, max_receives)
+            else:
+                queue.visibility_timeout, queue.dead_letter_url = visibility_timeout, dead_letter_url
+                queue.max_receives = max_receives
+
+    def _queue(self, url):
+        if url not in self._queues:
+            raise self.exceptions.QueueDoesNotExist(f'The specified queue does not exist: {url}')
+        return self._queues[url]
+
+    def _enqueue(self, queue, body, delay, attributes=None, receive_count=0):
+        message_id = str(uuid.uuid4())
+        queue.messages[message_id] = {'MessageId': message_id, 'Body': body, 'MD5OfBody': _sqs_md5(body),
+                                      'MessageAttributes': attributes or {}, 'receive_count': receive_count,
+                                      'receipt': None, 'sent_at': time.time()}
+        queue.push(queue.messages[message_id], time.time() + delay, next(self._sequence))
+        self._arrived.notify_all()
+        return message_id
+
+    @staticmethod
+    def _check_batch(entries, exceptions):
+        if not entries:
+            raise exceptions.EmptyBatchRequest('There should be at least one entry in the request.')
+        if len(entries) > MAX_SQS_BATCH:
+            raise exceptions.TooManyEntriesInBatchRequest(f'Maximum number of entries per request is {MAX_SQS_BATCH}.')
+
+    def send_message(self, QueueUrl, MessageBody, DelaySeconds=0, MessageAttributes=None):
+        self._call('SendMessage')
+        with self._lock:
+            message_id = self._enqueue(self._queue(QueueUrl), MessageBody, DelaySeconds, MessageAttributes)
+        return {'MessageId': message_id, 'MD5OfMessageBody': _sqs_md5(MessageBody)}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self._call('SendMessageBatch')
+        self._check_batch(Entries, self.exceptions)
+        with self._lock:
+            queue = self._queue(QueueUrl)
+            successful = [{'Id': entry['Id'], 'MD5OfMessageBody': _sqs_md5(entry['MessageBody']),
+                           'MessageId': self._enqueue(queue, entry['MessageBody'], entry.get('DelaySeconds', 0),
+                                                      entry.get('MessageAttributes'))}
+                          for entry in Entries]
+        return {'Successful': successful, 'Failed': []}
+
+    def _take_visible(self, queue, limit, visibility_timeout):
+        now, taken = time.time(), []
+        while queue.heap and queue.heap[0][0] <= now and len(taken) < limit:
+            visible_at, _, message_id = heapq.heappop(queue.heap)
+            message = queue.messages.get(message_id)
+            if message is None or message['visible_at'] != visible_at:
+                continue # Deleted, or made visible at another time since this entry was pushed
+            if queue.max_receives and message['receive_count'] >= queue.max_receives:
+                del queue.messages[message_id] # Redrive: the next receive would exceed maxReceiveCount
+                self._enqueue(self._queue(queue.dead_letter_url), message['Body'], 0, message['MessageAttributes'],
+                              message['receive_count'])
+                continue
+            message['receive_count'] += 1
+            message['receipt'] = f'{message_id}#{uuid.uuid4().hex}'
+            message.setdefault('first_received_at', now)
+            queue.push(message, now + visibility_timeout, next(self._sequence))
+            taken.append(message)
+        return taken
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages=1, VisibilityTimeout=None, WaitTimeSeconds=0,
+                        AttributeNames=None, MessageAttributeNames=None, MessageSystemAttributeNames=None):
+        self._call('ReceiveMessage')
+        if not 1 <= MaxNumberOfMessages <= MAX_SQS_BATCH:
+            raise self.exceptions.InvalidParameterValue(f'MaxNumberOfMessages must be between 1 and {MAX_SQS_BATCH}.')
+        deadline = time.time() + WaitTimeSeconds
+        with self._lock:
+            queue = self._queue(QueueUrl)
+            timeout = queue.visibility_timeout if VisibilityTimeout is None else VisibilityTimeout
+            while True:
+                taken = self._take_visible(queue, MaxNumberOfMessages, timeout)
+                remaining = deadline - time.time()
+                if taken or remaining <= 0:
+                    break
+                next_visible = queue.heap[0][0] - time.time() if queue.heap else remaining
+                self._arrived.wait(min(remaining, max(next_visible, 0.001)))
+            messages = [{'MessageId': m['MessageId'], 'ReceiptHandle': m['receipt'], 'Body': m['Body'],
+                         'MD5OfBody': m['MD5OfBody'], 'MessageAttributes': dict(m['MessageAttributes']),
+                         'Attributes': {'ApproximateReceiveCount': str(m['receive_count']),
+                                        'SentTimestamp': str(int(m['sent_at'] * 1000)),
+                                        'ApproximateFirstReceiveTimestamp': str(int(m['first_received_at'] * 1000))}}
+                        for m in taken]
+        return {'Messages': messages} if messages else {}
+
+    def _in_flight(self, queue, receipt_handle):
+        message = queue.messages.get(receipt_handle.split('#', 1)[0])
+        if message is None or message['receipt'] != receipt_handle:
+            return None # Deleted, or received again since: SQS ignores a stale handle on delete
+        return message
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        self._call('DeleteMessage')
+        with self._lock:
+            queue = self._queue(QueueUrl)
+            if self._in_flight(queue, ReceiptHandle):
+                del queue.messages[ReceiptHandle.split('#', 1)[0]]
+        return {}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        self._call('DeleteMessageBatch')
+        self._check_batch(Entries, self.exceptions)
+        with self._lock:
+            queue = self._queue(QueueUrl)
+            for entry in Entries:
+                if self._in_flight(queue, entry['ReceiptHandle']):
+                    del queue.messages[entry['ReceiptHandle'].split('#', 1)[0]]
+        return {'Successful': [{'Id': entry['Id']} for entry in Entries], 'Failed': []}
+
+    def change_message_visibility(self, QueueUrl, ReceiptHandle, VisibilityTimeout):
+        self._call('ChangeMessageVisibility')
+        if not 0 <= VisibilityTimeout <= MAX_VISIBILITY_TIMEOUT:
+            raise self.exceptions.InvalidParameterValue('VisibilityTimeout is out of range.')
+        with self._lock:
+            queue = self._queue(QueueUrl)
+            message = self._in_flight(queue, ReceiptHandle)
+            if message is None or message['visible_at'] <= time.time():
+                raise self.exceptions.MessageNotInflight('The message referred to is not in flight.')
+            queue.push(message, time.time() + VisibilityTimeout, next(self._sequence))
+            self._arrived.notify_all()
+        return {}
+
+    def get_queue_attributes(self, QueueUrl, AttributeNames=None):
+        self._call('GetQueueAttributes')
+        with self._lock:
+            queue, now = self._queue(QueueUrl), time.time()
+            in_flight = sum(1 for m in queue.messages.values() if m['visible_at'] > now and m['receive_count'])
+            delayed = sum(1 for m in queue.messages.values() if m['visible_at'] > now and not m['receive_count'])
+            return {'Attributes': {'ApproximateNumberOfMessages': str(len(queue.messages) - in_flight - delayed),
+                                   'ApproximateNumberOfMessagesNotVisible': str(in_flight),
+                                   'ApproximateNumberOfMessagesDelayed': str(delayed),
+                                   'VisibilityTimeout': str(queue.visibility_timeout)}}
+
+    def purge_queue(self, QueueUrl):
+        self._call('PurgeQueue')
+        with self._lock:
+            queue = self._queue(QueueUrl)
+            queue.messages.clear()
+            queue.heap.clear()
+        return {}
+
+
+class LocalSES(_LocalService):
+    """Records the emails the handlers send (sent is a list of the send_email arguments)."""
+    OPERATIONS = ('send_email',)
+
+    def __init__(self, latency_ms=0):
+        self._lock = threading.Lock()
+        self.sent = []
+        self._init_service(latency_ms)
+        self.exceptions = SimpleNamespace(ClientError=LocalClientError,
+                                          MessageRejected=_error_class('MessageRejected'))
+
+    def send_email(self, Source, Destination, Message, **kwargs):
+        self._call('SendEmail')
+        with self._lock:
+            self.sent.append({'Source': Source, 'Destination': Destination, 'Message': Message})
+        return {'MessageId': str(uuid.uuid4())}
+
+
+# ----------------------------------------------------------------------
+# Cognito
+# ----------------------------------------------------------------------
+def _is_probable_prime(n, rounds=20):
+    if n < 2:
+        return False
+    for small in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37):
+        if n % small == 0:
+            return n == small
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d, r = d // 2, r + 1
+    for _ in range(rounds):
+        x = pow(random.randrange(2, n - 1), d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _random_prime(bits):
+    while True:
+        candidate = random.getrandbits(bits) | (1 << (bits - 1)) | 1
+        if _is_probable_prime(candidate):
+            return candidate
+
+
+def generate_rsa_key(bits=2048, exponent=65537):
+    """Returns (n, e, d) for a fresh RSA key. For local token signing only, not for production keys."""
+    while True:
+        p, q = _random_prime(bits // 2), _random_prime(bits // 2)
+        phi = (p - 1) * (q - 1)
+        if p != q and phi % exponent:
+            return p * q, exponent, pow(exponent, -1, phi)
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _int_b64url(value):
+    return _b64url(value.to_bytes((value.bit_length() + 7) // 8, 'big'))
+
+
+class LocalCognito(_LocalService):
+    """An in-memory subset of the boto3 cognito-idp client covering the sign-up and login calls.
+
+    Issues real RS256-signed ID/access tokens; jwks() returns the matching public key set.
+    """
+    OPERATIONS = ('sign_up', 'confirm_sign_up', 'resend_confirmation_code', 'admin_create_user', 'admin_get_user',
+                  'initiate_auth')
+
+    def __init__(self, latency_ms=0, region='us-east-1', user_pool_id='us-east-1_local', client_id='local-client',
+                 token_ttl=3600):
+        self._lock = threading.RLock()
+        self.users = {}
+        self._init_service(latency_ms)
+        self.issuer = f'https://cognito-idp.{region}.amazonaws.com/{user_pool_id}'
+        self.client_id = client_id
+        self.token_ttl = token_ttl
+        self._signing_key = None
+        self.kid = uuid.uuid4().hex
+        self.refresh_tokens = {} # refresh token -> username
+        names = ['UsernameExistsException', 'InvalidPasswordException', 'NotAuthorizedException',
+                 'UserNotFoundException', 'CodeMismatchException', 'ExpiredCodeException',
+                 'LimitExceededException', 'TooManyRequestsException', 'InvalidParameterException']
+        self.exceptions = SimpleNamespace(ClientError=LocalClientError, **{n: _error_class(n) for n in names})
+
+    def _key(self):
+        with self._lock:
+            if self._signing_key is None:
+                self._signing_key = generate_rsa_key()
+            return self._signing_key
+
+    def rotate_signing_key(self):
+        """Switches to a new signing key id, as Cognito does on key rotation."""
+        with self._lock:
+            self._signing_key = generate_rsa_key()
+            self.kid = uuid.uuid4().hex
+
+    def jwks(self):
+        n, e, _ = self._key()
+        return {'keys': [{'kid': self.kid, 'kty': 'RSA', 'alg': 'RS256', 'use': 'sig',
+                          'n': _int_b64url(n), 'e': _int_b64url(e)}]}
+
+    def sign_jwt(self, claims):
+        n, _, d = self._key()
+        header = {'kid': self.kid, 'alg': 'RS256'}
+        signing_input = (_b64url(json.dumps(header, separators=(',', ':')).encode()) + '.' +
+                         _b64url(json.dumps(claims, separators=(',', ':')).encode())).encode('ascii')
+        key_length = (n.bit_length() + 7) // 8
+        digest_info = bytes.fromhex('3031300d060960864801650304020105000420') + hashlib.sha256(signing_input).digest()
+        encoded = b'\x00\x01' + b'\xff' * (key_length - len(digest_info) - 3) + b'\x00' + digest_info
+        signature = pow(int.from_bytes(encoded, 'big'), d, n).to_bytes(key_length, 'big')
+        return signing_input.decode('ascii') + '.' + _b64url(signature)
+
+    def _tokens(self, username, user):
+        now = int(time.time())
+        common = {'sub': user['sub'], 'iss': self.issuer, 'iat': now, 'auth_time': now, 'exp': now + self.token_ttl}
+        id_claims = dict(common, aud=self.client_id, token_use='id', email=user['attributes'].get('email', username),
+                         **{'cognito:username': username})
+        access_claims = dict(common, client_id=self.client_id, token_use='access', username=username,
+                             scope='aws.cognito.signin.user.admin')
+        return {'IdToken': self.sign_jwt(id_claims), 'AccessToken': self.sign_jwt(access_claims),
+                'ExpiresIn': self.token_ttl, 'TokenType': 'Bearer'}
+
+    def sign_up(self, ClientId, Username, Password, UserAttributes=None):
+        self._call('SignUp')
+        with self._lock:
+            if Username in self.users:
+                raise self.exceptions.UsernameExistsException('User already exists', 'SignUp')
+            if len(Password) < 8:
+                raise self.exceptions.InvalidPasswordException('Password did not conform with policy', 'SignUp')
+            sub = str(uuid.uuid4())
+            attributes = {a['Name']: a['Value'] for a in UserAttributes or []}
+            self.users[Username] = {'sub': sub, 'password': Password, 'confirmed': False, 'attributes': attributes}
+        return {'UserConfirmed': False, 'UserSub': sub}
+
+    def confirm_sign_up(self, ClientId, Username, ConfirmationCode):
+        self._call('ConfirmSignUp')
+        with self._lock:
+            user = self.users.get(Username)
+            if not user:
+                raise self.exceptions.UserNotFoundException('Username/client id combination not found.', 'ConfirmSignUp')
+            if user['confirmed']:
+                raise self.exceptions.NotAuthorizedException('User cannot be confirmed. Current status is CONFIRMED', 'ConfirmSignUp')
+            user['confirmed'] = True
+        return {}
+
+    def resend_confirmation_code(self, ClientId, Username):
+        self._call('ResendConfirmationCode')
+        if Username not in self.users:
+            raise self.exceptions.UserNotFoundException('Username/client id combination not found.', 'ResendConfirmationCode')
+        return {'CodeDeliveryDetails': {'DeliveryMedium': 'EMAIL', 'AttributeName': 'email'}}
+
+    def admin_create_user(self, UserPoolId, Username, UserAttributes=None, MessageAction=None,
+                          DesiredDeliveryMediums=None, TemporaryPassword=None):
+        self._call('AdminCreateUser')
+        with self._lock:
+            if Username in self.users:
+                raise self.exceptions.UsernameExistsException('User account already exists', 'AdminCreateUser')
+            sub = str(uuid.uuid4())
+            attributes = {a['Name']: a['Value'] for a in UserAttributes or []}
+            self.users[Username] = {'sub': sub, 'password': TemporaryPassword, 'confirmed': True,
+                                    'attributes': attributes}
+        return {'User': {'Username': Username, 'Attributes': [{'Name': 'sub', 'Value': sub}] +
+                         [{'Name': k, 'Value': v} for k, v in attributes.items()],
+                         'UserStatus': 'FORCE_CHANGE_PASSWORD', 'Enabled': True}}
+
+    def admin_get_user(self, UserPoolId, Username):
+        self._call('AdminGetUser')
+        with self._lock:
+            user = self.users.get(Username)
+            if not user:
+                raise self.exceptions.UserNotFoundException('User does not exist.', 'AdminGetUser')
+            return {'Username': Username, 'Enabled': True,
+                    'UserStatus': 'CONFIRMED' if user['confirmed'] else 'UNCONFIRMED',
+                    'UserAttributes': [{'Name': 'sub', 'Value': user['sub']}] +
+                                      [{'Name': k, 'Value': v} for k, v in user['attributes'].items()]}
+
+    def initiate_auth(self, ClientId, AuthFlow, AuthParameters):
+        self._call('InitiateAuth')
+        if AuthFlow == 'REFRESH_TOKEN_AUTH':
+            with self._lock:
+                username = self.refresh_tokens.get(AuthParameters.get('REFRESH_TOKEN'))
+                if username is None:
+                    raise self.exceptions.NotAuthorizedException('Invalid Refresh Token', 'InitiateAuth')
+                return {'AuthenticationResult': self._tokens(username, self.users[username])}
+        if AuthFlow != 'USER_PASSWORD_AUTH':
+            raise self.exceptions.InvalidParameterException(f'Unsupported auth flow {AuthFlow}', 'InitiateAuth')
+        with self._lock:
+            user = self.users.get(AuthParameters['USERNAME'])
+            if not user:
+                raise self.exceptions.UserNotFoundException('User does not exist.', 'InitiateAuth')
+            if user['password'] != AuthParameters['PASSWORD']:
+                raise self.exceptions.NotAuthorizedException('Incorrect username or password.', 'InitiateAuth')
+            if not user['confirmed']:
+                raise self.exceptions.NotAuthorizedException('User is not confirmed.', 'InitiateAuth')
+            refresh_token = uuid.uuid4().hex + uuid.uuid4().hex
+            self.refresh_tokens[refresh_token] = AuthParameters['USERNAME']
+        result = self._tokens(AuthParameters['USERNAME'], user)
+        result['RefreshToken'] = refresh_token
+        return {'AuthenticationResult': result}
+
+
+def hrms_table_schemas():
+    """Key schemas of the HRMS tables, mirroring backend/template.yaml."""
+    env = os.environ
+    return {
+        env.get('PROFILES_TABLE', 'HRMS_Profiles'): {
+            'hash': 'userId',
+            'indexes': {'DepartmentIndex': ('department', 'userId')},
+        },
+        env.get('LEAVES_TABLE', 'HRMS_Leaves'): {
+            'hash': 'userId', 'range': 'leaveId',
+            'indexes': {'ApprovalQueueIndex': ('pendingApproverId', 'queuedAt'),
+                        'LeaveTimelineIndex': ('userId', 'submittedAt'),
+                        'LeaveStartIndex': ('userId', 'startDate')},
+        },
+        env.get('FEEDBACK_TABLE', 'HRMS_Feedback'): {
+            'hash': 'userId', 'range': 'feedbackId',
+            'indexes': {'FeedbackTimelineIndex': ('userId', 'timestamp')},
+        },
+        env.get('DOCUMENTS_TABLE', 'HRMS_Documents'): {
+            'hash': 'userId', 'range': 'documentId',
+            'indexes': {'DocumentTimelineIndex': ('userId', 'uploadDate')},
+        },
+        env.get('ORG_CLOSURE_TABLE', 'HRMS_OrgClosure'): {
+            'hash': 'ancestorId', 'range': 'descendantKey',
+            'indexes': {'ChainIndex': ('descendantId', 'ancestorKey')},
+        },
+        env.get('IDEMPOTENCY_TABLE', 'HRMS_Idempotency'): {'hash': 'idempotencyKey'},
+        env.get('LEAVE_AGGREGATES_TABLE', 'HRMS_LeaveAggregates'): {'hash': 'pk', 'range': 'sk'},
+        env.get('ARCHIVE_TABLE', 'HRMS_Archive'): {'hash': 'userId'},
+        env.get('DOCUMENT_USAGE_TABLE', 'HRMS_DocumentUsage'): {'hash': 'userId'},
+        env.get('LEAVE_GUARDS_TABLE', 'HRMS_LeaveGuards'): {'hash': 'userId'},
+        env.get('MAIN_TABLE', 'HRMS_Main'): {
+            'hash': 'PK', 'range': 'SK',
+            'indexes': {'ApprovalQueueIndex': ('pendingApproverId', 'queuedAt'),
+                        'LeaveTimelineIndex': ('userId', 'submittedAt'),
+                        'FeedbackTimelineIndex': ('userId', 'timestamp'),
+                        'DocumentTimelineIndex': ('userId', 'uploadDate'),
+                        'LeaveStartIndex': ('userId', 'startDate'),
+                        'DepartmentIndex': ('department', 'userId')},
+        },
+    }
+
+
+def hrms_queue_configs():
+    """The job queue and its dead-letter queue, mirroring backend/template.yaml."""
+    env = os.environ
+    dead_letter_url = env.get('JOB_DLQ_URL', 'hrms-jobs-dlq')
+    return {
+        env.get('JOB_QUEUE_URL', 'hrms-jobs'): {'visibility_timeout': 60, 'dead_letter_url': dead_letter_url,
+                                                'max_receives': 5},
+        dead_letter_url: {'visibility_timeout': 60},
+    }
+
+
+def create_local_clients(latency_ms=None):
+    """Builds (cognito_client, dynamodb_client, s3_client) stand-ins with the HRMS tables created."""
+    if latency_ms is None:
+        latency_ms = float(os.environ.get('HRMS_LOCAL_LATENCY_MS', '0'))
+    # Local runs use a fixed pool/client unless configured, so issued tokens verify against them
+    region = os.environ.setdefault('AWS_REGION', 'us-east-1')
+    user_pool_id = os.environ.setdefault('COGNITO_USER_POOL_ID', f'{region}_local')
+    client_id = os.environ.setdefault('COGNITO_CLIENT_ID', 'local-client')
+    cognito = LocalCognito(latency_ms, region=region, user_pool_id=user_pool_id, client_id=client_id)
+    return cognito, LocalDynamoDB(hrms_table_schemas(), latency_ms), LocalS3(latency_ms)
+
+
+def create_local_queue_clients(latency_ms=None):
+    """Builds (sqs_client, ses_client) stand-ins with the HRMS queues created."""
+    if latency_ms is None:
+        latency_ms = float(os.environ.get('HRMS_LOCAL_LATENCY_MS', '0'))
+    return LocalSQS(hrms_queue_configs(), latency_ms), LocalSES(latency_ms)
@@ -0,0 +1,99 @@
+# memory_profile.py (Opt-in per-invocation memory sampling for the handlers)
+# Every handler entry point is wrapped in @sample_memory. With MEMORY_PROFILE_SAMPLE_RATE > 0
+# (e.g. 0.05, or 1 for every call) a sampled invocation runs under tracemalloc and logs one
+# line in CloudWatch Embedded Metric Format (namespace HRMS/Memory, dimension Function):
+#   PeakTracedKB  peak Python heap allocated during the invocation,
+#   RetainedKB    heap still held afterwards that was not held before (response, caches, leaks),
+#   MaxRssMB      the process's high-water RSS, comparable to Lambda's "Max Memory Used",
+#   DurationMs    wall time (tracing slows the call down, so read latency from unsampled calls),
+# plus topSites, the allocation sites ("file:line") holding most of the retained memory.
+# tracemalloc is process-wide, so only one invocation is traced at a time and tracing stops
+# again afterwards; unsampled invocations cost one random() call.
+# tools/rightsize_memory.py uses the same hook offline to recommend MemorySize per function.
+import functools
+import json
+import os
+import random
+import resource
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+
+MEMORY_PROFILE_SAMPLE_RATE = float(os.environ.get('MEMORY_PROFILE_SAMPLE_RATE', '0'))
+MEMORY_PROFILE_FRAMES = int(os.environ.get('MEMORY_PROFILE_FRAMES', '1')) # Traceback depth per allocation
+MEMORY_PROFILE_TOP_SITES = int(os.environ.get('MEMORY_PROFILE_TOP_SITES', '5'))
+MEMORY_PROFILE_EMIT = os.environ.get('MEMORY_PROFILE_EMIT', 'true').lower() not in ('0', 'false', 'no')
+
+samples = defaultdict(lambda: deque(maxlen=256)) # function name -> recent samples, for in-process readers
+_tracing_lock = threading.Lock()
+_IGNORED = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+def max_rss_mb():
+    """High-water resident set size of this process (ru_maxrss is in KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def _site(frame):
+    return f"{'/'.join(frame.filename.replace(os.sep, '/').split('/')[-2:])}:{frame.lineno}"
+
+def profile_invocation(name, handler, event, context):
+    """Runs one invocation under tracemalloc; returns (response, sample)."""
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(MEMORY_PROFILE_FRAMES)
+    before = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    try:
+        response = handler(event, context)
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        if started_tracing:
+            tracemalloc.stop()
+    top = [stat for stat in after.compare_to(before, 'lineno') if stat.size_diff > 0][:MEMORY_PROFILE_TOP_SITES]
+    sample = {
+        'Function': name,
+        'PeakTracedKB': round((peak - baseline) / 1024, 1),
+        'RetainedKB': round(max(0, current - baseline) / 1024, 1),
+        'MaxRssMB': round(max_rss_mb(), 1),
+        'DurationMs': round(duration_ms, 2),
+        'topSites': [{'site': _site(stat.traceback[0]), 'kb': round(stat.size_diff / 1024, 1)} for stat in top],
+    }
+    return response, sample
+
+def emit_sample(sample):
+    """Prints a sample in CloudWatch Embedded Metric Format."""
+    metrics = ('PeakTracedKB', 'RetainedKB', 'MaxRssMB', 'DurationMs')
+    units = {'PeakTracedKB': 'Kilobytes', 'RetainedKB': 'Kilobytes', 'MaxRssMB': 'Megabytes',
+             'DurationMs': 'Milliseconds'}
+    print(json.dumps(dict(sample, _aws={
+        'Timestamp': int(time.time() * 1000),
+        'CloudWatchMetrics': [{
+            'Namespace': 'HRMS/Memory',
+            'Dimensions': [['Function']],
+            'Metrics': [{'Name': metric, 'Unit': units[metric]} for metric in metrics]
+        }]
+    })))
+
+def sample_memory(handler):
+    """Decorator for handler entry points: samples MEMORY_PROFILE_SAMPLE_RATE of invocations."""
+    name = f'{handler.__module__}.{handler.__name__}'
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if MEMORY_PROFILE_SAMPLE_RATE <= 0 or random.random() >= MEMORY_PROFILE_SAMPLE_RATE:
+            return handler(event, context)
+        if not _tracing_lock.acquire(blocking=False): # Another invocation is being traced
+            return handler(event, context)
+        try:
+            response, sample = profile_invocation(name, handler, event, context)
+        finally:
+            _tracing_lock.release()
+        samples[name].append(sample)
+        if MEMORY_PROFILE_EMIT:
+            emit_sample(sample)
+        return response
+    return wrapper
@@ -0,0 +1,371 @@
+# org_manager.py
+# Reporting lines are kept in a closure table (HRMS_OrgClosure) with one row per
+# (ancestor, descendant) pair, including a depth-0 row for every employee itself:
+#   ancestorId (HASH) + descendantKey (RANGE, "<depth>#<descendantId>")
+#   ChainIndex GSI: descendantId (HASH) + ancestorKey (RANGE, "<depth>#<ancestorId>")
+# Zero-padded depth prefixes make "direct reports", "all reports" and "management chain"
+# single key-range queries, already ordered by depth.
+#
+# Moves are serialized on one guard item in the same table (ancestorId "#ORG", descendantKey
+# "#GUARD"). The depth-0 row of every employee also holds a managerId pointer, so a move reads
+# the chains it needs with consistent GetItems instead of the eventually consistent GSI, reads
+# the moved subtree with a consistent Query, and writes the diff in a TransactWriteItems that
+# bumps the guard version only if it is unchanged: of two concurrent moves one loses, re-reads
+# and re-checks for cycles. A diff too big for one transaction (100 items) is written in chunks:
+# the first claims the guard and records the move with a lease, every chunk checks the claim is
+# still held, and the last switches the pointer and releases it. A move left half-written (lease
+# expired) is finished by the next one, since re-planning it yields the same rows.
+import time
+from common_utils import (get_response, negotiated, error_response, get_user_id_from_event, dynamodb_client,
+                          encode_cursor, decode_cursor, is_hr, ORG_CLOSURE_TABLE)
+from memory_profile import sample_memory
+from profiling import profiled
+from warmup import handles_warmup
+
+DEPTH_WIDTH = 3 # Supports hierarchies up to 999 levels deep
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+FORBIDDEN_MESSAGE = 'Forbidden: outside your part of the organisation.'
+GUARD_KEY = {'ancestorId': {'S': '#ORG'}, 'descendantKey': {'S': '#GUARD'}}
+TRANSACTION_CHUNK_SIZE = 99 # TransactWriteItems limit, less the guard
+SET_MANAGER_ATTEMPTS = 5
+MOVE_LEASE_SECONDS = 60 # How long a move written in several transactions may hold the guard
+
+class OrgHierarchyError(ValueError):
+    """Raised when a manager change would create a reporting cycle."""
+
+class OrgGuardContentionError(Exception):
+    """Other reporting-line changes kept winning the org guard item."""
+
+def depth_key(depth, user_id):
+    """Sort key fragment ordering closure rows by depth, e.g. '002#<userId>'."""
+    return f"{depth:0{DEPTH_WIDTH}d}#{user_id}"
+
+def closure_item(ancestor_id, descendant_id, depth, manager_id=None):
+    """DynamoDB item for one closure row (depth-0 rows carry the employee's managerId, if any)."""
+    item = {
+        'ancestorId': {'S': ancestor_id},
+        'descendantKey': {'S': depth_key(depth, descendant_id)},
+        'descendantId': {'S': descendant_id},
+        'ancestorKey': {'S': depth_key(depth, ancestor_id)},
+        'depth': {'N': str(depth)}
+    }
+    if depth == 0 and manager_id:
+        item['managerId'] = {'S': manager_id}
+    return item
+
+def _query_all(**kwargs):
+    """Runs a paginated query to completion and returns every item."""
+    items = []
+    while True:
+        response = dynamodb_client.query(**kwargs)
+        items.extend(response.get('Items', []))
+        if not response.get('LastEvaluatedKey'):
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def get_ancestors(user_id):
+    """Returns [(ancestorId, depth), ...] for user_id, nearest first, including (user_id, 0) if present."""
+    items = _query_all(
+        TableName=ORG_CLOSURE_TABLE,
+        IndexName='ChainIndex',
+        KeyConditionExpression='descendantId = :uid',
+        ExpressionAttributeValues={':uid': {'S': user_id}},
+        ProjectionExpression='ancestorId, #d',
+        ExpressionAttributeNames={'#d': 'depth'}
+    )
+    return sorted(((i['ancestorId']['S'], int(i['depth']['N'])) for i in items), key=lambda row: row[1])
+
+def get_descendants(user_id, consistent=False):
+    """Returns [(descendantId, depth), ...] for the subtree rooted at user_id, including (user_id, 0) if present."""
+    items = _query_all(
+        TableName=ORG_CLOSURE_TABLE,
+        KeyConditionExpression='ancestorId = :uid',
+        ExpressionAttributeValues={':uid': {'S': user_id}},
+        ProjectionExpression='descendantId, #d',
+        ExpressionAttributeNames={'#d': 'depth'},
+        ConsistentRead=consistent
+    )
+    return [(i['descendantId']['S'], int(i['depth']['N'])) for i in items]
+
+def _self_row(user_id):
+    """The depth-0 closure row of user_id (consistent read), or None if they are not in the hierarchy."""
+    return dynamodb_client.get_item(TableName=ORG_CLOSURE_TABLE, ConsistentRead=True,
+                                    Key={'ancestorId': {'S': user_id},
+                                         'descendantKey': {'S': depth_key(0, user_id)}}).get('Item')
+
+def get_manager_id(user_id):
+    """Returns the direct manager of user_id (the pointer on their depth-0 row), or None."""
+    item = _self_row(user_id) or {}
+    return item.get('managerId', {}).get('S')
+
+def get_chain(user_id):
+    """[(ancestorId, depth), ...] of user_id from the managerId pointers (consistent reads), nearest
+    first and including (user_id, 0); [] if user_id is not in the hierarchy."""
+    item = _self_row(user_id)
+    chain = [(user_id, 0)] if item else []
+    while item and 'managerId' in item:
+        manager_id = item['managerId']['S']
+        if any(a == manager_id for a, _ in chain):
+            raise OrgHierarchyError(f'Reporting cycle found above {user_id}.')
+        chain.append((manager_id, len(chain)))
+        item = _self_row(manager_id)
+    return chain
+
+def is_above(manager_id, user_id):
+    """Whether manager_id is somewhere in user_id's management chain."""
+    return bool(_query_all(
+        TableName=ORG_CLOSURE_TABLE,
+        IndexName='ChainIndex',
+        KeyConditionExpression='descendantId = :uid AND ancestorKey >= :first',
+        FilterExpression='ancestorId = :mid',
+        ExpressionAttributeValues={':uid': {'S': user_id}, ':first': {'S': depth_key(1, '')},
+                                   ':mid': {'S': manager_id}},
+        ProjectionExpression='ancestorId'
+    ))
+
+def has_reports(user_id):
+    """Whether anyone reports directly to user_id."""
+    return bool(dynamodb_client.query(
+        TableName=ORG_CLOSURE_TABLE,
+        KeyConditionExpression='ancestorId = :uid AND begins_with(descendantKey, :prefix)',
+        ExpressionAttributeValues={':uid': {'S': user_id}, ':prefix': {'S': depth_key(1, '')}},
+        ProjectionExpression='descendantId',
+        Limit=1
+    ).get('Items'))
+
+def _plan_move(user_id, manager_id):
+    """The transaction items moving user_id (and everyone under them) beneath manager_id, the
+    managerId pointer switch last; [] if user_id already reports to manager_id.
+
+    Only the rows that actually change are written: the old ancestors x subtree rows are
+    diffed against the new ancestors x subtree rows, so the cost is proportional to the
+    moved subtree, never to the size of the organisation.
+    """
+    chain = get_chain(user_id)
+    current_manager = chain[1][0] if len(chain) > 1 else None
+    if chain and current_manager == (manager_id or None):
+        return [] # Nothing to do
+
+    subtree = get_descendants(user_id, consistent=True) or [(user_id, 0)]
+    new_chain, manager_chain = [], []
+    if manager_id:
+        if any(descendant == manager_id for descendant, _ in subtree):
+            raise OrgHierarchyError('Manager change would create a reporting cycle.')
+        manager_chain = get_chain(manager_id)
+        new_chain = manager_chain or [(manager_id, 0)]
+
+    # Pairs above the moved subtree (depth 0 rows inside the subtree never change)
+    old_rows = {(a, d, da + dd) for a, da in chain if da > 0 for d, dd in subtree}
+    new_rows = {(m, d, dm + 1 + dd) for m, dm in new_chain for d, dd in subtree}
+    items = [{'Delete': {'TableName': ORG_CLOSURE_TABLE,
+                         'Key': {'ancestorId': {'S': a}, 'descendantKey': {'S': depth_key(depth, d)}}}}
+             for a, d, depth in sorted(old_rows - new_rows)]
+    items += [{'Put': {'TableName': ORG_CLOSURE_TABLE, 'Item': closure_item(a, d, depth)}}
+              for a, d, depth in sorted(new_rows - old_rows)]
+    if manager_id and not manager_chain:
+        items.append({'Put': {'TableName': ORG_CLOSURE_TABLE, # Manager not yet in the hierarchy
+                              'Item': closure_item(manager_id, manager_id, 0)}})
+    if not chain: # First time this employee enters the hierarchy
+        items.append({'Put': {'TableName': ORG_CLOSURE_TABLE, 'Item': closure_item(user_id, user_id, 0, manager_id)}})
+    elif manager_id:
+        items.append({'Update': {'TableName': ORG_CLOSURE_TABLE,
+                                 'Key': {'ancestorId': {'S': user_id}, 'descendantKey': {'S': depth_key(0, user_id)}},
+                                 'UpdateExpression': 'SET managerId = :mid',
+                                 'ExpressionAttributeValues': {':mid': {'S': manager_id}}}})
+    else:
+        items.append({'Update': {'TableName': ORG_CLOSURE_TABLE,
+                                 'Key': {'ancestorId': {'S': user_id}, 'descendantKey': {'S': depth_key(0, user_id)}},
+                                 'UpdateExpression': 'REMOVE managerId'}})
+    return items
+
+def _read_guard():
+    """(version or None, pending move as stored or None, lease expiry) of the org guard item."""
+    item = dynamodb_client.get_item(TableName=ORG_CLOSURE_TABLE, Key=GUARD_KEY, ConsistentRead=True).get('Item') or {}
+    version = int(item['version']['N']) if 'version' in item else None
+    return version, item.get('pendingMove', {}).get('M'), float(item.get('leaseExpiresAt', {}).get('N', '0'))
+
+def _write_move(user_id, manager_id, items, version):
+    """Writes a planned move, claiming the guard at version; False if another move claimed it first.
+
+    Raises OrgGuardContentionError if the claim on a move written in several transactions was
+    taken over (lease expired) part way; whoever took it over finishes the move.
+    """
+    claimed = (version or 0) + 1
+    chunks = [items[i:i + TRANSACTION_CHUNK_SIZE] for i in range(0, len(items), TRANSACTION_CHUNK_SIZE)] or [[]]
+    for n, chunk in enumerate(chunks):
+        first, last = n == 0, n == len(chunks) - 1
+        guard = {'TableName': ORG_CLOSURE_TABLE, 'Key': GUARD_KEY, 'ExpressionAttributeValues': {}}
+        if first and version is None:
+            guard['ConditionExpression'] = 'attribute_not_exists(version)'
+        else:
+            guard['ConditionExpression'] = 'version = :seen'
+            guard['ExpressionAttributeValues'][':seen'] = {'N': str(version if first else claimed)}
+        if first:
+            guard['ExpressionAttributeValues'][':next'] = {'N': str(claimed)}
+            if last:
+                guard['UpdateExpression'] = 'SET version = :next REMOVE pendingMove, leaseExpiresAt'
+            else: # Record the move, so it can be finished if this writer dies part way
+                move = {'userId': {'S': user_id}}
+                if manager_id:
+                    move['managerId'] = {'S': manager_id}
+                guard['UpdateExpression'] = 'SET version = :next, pendingMove = :move, leaseExpiresAt = :until'
+                guard['ExpressionAttributeValues'][':move'] = {'M': move}
+                guard['ExpressionAttributeValues'][':until'] = {'N': str(int(time.time()) + MOVE_LEASE_SECONDS)}
+            action = 'Update'
+        elif last:
+            guard['UpdateExpression'] = 'REMOVE pendingMove, leaseExpiresAt'
+            action = 'Update'
+        else:
+            action = 'ConditionCheck'
+        try:
+            dynamodb_client.transact_write_items(TransactItems=[{action: guard}] + chunk)
+        except dynamodb_client.exceptions.TransactionCanceledException as e:
+            reasons = e.response.get('CancellationReasons', [])
+            if reasons and reasons[0].get('Code') in ('ConditionalCheckFailed', 'TransactionConflict'):
+                if first:
+                    return False # Another move got in first: re-read and plan again
+                raise OrgGuardContentionError()
+            raise
+    return True
+
+def set_manager(user_id, manager_id):
+    """Moves user_id (and everyone under them) beneath manager_id, or makes them a root if manager_id is falsy.
+
+    Raises OrgHierarchyError for a cycle, or OrgGuardContentionError when other moves kept
+    changing the hierarchy under this one.
+    Returns the number of closure rows written, updated or deleted.
+    """
+    if manager_id == user_id:
+        raise OrgHierarchyError('An employee cannot be their own manager.')
+
+    for attempt in range(SET_MANAGER_ATTEMPTS):
+        version, pending, lease_expires_at = _read_guard()
+        if pending:
+            if lease_expires_at > time.time():
+                time.sleep(0.05 * (attempt + 1)) # A move written in several transactions is under way
+                continue
+            pending_user, pending_manager = pending['userId']['S'], pending.get('managerId', {}).get('S')
+            print(f"Finishing the interrupted move of {pending_user} under {pending_manager}")
+            _write_move(pending_user, pending_manager, _plan_move(pending_user, pending_manager), version)
+            continue
+        items = _plan_move(user_id, manager_id)
+        if not items:
+            return 0
+        if _write_move(user_id, manager_id, items, version):
+            return len(items)
+    raise OrgGuardContentionError()
+
+def _paged_closure_query(event, key_condition, values, index_name=None):
+    """Runs one page of a closure query using the limit/nextToken query string parameters.
+
+    Raises ValueError (a 400 in the handlers) for a limit that isn't a whole number of at least 1.
+    """
+    params = event.get('queryStringParameters') or {}
+    limit = str(params.get('limit', DEFAULT_PAGE_SIZE)).strip()
+    if not limit.isdigit() or int(limit) < 1:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}.')
+    query_args = {
+        'TableName': ORG_CLOSURE_TABLE,
+        'KeyConditionExpression': key_condition,
+        'ExpressionAttributeValues': values,
+        'Limit': min(int(limit), MAX_PAGE_SIZE)
+    }
+    if index_name:
+        query_args['IndexName'] = index_name
+    start_key = decode_cursor(params.get('nextToken'))
+    if start_key:
+        query_args['ExclusiveStartKey'] = start_key
+    response = dynamodb_client.query(**query_args)
+    return response.get('Items', []), encode_cursor(response.get('LastEvaluatedKey'))
+
+def _target_user(event, caller_id):
+    """The employee a hierarchy query is about: ?managerId / ?employeeId, defaulting to the caller."""
+    params = event.get('queryStringParameters') or {}
+    return params.get('managerId') or params.get('employeeId') or caller_id
+
+def can_view(event, caller_id, user_id):
+    """Callers see their own part of the org (themselves and everyone below them); HR sees all of it."""
+    return user_id == caller_id or is_hr(event) or is_above(caller_id, user_id)
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+def get_direct_reports(event, context):
+    """Lambda function to list the employees reporting directly to a manager."""
+    caller_id = get_user_id_from_event(event)
+    if not caller_id:
+        return get_response(401, {'message': 'Unauthorized: User ID missing.'})
+    manager_id = _target_user(event, caller_id)
+
+    try:
+        if not can_view(event, caller_id, manager_id):
+            return get_response(403, {'message': FORBIDDEN_MESSAGE})
+        items, next_token = _paged_closure_query(
+            event,
+            'ancestorId = :mid AND begins_with(descendantKey, :prefix)',
+            {':mid': {'S': manager_id}, ':prefix': {'S': depth_key(1, '')}}
+        )
+        reports = [i['descendantId']['S'] for i in items]
+        return get_response(200, {'managerId': manager_id, 'directReports': reports, 'nextToken': next_token})
+    except ValueError as e:
+        return get_response(400, {'message': str(e)})
+    except Exception as e:
+        print(f"Error getting direct reports for {manager_id}: {e}")
+        return error_response(e)
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+def get_all_reports(event, context):
+    """Lambda function to list everyone under a manager at any depth (nearest levels first)."""
+    caller_id = get_user_id_from_event(event)
+    if not caller_id:
+        return get_response(401, {'message': 'Unauthorized: User ID missing.'})
+    manager_id = _target_user(event, caller_id)
+
+    try:
+        if not can_view(event, caller_id, manager_id):
+            return get_response(403, {'message': FORBIDDEN_MESSAGE})
+        items, next_token = _paged_closure_query(
+            event,
+            'ancestorId = :mid AND descendantKey >= :first',
+            {':mid': {'S': manager_id}, ':first': {'S': depth_key(1, '')}}
+        )
+        reports = [{'userId': i['descendantId']['S'], 'depth': int(i['depth']['N'])} for i in items]
+        return get_response(200, {'managerId': manager_id, 'reports': reports, 'nextToken': next_token})
+    except ValueError as e:
+        return get_response(400, {'message': str(e)})
+    except Exception as e:
+        print(f"Error getting all reports for {manager_id}: {e}")
+        return error_response(e)
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+def get_management_chain(event, context):
+    """Lambda function to list an employee's managers, from the direct manager up to the top."""
+    caller_id = get_user_id_from_event(event)
+    if not caller_id:
+        return get_response(401, {'message': 'Unauthorized: User ID missing.'})
+    user_id = _target_user(event, caller_id)
+
+    try:
+        if not can_view(event, caller_id, user_id):
+            return get_response(403, {'message': FORBIDDEN_MESSAGE})
+        items, next_token = _paged_closure_query(
+            event,
+            'descendantId = :uid AND ancestorKey >= :first',
+            {':uid': {'S': user_id}, ':first': {'S': depth_key(1, '')}},
+            index_name='ChainIndex'
+        )
+        chain = [{'userId': i['ancestorId']['S'], 'depth': int(i['depth']['N'])} for i in items]
+        return get_response(200, {'employeeId': user_id, 'chain': chain, 'nextToken': next_token})
+    except ValueError as e:
+        return get_response(400, {'message': str(e)})
+    except Exception as e:
+        print(f"Error getting management chain for {user_id}: {e}")
+        return error_response(e)
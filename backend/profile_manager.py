@@ -1,7 +1,17 @@
 # profile_manager.py
 import json
-from common_utils import get_response, get_user_id_from_event, dynamodb_client, PROFILES_TABLE
+from common_utils import (get_response, negotiated, error_response, get_user_id_from_event, update_entity,
+                          get_user_record, load_profile, load_profiles, profile_cache, is_hr)
+from org_manager import set_manager, get_manager_id, get_descendants, OrgHierarchyError, OrgGuardContentionError
+from audit import audited
+from memory_profile import sample_memory
+from profiling import profiled
+from warmup import handles_warmup
 
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
 def get_profile(event, context):
     """Lambda function to retrieve user profile."""
     user_id = get_user_id_from_event(event)
@@ -9,11 +19,7 @@ def get_profile(event, context):
         return get_response(401, {'message': 'Unauthorized: User ID missing.'})
 
     try:
-        response = dynamodb_client.get_item(
-            TableName=PROFILES_TABLE,
-            Key={'userId': {'S': user_id}}
-        )
-        item = response.get('Item')
+        item = load_profile(user_id)
         if item:
             # DynamoDB returns item with type descriptors (e.g., {'S': 'value'})
             profile_data = {k: v['S'] for k, v in item.items()} # Simple conversion for string attributes
@@ -22,8 +28,13 @@ def get_profile(event, context):
             return get_response(200, {'profile': {}, 'message': 'Profile not found.'}) # Return empty profile
     except Exception as e:
         print(f"Error getting profile for {user_id}: {e}")
-        return get_response(500, {'message': f'Internal server error: {str(e)}'})
+        return error_response(e)
 
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+@audited('profile.update')
 def update_profile(event, context):
     """Lambda function to update user profile."""
     user_id = get_user_id_from_event(event) # Assumes userId is in event body or authorizer
@@ -41,19 +52,162 @@ def update_profile(event, context):
         if not all([emp_id, name, email, department]):
             return get_response(400, {'message': 'Missing required profile fields.'})
 
-        # Update item in DynamoDB
-        dynamodb_client.put_item(
-            TableName=PROFILES_TABLE,
-            Item={
-                'userId': {'S': user_id},
-                'empId': {'S': emp_id},
-                'name': {'S': name},
-                'email': {'S': email},
-                'department': {'S': department}
-            }
+        # managerId is optional: omit it to keep the current manager, send null/"" to clear it.
+        # Leave approvals follow reporting lines, so only HR may change them.
+        update_expression = 'SET empId = :emp, #n = :name, email = :email, department = :dept'
+        values = {
+            ':emp': {'S': emp_id},
+            ':name': {'S': name},
+            ':email': {'S': email},
+            ':dept': {'S': department}
+        }
+        if 'managerId' in body and (body.get('managerId') or None) == get_manager_id(user_id):
+            del body['managerId'] # Unchanged
+        if 'managerId' in body:
+            if not is_hr(event):
+                return get_response(403, {'message': 'Forbidden: only HR can change reporting lines.'})
+            manager_id = body.get('managerId') or None
+            # Keep the org closure table in step before recording the new manager on the profile
+            set_manager(user_id, manager_id)
+            if manager_id:
+                update_expression += ', managerId = :mgr'
+                values[':mgr'] = {'S': manager_id}
+            else:
+                update_expression += ' REMOVE managerId'
+
+        # Update item in DynamoDB (update_item keeps attributes not sent in this request)
+        update_entity(
+            'profile', user_id,
+            UpdateExpression=update_expression,
+            ExpressionAttributeNames={'#n': 'name'}, # 'name' is a DynamoDB reserved word
+            ExpressionAttributeValues=values
         )
+        profile_cache.pop(user_id)
         return get_response(200, {'message': 'Profile updated successfully.'})
 
+    except OrgHierarchyError as e:
+        return get_response(400, {'message': str(e)})
+    except OrgGuardContentionError:
+        return get_response(503, {'message': 'Other reporting lines are being changed; please retry.'},
+                            headers={'Retry-After': '1'})
     except Exception as e:
         print(f"Error updating profile for {user_id}: {e}")
-        return get_response(500, {'message': f'Internal server error: {str(e)}'})
\ No newline at end of file
+        return error_response(e)
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+@audited('profile.set_manager', target=lambda request, response: response['employeeId'])
+def set_employee_manager(event, context):
+    """Lambda function for HR to change an employee's manager.
+
+    Body: {"employeeId": "...", "managerId": "..."} (null/"" makes the employee a root of the org).
+    """
+    caller_id = get_user_id_from_event(event)
+    if not caller_id:
+        return get_response(401, {'message': 'Unauthorized: User ID missing.'})
+    if not is_hr(event):
+        return get_response(403, {'message': 'Forbidden: only HR can change reporting lines.'})
+
+    try:
+        body = json.loads(event.get('body') or '{}')
+        if not isinstance(body, dict):
+            return get_response(400, {'message': 'Invalid request body: expected a JSON object.'})
+        employee_id = body.get('employeeId')
+        if not employee_id or 'managerId' not in body:
+            return get_response(400, {'message': 'employeeId and managerId are required.'})
+        manager_id = body.get('managerId') or None
+        if not load_profile(employee_id):
+            return get_response(404, {'message': 'Profile not found.'})
+
+        set_manager(employee_id, manager_id)
+        if manager_id:
+            update_entity('profile', employee_id, UpdateExpression='SET managerId = :mgr',
+                          ExpressionAttributeValues={':mgr': {'S': manager_id}})
+        else:
+            update_entity('profile', employee_id, UpdateExpression='REMOVE managerId')
+        profile_cache.pop(employee_id)
+        return get_response(200, {'message': 'Manager updated successfully.', 'employeeId': employee_id,
+                                  'managerId': manager_id})
+
+    except OrgHierarchyError as e:
+        return get_response(400, {'message': str(e)})
+    except OrgGuardContentionError:
+        return get_response(503, {'message': 'Other reporting lines are being changed; please retry.'},
+                            headers={'Retry-After': '1'})
+    except ValueError as e:
+        return get_response(400, {'message': f'Invalid request body: {e}'})
+    except Exception as e:
+        print(f"Error setting a manager for {caller_id}: {e}")
+        return error_response(e)
+
+def _plain(item):
+    """Converts a DynamoDB item's string and number attributes to plain JSON values."""
+    return {k: v['S'] if 'S' in v else (int(v['N']) if v['N'].lstrip('-').isdigit() else float(v['N']))
+            for k, v in item.items() if 'S' in v or 'N' in v}
+
+MAX_BATCH_PROFILES = 500
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+def get_profiles_batch(event, context):
+    """Lambda function to look up many users' profiles at once (e.g. names next to a team's leaves).
+
+    Body: {"userIds": ["...", ...]} (duplicates are ignored, at most MAX_BATCH_PROFILES distinct ids).
+    HR can read anyone; everyone else only themselves and the people below them. Ids the caller may
+    not see are reported under "missing" like unknown ones, so the response doesn't reveal who exists.
+    """
+    caller_id = get_user_id_from_event(event)
+    if not caller_id:
+        return get_response(401, {'message': 'Unauthorized: User ID missing.'})
+
+    try:
+        body = json.loads(event.get('body') or '{}')
+        user_ids = body.get('userIds')
+        if not isinstance(user_ids, list) or not all(isinstance(u, str) and u for u in user_ids):
+            return get_response(400, {'message': 'userIds must be a list of user IDs.'})
+        user_ids = list(dict.fromkeys(user_ids))
+        if len(user_ids) > MAX_BATCH_PROFILES:
+            return get_response(400, {'message': f'At most {MAX_BATCH_PROFILES} userIds per request.'})
+
+        if is_hr(event):
+            visible = user_ids
+        else:
+            subtree = {d for d, _ in get_descendants(caller_id)} | {caller_id}
+            visible = [u for u in user_ids if u in subtree]
+        profiles = load_profiles(visible)
+        return get_response(200, {
+            'profiles': {u: _plain(profiles[u]) for u in user_ids if u in profiles},
+            'missing': [u for u in user_ids if u not in profiles]
+        })
+    except ValueError as e:
+        return get_response(400, {'message': f'Invalid request body: {e}'})
+    except Exception as e:
+        print(f"Error getting profiles for {caller_id}: {e}")
+        return error_response(e)
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+def get_full_record(event, context):
+    """Lambda function to return a user's profile, leaves, feedback and documents in one response."""
+    user_id = get_user_id_from_event(event)
+    if not user_id:
+        return get_response(401, {'message': 'Unauthorized: User ID missing.'})
+
+    try:
+        # One Query in the single-table layout; a GetItem and three Queries otherwise
+        record = get_user_record(user_id)
+        return get_response(200, {
+            'profile': _plain(record['profile']) if record['profile'] else {},
+            'leaves': [_plain(item) for item in record['leave']],
+            'feedback': [_plain(item) for item in record['feedback']],
+            'documents': [_plain(item) for item in record['document']]
+        })
+    except Exception as e:
+        print(f"Error getting full record for {user_id}: {e}")
+        return error_response(e)
@@ -0,0 +1,193 @@
+# profiling.py (Opt-in CPU profiles of sampled and slow invocations)
+# Every handler entry point is wrapped in @profiled. Off by default; two triggers, either or both:
+#   PROFILE_SAMPLE_RATE  fraction of invocations to profile (e.g. 0.01),
+#   PROFILE_SLOW_MS      keep the profile of any invocation that took at least this long.
+# A slow call is only known to be slow at the end, so while PROFILE_SLOW_MS is set every
+# invocation is watched by a statistical stack sampler: one background thread reads the stack of
+# each thread running a handler (sys._current_frames) every PROFILE_INTERVAL_MS and counts the
+# collapsed stacks; the counts are kept if the call was slow and dropped otherwise. The thread
+# ticks on its own (never woken by an invocation, which would cost a GIL handoff per call), so
+# an invocation only adds and removes its thread's entry; calls shorter than the interval are
+# rarely sampled at all. Lambda freezes the thread with the container between invocations.
+# Sampled invocations use the same sampler, or run under cProfile with PROFILE_MODE=cprofile
+# (exact call counts and times, but it slows the call down and only one runs at a time).
+# Threads a handler starts itself (e.g. the coverage query pool) are not sampled.
+#
+# A capture is one gzip-compressed JSON object, in PROFILE_DIR on local disk when set, else in
+# S3 (PROFILE_BUCKET, default the private INTERNAL_BUCKET_NAME), keyed by route and request id:
+#   profiles/route=GET_documents/date=2026-10-19/20261019T140512Z-<requestId>.json.gz
+# {"route", "function", "requestId", "startedAt", "durationMs", "trigger": "sampled" | "slow",
+#  "mode": "stack" | "cprofile", "intervalMs", "stacks": {"a.py:f;b.py:g": samples} or
+#  "pstats": base64 of the marshalled cProfile stats}.
+# At most PROFILE_MAX_PER_MINUTE captures are stored per container, so a slow dependency
+# doesn't turn every request into an upload. tools/collapse_profiles.py folds stored captures
+# into flame-graph-ready collapsed stacks per route.
+import base64
+import cProfile
+import functools
+import gzip
+import json
+import marshal
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timezone
+from common_utils import s3_client, INTERNAL_BUCKET_NAME
+
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', '0')) # 0 disables the latency trigger
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'stack') # How sampled invocations are profiled: stack | cprofile
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '5'))
+PROFILE_MAX_PER_MINUTE = int(os.environ.get('PROFILE_MAX_PER_MINUTE', '10'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '') # Local directory for captures; S3 when empty
+PROFILE_BUCKET = os.environ.get('PROFILE_BUCKET', INTERNAL_BUCKET_NAME) # Private; never the documents bucket
+PROFILE_PREFIX = os.environ.get('PROFILE_PREFIX', 'profiles/')
+MAX_STACK_DEPTH = 128
+if (PROFILE_SAMPLE_RATE > 0 or PROFILE_SLOW_MS > 0) and not (PROFILE_DIR or PROFILE_BUCKET):
+    raise RuntimeError('Profiling is on but PROFILE_DIR, PROFILE_BUCKET and INTERNAL_BUCKET_NAME are all unset.')
+
+def frame_name(filename, function):
+    """How a frame appears in collapsed stacks: "<file name>:<function>" (no ';', the frame separator)."""
+    return f"{os.path.basename(filename) or filename}:{function}".replace(';', ':')
+
+def route_of(event, function):
+    """"GET /documents" for API events (the resource path, not the request path), else the function name."""
+    if isinstance(event, dict) and event.get('httpMethod') and event.get('resource'):
+        return f"{event['httpMethod']} {event['resource']}"
+    return function
+
+def route_slug(route):
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', route).strip('_') or 'unknown'
+
+def object_key(prefix, route, started_at, request_id):
+    t = datetime.fromtimestamp(started_at, timezone.utc)
+    return f'{prefix}route={route_slug(route)}/date={t:%Y-%m-%d}/{t:%Y%m%dT%H%M%SZ}-{route_slug(request_id)}.json.gz'
+
+class StackSampler:
+    """Counts the collapsed stacks of the threads running a profiled handler, every interval seconds."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._active = {} # thread id -> Counter of stacks
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def begin(self):
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+
+    def end(self):
+        """Stops sampling the calling thread; returns its stack counts."""
+        with self._lock:
+            return self._active.pop(threading.get_ident(), Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                threads = list(self._active)
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            stacks = [(thread_id, _collapse(frames.get(thread_id))) for thread_id in threads]
+            with self._lock:
+                for thread_id, stack in stacks:
+                    if stack and thread_id in self._active: # Not ended since
+                        self._active[thread_id][stack] += 1
+
+def _collapse(frame):
+    """Root-first "frame;frame;..." of a stack, from the handler down (the profiler's frames left out)."""
+    names = []
+    while frame is not None and frame.f_code is not _WRAPPER_CODE and len(names) < MAX_STACK_DEPTH:
+        names.append(frame_name(frame.f_code.co_filename, frame.f_code.co_name))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+sampler = StackSampler(PROFILE_INTERVAL_MS / 1000.0)
+_cprofile_lock = threading.Lock() # One cProfile at a time (Python 3.12+ allows only one profiler)
+_invocation = threading.local() # Set while this thread runs a profiled handler (nested handlers are not profiled)
+_stored, _stored_lock = deque(), threading.Lock() # When the captures of the last minute were stored
+
+def store_capture(capture):
+    """Writes a capture (gzip JSON) to PROFILE_DIR or S3; returns where, or None if not stored."""
+    now = time.time()
+    with _stored_lock:
+        while _stored and now - _stored[0] > 60:
+            _stored.popleft()
+        if len(_stored) >= PROFILE_MAX_PER_MINUTE:
+            return None
+        _stored.append(now)
+    key = object_key(PROFILE_PREFIX, capture['route'], capture['startedAt'], capture['requestId'])
+    body = gzip.compress(json.dumps(capture, separators=(',', ':')).encode('utf-8'))
+    try:
+        if PROFILE_DIR:
+            path = os.path.join(PROFILE_DIR, *key.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(body)
+            return path
+        s3_client.put_object(Bucket=PROFILE_BUCKET, Key=key, Body=body, ContentType='application/json',
+                             ContentEncoding='gzip', Metadata={'route': capture['route'],
+                                                               'request-id': capture['requestId']})
+        return f's3://{PROFILE_BUCKET}/{key}'
+    except Exception as e:
+        print(f"Could not store the profile of {capture['route']} ({capture['requestId']}): {e}")
+        return None
+
+def _request_id(event, context):
+    request_context = (event.get('requestContext') or {}) if isinstance(event, dict) else {}
+    return getattr(context, 'aws_request_id', None) or request_context.get('requestId') or str(uuid.uuid4())
+
+def profiled(handler):
+    """Decorator for handler entry points: profiles sampled invocations and keeps the profiles of slow ones."""
+    name = f'{handler.__module__}.{handler.__name__}'
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        sampled = PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+        if not (sampled or PROFILE_SLOW_MS > 0) or getattr(_invocation, 'active', False):
+            return handler(event, context)
+        profiler = None
+        if sampled and PROFILE_MODE == 'cprofile' and _cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+        _invocation.active = True
+        started_at, started = time.time(), time.perf_counter()
+        if profiler:
+            profiler.enable()
+        else:
+            sampler.begin()
+        try:
+            return handler(event, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            if profiler:
+                profiler.disable()
+                _cprofile_lock.release()
+            else:
+                stacks = sampler.end()
+            _invocation.active = False
+            slow = PROFILE_SLOW_MS > 0 and duration_ms >= PROFILE_SLOW_MS
+            if sampled or slow:
+                capture = {'route': route_of(event, name), 'function': name, 'requestId': _request_id(event, context),
+                           'startedAt': started_at, 'durationMs': round(duration_ms, 2),
+                           'trigger': 'slow' if slow else 'sampled', 'mode': 'cprofile' if profiler else 'stack',
+                           'intervalMs': PROFILE_INTERVAL_MS}
+                if profiler:
+                    profiler.create_stats()
+                    capture['pstats'] = base64.b64encode(marshal.dumps(profiler.stats)).decode('ascii')
+                else:
+                    capture['stacks'] = dict(stacks)
+                where = store_capture(capture)
+                if where:
+                    print(f"Profiled {capture['route']} ({capture['trigger']}, {capture['durationMs']} ms): {where}")
+    return wrapper
+
+_WRAPPER_CODE = profiled(lambda event, context: None).__code__ # Where collapsed stacks stop
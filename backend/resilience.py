@@ -0,0 +1,312 @@
+# resilience.py (Client-side throttling, retries and circuit breaking for AWS calls)
+# common_utils wraps each AWS client in a ResilientClient, so every DynamoDB / Cognito / S3 / SQS / SES
+# call made by the handlers goes through:
+#   1. an adaptive token bucket (per dependency) that slows down when AWS throttles us,
+#   2. a circuit breaker that fails fast once a dependency keeps failing,
+#   3. retries with exponential backoff and full jitter, capped by a retry budget so
+#      retries can never multiply load during an outage.
+# botocore's own retries are disabled in common_utils so the two layers don't stack.
+import json
+import os
+import random
+import threading
+import time
+
+# Error codes worth retrying: throttling and transient server-side failures.
+THROTTLING_CODES = {
+    'ProvisionedThroughputExceededException', 'ThrottlingException', 'Throttling', 'RequestLimitExceeded',
+    'TooManyRequestsException', 'SlowDown', 'RequestThrottled', 'RequestThrottledException',
+}
+TRANSIENT_CODES = {
+    'InternalServerError', 'InternalFailure', 'InternalErrorException', 'ServiceUnavailable',
+    'ServiceUnavailableException', 'TransactionInProgressException', 'RequestTimeout', 'RequestTimeoutException',
+}
+
+# Per-dependency defaults: steady requests/second and burst for the client-side token bucket.
+DEPENDENCY_LIMITS = {
+    'dynamodb': {'rate': 1000.0, 'burst': 1000.0},
+    'cognito': {'rate': 25.0, 'burst': 50.0},
+    's3': {'rate': 500.0, 'burst': 500.0},
+    'sqs': {'rate': 1000.0, 'burst': 1000.0},
+    'ses': {'rate': 14.0, 'burst': 14.0}, # SES's default production sending rate
+}
+MAX_ATTEMPTS = int(os.environ.get('RESILIENCE_MAX_ATTEMPTS', '4'))
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_CAP_SECONDS = 2.0
+MAX_QUEUE_WAIT_SECONDS = 1.0 # Longest a call may wait for a rate-limit token before failing fast
+BREAKER_FAILURE_THRESHOLD = 5 # Consecutive failed calls before the breaker opens
+BREAKER_RESET_SECONDS = 10.0
+RETRY_BUDGET_RATIO = 0.2 # Each call earns 0.2 retries...
+RETRY_BUDGET_MAX = 10.0 # ...up to this many banked retries
+METRICS_INTERVAL_SECONDS = 60.0
+
+class DependencyUnavailableError(Exception):
+    """Raised instead of calling a dependency that is throttling us or whose breaker is open."""
+
+    def __init__(self, dependency, message, retry_after=1, cause=None):
+        super().__init__(message)
+        self.dependency = dependency
+        self.retry_after = max(1, int(round(retry_after)))
+        self.cause = cause
+
+def error_code(error):
+    """The AWS error code of a botocore ClientError (or local stand-in error), else None."""
+    response = getattr(error, 'response', None)
+    if isinstance(response, dict):
+        return (response.get('Error') or {}).get('Code')
+    return None
+
+def is_retryable(error):
+    code = error_code(error)
+    if code is None:
+        # Connection resets, read timeouts and similar transport errors from botocore/urllib3
+        return type(error).__name__ in ('EndpointConnectionError', 'ConnectionClosedError', 'ReadTimeoutError',
+                                        'ConnectTimeoutError', 'ConnectionError', 'TimeoutError')
+    return code in THROTTLING_CODES or code in TRANSIENT_CODES
+
+class AdaptiveTokenBucket:
+    """Token bucket whose refill rate halves on throttling and creeps back up on success (AIMD)."""
+
+    def __init__(self, rate, burst, min_rate=1.0):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, max_wait):
+        """Takes one token, sleeping up to max_wait seconds for it; returns False if it would take longer."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            if wait > max_wait:
+                return False
+            self.tokens -= 1 # May go negative: the debt is repaid by the sleep below
+        if wait:
+            time.sleep(wait)
+        return True
+
+    def configure(self, rate, burst=None):
+        """Sets a new ceiling (e.g. a bulk job sized to a service quota); the current rate restarts there."""
+        with self.lock:
+            self.max_rate = self.rate = rate
+            self.min_rate = min(self.min_rate, rate)
+            self.burst = self.tokens = burst or rate
+
+    def on_throttle(self):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate * 0.5)
+
+    def on_success(self):
+        if self.rate < self.max_rate:
+            with self.lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.01)
+
+class RetryBudget:
+    """Caps retries to a fraction of recent calls so retry storms can't amplify an outage."""
+
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, maximum=RETRY_BUDGET_MAX):
+        self.ratio = ratio
+        self.maximum = maximum
+        self.balance = maximum
+        self.lock = threading.Lock()
+
+    def deposit(self):
+        with self.lock:
+            self.balance = min(self.maximum, self.balance + self.ratio)
+
+    def withdraw(self):
+        with self.lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open trial after a cool-down -> closed on success."""
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def retry_after(self):
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def allow(self):
+        """Returns True if a call may proceed; in half-open state only one trial call is let through."""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.retry_after() > 0:
+                return False
+            if self.trial_in_flight:
+                return False
+            self.state = self.HALF_OPEN
+            self.trial_in_flight = True
+            return True
+
+    def release_trial(self):
+        """Lets another half-open trial through when the one allowed never reached the dependency."""
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self.lock:
+            changed = self.state != self.CLOSED
+            self.state, self.failures, self.trial_in_flight = self.CLOSED, 0, False
+            return changed
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                changed = self.state != self.OPEN
+                self.state, self.opened_at = self.OPEN, time.monotonic()
+                return changed
+            return False
+
+class Dependency:
+    """Rate limiter, retry budget, breaker and counters for one downstream service."""
+    STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+    COUNTERS = ('calls', 'successes', 'failures', 'retries', 'throttles', 'short_circuits', 'budget_exhausted')
+
+    def __init__(self, name, rate, burst):
+        self.name = name
+        self.bucket = AdaptiveTokenBucket(rate, burst)
+        self.budget = RetryBudget()
+        self.breaker = CircuitBreaker()
+        self.counts = dict.fromkeys(self.COUNTERS, 0)
+        self.reported = dict(self.counts)
+        self.last_emit = time.monotonic()
+        self.lock = threading.Lock()
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counts[counter] += amount
+
+    def call(self, operation, func, *args, **kwargs):
+        self.count('calls')
+        if not self.breaker.allow():
+            self.count('short_circuits')
+            raise DependencyUnavailableError(self.name, f'{self.name} is unavailable (circuit open).',
+                                             retry_after=self.breaker.retry_after() or 1)
+        attempt = 0
+        while True:
+            attempt += 1
+            if not self.bucket.acquire(MAX_QUEUE_WAIT_SECONDS):
+                # Our own limit, not a sign the dependency is unhealthy: the breaker isn't told
+                self.count('short_circuits')
+                self.breaker.release_trial()
+                raise DependencyUnavailableError(self.name, f'{self.name} request rate limit reached.',
+                                                 retry_after=1 / max(self.bucket.rate, 0.1))
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    self._finish(success=True) # Validation/conditional errors mean the service is healthy
+                    raise
+                if error_code(e) in THROTTLING_CODES:
+                    self.count('throttles')
+                    self.bucket.on_throttle()
+                if attempt >= MAX_ATTEMPTS or not self.budget.withdraw():
+                    if attempt < MAX_ATTEMPTS:
+                        self.count('budget_exhausted')
+                    self._finish(success=False)
+                    raise DependencyUnavailableError(self.name, f'{self.name} {operation} failed: {e}',
+                                                     retry_after=BACKOFF_CAP_SECONDS, cause=e)
+                self.count('retries')
+                time.sleep(random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)))
+                continue
+            self.bucket.on_success()
+            self.budget.deposit()
+            self._finish(success=True)
+            return result
+
+    def _finish(self, success):
+        self.count('successes' if success else 'failures')
+        changed = self.breaker.record_success() if success else self.breaker.record_failure()
+        if changed:
+            print(f"Circuit breaker for {self.name} is now {self.breaker.state}")
+        if changed or time.monotonic() - self.last_emit >= METRICS_INTERVAL_SECONDS:
+            emit_metrics(self)
+
+    def snapshot(self):
+        with self.lock:
+            counts = dict(self.counts)
+        counts.update(breaker_state=self.breaker.state, request_rate=round(self.bucket.rate, 2),
+                      retry_budget=round(self.budget.balance, 2))
+        return counts
+
+class ResilientClient:
+    """Proxy over a boto3 client that routes every API call through a Dependency.
+
+    Only methods listed in client.meta.method_to_api_mapping (the AWS operations) are wrapped;
+    everything else (exceptions, paginators, presigning, stand-in helpers) passes straight through.
+    """
+
+    def __init__(self, client, dependency):
+        self._client = client
+        self._dependency = dependency
+        self._operations = set(client.meta.method_to_api_mapping)
+
+    @property
+    def raw(self):
+        return self._client
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if name not in self._operations:
+            return attribute # e.g. client.exceptions, client.meta, generate_presigned_url
+
+        def call(*args, **kwargs):
+            return self._dependency.call(name, attribute, *args, **kwargs)
+        return call
+
+DEPENDENCIES = {}
+_registry_lock = threading.Lock()
+
+def get_dependency(name):
+    with _registry_lock:
+        if name not in DEPENDENCIES:
+            limits = DEPENDENCY_LIMITS.get(name, {'rate': 100.0, 'burst': 100.0})
+            rate = float(os.environ.get(f'RESILIENCE_{name.upper()}_RATE', limits['rate']))
+            DEPENDENCIES[name] = Dependency(name, rate, max(float(limits['burst']), rate))
+        return DEPENDENCIES[name]
+
+def wrap_client(client, name):
+    """Returns client wrapped with the named dependency's throttling, retries and breaker."""
+    return ResilientClient(client, get_dependency(name))
+
+def get_metrics():
+    """Current counters, breaker state, adaptive rate and retry budget for every dependency."""
+    return {name: dependency.snapshot() for name, dependency in DEPENDENCIES.items()}
+
+def emit_metrics(dependency):
+    """Prints the counters accumulated since the last emit in CloudWatch Embedded Metric Format."""
+    with dependency.lock:
+        deltas = {k: dependency.counts[k] - dependency.reported[k] for k in dependency.COUNTERS}
+        dependency.reported = dict(dependency.counts)
+        dependency.last_emit = time.monotonic()
+    metrics = dict(deltas, BreakerState=Dependency.STATE_VALUES[dependency.breaker.state])
+    print(json.dumps(dict(metrics, Dependency=dependency.name, _aws={
+        'Timestamp': int(time.time() * 1000),
+        'CloudWatchMetrics': [{
+            'Namespace': 'HRMS/Resilience',
+            'Dimensions': [['Dependency']],
+            'Metrics': [{'Name': name, 'Unit': 'Count'} for name in metrics]
+        }]
+    })))
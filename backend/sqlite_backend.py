@@ -0,0 +1,614 @@
+# sqlite_backend.py (Embedded SQLite storage for on-prem / single-node deployments)
+# SQLiteDynamoDB implements the subset of the low-level DynamoDB client the handlers use
+# (the same surface as local_backends.LocalDynamoDB), so with HRMS_SQLITE_PATH set every
+# manager module, the storage layouts, idempotency and the org closure run unchanged on one
+# SQLite file instead of DynamoDB.
+#
+# Each DynamoDB table is one SQLite table:
+#   hk, rk        the table's hash/range key values (rk = '' without a range key), the
+#                 clustered PRIMARY KEY of a WITHOUT ROWID table, so GetItem and key-range
+#                 Queries are single B-tree seeks that return the item without a second lookup
+#   seg           crc32(hk), for parallel Scan segments that are stable across processes
+#   item          the item as DynamoDB JSON
+#   <index>_hk/rk per GSI, with a partial covering index (<index>_hk, <index>_rk, hk, rk, item)
+#                 WHERE <index>_hk IS NOT NULL: sparse like the GSI, and an index-only read
+# Key values keep DynamoDB's ordering: S as TEXT (BINARY collation = UTF-8 byte order), N as
+# INTEGER/REAL. Condition, update, filter and projection expressions are evaluated with the
+# local_backends expression engine inside the write's transaction.
+#
+# Connections come from a small pool; each runs in WAL mode (readers never block the writer)
+# and caches its prepared statements. Writes take BEGIN IMMEDIATE, so a condition check and
+# the write it guards are atomic, and TransactWriteItems is one SQLite transaction.
+# Not emulated: the 1 MB page limit, streams, throttling. Leave summary aggregates are fed by
+# DynamoDB Streams, so run tools/backfill_leave_aggregates.py to refresh them here.
+# SQLiteSQS keeps the background job queues (jobs.py) in the same file, so on-prem workers in
+# any process share them.
+import base64
+import json
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from decimal import Decimal
+from types import SimpleNamespace
+from local_backends import (_LocalService, _Paginator, _Parser, _evaluate, _apply_update, _project, _flatten_and,
+                            _copy_item, _error_class, _sqs_md5, hrms_table_schemas, hrms_queue_configs, LocalSQS,
+                            LocalClientError, ConditionalCheckFailedException, TransactionCanceledException,
+                            ResourceNotFoundException, ValidationException, ProvisionedThroughputExceededException,
+                            ThrottlingException, MAX_SQS_BATCH, MAX_VISIBILITY_TIMEOUT)
+
+POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 10000
+RECEIVE_POLL_SECONDS = 0.1 # Long-polling interval for messages sent by other processes
+PREFIX_UPPER_BOUND = '\U0010ffff' # Sorts after any character a begins_with prefix can be followed by
+
+def _key_value(av):
+    """SQLite value for a key AttributeValue, ordered the way DynamoDB orders keys."""
+    if 'S' in av:
+        return av['S']
+    if 'N' in av:
+        number = Decimal(av['N'])
+        return int(number) if number == number.to_integral_value() else float(number)
+    if 'B' in av:
+        return bytes(av['B'])
+    raise ValidationException('Key attributes must be of type S, N or B')
+
+def _encode_bytes(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f'Cannot store {type(value).__name__}')
+
+def _decode_bytes(obj):
+    return base64.b64decode(obj['__bytes__']) if len(obj) == 1 and '__bytes__' in obj else obj
+
+def _dumps(item):
+    return json.dumps(item, separators=(',', ':'), default=_encode_bytes)
+
+def _loads(text):
+    return json.loads(text, object_hook=_decode_bytes)
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+class _ConnectionPool:
+    """Fixed set of SQLite connections shared by the handler threads."""
+
+    def __init__(self, path, size):
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                                         check_same_thread=False, cached_statements=256)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL') # Durable at checkpoints; WAL keeps it consistent
+            connection.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+            self._idle.put(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put(connection)
+
+    @contextmanager
+    def transaction(self):
+        """A connection inside BEGIN IMMEDIATE (the write lock), committed on success."""
+        with self.connection() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get().close()
+
+class _SQLiteTable:
+    """SQL statements and key handling for one DynamoDB table."""
+
+    def __init__(self, name, hash_key, range_key=None, indexes=None):
+        self.name, self.hash_key, self.range_key = name, hash_key, range_key
+        self.indexes = dict(indexes or {}) # index name -> (hash attribute, range attribute or None)
+        self.sql_name = _quote(name)
+        index_columns = [f'{_quote(index + "_hk")}, {_quote(index + "_rk")}' for index in self.indexes]
+        columns = ', '.join(['hk', 'rk', 'seg', 'item'] + index_columns)
+        self.insert_sql = (f'INSERT OR REPLACE INTO {self.sql_name} ({columns}) '
+                           f'VALUES ({", ".join("?" * (4 + 2 * len(self.indexes)))})')
+        self.get_sql = f'SELECT item FROM {self.sql_name} WHERE hk = ? AND rk = ?'
+        self.delete_sql = f'DELETE FROM {self.sql_name} WHERE hk = ? AND rk = ?'
+
+    def create_statements(self):
+        index_columns = ''.join(f', {_quote(index + "_hk")}, {_quote(index + "_rk")}' for index in self.indexes)
+        statements = [f'CREATE TABLE IF NOT EXISTS {self.sql_name} (hk NOT NULL, rk NOT NULL, seg INTEGER NOT NULL, '
+                      f'item TEXT NOT NULL{index_columns}, PRIMARY KEY (hk, rk)) WITHOUT ROWID']
+        for index in self.indexes:
+            index_hk, index_rk = _quote(index + '_hk'), _quote(index + '_rk')
+            statements.append(f'CREATE INDEX IF NOT EXISTS {_quote(self.name + "_" + index)} ON {self.sql_name} '
+                              f'({index_hk}, {index_rk}, hk, rk, item) WHERE {index_hk} IS NOT NULL')
+        statements.append(f'CREATE INDEX IF NOT EXISTS {_quote(self.name + "_seg")} ON {self.sql_name} (seg, hk, rk)')
+        return statements
+
+    def locate(self, key):
+        if self.hash_key not in key or (self.range_key and self.range_key not in key):
+            raise ValidationException(f'The provided key element does not match the schema of {self.name}')
+        return _key_value(key[self.hash_key]), _key_value(key[self.range_key]) if self.range_key else ''
+
+    def key_of(self, item):
+        key = {self.hash_key: item[self.hash_key]}
+        if self.range_key:
+            key[self.range_key] = item[self.range_key]
+        return key
+
+    def row(self, item):
+        hk, rk = self.locate(item)
+        values = [hk, rk, zlib.crc32(str(hk).encode('utf-8')), _dumps(item)]
+        for index_hash, index_range in self.indexes.values():
+            if index_hash in item and (not index_range or index_range in item):
+                values += [_key_value(item[index_hash]), _key_value(item[index_range]) if index_range else '']
+            else:
+                values += [None, None] # Not in the sparse index
+        return values
+
+    def get(self, connection, key):
+        row = connection.execute(self.get_sql, self.locate(key)).fetchone()
+        return _loads(row[0]) if row else None
+
+    def put(self, connection, item):
+        connection.execute(self.insert_sql, self.row(item))
+
+    def delete(self, connection, key):
+        connection.execute(self.delete_sql, self.locate(key))
+
+def _range_sql(column, condition):
+    """SQL predicate and parameters for a sort-key condition node of a KeyConditionExpression."""
+    kind = condition[0]
+    if kind == 'between':
+        return f'{column} BETWEEN ? AND ?', [_key_value(condition[2][1]), _key_value(condition[3][1])]
+    if kind == 'func' and condition[1] == 'begins_with':
+        prefix = _key_value(condition[2][1][1])
+        return f'{column} >= ? AND {column} < ?', [prefix, prefix + PREFIX_UPPER_BOUND]
+    if kind == 'cmp' and condition[1] in ('=', '<', '<=', '>', '>='):
+        return f'{column} {condition[1]} ?', [_key_value(condition[3][1])]
+    raise ValidationException('Unsupported key condition')
+
+class SQLiteDynamoDB(_LocalService):
+    """The handlers' subset of the boto3 low-level DynamoDB client, stored in one SQLite file."""
+    OPERATIONS = ('get_item', 'put_item', 'update_item', 'delete_item', 'query', 'scan', 'batch_get_item',
+                  'batch_write_item', 'transact_write_items')
+
+    def __init__(self, path, tables=None, pool_size=POOL_SIZE, latency_ms=0):
+        self.path = path
+        self._init_service(latency_ms)
+        self._pool = _ConnectionPool(path, pool_size)
+        self._tables = {}
+        self._schema_lock = threading.Lock()
+        self.exceptions = SimpleNamespace(
+            ClientError=LocalClientError,
+            ConditionalCheckFailedException=ConditionalCheckFailedException,
+            TransactionCanceledException=TransactionCanceledException,
+            ResourceNotFoundException=ResourceNotFoundException,
+            ProvisionedThroughputExceededException=ProvisionedThroughputExceededException,
+            ThrottlingException=ThrottlingException,
+        )
+        for name, schema in (tables or {}).items():
+            self.add_table(name, schema['hash'], schema.get('range'), schema.get('indexes'))
+
+    def add_table(self, name, hash_key, range_key=None, indexes=None):
+        table = _SQLiteTable(name, hash_key, range_key, indexes)
+        with self._schema_lock, self._pool.transaction() as connection:
+            for statement in table.create_statements():
+                connection.execute(statement)
+            self._tables[name] = table
+
+    def close(self):
+        self._pool.close()
+
+    def _table(self, name):
+        if name not in self._tables:
+            raise ResourceNotFoundException(f'Requested resource not found: Table: {name} not found')
+        return self._tables[name]
+
+    @staticmethod
+    def _check(current, condition, names, values, return_old='NONE'):
+        if not condition:
+            return
+        if not _evaluate(_Parser(condition, names, values).condition(), current or {}):
+            error = ConditionalCheckFailedException('The conditional request failed', 'ConditionalCheck')
+            if return_old == 'ALL_OLD' and current:
+                error.response['Item'] = current # ReturnValuesOnConditionCheckFailure
+            raise error
+
+    # Single-item operations
+    def get_item(self, TableName, Key, ProjectionExpression=None, ExpressionAttributeNames=None, ConsistentRead=False):
+        self._call('GetItem')
+        table = self._table(TableName)
+        with self._pool.connection() as connection:
+            item = table.get(connection, Key)
+        return {'Item': _project(item, ProjectionExpression, ExpressionAttributeNames)} if item else {}
+
+    def put_item(self, TableName, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, ReturnValues='NONE', ReturnValuesOnConditionCheckFailure='NONE'):
+        self._call('PutItem')
+        table = self._table(TableName)
+        with self._pool.transaction() as connection:
+            old = table.get(connection, Item) if ConditionExpression or ReturnValues == 'ALL_OLD' else None
+            self._check(old, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues,
+                        ReturnValuesOnConditionCheckFailure)
+            table.put(connection, Item)
+        return {'Attributes': old} if old and ReturnValues == 'ALL_OLD' else {}
+
+    def update_item(self, TableName, Key, UpdateExpression, ConditionExpression=None,
+                    ExpressionAttributeNames=None, ExpressionAttributeValues=None, ReturnValues='NONE',
+                    ReturnValuesOnConditionCheckFailure='NONE'):
+        self._call('UpdateItem')
+        table = self._table(TableName)
+        with self._pool.transaction() as connection:
+            old = table.get(connection, Key)
+            self._check(old, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues,
+                        ReturnValuesOnConditionCheckFailure)
+            item = _copy_item(old) if old else _copy_item(Key)
+            _apply_update(item, UpdateExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+            table.put(connection, item)
+        if ReturnValues in ('ALL_NEW', 'UPDATED_NEW'):
+            return {'Attributes': item}
+        if ReturnValues == 'ALL_OLD' and old:
+            return {'Attributes': old}
+        return {}
+
+    def delete_item(self, TableName, Key, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues='NONE'):
+        self._call('DeleteItem')
+        table = self._table(TableName)
+        with self._pool.transaction() as connection:
+            old = table.get(connection, Key)
+            self._check(old, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+            if old:
+                table.delete(connection, Key)
+        return {'Attributes': old} if old and ReturnValues == 'ALL_OLD' else {}
+
+    # Multi-item reads
+    def query(self, TableName, KeyConditionExpression, IndexName=None, FilterExpression=None,
+              ProjectionExpression=None, ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+              Limit=None, ExclusiveStartKey=None, ScanIndexForward=True, Select=None, ConsistentRead=False):
+        self._call('Query')
+        table = self._table(TableName)
+        if IndexName:
+            if IndexName not in table.indexes:
+                raise ValidationException(f'The table does not have the specified index: {IndexName}')
+            hash_key, range_key = table.indexes[IndexName]
+            hash_column, range_column = _quote(IndexName + '_hk'), _quote(IndexName + '_rk')
+            order = [range_column, 'hk', 'rk'] # Index order, ties broken by the table key like DynamoDB
+        else:
+            hash_key, range_key = table.hash_key, table.range_key
+            hash_column, range_column = 'hk', 'rk'
+            order = ['rk']
+
+        parser = _Parser(KeyConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues)
+        where, params = [], []
+        for clause in _flatten_and(parser.condition()):
+            if clause[0] == 'cmp' and clause[1] == '=' and clause[2] == ('path', hash_key):
+                where.insert(0, f'{hash_column} = ?')
+                params.insert(0, _key_value(clause[3][1]))
+            elif range_key:
+                predicate, values = _range_sql(range_column, clause)
+                where.append(predicate)
+                params.extend(values)
+        if not where or not where[0].startswith(hash_column):
+            raise ValidationException('Query condition missed key schema element')
+        if ExclusiveStartKey:
+            table_key = list(table.locate(ExclusiveStartKey))
+            if IndexName:
+                start = [_key_value(ExclusiveStartKey[range_key]) if range_key else ''] + table_key
+            else:
+                start = table_key[1:]
+            where.append(f"({', '.join(order)}) {'>' if ScanIndexForward else '<'} ({', '.join('?' * len(order))})")
+            params.extend(start)
+        direction = 'ASC' if ScanIndexForward else 'DESC'
+        sql = (f"SELECT item FROM {table.sql_name} WHERE {' AND '.join(where)} "
+               f"ORDER BY {', '.join(f'{column} {direction}' for column in order)}")
+        return self._page(table, sql, params, Limit, FilterExpression, ProjectionExpression,
+                          ExpressionAttributeNames, ExpressionAttributeValues, Select, IndexName and (hash_key, range_key))
+
+    def scan(self, TableName, IndexName=None, FilterExpression=None, ProjectionExpression=None,
+             ExpressionAttributeNames=None, ExpressionAttributeValues=None, Limit=None,
+             ExclusiveStartKey=None, Segment=None, TotalSegments=None, Select=None, ConsistentRead=False):
+        self._call('Scan')
+        table = self._table(TableName)
+        where, params = [], []
+        if IndexName:
+            where.append(f'{_quote(IndexName + "_hk")} IS NOT NULL')
+        if TotalSegments:
+            where.append('seg % ? = ?')
+            params += [TotalSegments, Segment or 0]
+        if ExclusiveStartKey:
+            where.append('(hk, rk) > (?, ?)')
+            params.extend(table.locate(ExclusiveStartKey))
+        sql = (f"SELECT item FROM {table.sql_name} {'WHERE ' + ' AND '.join(where) if where else ''} "
+               f"ORDER BY hk, rk")
+        return self._page(table, sql, params, Limit, FilterExpression, ProjectionExpression,
+                          ExpressionAttributeNames, ExpressionAttributeValues, Select, None)
+
+    def _page(self, table, sql, params, limit, filter_expression, projection, names, values, select, index_keys):
+        """Runs a key-ordered SELECT; Limit caps items read (before the filter), like DynamoDB."""
+        if limit:
+            sql += ' LIMIT ?'
+            params = params + [limit + 1] # One extra row tells whether there is a next page
+        with self._pool.connection() as connection:
+            rows = connection.execute(sql, params).fetchall()
+        more = bool(limit) and len(rows) > limit
+        rows = rows[:limit] if limit else rows
+        filter_node = _Parser(filter_expression, names, values).condition() if filter_expression else None
+        items, last = [], None
+        for (text,) in rows:
+            item = _loads(text)
+            if filter_node is None or _evaluate(filter_node, item):
+                items.append(_project(item, projection, names) if projection else item)
+            last = item
+        response = {'Count': len(items), 'ScannedCount': len(rows)}
+        if select != 'COUNT':
+            response['Items'] = items
+        if more and last is not None:
+            last_key = table.key_of(last)
+            if index_keys:
+                for attribute in index_keys:
+                    if attribute:
+                        last_key[attribute] = last[attribute]
+            response['LastEvaluatedKey'] = last_key
+        return response
+
+    # Batch and transactional operations
+    def batch_get_item(self, RequestItems):
+        self._call('BatchGetItem')
+        if sum(len(spec['Keys']) for spec in RequestItems.values()) > 100:
+            raise ValidationException('Too many items requested for the BatchGetItem call')
+        responses = {}
+        with self._pool.connection() as connection:
+            for table_name, spec in RequestItems.items():
+                table = self._table(table_name)
+                found = responses.setdefault(table_name, [])
+                for key in spec['Keys']:
+                    item = table.get(connection, key)
+                    if item:
+                        found.append(_project(item, spec.get('ProjectionExpression'),
+                                              spec.get('ExpressionAttributeNames')))
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, RequestItems):
+        self._call('BatchWriteItem')
+        if sum(len(requests) for requests in RequestItems.values()) > 25:
+            raise ValidationException('Too many items requested for the BatchWriteItem call')
+        with self._pool.transaction() as connection:
+            for table_name, requests in RequestItems.items():
+                table = self._table(table_name)
+                for request in requests:
+                    if 'PutRequest' in request:
+                        table.put(connection, request['PutRequest']['Item'])
+                    else:
+                        table.delete(connection, request['DeleteRequest']['Key'])
+        return {'UnprocessedItems': {}}
+
+    def transact_write_items(self, TransactItems, ClientRequestToken=None):
+        self._call('TransactWriteItems')
+        if len(TransactItems) > 100:
+            raise ValidationException('Member must have length less than or equal to 100')
+        with self._pool.transaction() as connection:
+            reasons, failed, current = [], False, []
+            for entry in TransactItems:
+                (action, spec), = entry.items()
+                table = self._table(spec['TableName'])
+                old = table.get(connection, spec.get('Key') or table.key_of(spec['Item']))
+                current.append(old)
+                try:
+                    self._check(old, spec.get('ConditionExpression'), spec.get('ExpressionAttributeNames'),
+                                spec.get('ExpressionAttributeValues'))
+                    reasons.append({'Code': 'None'})
+                except ConditionalCheckFailedException:
+                    failed = True
+                    reasons.append({'Code': 'ConditionalCheckFailed', 'Message': 'The conditional request failed'})
+            if failed:
+                codes = ', '.join(r['Code'] for r in reasons)
+                raise TransactionCanceledException(
+                    f'Transaction cancelled, please refer cancellation reasons for specific reasons [{codes}]',
+                    'TransactWriteItems',
+                    {'Error': {'Code': 'TransactionCanceledException', 'Message': codes},
+                     'CancellationReasons': reasons})
+            for entry, old in zip(TransactItems, current):
+                (action, spec), = entry.items()
+                table = self._table(spec['TableName'])
+                if action == 'Put':
+                    table.put(connection, spec['Item'])
+                elif action == 'Delete':
+                    table.delete(connection, spec['Key'])
+                elif action == 'Update':
+                    item = _copy_item(old) if old else _copy_item(spec['Key'])
+                    _apply_update(item, spec['UpdateExpression'], spec.get('ExpressionAttributeNames'),
+                                  spec.get('ExpressionAttributeValues'))
+                    table.put(connection, item)
+        return {}
+
+    def get_paginator(self, operation_name):
+        return _Paginator(getattr(self, operation_name))
+
+class SQLiteSQS(_LocalService):
+    """The job subsystem's subset of the boto3 SQS client, stored in the same SQLite file.
+
+    All queues share one table; a message is visible when visible_at <= now. ReceiveMessage takes
+    the write lock to claim messages, so workers in several processes never receive the same one.
+    Long polls wake as soon as a message is sent from this process and poll every
+    RECEIVE_POLL_SECONDS for messages sent by others.
+    """
+    OPERATIONS = ('send_message', 'send_message_batch', 'receive_message', 'delete_message', 'delete_message_batch',
+                  'change_message_visibility', 'get_queue_attributes', 'purge_queue')
+
+    def __init__(self, path, queues=None, pool_size=4, latency_ms=0):
+        self.path = path
+        self._init_service(latency_ms)
+        self._pool = _ConnectionPool(path, pool_size)
+        self._queues = dict(queues or {})
+        self._arrived = threading.Condition()
+        names = ['QueueDoesNotExist', 'ReceiptHandleIsInvalid', 'MessageNotInflight',
+                 'TooManyEntriesInBatchRequest', 'EmptyBatchRequest', 'InvalidParameterValue']
+        self.exceptions = SimpleNamespace(ClientError=LocalClientError, **{n: _error_class(n) for n in names})
+        with self._pool.transaction() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS sqs_messages (message_id TEXT PRIMARY KEY, queue TEXT NOT NULL, '
+                               'seq INTEGER NOT NULL, body TEXT NOT NULL, attributes TEXT NOT NULL, '
+                               'sent_at REAL NOT NULL, visible_at REAL NOT NULL, receive_count INTEGER NOT NULL, '
+                               'receipt TEXT, first_received_at REAL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS sqs_messages_visible ON sqs_messages (queue, visible_at, seq)')
+
+    def close(self):
+        self._pool.close()
+
+    def add_queue(self, url, visibility_timeout=30, dead_letter_url=None, max_receives=None):
+        """Creates or reconfigures a queue (queue settings live in this process; messages in the file)."""
+        self._queues[url] = {'visibility_timeout': visibility_timeout, 'dead_letter_url': dead_letter_url,
+                             'max_receives': max_receives}
+
+    def _queue(self, url):
+        if url not in self._queues:
+            raise self.exceptions.QueueDoesNotExist(f'The specified queue does not exist: {url}')
+        return self._queues[url]
+
+    def _insert(self, connection, queue_url, body, delay, attributes=None, receive_count=0):
+        message_id, now = str(uuid.uuid4()), time.time()
+        connection.execute('INSERT INTO sqs_messages (message_id, queue, seq, body, attributes, sent_at, visible_at, '
+                           'receive_count) VALUES (?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM sqs_messages), '
+                           '?, ?, ?, ?, ?)',
+                           (message_id, queue_url, body, _dumps(attributes or {}), now, now + delay, receive_count))
+        return message_id
+
+    def _sent(self):
+        with self._arrived:
+            self._arrived.notify_all()
+
+    def send_message(self, QueueUrl, MessageBody, DelaySeconds=0, MessageAttributes=None):
+        self._call('SendMessage')
+        self._queue(QueueUrl)
+        with self._pool.transaction() as connection:
+            message_id = self._insert(connection, QueueUrl, MessageBody, DelaySeconds, MessageAttributes)
+        self._sent()
+        return {'MessageId': message_id, 'MD5OfMessageBody': _sqs_md5(MessageBody)}
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self._call('SendMessageBatch')
+        LocalSQS._check_batch(Entries, self.exceptions)
+        self._queue(QueueUrl)
+        with self._pool.transaction() as connection:
+            successful = [{'Id': entry['Id'], 'MD5OfMessageBody': _sqs_md5(entry['MessageBody']),
+                           'MessageId': self._insert(connection, QueueUrl, entry['MessageBody'],
+                                                     entry.get('DelaySeconds', 0), entry.get('MessageAttributes'))}
+                          for entry in Entries]
+        self._sent()
+        return {'Successful': successful, 'Failed': []}
+
+    def _claim(self, queue_url, config, limit, visibility_timeout):
+        taken = []
+        with self._pool.transaction() as connection:
+            now = time.time()
+            rows = connection.execute('SELECT message_id, body, attributes, receive_count, sent_at, first_received_at '
+                                      'FROM sqs_messages WHERE queue = ? AND visible_at <= ? ORDER BY visible_at, seq '
+                                      'LIMIT ?', (queue_url, now, limit)).fetchall()
+            for message_id, body, attributes, receive_count, sent_at, first_received_at in rows:
+                if config.get('max_receives') and receive_count >= config['max_receives']:
+                    connection.execute('DELETE FROM sqs_messages WHERE message_id = ?', (message_id,))
+                    self._insert(connection, config['dead_letter_url'], body, 0, _loads(attributes), receive_count)
+                    continue
+                receipt = f'{message_id}#{uuid.uuid4().hex}'
+                connection.execute('UPDATE sqs_messages SET receive_count = receive_count + 1, receipt = ?, '
+                                   'visible_at = ?, first_received_at = COALESCE(first_received_at, ?) '
+                                   'WHERE message_id = ?', (receipt, now + visibility_timeout, now, message_id))
+                taken.append({'MessageId': message_id, 'ReceiptHandle': receipt, 'Body': body,
+                              'MD5OfBody': _sqs_md5(body), 'MessageAttributes': _loads(attributes),
+                              'Attributes': {'ApproximateReceiveCount': str(receive_count + 1),
+                                             'SentTimestamp': str(int(sent_at * 1000)),
+                                             'ApproximateFirstReceiveTimestamp':
+                                                 str(int((first_received_at or now) * 1000))}})
+        return taken
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages=1, VisibilityTimeout=None, WaitTimeSeconds=0,
+                        AttributeNames=None, MessageAttributeNames=None, MessageSystemAttributeNames=None):
+        self._call('ReceiveMessage')
+        if not 1 <= MaxNumberOfMessages <= MAX_SQS_BATCH:
+            raise self.exceptions.InvalidParameterValue(f'MaxNumberOfMessages must be between 1 and {MAX_SQS_BATCH}.')
+        config = self._queue(QueueUrl)
+        timeout = config.get('visibility_timeout', 30) if VisibilityTimeout is None else VisibilityTimeout
+        deadline = time.time() + WaitTimeSeconds
+        while True:
+            taken = self._claim(QueueUrl, config, MaxNumberOfMessages, timeout)
+            remaining = deadline - time.time()
+            if taken or remaining <= 0:
+                return {'Messages': taken} if taken else {}
+            with self._arrived:
+                self._arrived.wait(min(remaining, RECEIVE_POLL_SECONDS))
+
+    def _delete(self, connection, queue_url, receipt_handle):
+        # A stale handle (the message was received again since) deletes nothing, as in SQS
+        connection.execute('DELETE FROM sqs_messages WHERE message_id = ? AND queue = ? AND receipt = ?',
+                           (receipt_handle.split('#', 1)[0], queue_url, receipt_handle))
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        self._call('DeleteMessage')
+        self._queue(QueueUrl)
+        with self._pool.transaction() as connection:
+            self._delete(connection, QueueUrl, ReceiptHandle)
+        return {}
+
+    def delete_message_batch(self, QueueUrl, Entries):
+        self._call('DeleteMessageBatch')
+        LocalSQS._check_batch(Entries, self.exceptions)
+        self._queue(QueueUrl)
+        with self._pool.transaction() as connection:
+            for entry in Entries:
+                self._delete(connection, QueueUrl, entry['ReceiptHandle'])
+        return {'Successful': [{'Id': entry['Id']} for entry in Entries], 'Failed': []}
+
+    def change_message_visibility(self, QueueUrl, ReceiptHandle, VisibilityTimeout):
+        self._call('ChangeMessageVisibility')
+        if not 0 <= VisibilityTimeout <= MAX_VISIBILITY_TIMEOUT:
+            raise self.exceptions.InvalidParameterValue('VisibilityTimeout is out of range.')
+        self._queue(QueueUrl)
+        with self._pool.transaction() as connection:
+            now = time.time()
+            changed = connection.execute('UPDATE sqs_messages SET visible_at = ? WHERE message_id = ? AND queue = ? '
+                                         'AND receipt = ? AND visible_at > ?',
+                                         (now + VisibilityTimeout, ReceiptHandle.split('#', 1)[0], QueueUrl,
+                                          ReceiptHandle, now)).rowcount
+        if not changed:
+            raise self.exceptions.MessageNotInflight('The message referred to is not in flight.')
+        self._sent()
+        return {}
+
+    def get_queue_attributes(self, QueueUrl, AttributeNames=None):
+        self._call('GetQueueAttributes')
+        config = self._queue(QueueUrl)
+        with self._pool.connection() as connection:
+            visible, in_flight, delayed = connection.execute(
+                'SELECT COALESCE(SUM(visible_at <= :now), 0), COALESCE(SUM(visible_at > :now AND receive_count > 0), 0), '
+                'COALESCE(SUM(visible_at > :now AND receive_count = 0), 0) FROM sqs_messages WHERE queue = :queue',
+                {'now': time.time(), 'queue': QueueUrl}).fetchone()
+        return {'Attributes': {'ApproximateNumberOfMessages': str(visible),
+                               'ApproximateNumberOfMessagesNotVisible': str(in_flight),
+                               'ApproximateNumberOfMessagesDelayed': str(delayed),
+                               'VisibilityTimeout': str(config.get('visibility_timeout', 30))}}
+
+    def purge_queue(self, QueueUrl):
+        self._call('PurgeQueue')
+        self._queue(QueueUrl)
+        with self._pool.transaction() as connection:
+            connection.execute('DELETE FROM sqs_messages WHERE queue = ?', (QueueUrl,))
+        return {}
+
+def create_sqlite_client(path, latency_ms=0):
+    """SQLiteDynamoDB for `path` with the HRMS tables (and GSIs) created if missing."""
+    return SQLiteDynamoDB(path, hrms_table_schemas(), latency_ms=latency_ms)
+
+def create_sqlite_queue_client(path, latency_ms=0):
+    """SQLiteSQS for `path` with the HRMS job queues."""
+    return SQLiteSQS(path, hrms_queue_configs(), latency_ms=latency_ms)
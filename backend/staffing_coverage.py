@@ -0,0 +1,221 @@
+# staffing_coverage.py (Daily staffing of a department from its members' approved and pending leaves)
+# Members come from the DepartmentIndex GSI on profiles (department, userId). Their leaves in a
+# window are read with the bounded LeaveStartIndex query of the overlap check (leave_manager.py):
+# leaves last at most MAX_LEAVE_DAYS, so one Query per member, run COVERAGE_QUERY_WORKERS at a time.
+# Headcount is a difference array over the window's days: each member's leave ranges are sorted
+# and merged first (a member on two leaves the same day is away once), every merged range adds
+# +1 on its first day and -1 after its last, and a running sum gives the people away per day.
+# That is O(n log n + days) for n leaves, instead of checking every leave for every day.
+# Days with fewer people available than the department's minimum are flagged: "short" counting
+# approved leaves, "at risk" if all pending leaves were approved too. The minimum is
+# COVERAGE_MIN_STAFFED_PERCENT of the members (rounded up) unless ?minStaffed= is given.
+# Access: HR may query any department and any leave; a manager (someone with direct reports)
+# only their own department, and the pre-approval check only for leaves of people below them.
+import math
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from common_utils import (get_response, negotiated, error_response, get_user_id_from_event, dynamodb_client,
+                          load_profile, storage, is_hr, LEAVE_START_INDEX, MAX_LEAVE_DAYS)
+from org_manager import is_above, has_reports, FORBIDDEN_MESSAGE
+from memory_profile import sample_memory
+from profiling import profiled
+from warmup import handles_warmup
+
+DEPARTMENT_INDEX = 'DepartmentIndex'
+COVERAGE_MIN_STAFFED_PERCENT = float(os.environ.get('COVERAGE_MIN_STAFFED_PERCENT', '80'))
+COVERAGE_QUERY_WORKERS = int(os.environ.get('COVERAGE_QUERY_WORKERS', '16')) # Concurrent per-member Queries
+DEFAULT_WINDOW_DAYS = 90
+MAX_WINDOW_DAYS = 366
+COUNTED_STATUSES = ('Approved', 'Pending')
+DEPARTMENT_FORBIDDEN_MESSAGE = 'Forbidden: department coverage is for HR, and for managers of their own department.'
+
+def department_members(department):
+    """User ids of the profiles in a department."""
+    members, query_args = [], {
+        'TableName': storage.table('profile'),
+        'IndexName': DEPARTMENT_INDEX,
+        'KeyConditionExpression': 'department = :dept',
+        'ProjectionExpression': 'userId',
+        'ExpressionAttributeValues': {':dept': {'S': department}}
+    }
+    while True:
+        response = dynamodb_client.query(**query_args)
+        members.extend(item['userId']['S'] for item in response.get('Items', []))
+        if not response.get('LastEvaluatedKey'):
+            return members
+        query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def _member_leaves(user_id, first, last):
+    query_args = {
+        'TableName': storage.table('leave'),
+        'IndexName': LEAVE_START_INDEX,
+        'KeyConditionExpression': 'userId = :uid AND startDate BETWEEN :from AND :to',
+        'FilterExpression': 'endDate >= :first AND #s IN (:approved, :pending)',
+        'ProjectionExpression': 'userId, leaveId, startDate, endDate, #s',
+        'ExpressionAttributeNames': {'#s': 'status'},
+        'ExpressionAttributeValues': {':uid': {'S': user_id},
+                                      ':from': {'S': (first - timedelta(days=MAX_LEAVE_DAYS)).isoformat()},
+                                      ':to': {'S': last.isoformat()}, ':first': {'S': first.isoformat()},
+                                      ':approved': {'S': 'Approved'}, ':pending': {'S': 'Pending'}}
+    }
+    leaves = []
+    while True:
+        response = dynamodb_client.query(**query_args)
+        leaves.extend((item['userId']['S'], item['leaveId']['S'], item['startDate']['S'], item['endDate']['S'],
+                       item['status']['S']) for item in response.get('Items', []))
+        if not response.get('LastEvaluatedKey'):
+            return leaves
+        query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def load_leaves(user_ids, first, last):
+    """(userId, leaveId, startDate, endDate, status) of the users' approved/pending leaves overlapping [first, last]."""
+    if not user_ids:
+        return []
+    with ThreadPoolExecutor(max_workers=min(COVERAGE_QUERY_WORKERS, len(user_ids))) as pool:
+        return [leave for leaves in pool.map(lambda u: _member_leaves(u, first, last), user_ids) for leave in leaves]
+
+def _merged(ranges):
+    """Sorted, non-overlapping (first, last) day offsets covering the same days as ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+def daily_away(leaves, first, last):
+    """(approved, approved or pending): people away on each day of [first, last] for the given leaves."""
+    days = (last - first).days + 1
+    origin = first.toordinal()
+    by_user = defaultdict(lambda: ([], []))
+    for user_id, _, start_date, end_date, status in leaves:
+        start = max(date.fromisoformat(start_date).toordinal() - origin, 0)
+        end = min(date.fromisoformat(end_date).toordinal() - origin, days - 1)
+        if start > end:
+            continue
+        approved, counted = by_user[user_id]
+        counted.append((start, end))
+        if status == 'Approved':
+            approved.append((start, end))
+    sweeps = []
+    for which in (0, 1):
+        delta = [0] * (days + 1)
+        for ranges in by_user.values():
+            for start, end in _merged(ranges[which]):
+                delta[start] += 1
+                delta[end + 1] -= 1
+        away, running = [], 0
+        for step in delta[:days]:
+            running += step
+            away.append(running)
+        sweeps.append(away)
+    return sweeps[0], sweeps[1]
+
+def minimum_staffed(members):
+    return math.ceil(members * COVERAGE_MIN_STAFFED_PERCENT / 100)
+
+def department_coverage(department, first, last, min_staffed=None):
+    """Per-day headcount of a department over [first, last], with the days below its minimum."""
+    members = department_members(department)
+    min_staffed = minimum_staffed(len(members)) if min_staffed is None else min_staffed
+    approved, counted = daily_away(load_leaves(members, first, last), first, last)
+    days, short, at_risk = [], [], []
+    for offset, (away, away_if_approved) in enumerate(zip(approved, counted)):
+        day = (first + timedelta(days=offset)).isoformat()
+        available, available_if_approved = len(members) - away, len(members) - away_if_approved
+        days.append({'date': day, 'onLeave': away, 'pending': away_if_approved - away, 'available': available,
+                     'availableIfPendingApproved': available_if_approved})
+        if available < min_staffed:
+            short.append(day)
+        elif available_if_approved < min_staffed:
+            at_risk.append(day)
+    return {'department': department, 'from': first.isoformat(), 'to': last.isoformat(), 'members': len(members),
+            'minStaffed': min_staffed, 'days': days, 'shortDays': short, 'atRiskDays': at_risk}
+
+def approval_shortfalls(employee_id, leave_id, min_staffed=None):
+    """The pre-approval check: days of the leave on which approving it leaves its department short.
+
+    Other pending leaves are not counted, so the answer only depends on what is already approved.
+    Returns None when the leave doesn't exist.
+    """
+    item = dynamodb_client.get_item(TableName=storage.table('leave'),
+                                    Key=storage.key('leave', employee_id, leave_id)).get('Item')
+    if not item:
+        return None
+    department = ((load_profile(employee_id) or {}).get('department') or {}).get('S')
+    if not department:
+        raise ValueError('The employee has no department.')
+    first, last = date.fromisoformat(item['startDate']['S']), date.fromisoformat(item['endDate']['S'])
+    members = department_members(department)
+    min_staffed = minimum_staffed(len(members)) if min_staffed is None else min_staffed
+    leaves = [leave for leave in load_leaves(members, first, last) if leave[1] != leave_id]
+    leaves.append((employee_id, leave_id, first.isoformat(), last.isoformat(), 'Approved'))
+    approved, _ = daily_away(leaves, first, last)
+    short = [{'date': (first + timedelta(days=offset)).isoformat(), 'available': len(members) - away}
+             for offset, away in enumerate(approved) if len(members) - away < min_staffed]
+    return {'department': department, 'employeeId': employee_id, 'leaveId': leave_id,
+            'status': item.get('status', {}).get('S'), 'members': len(members), 'minStaffed': min_staffed,
+            'canApprove': not short, 'shortDays': short}
+
+def _date_param(params, name, default):
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a YYYY-MM-DD date.')
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+def get_coverage(event, context):
+    """Lambda function to return a department's daily staffing and the days below its minimum.
+
+    ?department= (default: the caller's), ?from= and ?to= (YYYY-MM-DD, default the next 90 days,
+    at most 366 days), ?minStaffed= to override the configured minimum.
+    With ?employeeId=&leaveId= it is the pre-approval check for that leave instead.
+    Only HR and managers may call it (see the access rules above).
+    """
+    user_id = get_user_id_from_event(event)
+    if not user_id:
+        return get_response(401, {'message': 'Unauthorized: User ID missing.'})
+
+    try:
+        params = event.get('queryStringParameters') or {}
+        min_staffed = int(params['minStaffed']) if params.get('minStaffed') else None
+        if min_staffed is not None and min_staffed < 0:
+            return get_response(400, {'message': 'minStaffed must not be negative.'})
+        if params.get('leaveId'):
+            if not params.get('employeeId'):
+                return get_response(400, {'message': 'employeeId is required with leaveId.'})
+            if not (is_hr(event) or is_above(user_id, params['employeeId'])):
+                return get_response(403, {'message': FORBIDDEN_MESSAGE})
+            check = approval_shortfalls(params['employeeId'], params['leaveId'], min_staffed)
+            if check is None:
+                return get_response(404, {'message': 'Leave request not found.'})
+            return get_response(200, check)
+
+        own_department = ((load_profile(user_id) or {}).get('department') or {}).get('S')
+        department = params.get('department') or own_department
+        if not department:
+            return get_response(400, {'message': 'department is required (the caller has none in their profile).'})
+        if not (is_hr(event) or (department == own_department and has_reports(user_id))):
+            return get_response(403, {'message': DEPARTMENT_FORBIDDEN_MESSAGE})
+        first = _date_param(params, 'from', date.today())
+        last = _date_param(params, 'to', first + timedelta(days=DEFAULT_WINDOW_DAYS - 1))
+        if last < first:
+            return get_response(400, {'message': 'to must not be before from.'})
+        if (last - first).days >= MAX_WINDOW_DAYS:
+            return get_response(400, {'message': f'The window can cover at most {MAX_WINDOW_DAYS} days.'})
+        return get_response(200, department_coverage(department, first, last, min_staffed))
+    except ValueError as e:
+        return get_response(400, {'message': str(e)})
+    except Exception as e:
+        print(f"Error getting coverage for {user_id}: {e}")
+        return error_response(e)
@@ -0,0 +1,8 @@
+# tests/conftest.py
+# The tests import the backend modules the way the Lambda runtime does (flat, from backend/)
+# and run them against the in-memory stand-ins (local_backends.py).
+import os
+import sys
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,145 @@
+# tests/test_resilience.py
+# Drives resilience.Dependency through a DynamoDB stand-in with injected faults: throttling and
+# backoff, the retry budget, the circuit breaker's open -> half-open -> closed cycle, and the
+# client-side rate limit (which must not count against the dependency's health).
+import time
+
+import pytest
+
+import resilience
+from local_backends import LocalDynamoDB
+from resilience import CircuitBreaker, Dependency, DependencyUnavailableError, ResilientClient
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, 'BACKOFF_BASE_SECONDS', 0.001)
+    monkeypatch.setattr(resilience, 'BACKOFF_CAP_SECONDS', 0.005)
+    monkeypatch.setattr(resilience, 'emit_metrics', lambda dependency: None)
+
+@pytest.fixture
+def stand_in():
+    return LocalDynamoDB({'Items': {'hash': 'id'}})
+
+def make_client(stand_in, rate=1000.0, burst=1000.0, failure_threshold=5, reset_seconds=10.0):
+    dependency = Dependency('dynamodb', rate, burst)
+    dependency.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+    return ResilientClient(stand_in, dependency), dependency
+
+def put(client, item_id='a'):
+    return client.put_item(TableName='Items', Item={'id': {'S': item_id}})
+
+def test_throttled_calls_are_retried_and_slow_the_bucket(stand_in):
+    client, dependency = make_client(stand_in)
+    stand_in.inject_faults('ProvisionedThroughputExceededException', operations={'PutItem'}, count=2)
+
+    put(client)
+
+    assert stand_in.request_counts['PutItem'] == 3
+    assert dependency.counts['throttles'] == 2
+    assert dependency.counts['retries'] == 2
+    assert dependency.counts['successes'] == 1
+    assert dependency.bucket.rate < dependency.bucket.max_rate
+    assert dependency.breaker.state == CircuitBreaker.CLOSED
+
+def test_non_retryable_errors_pass_through_and_count_as_healthy(stand_in):
+    client, dependency = make_client(stand_in)
+    put(client)
+
+    with pytest.raises(stand_in.exceptions.ConditionalCheckFailedException):
+        client.put_item(TableName='Items', Item={'id': {'S': 'a'}}, ConditionExpression='attribute_not_exists(id)')
+
+    assert stand_in.request_counts['PutItem'] == 2
+    assert dependency.counts['retries'] == 0
+    assert dependency.counts['failures'] == 0
+
+def test_gives_up_after_max_attempts(stand_in):
+    client, dependency = make_client(stand_in)
+    stand_in.inject_faults('InternalServerError', operations={'PutItem'})
+
+    with pytest.raises(DependencyUnavailableError) as raised:
+        put(client)
+
+    assert stand_in.request_counts['PutItem'] == resilience.MAX_ATTEMPTS
+    assert raised.value.dependency == 'dynamodb'
+    assert resilience.error_code(raised.value.cause) == 'InternalServerError'
+    assert dependency.counts['failures'] == 1
+
+def test_exhausted_retry_budget_stops_retrying(stand_in):
+    client, dependency = make_client(stand_in)
+    dependency.budget.balance = 1
+    stand_in.inject_faults('ThrottlingException', operations={'PutItem'})
+
+    with pytest.raises(DependencyUnavailableError):
+        put(client)
+
+    assert stand_in.request_counts['PutItem'] == 2 # The first try and the one retry the budget allowed
+    assert dependency.counts['retries'] == 1
+    assert dependency.counts['budget_exhausted'] == 1
+
+    stand_in.clear_faults()
+    put(client) # Successful calls earn retries back
+    assert dependency.budget.balance == pytest.approx(resilience.RETRY_BUDGET_RATIO)
+
+def test_breaker_opens_half_opens_and_closes(stand_in, monkeypatch):
+    monkeypatch.setattr(resilience, 'MAX_ATTEMPTS', 1)
+    client, dependency = make_client(stand_in, failure_threshold=2, reset_seconds=0.05)
+    fault = stand_in.inject_faults('ServiceUnavailable', operations={'PutItem'})
+
+    for _ in range(2):
+        with pytest.raises(DependencyUnavailableError):
+            put(client)
+    assert dependency.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(DependencyUnavailableError, match='circuit open'):
+        put(client) # Fails fast without reaching the dependency
+    assert stand_in.request_counts['PutItem'] == 2
+    assert dependency.counts['short_circuits'] == 1
+
+    time.sleep(0.06)
+    with pytest.raises(DependencyUnavailableError):
+        put(client) # The half-open trial fails: open again
+    assert dependency.breaker.state == CircuitBreaker.OPEN
+    assert stand_in.request_counts['PutItem'] == 3
+
+    stand_in.clear_faults(fault)
+    time.sleep(0.06)
+    put(client) # The next trial succeeds
+    assert dependency.breaker.state == CircuitBreaker.CLOSED
+    put(client)
+    assert stand_in.request_counts['PutItem'] == 5
+
+def test_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow() # Until the trial finishes
+
+def test_local_rate_limit_rejections_do_not_open_the_breaker(stand_in, monkeypatch):
+    monkeypatch.setattr(resilience, 'MAX_QUEUE_WAIT_SECONDS', 0.0)
+    client, dependency = make_client(stand_in, rate=0.5, burst=1, failure_threshold=2)
+
+    put(client)
+    for _ in range(5):
+        with pytest.raises(DependencyUnavailableError, match='rate limit'):
+            put(client)
+
+    assert stand_in.request_counts['PutItem'] == 1
+    assert dependency.counts['short_circuits'] == 5
+    assert dependency.counts['failures'] == 0
+    assert dependency.breaker.state == CircuitBreaker.CLOSED
+
+def test_local_rate_limit_rejection_releases_the_half_open_trial(stand_in, monkeypatch):
+    monkeypatch.setattr(resilience, 'MAX_QUEUE_WAIT_SECONDS', 0.0)
+    client, dependency = make_client(stand_in, rate=0.5, burst=1, failure_threshold=1, reset_seconds=0.01)
+    dependency.bucket.tokens = 0
+    dependency.breaker.record_failure()
+    time.sleep(0.02)
+
+    with pytest.raises(DependencyUnavailableError, match='rate limit'):
+        put(client) # Allowed as the trial, then rejected by our own bucket
+
+    assert dependency.breaker.state == CircuitBreaker.HALF_OPEN
+    assert dependency.breaker.allow() # Another trial may go
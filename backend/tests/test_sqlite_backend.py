@@ -0,0 +1,130 @@
+# tests/test_sqlite_backend.py
+# Differential test of the SQLite backend (sqlite_backend.py) against the in-memory stand-in
+# (local_backends.py), the reference for DynamoDB semantics the handlers rely on: the same
+# seeded writes go to both, then every query, scan and conditional write must give the same
+# results, page by page.
+import random
+
+import pytest
+
+from local_backends import LocalDynamoDB
+from sqlite_backend import SQLiteDynamoDB
+
+SCHEMA = {
+    'T': {'hash': 'h', 'range': 'r', 'indexes': {'G': ('g', 'gr')}},
+    'N': {'hash': 'h', 'range': 'n'},
+}
+
+@pytest.fixture
+def backends(tmp_path):
+    local = LocalDynamoDB(SCHEMA)
+    sqlite = SQLiteDynamoDB(str(tmp_path / 'hrms.db'), SCHEMA)
+    rnd = random.Random(1)
+    for _ in range(600):
+        item = {'h': {'S': f'h{rnd.randint(0, 3)}'}, 'r': {'S': f'r{rnd.randint(0, 80):03d}'},
+                'v': {'N': str(rnd.randint(0, 9))}}
+        if rnd.random() < 0.6: # Sparse GSI: only some items have its keys
+            item['g'] = {'S': f'g{rnd.randint(0, 2)}'}
+            item['gr'] = {'S': f'x{rnd.randint(0, 20):02d}'}
+        number = {'h': {'S': 'n'}, 'n': {'N': str(rnd.randint(-50, 50))}}
+        for client in (local, sqlite):
+            client.put_item(TableName='T', Item=dict(item))
+            client.put_item(TableName='N', Item=dict(number))
+    yield local, sqlite
+    sqlite.close()
+
+def all_pages(method, **kwargs):
+    """Every page of a query/scan, as a list of pages."""
+    pages = []
+    while True:
+        response = method(**kwargs)
+        pages.append(response.get('Items', []))
+        if not response.get('LastEvaluatedKey'):
+            return pages
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+QUERIES = [
+    dict(TableName='T', KeyConditionExpression='h = :h', ExpressionAttributeValues={':h': {'S': 'h1'}}),
+    dict(TableName='T', KeyConditionExpression='h = :h AND begins_with(r, :p)',
+         ExpressionAttributeValues={':h': {'S': 'h2'}, ':p': {'S': 'r01'}}),
+    dict(TableName='T', KeyConditionExpression='h = :h AND r BETWEEN :a AND :b', ScanIndexForward=False,
+         ExpressionAttributeValues={':h': {'S': 'h0'}, ':a': {'S': 'r010'}, ':b': {'S': 'r050'}}),
+    dict(TableName='T', KeyConditionExpression='h = :h AND r > :a', FilterExpression='v >= :v',
+         ExpressionAttributeValues={':h': {'S': 'h3'}, ':a': {'S': 'r040'}, ':v': {'N': '5'}}),
+    dict(TableName='T', KeyConditionExpression='h = :h', ProjectionExpression='r, v',
+         ExpressionAttributeValues={':h': {'S': 'h1'}}),
+    dict(TableName='T', IndexName='G', KeyConditionExpression='g = :g', ExpressionAttributeValues={':g': {'S': 'g1'}}),
+    dict(TableName='T', IndexName='G', KeyConditionExpression='g = :g AND gr <= :x', ScanIndexForward=False,
+         ExpressionAttributeValues={':g': {'S': 'g0'}, ':x': {'S': 'x10'}}),
+    dict(TableName='N', KeyConditionExpression='h = :h AND n >= :x',
+         ExpressionAttributeValues={':h': {'S': 'n'}, ':x': {'N': '-7'}}),
+]
+
+@pytest.mark.parametrize('query', QUERIES)
+@pytest.mark.parametrize('limit', [None, 1, 7, 50])
+def test_queries_match_page_by_page(backends, query, limit):
+    local, sqlite = backends
+    kwargs = dict(query, **({'Limit': limit} if limit else {}))
+    expected = all_pages(local.query, **kwargs)
+    assert all_pages(sqlite.query, **kwargs) == expected
+    assert any(expected)
+
+def test_segmented_scans_cover_the_same_items(backends):
+    local, sqlite = backends
+    def scanned(client, limit):
+        return sorted(str(item) for segment in range(3)
+                      for page in all_pages(client.scan, TableName='T', Segment=segment, TotalSegments=3,
+                                            **({'Limit': limit} if limit else {}))
+                      for item in page)
+    expected = scanned(local, None)
+    assert scanned(sqlite, 13) == expected
+    assert len(expected) == len(scanned(local, 13))
+
+def test_updates_and_conditions_match(backends):
+    results = []
+    for client in backends:
+        client.update_item(TableName='T', Key={'h': {'S': 'h9'}, 'r': {'S': 'x'}},
+                           UpdateExpression='SET v = if_not_exists(v, :z) + :one ADD c :one',
+                           ExpressionAttributeValues={':z': {'N': '0'}, ':one': {'N': '1'}})
+        with pytest.raises(client.exceptions.ConditionalCheckFailedException) as failed:
+            client.put_item(TableName='T', Item={'h': {'S': 'h9'}, 'r': {'S': 'x'}},
+                            ConditionExpression='attribute_not_exists(h)', ReturnValuesOnConditionCheckFailure='ALL_OLD')
+        results.append((failed.value.response.get('Item'),
+                        client.get_item(TableName='T', Key={'h': {'S': 'h9'}, 'r': {'S': 'x'}})['Item']))
+    assert results[0] == results[1]
+    assert results[0][1]['v'] == {'N': '1'}
+
+def test_cancelled_transactions_match(backends):
+    outcomes = []
+    for client in backends:
+        key = {'h': {'S': 'tx'}, 'r': {'S': 'guard'}}
+        client.put_item(TableName='T', Item=dict(key, version={'N': '1'}))
+        with pytest.raises(client.exceptions.TransactionCanceledException) as cancelled:
+            client.transact_write_items(TransactItems=[
+                {'Put': {'TableName': 'T', 'Item': {'h': {'S': 'tx'}, 'r': {'S': 'new'}}}},
+                {'ConditionCheck': {'TableName': 'T', 'Key': key, 'ConditionExpression': 'version = :seen',
+                                    'ExpressionAttributeValues': {':seen': {'N': '0'}}}},
+            ])
+        client.transact_write_items(TransactItems=[
+            {'Put': {'TableName': 'T', 'Item': {'h': {'S': 'tx'}, 'r': {'S': 'other'}}}},
+            {'Update': {'TableName': 'T', 'Key': key, 'UpdateExpression': 'SET version = :next',
+                        'ConditionExpression': 'version = :seen',
+                        'ExpressionAttributeValues': {':seen': {'N': '1'}, ':next': {'N': '2'}}}},
+        ])
+        outcomes.append(([r['Code'] for r in cancelled.value.response['CancellationReasons']],
+                         all_pages(client.query, TableName='T', KeyConditionExpression='h = :h',
+                                   ExpressionAttributeValues={':h': {'S': 'tx'}})))
+    assert outcomes[0] == outcomes[1]
+    assert outcomes[0][0] == ['None', 'ConditionalCheckFailed']
+
+def test_batch_operations_match(backends):
+    local, sqlite = backends
+    keys = [{'h': {'S': f'h{i % 4}'}, 'r': {'S': f'r{i:03d}'}} for i in range(0, 80, 3)]
+    requests = [{'DeleteRequest': {'Key': key}} for key in keys[:5]]
+    requests += [{'PutRequest': {'Item': {'h': {'S': 'b'}, 'r': {'S': f'{i:02d}'}}}} for i in range(10)]
+    responses = []
+    for client in backends:
+        client.batch_write_item(RequestItems={'T': requests})
+        response = client.batch_get_item(RequestItems={'T': {'Keys': keys + [{'h': {'S': 'b'}, 'r': {'S': '03'}}]}})
+        responses.append(sorted(str(item) for item in response['Responses']['T']))
+    assert responses[0] == responses[1]
@@ -0,0 +1,141 @@
+# timeline.py (The caller's activity feed: leaves, feedback and documents, newest first)
+# Each entity has a sparse GSI keyed (userId, <its timestamp>), so a user's items of one kind
+# can be read newest first, a page at a time. get_timeline opens one lazy reader per entity and
+# merges them with a heap-based k-way merge (the next item of every reader in a heap), stopping
+# as soon as the requested page is full: a reader fetches pages of at most `limit` items, and only
+# when the merge needs its next item, so a page costs at most one or two Queries per entity
+# whatever the length of the history.
+# The cursor records, per entity, the index key of the last item returned from it (null once
+# that entity is exhausted; absent if the entity hasn't been read yet), and the next page
+# resumes each reader right after that item. Items fetched but not returned are read again.
+# Timestamps are the ISO-8601 strings the clients send (submittedAt, timestamp, uploadDate),
+# or the server time when missing, so string order is time order.
+import heapq
+from collections import deque
+from common_utils import (get_response, negotiated, error_response, get_user_id_from_event, dynamodb_client,
+                          encode_cursor, decode_cursor, storage, ENTITY_ID_ATTRIBUTES)
+from memory_profile import sample_memory
+from profiling import profiled
+from warmup import handles_warmup
+
+# entity -> (GSI name, timestamp attribute); the same indexes exist on HRMS_Main for the single-table layout
+TIMELINE_INDEXES = {
+    'leave': ('LeaveTimelineIndex', 'submittedAt'),
+    'feedback': ('FeedbackTimelineIndex', 'timestamp'),
+    'document': ('DocumentTimelineIndex', 'uploadDate'),
+}
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+class TimelineReader:
+    """Lazily pages through one entity's items of a user, newest first."""
+
+    def __init__(self, entity, user_id, page_size, start_key=None):
+        self.entity = entity
+        self.index, self.time_attribute = TIMELINE_INDEXES[entity]
+        self.query_args = {
+            'TableName': storage.table(entity),
+            'IndexName': self.index,
+            'KeyConditionExpression': 'userId = :uid',
+            'ExpressionAttributeValues': {':uid': {'S': user_id}},
+            'ScanIndexForward': False,
+            'Limit': page_size
+        }
+        if start_key:
+            self.query_args['ExclusiveStartKey'] = start_key
+        self.buffer = deque()
+        self.more = True
+        self.pages = self.items_read = 0
+
+    def __iter__(self):
+        while True:
+            if not self.buffer:
+                if not self.more:
+                    return
+                response = dynamodb_client.query(**self.query_args)
+                self.pages += 1
+                self.items_read += len(response.get('Items', []))
+                self.buffer.extend(response.get('Items', []))
+                self.more = bool(response.get('LastEvaluatedKey'))
+                if self.more:
+                    self.query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+                continue
+            item = self.buffer.popleft()
+            yield item[self.time_attribute]['S'], self.entity, item
+
+    def start_key(self, item):
+        """The index key to resume this reader right after item."""
+        id_attribute = ENTITY_ID_ATTRIBUTES[self.entity]
+        return dict(storage.key(self.entity, item['userId']['S'], item[id_attribute]['S']),
+                    userId=item['userId'], **{self.time_attribute: item[self.time_attribute]})
+
+def _entry(entity, item):
+    attributes = storage.attributes(item)
+    entry = {k: v['S'] if 'S' in v else int(v['N']) for k, v in attributes.items() if 'S' in v or 'N' in v}
+    return dict(entry, type=entity, at=entry[TIMELINE_INDEXES[entity][1]])
+
+class _Newest(str):
+    """A timestamp that sorts first in a min-heap when it is the most recent."""
+    __slots__ = ()
+
+    def __lt__(self, other):
+        return str.__gt__(self, other)
+
+def read_timeline(user_id, limit, cursor=None):
+    """(entries, next cursor or None, readers) for the user's newest `limit` items after the cursor."""
+    cursor = cursor or {}
+    readers = {entity: TimelineReader(entity, user_id, limit, cursor.get(entity))
+               for entity in TIMELINE_INDEXES if cursor.get(entity, True) is not None}
+    streams = {entity: iter(reader) for entity, reader in readers.items()}
+    heap = [] # (newest timestamp first, tie-break, entity, item): the head of every reader with items left
+    def advance(order, entity):
+        head = next(streams[entity], None)
+        if head:
+            heapq.heappush(heap, (_Newest(head[0]), order, entity, head[2]))
+    for order, entity in enumerate(streams):
+        advance(order, entity)
+    page, last_returned = [], {}
+    while heap and len(page) < limit:
+        _, order, entity, item = heapq.heappop(heap)
+        page.append(_entry(entity, item))
+        last_returned[entity] = item
+        advance(order, entity)
+    if not heap:
+        return page, None, readers
+    pending = {entity for _, _, entity, _ in heap}
+    next_cursor = dict(cursor)
+    for entity, reader in readers.items():
+        if entity not in pending:
+            next_cursor[entity] = None # Exhausted
+        elif entity in last_returned:
+            next_cursor[entity] = reader.start_key(last_returned[entity])
+    return page, next_cursor, readers
+
+@handles_warmup
+@negotiated
+@sample_memory
+@profiled
+def get_timeline(event, context):
+    """Lambda function to return the caller's leaves, feedback and documents as one newest-first feed.
+
+    ?limit= (default 20, at most 100) and ?nextToken= from the previous page.
+    """
+    user_id = get_user_id_from_event(event)
+    if not user_id:
+        return get_response(401, {'message': 'Unauthorized: User ID missing.'})
+
+    try:
+        params = event.get('queryStringParameters') or {}
+        limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return get_response(400, {'message': f'limit must be between 1 and {MAX_PAGE_SIZE}.'})
+        cursor = decode_cursor(params.get('nextToken'))
+        if cursor is not None and (not isinstance(cursor, dict) or set(cursor) - set(TIMELINE_INDEXES)):
+            raise ValueError('Invalid pagination token.')
+        entries, next_cursor, _ = read_timeline(user_id, limit, cursor)
+        return get_response(200, {'timeline': entries, 'nextToken': encode_cursor(next_cursor)})
+    except ValueError as e:
+        return get_response(400, {'message': str(e)})
+    except Exception as e:
+        print(f"Error getting timeline for {user_id}: {e}")
+        return error_response(e)
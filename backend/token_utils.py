@@ -0,0 +1,138 @@
+# token_utils.py (Local verification of Cognito ID/access tokens)
+# Tokens are checked entirely in-process: RS256 signature against the user pool's JWKS,
+# then exp, iss, token_use and audience (aud for ID tokens, client_id for access tokens).
+# The JWKS is fetched once per warm container and refreshed when a token names an unknown
+# key id (Cognito key rotation), so steady-state verification makes no network calls.
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+import urllib.request
+
+JWKS_CACHE_TTL_SECONDS = 24 * 3600
+JWKS_MIN_REFRESH_SECONDS = 60 # Unknown kids trigger at most one refetch per minute
+CLOCK_SKEW_SECONDS = 30
+
+# ASN.1 DigestInfo prefix for SHA-256 in an EMSA-PKCS1-v1_5 encoded message (RFC 8017, 9.2)
+_SHA256_DIGEST_INFO = bytes.fromhex('3031300d060960864801650304020105000420')
+
+class TokenError(ValueError):
+    """Raised when a token is malformed, expired, or fails signature/claim checks."""
+
+def b64url_decode(segment):
+    """Decodes unpadded base64url, as used in JWT segments and JWK numbers."""
+    if isinstance(segment, str):
+        segment = segment.encode('ascii')
+    return base64.urlsafe_b64decode(segment + b'=' * (-len(segment) % 4))
+
+def _b64url_int(segment):
+    return int.from_bytes(b64url_decode(segment), 'big')
+
+def rsa_pkcs1_sha256_verify(message, signature, modulus, exponent):
+    """Verifies an RSASSA-PKCS1-v1_5 SHA-256 signature (JWT 'RS256') with a public key (n, e)."""
+    key_length = (modulus.bit_length() + 7) // 8
+    if len(signature) != key_length:
+        return False
+    signature_int = int.from_bytes(signature, 'big')
+    if signature_int >= modulus:
+        return False
+    encoded = pow(signature_int, exponent, modulus).to_bytes(key_length, 'big')
+    digest_info = _SHA256_DIGEST_INFO + hashlib.sha256(message).digest()
+    padding_length = key_length - len(digest_info) - 3
+    if padding_length < 8:
+        return False
+    expected = b'\x00\x01' + b'\xff' * padding_length + b'\x00' + digest_info
+    return hmac.compare_digest(encoded, expected)
+
+def split_token(token):
+    """Returns (header, claims, signing_input, signature) without verifying anything."""
+    try:
+        header_segment, payload_segment, signature_segment = token.split('.')
+        header = json.loads(b64url_decode(header_segment))
+        claims = json.loads(b64url_decode(payload_segment))
+        signature = b64url_decode(signature_segment)
+    except (ValueError, AttributeError) as e:
+        raise TokenError(f'Malformed token: {e}')
+    return header, claims, f'{header_segment}.{payload_segment}'.encode('ascii'), signature
+
+class CognitoTokenVerifier:
+    """Verifies Cognito user pool tokens against a cached JWKS.
+
+    jwks may be passed directly (a dict in JWKS JSON form) or jwks_loader may be any
+    zero-argument callable returning one, which lets tests and local runs work offline.
+    By default the JWKS is downloaded from the user pool's well-known URL.
+    """
+
+    def __init__(self, region, user_pool_id, client_id, jwks=None, jwks_loader=None):
+        self.region = region
+        self.user_pool_id = user_pool_id
+        self.client_id = client_id
+        self.issuer = f'https://cognito-idp.{region}.amazonaws.com/{user_pool_id}'
+        self._jwks_loader = jwks_loader or self._download_jwks
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        if jwks is not None:
+            self.set_jwks(jwks)
+
+    def _download_jwks(self):
+        with urllib.request.urlopen(f'{self.issuer}/.well-known/jwks.json', timeout=3) as response:
+            return json.loads(response.read())
+
+    def set_jwks(self, jwks):
+        """Replaces the cached key set (e.g. with a test or pre-warmed JWKS)."""
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            if jwk.get('kty') == 'RSA' and jwk.get('kid'):
+                keys[jwk['kid']] = (_b64url_int(jwk['n']), _b64url_int(jwk['e']))
+        with self._lock:
+            self._keys = keys
+            self._fetched_at = time.time()
+
+    def load_jwks(self, force=False):
+        """Fetches the JWKS if it was never loaded, is stale, or force is set (and the refetch limit allows)."""
+        age = time.time() - self._fetched_at
+        if self._keys and not force and age < JWKS_CACHE_TTL_SECONDS:
+            return
+        if force and self._fetched_at and age < JWKS_MIN_REFRESH_SECONDS:
+            return
+        self.set_jwks(self._jwks_loader())
+
+    def _public_key(self, kid):
+        self.load_jwks()
+        key = self._keys.get(kid)
+        if key is None:
+            self.load_jwks(force=True) # The pool may have rotated its signing key
+            key = self._keys.get(kid)
+        if key is None:
+            raise TokenError('Token signed with an unknown key.')
+        return key
+
+    def verify(self, token, token_use=None):
+        """Returns the token's claims if it is valid; raises TokenError otherwise.
+
+        token_use may be 'id' or 'access' to require a particular token type.
+        """
+        header, claims, signing_input, signature = split_token(token)
+        if header.get('alg') != 'RS256':
+            raise TokenError('Unsupported token algorithm.')
+        modulus, exponent = self._public_key(header.get('kid'))
+        if not rsa_pkcs1_sha256_verify(signing_input, signature, modulus, exponent):
+            raise TokenError('Invalid token signature.')
+
+        now = time.time()
+        if not isinstance(claims.get('exp'), (int, float)) or claims['exp'] < now - CLOCK_SKEW_SECONDS:
+            raise TokenError('Token has expired.')
+        if claims.get('iss') != self.issuer:
+            raise TokenError('Token was not issued by this user pool.')
+        use = claims.get('token_use')
+        if use not in ('id', 'access') or (token_use and use != token_use):
+            raise TokenError('Unexpected token_use.')
+        audience = claims.get('aud') if use == 'id' else claims.get('client_id')
+        if audience != self.client_id:
+            raise TokenError('Token was issued for a different app client.')
+        if not claims.get('sub'):
+            raise TokenError('Token has no subject.')
+        return claims
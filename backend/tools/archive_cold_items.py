@@ -0,0 +1,73 @@
+# tools/archive_cold_items.py
+# Moves decided leaves that ended, and feedback given, before the horizon out of DynamoDB into
+# each user's compressed archive object in S3 (see archive.py). Cold items are found with a
+# parallel filtered scan, grouped by user and moved one user at a time. Safe to re-run:
+# items already archived are merged by id, and a user updated concurrently is skipped.
+#
+#   python backend/tools/archive_cold_items.py [--horizon-days 365] [--segments 4] [--dry-run]
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import dynamodb_client
+from archive import ARCHIVED_ENTITIES, ARCHIVE_HORIZON_DAYS, archive_user, cold_scan_args, cutoff_date
+
+def scan_segment(entity, cutoff, segment, total_segments):
+    """The cold items of one parallel-scan segment of an entity's table."""
+    scan_args = dict(cold_scan_args(entity, cutoff), Segment=segment, TotalSegments=total_segments)
+    items = []
+    while True:
+        response = dynamodb_client.scan(**scan_args)
+        items.extend(response.get('Items', []))
+        if not response.get('LastEvaluatedKey'):
+            return items
+        scan_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def find_cold_items(cutoff, segments):
+    """{userId: {entity: [stored items]}} of everything older than the cutoff."""
+    by_user = defaultdict(lambda: defaultdict(list))
+    with ThreadPoolExecutor(max_workers=segments) as pool:
+        for entity in ARCHIVED_ENTITIES:
+            for items in pool.map(lambda s: scan_segment(entity, cutoff, s, segments), range(segments)):
+                for item in items:
+                    by_user[item['userId']['S']][entity].append(item)
+    return by_user
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive old leaves and feedback to per-user S3 objects.')
+    parser.add_argument('--horizon-days', type=int, default=ARCHIVE_HORIZON_DAYS)
+    parser.add_argument('--segments', type=int, default=4, help='parallel scan segments')
+    parser.add_argument('--workers', type=int, default=8, help='users archived concurrently')
+    parser.add_argument('--dry-run', action='store_true', help='only count what would be archived')
+    args = parser.parse_args()
+
+    started = time.time()
+    cutoff = cutoff_date(args.horizon_days)
+    by_user = find_cold_items(cutoff, args.segments)
+    counts = {entity: sum(len(items[entity]) for items in by_user.values()) for entity in ARCHIVED_ENTITIES}
+    print(f"Cold items before {cutoff}: {counts} across {len(by_user)} users")
+    if args.dry_run:
+        return
+
+    skipped, failed = [], []
+    def move(user_id):
+        try:
+            if archive_user(user_id, by_user[user_id]) is None:
+                skipped.append(user_id)
+        except Exception as e:
+            print(f"Could not archive {user_id}: {e}")
+            failed.append(user_id)
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        list(pool.map(move, list(by_user)))
+    print(f"Archived {len(by_user) - len(skipped) - len(failed)} users in {time.time() - started:.1f}s "
+          f"({len(skipped)} skipped after a concurrent update, {len(failed)} failed)")
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# tools/backfill_leave_aggregates.py
+# Counts leaves that already existed before the HRMS_Leaves stream was enabled (or repairs
+# drift) by feeding every stored leave through leave_reports.reconcile_leaves. The ledger
+# makes this safe to run at any time, including while the stream consumer is running:
+# leaves that are already counted correctly are skipped.
+#
+#   python backend/tools/backfill_leave_aggregates.py [--segments 4]
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import dynamodb_client, storage
+from leave_reports import reconcile_leaves
+
+def backfill_segment(segment, total_segments, chunk_size=100):
+    """Scans one parallel-scan segment of the stored leaves; returns (leaves seen, leaves that failed)."""
+    scan_args = dict(
+        storage.scan_args('leave'),
+        ProjectionExpression='userId, leaveId, leaveType, startDate, #s',
+        ExpressionAttributeNames={'#s': 'status'},
+        Segment=segment,
+        TotalSegments=total_segments
+    )
+    seen, failed = 0, []
+    while True:
+        response = dynamodb_client.scan(**scan_args)
+        items = response.get('Items', [])
+        for start in range(0, len(items), chunk_size):
+            failed.extend(reconcile_leaves(items[start:start + chunk_size]))
+        seen += len(items)
+        if not response.get('LastEvaluatedKey'):
+            return seen, failed
+        scan_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill HRMS_LeaveAggregates from the stored leaves.')
+    parser.add_argument('--segments', type=int, default=4, help='parallel scan segments')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.segments) as pool:
+        results = list(pool.map(lambda s: backfill_segment(s, args.segments), range(args.segments)))
+    seen = sum(r[0] for r in results)
+    failed = [key for r in results for key in r[1]]
+    print(f"Reconciled {seen} leaves in {time.perf_counter() - started:.1f}s")
+    if failed:
+        print(f"{len(failed)} leaves could not be written (re-run to retry): {failed[:20]}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
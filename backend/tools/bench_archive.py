@@ -0,0 +1,111 @@
+# tools/bench_archive.py
+# Hot/cold tiering (archive.py) on the local stand-ins: users with several years of decided
+# leaves and feedback are archived with a one-year horizon, then get_leaves/get_feedback are
+# compared before and after (latency, items and bytes read from DynamoDB), along with the
+# ?history=true read-through (S3 requests per call) and the DynamoDB vs S3 bytes stored.
+#
+#   python backend/tools/bench_archive.py [--users 200] [--years 5] [--latency-ms 2]
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import dynamodb_client, s3_client, batch_write_all, storage
+from archive import ARCHIVE_BUCKET, ARCHIVE_PREFIX, ARCHIVED_ENTITIES, cutoff_date
+from archive_cold_items import find_cold_items
+from archive import archive_user
+from feedback_manager import get_feedback
+from leave_manager import get_leaves
+
+def seed(users, years):
+    writes = {}
+    today = date.today()
+    for user in users:
+        for week in range(0, years * 52, 4): # A leave every four weeks, feedback every eight
+            start = today - timedelta(weeks=week)
+            leave = {'userId': {'S': user}, 'leaveId': {'S': f'leave-{week:04d}'}, 'leaveType': {'S': 'Annual'},
+                     'startDate': {'S': start.isoformat()}, 'endDate': {'S': (start + timedelta(days=2)).isoformat()},
+                     'status': {'S': 'Pending' if week < 4 else 'Approved'}, 'reason': {'S': 'Family trip'},
+                     'submittedAt': {'S': f'{start.isoformat()}T09:00:00Z'}}
+            writes.setdefault(storage.table('leave'), []).append({'PutRequest': {'Item': storage.item('leave', leave)}})
+            if week % 8 == 0:
+                feedback = {'userId': {'S': user}, 'feedbackId': {'S': f'fb-{week:04d}'},
+                            'feedback': {'S': 'Consistently strong delivery. ' * 4}, 'timestamp': {'S': start.isoformat()}}
+                writes.setdefault(storage.table('feedback'), []).append(
+                    {'PutRequest': {'Item': storage.item('feedback', feedback)}})
+    for table, requests in writes.items():
+        batch_write_all(table, requests)
+
+def stored_bytes(entity):
+    total, args = 0, storage.scan_args(entity)
+    while True:
+        response = dynamodb_client.scan(**args)
+        total += sum(len(json.dumps(item)) for item in response.get('Items', []))
+        if not response.get('LastEvaluatedKey'):
+            return total
+        args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def measure(label, handler, key, users, history=False):
+    latencies, items, body_bytes = [], 0, 0
+    dynamodb_client.raw.request_counts.clear()
+    s3_client.raw.request_counts.clear()
+    results = {}
+    for user in users:
+        params = {'userId': user, **({'history': 'true'} if history else {})}
+        started = time.perf_counter()
+        response = handler({'queryStringParameters': params}, None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        rows = json.loads(response['body'])[key]
+        results[user] = sorted(row[next(k for k in row if k.endswith('Id') and k != 'userId')] for row in rows)
+        items += len(rows)
+        body_bytes += len(response['body'])
+    s3_calls = sum(s3_client.raw.request_counts.values()) / len(users)
+    print(f"{label:<36} p50={statistics.median(latencies):6.2f}ms  items/call={items / len(users):5.1f}  "
+          f"response={body_bytes / len(users) / 1024:6.1f} KB  S3 requests/call={s3_calls:.1f}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark reads before and after archiving cold items to S3.')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--years', type=int, default=5, help='history per user')
+    parser.add_argument('--horizon-days', type=int, default=365)
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='simulated per-call DynamoDB/S3 latency')
+    args = parser.parse_args()
+
+    users = [f'user-{i:05d}' for i in range(args.users)]
+    seed(users, args.years)
+    before = {entity: stored_bytes(entity) for entity in ARCHIVED_ENTITIES}
+    dynamodb_client.raw.latency = s3_client.raw.latency = args.latency_ms / 1000.0
+    all_leaves = measure('get_leaves, before archiving', get_leaves, 'leaves', users)
+    all_feedback = measure('get_feedback, before archiving', get_feedback, 'feedback', users)
+
+    dynamodb_client.raw.latency = s3_client.raw.latency = 0
+    started = time.perf_counter()
+    by_user = find_cold_items(cutoff_date(args.horizon_days), 4)
+    for user_id, cold_items in by_user.items():
+        archive_user(user_id, cold_items)
+    print(f"archived {sum(len(v[e]) for v in by_user.values() for e in ARCHIVED_ENTITIES)} items of "
+          f"{len(by_user)} users in {time.perf_counter() - started:.1f}s (horizon {args.horizon_days} days)")
+
+    dynamodb_client.raw.latency = s3_client.raw.latency = args.latency_ms / 1000.0
+    measure('get_leaves, hot only', get_leaves, 'leaves', users)
+    measure('get_feedback, hot only', get_feedback, 'feedback', users)
+    history_leaves = measure('get_leaves?history=true', get_leaves, 'leaves', users, history=True)
+    history_feedback = measure('get_feedback?history=true', get_feedback, 'feedback', users, history=True)
+    print(f"history matches the pre-archive lists: {history_leaves == all_leaves and history_feedback == all_feedback}")
+
+    dynamodb_client.raw.latency = s3_client.raw.latency = 0
+    after = {entity: stored_bytes(entity) for entity in ARCHIVED_ENTITIES}
+    archived = sum(o['Size'] for o in s3_client.list_objects_v2(Bucket=ARCHIVE_BUCKET, Prefix=ARCHIVE_PREFIX,
+                                                                 MaxKeys=100000).get('Contents', []))
+    print(f"DynamoDB item bytes {sum(before.values()) / 1024:.0f} KB -> {sum(after.values()) / 1024:.0f} KB; "
+          f"S3 archive {archived / 1024:.0f} KB in {args.users} objects")
+
+if __name__ == '__main__':
+    main()
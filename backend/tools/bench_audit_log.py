@@ -0,0 +1,99 @@
+# tools/bench_audit_log.py
+# Handler latency with the audit log (audit.py) off, write-behind as in the self-hosted server,
+# flushed at the end of every Lambda invocation (the default there), and batched across Lambda
+# invocations (AUDIT_BATCH_INVOCATIONS=true), on the local stand-ins with simulated
+# DynamoDB and S3 latency. Afterwards the stored objects are read back with the query tool.
+#
+#   python backend/tools/bench_audit_log.py [--requests 2000] [--latency-ms 5] [--s3-latency-ms 20]
+import argparse
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audit
+from common_utils import dynamodb_client, s3_client
+from feedback_manager import submit_feedback
+from leave_manager import submit_leave
+from profile_manager import update_profile
+from query_audit_log import query, matcher
+
+LEAVES_FROM = date(2027, 1, 4)
+_leaves = itertools.count() # Every generated leave gets its own dates, so none is rejected as an overlap
+
+class Context:
+    def __init__(self, request_id):
+        self.aws_request_id = request_id
+
+def leave_body():
+    start = LEAVES_FROM + timedelta(days=2 * next(_leaves))
+    return {'leaveType': 'Annual', 'startDate': start.isoformat(), 'endDate': start.isoformat(), 'reason': 'Trip'}
+
+def requests(count):
+    calls = (
+        (update_profile, lambda: {'empId': 'E1', 'name': 'Bench User', 'email': 'b@example.com',
+                                  'department': 'Engineering'}),
+        (submit_leave, leave_body),
+        (submit_feedback, lambda: {'feedback': 'Great demo', 'timestamp': '2026-05-01'}),
+    )
+    for i in range(count):
+        handler, build = calls[i % len(calls)]
+        body = build()
+        user = f'user-{i % 200:04d}'
+        yield handler, {'queryStringParameters': {'userId': user}, 'body': json.dumps(dict(body, userId=user)),
+                        'requestContext': {'identity': {'sourceIp': '10.0.0.1'}}}
+
+def run(label, count, enabled, in_lambda, batch_invocations=False):
+    log = audit.audit_log
+    log.flush()
+    log.enabled, log.batch_invocations = enabled, batch_invocations
+    audit.IN_LAMBDA = in_lambda
+    before = dict(log.stats)
+    latencies = []
+    for i, (handler, event) in enumerate(requests(count)):
+        started = time.perf_counter()
+        response = handler(event, Context(f'{label}-{i}'))
+        latencies.append((time.perf_counter() - started) * 1000)
+        assert response['statusCode'] == 200, response
+    log.flush()
+    latencies.sort()
+    objects = log.stats['objects'] - before['objects']
+    raw = log.stats['raw_bytes'] - before['raw_bytes']
+    stored = log.stats['stored_bytes'] - before['stored_bytes']
+    print(f"{label:<34} mean={statistics.mean(latencies):6.2f}ms  p50={statistics.median(latencies):6.2f}ms  "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:6.2f}ms  events={log.stats['events'] - before['events']:>5}  "
+          f"objects={objects:>4}" + (f"  gzip {raw / max(stored, 1):.1f}x" if objects else ''))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark handler latency with the audit log on and off.')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='simulated per-call DynamoDB latency')
+    parser.add_argument('--s3-latency-ms', type=float, default=20.0, help='simulated per-call S3 latency')
+    args = parser.parse_args()
+
+    dynamodb_client.raw.latency = args.latency_ms / 1000.0
+    s3_client.raw.latency = args.s3_latency_ms / 1000.0
+    started = datetime.now(timezone.utc)
+    print(f"{args.requests} writes (update_profile, submit_leave, submit_feedback), "
+          f"DynamoDB {args.latency_ms}ms, S3 {args.s3_latency_ms}ms per call")
+    run('audit off', args.requests, False, False)
+    run('write-behind (server)', args.requests, True, False)
+    run('Lambda, flush every invocation', args.requests, True, True)
+    run('Lambda, batched across invocations', args.requests, True, True, batch_invocations=True)
+
+    until = datetime.now(timezone.utc) + timedelta(seconds=1)
+    s3_client.raw.latency = 0
+    events = list(query(audit.AUDIT_BUCKET, audit.AUDIT_PREFIX, started, until, matcher(started, until)))
+    leaves = list(query(audit.AUDIT_BUCKET, audit.AUDIT_PREFIX, started, until,
+                        matcher(started, until, actor='user-0001', action='leave.submit')))
+    print(f"query tool read back {len(events)} events ({3 * args.requests} recorded); "
+          f"{len(leaves)} leave.submit by user-0001")
+
+if __name__ == '__main__':
+    main()
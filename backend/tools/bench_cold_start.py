@@ -0,0 +1,81 @@
+# tools/bench_cold_start.py
+# Compares package size and INIT time (fresh interpreter importing the handler module, as a
+# Lambda cold start does) between the checked-in auth_lambda_package_*/*.zip files and the
+# artifacts tools/build_artifacts.py produces, with and without precompiled bytecode.
+# Artifacts are extracted to a temp dir and imported with bytecode writes disabled, like the
+# read-only /var/task in Lambda, so source-only packages recompile on every cold start.
+#
+#   python backend/tools/bench_cold_start.py [--runs 20]
+#
+# Runs with HRMS_LOCAL_BACKENDS=1: the "local" builds also package local_backends so they import
+# without boto3. The checked-in zips and the "deployable" build import boto3 (as in Lambda) and
+# are reported as failing to import where it isn't installed; their sizes are still compared.
+import argparse
+import glob
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from build_artifacts import build, BACKEND_DIR
+
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+INIT_SNIPPET = ('import importlib, sys, time; started = time.perf_counter(); '
+                'importlib.import_module(sys.argv[1]); print((time.perf_counter() - started) * 1000)')
+
+def unzipped_bytes(path):
+    with zipfile.ZipFile(path) as archive:
+        return sum(info.file_size for info in archive.infolist())
+
+def measure_init(zip_path, module, runs, local):
+    """Median/p90 import time in ms over fresh interpreters, or the import error."""
+    with tempfile.TemporaryDirectory() as task_dir:
+        with zipfile.ZipFile(zip_path) as archive:
+            archive.extractall(task_dir)
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1', HRMS_LOCAL_BACKENDS='1' if local else '')
+        env.pop('PYTHONPATH', None)
+        timings = []
+        for _ in range(runs):
+            result = subprocess.run([sys.executable, '-c', INIT_SNIPPET, module], cwd=task_dir, env=env,
+                                    capture_output=True, text=True)
+            if result.returncode != 0:
+                return None, result.stderr.strip().splitlines()[-1]
+            timings.append(float(result.stdout.strip().splitlines()[-1]))
+    timings.sort()
+    return (statistics.median(timings), timings[int(len(timings) * 0.9) - 1 if len(timings) >= 10 else -1]), None
+
+def report(label, zip_path, module, runs):
+    init, error = measure_init(zip_path, module, runs, local=label.startswith('local'))
+    timing = f"init p50={init[0]:6.2f}ms p90={init[1]:6.2f}ms" if init else f"init failed: {error}"
+    print(f"{module:<17} {label:<24} zip={os.path.getsize(zip_path):>6}B  "
+          f"unzipped={unzipped_bytes(zip_path):>7}B  {timing}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare cold-start INIT time and size of Lambda packages.')
+    parser.add_argument('--runs', type=int, default=20, help='fresh interpreters per package')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as out:
+        # Bytecode for this interpreter so it is actually used here; the real build targets the runtime
+        builds = {}
+        for label, options in (('deployable, precompiled', {'precompile': True}),
+                               ('local, source only', {'precompile': False, 'include_dev': True}),
+                               ('local, precompiled', {'precompile': True, 'include_dev': True}),
+                               ('local, sourceless', {'sourceless': True, 'include_dev': True})):
+            builds[label] = build(os.path.join(out, label.replace(', ', '-').replace(' ', '_')),
+                                  check_runtime=False, **options)
+        print()
+        legacy = {os.path.basename(p)[:-4]: p for p in glob.glob(os.path.join(REPO_DIR, 'auth_lambda_package_*', '*.zip'))}
+        for module in sorted(builds['local, precompiled']):
+            if module in legacy:
+                report('checked-in zip', legacy[module], module, args.runs)
+            for label, manifest in builds.items():
+                directory = os.path.join(out, label.replace(', ', '-').replace(' ', '_'))
+                report(label, os.path.join(directory, manifest[module]['zip']), module, args.runs)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# tools/bench_coverage.py
+# /leaves/coverage (staffing_coverage.py) for a large department over a year. A department of --members
+# people with about --leaves-per-member approved/pending/rejected leaves each is seeded on the
+# local stand-ins; then the headcount computation alone is timed, the difference-array sweep
+# against counting, for every day, the members with a leave covering it; and the whole
+# department_coverage and pre-approval check are timed with a simulated per-call latency.
+#
+#   python backend/tools/bench_coverage.py [--members 5000] [--leaves-per-member 8] [--days 365] [--latency-ms 2]
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import staffing_coverage
+from common_utils import dynamodb_client, batch_write_all, storage
+
+def seed(members, leaves_per_member, first, days):
+    """Profiles of one department and each member's non-overlapping leaves spread over the window."""
+    rng = random.Random(42)
+    profiles, leaves = [], []
+    for m in range(members):
+        user_id = f'member-{m:05d}'
+        profiles.append({'PutRequest': {'Item': storage.item('profile', {
+            'userId': {'S': user_id}, 'name': {'S': f'Member {m}'}, 'department': {'S': 'Engineering'}})}})
+        day = rng.randint(-10, days // leaves_per_member)
+        for n in range(leaves_per_member):
+            start = first + timedelta(days=day)
+            end = start + timedelta(days=rng.choice((0, 0, 1, 2, 4, 9)))
+            leaves.append({'PutRequest': {'Item': storage.item('leave', {
+                'userId': {'S': user_id}, 'leaveId': {'S': f'{user_id}-{n:02d}'}, 'leaveType': {'S': 'Annual'},
+                'startDate': {'S': start.isoformat()}, 'endDate': {'S': end.isoformat()},
+                'status': {'S': rng.choice(('Approved', 'Approved', 'Pending', 'Rejected'))}})}})
+            day += (end - start).days + 1 + rng.randint(1, 2 * days // leaves_per_member)
+    batch_write_all(storage.table('profile'), profiles)
+    batch_write_all(storage.table('leave'), leaves)
+    return len(leaves)
+
+def naive_away(leaves, first, last):
+    """For every day, the members with an approved (or any counted) leave covering it."""
+    approved, counted = [], []
+    ranges = [(user_id, date.fromisoformat(start), date.fromisoformat(end), status)
+              for user_id, _, start, end, status in leaves]
+    day = first
+    while day <= last:
+        covering = [(user_id, status) for user_id, start, end, status in ranges if start <= day <= end]
+        approved.append(len({user_id for user_id, status in covering if status == 'Approved'}))
+        counted.append(len({user_id for user_id, _ in covering}))
+        day += timedelta(days=1)
+    return approved, counted
+
+def median_ms(fn, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the department coverage sweep against per-day counting.')
+    parser.add_argument('--members', type=int, default=5000)
+    parser.add_argument('--leaves-per-member', type=int, default=8)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='simulated per-call DynamoDB latency')
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    first = date(2026, 1, 1)
+    last = first + timedelta(days=args.days - 1)
+    stored = seed(args.members, args.leaves_per_member, first, args.days)
+    members = staffing_coverage.department_members('Engineering')
+    leaves = staffing_coverage.load_leaves(members, first, last)
+    print(f"{len(members)} members, {stored} leaves stored, {len(leaves)} approved/pending in the {args.days}-day window")
+
+    sweep_ms, sweep = median_ms(lambda: staffing_coverage.daily_away(leaves, first, last), args.rounds)
+    naive_ms, naive = median_ms(lambda: naive_away(leaves, first, last), 1)
+    print(f"headcount: per-day counting {naive_ms:9.1f}ms  difference array {sweep_ms:7.1f}ms  "
+          f"same {tuple(sweep) == tuple(naive)}")
+
+    dynamodb_client.raw.latency = args.latency_ms / 1000.0
+    for workers in sorted({1, staffing_coverage.COVERAGE_QUERY_WORKERS}):
+        staffing_coverage.COVERAGE_QUERY_WORKERS = workers
+        dynamodb_client.raw.request_counts.clear()
+        total_ms, report = median_ms(lambda: staffing_coverage.department_coverage('Engineering', first, last), 1)
+        print(f"department_coverage, {workers:>2} query workers: {total_ms:8.1f}ms "
+              f"({sum(dynamodb_client.raw.request_counts.values())} calls), "
+              f"{len(report['shortDays'])} short days, {len(report['atRiskDays'])} at risk (minimum {report['minStaffed']})")
+    pending = next(leave for leave in leaves if leave[4] == 'Pending')
+    check_ms, check = median_ms(lambda: staffing_coverage.approval_shortfalls(pending[0], pending[1]), args.rounds)
+    print(f"pre-approval check of one pending leave: {check_ms:.1f}ms, canApprove {check['canApprove']}")
+    dynamodb_client.raw.latency = 0
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# tools/bench_field_projection.py
+# Measures what ?fields= saves on the list endpoints: bytes read from DynamoDB and the time to
+# parse them (the SDK's share), response body size and handler time (decode + encode), for all
+# attributes vs the handful the UI lists show. Runs against the local DynamoDB stand-in.
+#
+#   python backend/tools/bench_field_projection.py [--items 500] [--requests 200]
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import dynamodb_client, batch_write_all, storage, with_projection
+from bench_storage_layout import user_items
+import document_manager
+import feedback_manager
+import leave_manager
+
+USER = 'bench-user'
+CASES = (
+    ('get_documents', document_manager.get_documents, 'document', 'fileName,uploadDate'),
+    ('get_leaves', leave_manager.get_leaves, 'leave', 'leaveId,leaveType,startDate,status'),
+    ('get_feedback', feedback_manager.get_feedback, 'feedback', 'feedbackId,timestamp'),
+)
+
+def wire_cost(entity, fields, repeat=50):
+    """(bytes, ms to parse) of the Query response as DynamoDB sends it (JSON with typed attribute values)."""
+    args = with_projection(storage.query_args(entity, USER), fields.split(',') if fields else None)
+    payload = json.dumps(dynamodb_client.query(**args), separators=(',', ':'))
+    started = time.perf_counter()
+    for _ in range(repeat):
+        json.loads(payload) # What the SDK does with every response before our code sees it
+    return len(payload), (time.perf_counter() - started) * 1000 / repeat
+
+def run(label, handler, entity, fields, requests):
+    params = {'userId': USER}
+    if fields:
+        params['fields'] = fields
+    event = {'queryStringParameters': params}
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = handler(event, None)
+        latencies.append((time.perf_counter() - started) * 1000)
+    assert response['statusCode'] == 200, response
+    wire_size, parse_ms = wire_cost(entity, fields)
+    print(f"{label:<14} {('fields=' + fields) if fields else 'all fields':<44} "
+          f"DynamoDB={wire_size:>7}B parse={parse_ms:5.2f}ms  body={len(response['body']):>7}B  "
+          f"p50={statistics.median(latencies):6.2f}ms  mean={statistics.mean(latencies):6.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ?fields= projection on the list endpoints.')
+    parser.add_argument('--items', type=int, default=500, help='documents, leaves and feedback per user')
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    writes = {}
+    for entity, attributes in user_items(USER, args.items, args.items, args.items):
+        writes.setdefault(storage.table(entity), []).append({'PutRequest': {'Item': storage.item(entity, attributes)}})
+    for table, requests in writes.items():
+        batch_write_all(table, requests)
+
+    for label, handler, entity, fields in CASES:
+        run(label, handler, entity, None, args.requests)
+        run(label, handler, entity, fields, args.requests)
+
+if __name__ == '__main__':
+    main()
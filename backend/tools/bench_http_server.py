@@ -0,0 +1,163 @@
+# tools/bench_http_server.py
+# Throughput of the self-hosted HTTP mode (http_server.py) on the local stand-ins: a mix of
+# GET /profile, GET /leaves, GET /documents?fields=... and POST /feedback sent by concurrent
+# clients with keep-alive and with a new connection per request, for several handler pool
+# sizes, next to calling the same handlers in-process (no HTTP) as the ceiling.
+# Client and server share one process (and its GIL), so absolute numbers are conservative.
+#
+#   python backend/tools/bench_http_server.py [--requests 4000] [--clients 64] [--latency-ms 2]
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import cognito_client, dynamodb_client, batch_write_all, storage
+from http_server import HTTPServer, load_routes, build_event, invoke
+from bench_storage_layout import user_items
+
+EMAIL, PASSWORD = 'bench@example.com', 'Bench-password-1'
+
+def start_server(workers):
+    server = HTTPServer(load_routes(), host='127.0.0.1', port=0, workers=workers)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        ready.set()
+        loop.run_until_complete(server.serve_until_stopped())
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait()
+    return server, loop, thread
+
+def stop_server(server, loop, thread):
+    loop.call_soon_threadsafe(server.request_stop)
+    thread.join()
+
+async def send(reader, writer, method, path, token=None, body=None, close=False):
+    payload = json.dumps(body).encode('utf-8') if body is not None else b''
+    head = [f'{method} {path} HTTP/1.1', 'Host: bench', f'Content-Length: {len(payload)}']
+    if token:
+        head.append(f'Authorization: Bearer {token}')
+    if payload:
+        head.append('Content-Type: application/json')
+    if close:
+        head.append('Connection: close')
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+def request_mix(count):
+    routes = (('GET', '/profile', None), ('GET', '/leaves', None),
+              ('GET', '/documents?fields=fileName,uploadDate', None),
+              ('POST', '/feedback', {'feedback': 'Solid sprint', 'timestamp': '2026-03-01'}))
+    return [routes[i % len(routes)] for i in range(count)]
+
+async def http_load(port, token, requests, clients, keep_alive):
+    queue = list(request_mix(requests))
+    latencies, statuses = [], {}
+
+    async def client():
+        reader = writer = None
+        while queue:
+            method, path, body = queue.pop()
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            started = time.perf_counter()
+            status, _ = await send(reader, writer, method, path, token, body, close=not keep_alive)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+            if not keep_alive:
+                writer.close()
+                reader = writer = None
+        if writer:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return requests / (time.perf_counter() - started), latencies, statuses
+
+def report(label, throughput, latencies, statuses):
+    latencies.sort()
+    print(f"{label:<40} {throughput:8.0f} req/s  p50={statistics.median(latencies):7.2f}ms  "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:7.2f}ms  {statuses}")
+
+def in_process(token, requests, workers):
+    """The same handlers through invoke() on a thread pool, without HTTP."""
+    routes = load_routes()
+    latencies, statuses = [], {}
+
+    def call(entry):
+        method, target, body = entry
+        path = target.split('?', 1)[0]
+        event = build_event(method, target, [('Authorization', f'Bearer {token}')],
+                            json.dumps(body).encode('utf-8') if body else b'', '127.0.0.1')
+        handler, requires_auth = routes[(method, path)]
+        started = time.perf_counter()
+        response = invoke(handler, event, requires_auth)
+        return (time.perf_counter() - started) * 1000, response['statusCode']
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for latency, status in pool.map(call, request_mix(requests)):
+            latencies.append(latency)
+            statuses[status] = statuses.get(status, 0) + 1
+    return requests / (time.perf_counter() - started), latencies, statuses
+
+async def sign_in(port):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    await send(reader, writer, 'POST', '/auth/signup', body={'email': EMAIL, 'password': PASSWORD})
+    cognito_client.raw.users[EMAIL]['confirmed'] = True
+    status, body = await send(reader, writer, 'POST', '/auth/login', body={'email': EMAIL, 'password': PASSWORD})
+    writer.close()
+    assert status == 200, body
+    login = json.loads(body)
+    return login['idToken'], login['userId']
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the self-hosted HTTP server against in-process calls.')
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--clients', type=int, default=64, help='concurrent client connections')
+    parser.add_argument('--workers', type=int, nargs='+', default=[8, 32, 64], help='handler pool sizes to try')
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='simulated per-call DynamoDB latency')
+    args = parser.parse_args()
+
+    server, loop, thread = start_server(max(args.workers))
+    token, user_id = asyncio.run(sign_in(server.port))
+    stop_server(server, loop, thread)
+    writes = {}
+    for entity, attributes in user_items(user_id, 20, 10, 20):
+        writes.setdefault(storage.table(entity), []).append({'PutRequest': {'Item': storage.item(entity, attributes)}})
+    for table, requests in writes.items():
+        batch_write_all(table, requests)
+    dynamodb_client.raw.latency = args.latency_ms / 1000.0
+
+    for workers in args.workers:
+        report(f'in-process, {workers} threads', *in_process(token, args.requests, workers))
+        server, loop, thread = start_server(workers)
+        for keep_alive in (True, False):
+            result = asyncio.run(http_load(server.port, token, args.requests, args.clients, keep_alive))
+            report(f"HTTP {'keep-alive' if keep_alive else 'close'}, {workers} threads", *result)
+        stop_server(server, loop, thread)
+
+if __name__ == '__main__':
+    main()
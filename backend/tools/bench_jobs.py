@@ -0,0 +1,130 @@
+# tools/bench_jobs.py
+# The background job queue (jobs.py) on the local stand-ins, with a simulated per-call latency:
+#   1. enqueue overhead: submit_leave with the approver's notification enqueued against the same
+#      handler sending it inline (profile reads + SES SendEmail on the request path),
+#   2. worker throughput: --jobs document post-processing jobs (HeadObject + TransactWriteItems)
+#      drained by a JobWorker with 1..N threads (notification jobs are left out: they are capped
+#      by the SES sending rate, 14/s in resilience.py, whatever the thread count),
+#   3. retries: a job that always fails, on a queue with a 1 s visibility timeout and
+#      maxReceiveCount 3, until it lands in the dead-letter queue.
+# With --sqlite PATH the queue (and tables) are SQLite-backed (sqlite_backend.py) instead of in memory.
+#
+#   python backend/tools/bench_jobs.py [--jobs 500] [--threads 1 4 8 16] [--latency-ms 5] [--ses-latency-ms 50]
+#                                      [--sqlite /tmp/hrms.db]
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def timed(fn, rounds):
+    latencies = []
+    for i in range(rounds):
+        started = time.perf_counter()
+        fn(i)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies)
+
+def drain(job_worker, threads, jobs):
+    """Seconds a new JobWorker with `threads` threads takes to finish `jobs` queued jobs."""
+    started = time.perf_counter()
+    worker = job_worker.start_worker(threads)
+    while worker.stats['succeeded'] < jobs:
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - started
+    worker.stop()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark job enqueue overhead, worker throughput and retries.')
+    parser.add_argument('--jobs', type=int, default=500, help='jobs per throughput run')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8, 16], help='worker threads to try')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='simulated per-call AWS latency')
+    parser.add_argument('--ses-latency-ms', type=float, default=50.0, help='simulated SES SendEmail latency')
+    parser.add_argument('--rounds', type=int, default=12, help='submissions timed (inline sends stay within the SES burst)')
+    parser.add_argument('--sqlite', help='SQLite file for the queue and tables (default: in-memory stand-ins)')
+    args = parser.parse_args()
+    if args.sqlite:
+        os.environ['HRMS_SQLITE_PATH'] = args.sqlite
+
+    import jobs
+    import job_worker
+    import leave_manager
+    from common_utils import dynamodb_client, s3_client, sqs_client, ses_client, storage, JOB_QUEUE_URL, S3_BUCKET_NAME
+    from org_manager import set_manager
+    jobs.NOTIFICATION_SENDER = 'hrms@example.com' # Send through the SES stand-in rather than only logging
+    clients = (dynamodb_client, s3_client, sqs_client, ses_client)
+
+    set_manager('employee', 'manager')
+    for user_id in ('employee', 'manager'):
+        dynamodb_client.put_item(TableName=storage.table('profile'), Item=storage.item('profile', {
+            'userId': {'S': user_id}, 'name': {'S': user_id.title()}, 'email': {'S': f'{user_id}@example.com'}}))
+    submitted = []
+    def submit(i):
+        start = date(2027, 1, 4) + timedelta(days=3 * len(submitted))
+        submitted.append(start)
+        response = leave_manager.submit_leave({
+            'requestContext': {'authorizer': {'claims': {'sub': 'employee'}}},
+            'body': json.dumps({'leaveType': 'Annual', 'startDate': start.isoformat(),
+                                'endDate': (start + timedelta(days=1)).isoformat(), 'reason': 'Trip'})}, None)
+        assert response['statusCode'] == 200, response['body']
+
+    for client in clients:
+        client.raw.latency = args.latency_ms / 1000.0
+    ses_client.raw.latency = args.ses_latency_ms / 1000.0
+    payload = {'userId': 'employee', 'leaveId': 'leave-0', 'approverId': 'manager', 'leaveType': 'Annual',
+               'startDate': '2027-01-04', 'endDate': '2027-01-05', 'reason': 'Trip'}
+    enqueue_ms = timed(lambda i: jobs.enqueue('leave.submitted', payload), args.rounds)
+    queued_ms = timed(submit, args.rounds)
+    leave_manager.enqueue = lambda job_type, job_payload, **kwargs: jobs.JOB_HANDLERS[job_type](job_payload)
+    inline_ms = timed(submit, args.rounds)
+    leave_manager.enqueue = jobs.enqueue
+    print(f"enqueue alone {enqueue_ms:5.1f}ms   submit_leave: notification enqueued {queued_ms:5.1f}ms, "
+          f"sent inline {inline_ms:5.1f}ms ({len(ses_client.raw.sent)} emails sent)")
+    sqs_client.purge_queue(QueueUrl=JOB_QUEUE_URL)
+
+    def send_jobs(bodies):
+        for start in range(0, len(bodies), 10):
+            sqs_client.send_message_batch(QueueUrl=JOB_QUEUE_URL, Entries=[
+                {'Id': str(n), 'MessageBody': json.dumps(body)} for n, body in enumerate(bodies[start:start + 10])])
+
+    for threads in args.threads:
+        documents = []
+        for n in range(args.jobs):
+            document = {'userId': 'employee', 'documentId': f'doc-{threads}-{n}', 'fileSize': 1000,
+                        's3Bucket': S3_BUCKET_NAME, 's3Key': f'employee/doc-{threads}-{n}.pdf'}
+            dynamodb_client.put_item(TableName=storage.table('document'), Item=storage.item('document', {
+                'userId': {'S': 'employee'}, 'documentId': {'S': document['documentId']}, 'fileSize': {'N': '1000'}}))
+            s3_client.put_object(Bucket=S3_BUCKET_NAME, Key=document['s3Key'], Body=b'%PDF' + bytes(1000))
+            documents.append({'type': 'document.uploaded', 'payload': document})
+        send_jobs(documents)
+        elapsed = drain(job_worker, threads, args.jobs)
+        print(f"worker, {threads:>2} threads: {args.jobs} document jobs in {elapsed:6.2f}s = "
+              f"{args.jobs / elapsed:7.1f} jobs/s")
+
+    for client in clients:
+        client.raw.latency = 0
+    jobs.JOB_RETRY_BASE_SECONDS = 0 # Retry as soon as the message is visible again
+    sqs_client.raw.add_queue(JOB_QUEUE_URL, visibility_timeout=1, dead_letter_url='hrms-jobs-dlq', max_receives=3)
+    def fail(job_payload):
+        raise RuntimeError('downstream unavailable')
+    jobs.job('bench.fail')(fail)
+    dead_letters = lambda: int(sqs_client.get_queue_attributes(QueueUrl='hrms-jobs-dlq', AttributeNames=['All'])
+                               ['Attributes']['ApproximateNumberOfMessages'])
+    before = dead_letters()
+    worker = job_worker.start_worker(1)
+    worker.wait_seconds = 0.2
+    started = time.perf_counter()
+    jobs.enqueue('bench.fail', {})
+    while dead_letters() == before:
+        time.sleep(0.01)
+    worker.stop()
+    print(f"failing job: {worker.stats['failed']} attempts, then dead-lettered after {time.perf_counter() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# tools/bench_leave_overlap.py
+# The overlap check on leave submission (leave_manager.py) as a user's history grows: the bounded
+# LeaveStartIndex query against reading the user's whole leave partition and comparing ranges in
+# Python. Users with 100/1000/10000 past (non-overlapping) leaves are seeded on the local stand-ins
+# with a simulated per-call latency; for each, the check alone and a full submit_leave are timed,
+# with the DynamoDB calls and items read. Then --threads submissions of the same range by one
+# user race each other: exactly one must succeed, the others get 409 (overlap) or, when they kept
+# losing the guard item, 503 asking them to retry.
+# The stand-in has no 1 MB page limit, so the full-partition read needs more calls against DynamoDB than shown.
+#
+#   python backend/tools/bench_leave_overlap.py [--histories 100 1000 10000] [--threads 16] [--latency-ms 2]
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import leave_manager
+from common_utils import dynamodb_client, batch_write_all, storage
+
+class CountingClient:
+    """Passes calls through to the DynamoDB client, adding up the items each Query reads."""
+
+    def __init__(self, client):
+        self.client = client
+        self.items_read = 0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def query(self, **kwargs):
+        response = self.client.query(**kwargs)
+        self.items_read += response.get('ScannedCount', len(response.get('Items', [])))
+        return response
+
+counting = CountingClient(dynamodb_client)
+leave_manager.dynamodb_client = counting
+
+def seed(user_id, history, today):
+    """history 3-day leaves, one every week going back from today."""
+    requests = []
+    for i in range(history):
+        start = today - timedelta(weeks=i + 1)
+        item = {'userId': {'S': user_id}, 'leaveId': {'S': f'{user_id}-{i:06d}'}, 'leaveType': {'S': 'Annual'},
+                'startDate': {'S': start.isoformat()}, 'endDate': {'S': (start + timedelta(days=2)).isoformat()},
+                'status': {'S': ('Approved', 'Rejected', 'Pending')[i % 3]}, 'reason': {'S': 'Family event'}}
+        requests.append({'PutRequest': {'Item': storage.item('leave', item)}})
+    batch_write_all(storage.table('leave'), requests)
+
+def full_partition_overlaps(user_id, start_date, end_date):
+    """The check without the index: every leave of the user, compared in Python."""
+    conflicts, query_args = [], storage.query_args('leave', user_id)
+    while True:
+        response = counting.query(**query_args)
+        for item in response.get('Items', []):
+            if item['startDate']['S'] <= end_date and item['endDate']['S'] >= start_date \
+                    and item['status']['S'] != 'Rejected':
+                conflicts.append(item['leaveId']['S'])
+        if not response.get('LastEvaluatedKey'):
+            return sorted(conflicts)
+        query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def submit(user_id, start, end):
+    event = {'queryStringParameters': {'userId': user_id},
+             'body': json.dumps({'leaveType': 'Annual', 'startDate': start.isoformat(), 'endDate': end.isoformat()})}
+    return leave_manager.submit_leave(event, None)
+
+def timed(fn, rounds):
+    latencies, calls, items = [], 0, 0
+    for _ in range(rounds):
+        dynamodb_client.raw.request_counts.clear()
+        counting.items_read = 0
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+        calls, items = sum(dynamodb_client.raw.request_counts.values()), counting.items_read
+    return statistics.median(latencies), calls, items
+
+def race(threads, today):
+    """threads concurrent submissions of the same range by one user: status code -> count."""
+    start, barrier, codes, lock = today + timedelta(days=30), threading.Barrier(threads), {}, threading.Lock()
+    def worker():
+        barrier.wait()
+        code = submit('racer', start, start + timedelta(days=1))['statusCode']
+        with lock:
+            codes[code] = codes.get(code, 0) + 1
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    return codes
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the bounded leave overlap check against a full partition read.')
+    parser.add_argument('--histories', type=int, nargs='+', default=[100, 1000, 10000], help='past leaves per user')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent submissions of the same range')
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='simulated per-call DynamoDB latency')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    today = date(2026, 6, 1)
+    for history in args.histories:
+        user_id = f'user-{history}'
+        seed(user_id, history, today)
+        dynamodb_client.raw.latency = args.latency_ms / 1000.0
+        # A range clashing with the most recent past leave (Pending or Approved: history index 0 is Approved)
+        start, end = today - timedelta(weeks=1), today - timedelta(weeks=1) + timedelta(days=1)
+        expected = full_partition_overlaps(user_id, start.isoformat(), end.isoformat())
+        found = leave_manager.find_overlaps(user_id, start.isoformat(), end.isoformat())
+        full_ms, full_calls, full_items = timed(
+            lambda: full_partition_overlaps(user_id, start.isoformat(), end.isoformat()), args.rounds)
+        bounded_ms, bounded_calls, bounded_items = timed(
+            lambda: leave_manager.find_overlaps(user_id, start.isoformat(), end.isoformat()), args.rounds)
+        print(f"history={history:<6} check: full partition {full_ms:7.1f}ms ({full_calls} calls, {full_items} items)  "
+              f"bounded {bounded_ms:5.1f}ms ({bounded_calls} calls, {bounded_items} items)  same {found == expected}")
+        submitted = []
+        def submit_next(): # Each round a new 2-day leave after today, clear of the others
+            first = today + timedelta(days=3 * len(submitted))
+            submitted.append(first)
+            response = submit(user_id, first, first + timedelta(days=1))
+            assert response['statusCode'] == 200, response['body']
+        submit_ms, submit_calls, submit_items = timed(submit_next, args.rounds)
+        print(f"{'':<14} submit_leave {submit_ms:5.1f}ms ({submit_calls} calls, {submit_items} items queried)")
+        dynamodb_client.raw.latency = 0
+
+    codes = race(args.threads, today)
+    print(f"{args.threads} concurrent submissions of one range: {codes.get(200, 0)} accepted, "
+          f"{codes.get(409, 0)} rejected with 409, {codes.get(503, 0)} told to retry (503), "
+          f"other {sum(codes.values()) - codes.get(200, 0) - codes.get(409, 0) - codes.get(503, 0)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# tools/bench_org_closure.py
+# Benchmarks the org closure table against the in-memory DynamoDB stand-in:
+# bulk rebuild, the three hierarchy queries, and incremental manager moves.
+#
+#   python backend/tools/bench_org_closure.py [--employees 50000] [--levels 10]
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import dynamodb_client, PROFILES_TABLE
+import org_manager
+from rebuild_org_closure import rebuild
+
+def build_org(employees, levels):
+    """Returns ({userId: managerId}, [ids per level]) for a tree of exactly `levels` levels.
+
+    Level sizes grow geometrically (ratio chosen so they sum to `employees`) and each level's
+    members are spread round-robin across the managers of the level above.
+    """
+    low, high = 1.0, float(employees)
+    for _ in range(60):
+        ratio = (low + high) / 2
+        if sum(ratio ** level for level in range(levels)) < employees:
+            low = ratio
+        else:
+            high = ratio
+    sizes = [max(1, round(high ** level)) for level in range(levels)]
+    sizes[-1] = max(1, employees - sum(sizes[:-1]))
+
+    managers, tiers = {'emp-0': None}, [['emp-0']]
+    next_id = 1
+    for size in sizes[1:]:
+        tier = [f'emp-{next_id + i}' for i in range(size)]
+        for position, user_id in enumerate(tier):
+            managers[user_id] = tiers[-1][position % len(tiers[-1])]
+        next_id += size
+        tiers.append(tier)
+    return managers, tiers
+
+def timed(label, func, repeat=1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+    print(f"{label:<48} {elapsed_ms:10.2f} ms")
+    return result
+
+def invoke(handler, **params):
+    claims = {'sub': 'bench-hr', 'cognito:groups': 'HR'} # HR may query any part of the org
+    response = handler({'queryStringParameters': params, 'requestContext': {'authorizer': {'claims': claims}}}, None)
+    return json.loads(response['body'])
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the org closure table on local backends.')
+    parser.add_argument('--employees', type=int, default=50000)
+    parser.add_argument('--levels', type=int, default=10)
+    args = parser.parse_args()
+
+    managers, tiers = build_org(args.employees, args.levels)
+    for user_id, manager_id in managers.items():
+        item = {'userId': {'S': user_id}}
+        if manager_id:
+            item['managerId'] = {'S': manager_id}
+        dynamodb_client.put_item(TableName=PROFILES_TABLE, Item=item)
+    print(f"{len(managers)} employees across {len(tiers)} levels")
+
+    rows, _ = timed('bulk rebuild', lambda: rebuild(managers, workers=4))
+    print(f"{'closure rows':<48} {rows:10d}")
+
+    root, mid, leaf = tiers[0][0], tiers[len(tiers) // 2][0], tiers[-1][-1]
+    dynamodb_client.request_counts.clear()
+    timed('direct reports (root)', lambda: invoke(org_manager.get_direct_reports, managerId=root), repeat=20)
+    timed(f'all reports, first page (root)', lambda: invoke(org_manager.get_all_reports, managerId=root), repeat=20)
+    timed(f'all reports, first page (level {len(tiers) // 2})',
+          lambda: invoke(org_manager.get_all_reports, managerId=mid), repeat=20)
+    timed('management chain (leaf)', lambda: invoke(org_manager.get_management_chain, employeeId=leaf), repeat=20)
+    print(f"{'queries issued for 80 hierarchy calls':<48} {dynamodb_client.request_counts['Query']:10d}")
+
+    # Move a mid-level manager (and their subtree) under a different branch, then back
+    subtree = len(org_manager.get_descendants(mid))
+    other = tiers[1][-1]
+    dynamodb_client.request_counts.clear()
+    changed = timed(f'incremental move of {subtree}-person subtree', lambda: org_manager.set_manager(mid, other))
+    print(f"{'closure rows changed':<48} {changed:10d}")
+    print(f"{'TransactWriteItems calls':<48} {dynamodb_client.request_counts['TransactWriteItems']:10d}")
+    timed('leaf re-parent', lambda: org_manager.set_manager(leaf, tiers[-2][0]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# tools/bench_profile_batch.py
+# /profiles/batch against one get_profile call per user, on the local stand-ins with a simulated
+# per-call DynamoDB latency: N individual GetItems, the batch endpoint with a cold profile cache
+# (ceil(N/100) BatchGetItem calls, issued concurrently) and with a warm one (no DynamoDB calls).
+#
+#   python backend/tools/bench_profile_batch.py [--sizes 10 100 300] [--latency-ms 5] [--rounds 5]
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import dynamodb_client, batch_write_all, storage, profile_cache
+from profile_manager import get_profile, get_profiles_batch
+
+def seed(user_ids):
+    batch_write_all(storage.table('profile'), [{'PutRequest': {'Item': storage.item('profile', {
+        'userId': {'S': u}, 'empId': {'S': f'E{i:05d}'}, 'name': {'S': f'Employee {i}'},
+        'email': {'S': f'{u}@example.com'}, 'department': {'S': f'Dept {i % 12}'}})}}
+        for i, u in enumerate(user_ids)])
+
+def individual(user_ids):
+    return {u: json.loads(get_profile({'queryStringParameters': {'userId': u}}, None)['body'])['profile']
+            for u in user_ids}
+
+def batch(user_ids):
+    response = get_profiles_batch({'queryStringParameters': {'userId': 'manager'},
+                                   'body': json.dumps({'userIds': user_ids})}, None)
+    return json.loads(response['body'])['profiles']
+
+def timed(fn, user_ids, rounds, clear_cache):
+    latencies, calls = [], 0
+    for _ in range(rounds):
+        if clear_cache:
+            profile_cache.clear()
+        dynamodb_client.raw.request_counts.clear()
+        started = time.perf_counter()
+        result = fn(user_ids)
+        latencies.append((time.perf_counter() - started) * 1000)
+        calls = sum(dynamodb_client.raw.request_counts.values())
+    return statistics.median(latencies), calls, result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /profiles/batch against individual profile reads.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 300])
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='simulated per-call DynamoDB latency')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    user_ids = [f'user-{i:05d}' for i in range(max(args.sizes))]
+    seed(user_ids)
+    dynamodb_client.raw.latency = args.latency_ms / 1000.0
+    for size in args.sizes:
+        ids = user_ids[:size] + user_ids[:size // 10] # Some duplicates, as in a list of team leaves
+        single_ms, single_calls, expected = timed(individual, ids, args.rounds, clear_cache=True)
+        cold_ms, cold_calls, cold = timed(batch, ids, args.rounds, clear_cache=True)
+        warm_ms, warm_calls, warm = timed(batch, ids, args.rounds, clear_cache=False)
+        print(f"N={size:<4} individual {single_ms:8.1f}ms ({single_calls} calls)  "
+              f"batch cold {cold_ms:7.1f}ms ({cold_calls} calls)  batch warm {warm_ms:6.2f}ms ({warm_calls} calls)  "
+              f"speed-up {single_ms / cold_ms:5.1f}x  same result {cold == warm == expected}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# tools/bench_profiling.py
+# What the @profiled hook (profiling.py) adds to a handler: get_documents on the local stand-ins
+# is timed with the hook off, with the slow-call trigger watching every invocation (stack
+# sampler running, nothing stored), and with every invocation sampled by the stack sampler and
+# by cProfile (profiles written to a temporary PROFILE_DIR, one capture per invocation).
+#
+#   python backend/tools/bench_profiling.py [--invocations 2000] [--documents 40] [--interval-ms 5]
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+os.environ.setdefault('RESILIENCE_DYNAMODB_RATE', '1000000') # Back-to-back calls would hit the client-side rate limit
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import profiling
+import document_manager
+
+def timed(invocations, event):
+    latencies = []
+    for _ in range(invocations):
+        event['requestContext']['requestId'] = str(uuid.uuid4()) # One capture per invocation
+        started = time.perf_counter()
+        response = document_manager.get_documents(event, None)
+        latencies.append((time.perf_counter() - started) * 1e6)
+        assert response['statusCode'] == 200, response['body']
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99)]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the overhead of the profiling hook.')
+    parser.add_argument('--invocations', type=int, default=2000)
+    parser.add_argument('--documents', type=int, default=40, help='documents returned per call')
+    parser.add_argument('--interval-ms', type=float, default=5.0, help='stack sampling interval')
+    args = parser.parse_args()
+
+    for i in range(args.documents):
+        document_manager.upload_document({'requestContext': {'authorizer': {'claims': {'sub': 'employee'}}},
+                                          'body': json.dumps({'fileName': f'file-{i}.pdf', 'fileType': 'application/pdf',
+                                                              'fileSize': 1000})}, None)
+    event = {'httpMethod': 'GET', 'resource': '/documents', 'queryStringParameters': None,
+             'requestContext': {'requestId': 'bench', 'authorizer': {'claims': {'sub': 'employee'}}}}
+    profiling.sampler.interval = args.interval_ms / 1000.0
+    profiling.PROFILE_INTERVAL_MS = args.interval_ms
+    profiling.PROFILE_MAX_PER_MINUTE = args.invocations
+    profiling.PROFILE_DIR = tempfile.mkdtemp(prefix='hrms-profiles-')
+
+    settings = [('hook off', 0, 0, 'stack'), ('slow trigger armed', 0, 60000, 'stack'),
+                ('every call, stack sampler', 1, 0, 'stack'), ('every call, cProfile', 1, 0, 'cprofile')]
+    timed(args.invocations // 10, event) # Warm up
+    baseline = None
+    for label, rate, slow_ms, mode in settings:
+        profiling.PROFILE_SAMPLE_RATE, profiling.PROFILE_SLOW_MS, profiling.PROFILE_MODE = rate, slow_ms, mode
+        median_us, p99_us = timed(args.invocations, event)
+        baseline = baseline or median_us
+        print(f"{label:<28} median {median_us:7.1f}us  p99 {p99_us:7.1f}us  (+{median_us - baseline:6.1f}us)")
+    stored = sum(len(files) for _, _, files in os.walk(profiling.PROFILE_DIR))
+    print(f"{stored} profiles stored in {profiling.PROFILE_DIR}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# tools/bench_provision_users.py
+# Benchmarks tools/provision_users.py against the local Cognito/DynamoDB stand-ins:
+# throughput by worker count, a quota-bound run, error reporting under injected faults,
+# and resuming an interrupted run from its checkpoint.
+#
+#   python backend/tools/bench_provision_users.py [--users 2000] [--latency-ms 40]
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import resilience
+from common_utils import cognito_client, dynamodb_client, PROFILES_TABLE
+from provision_users import provision
+
+def write_users(path, count, domain):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({'email': f'user{i}@{domain}', 'name': f'User {i}', 'empId': f'E{i:06d}',
+                                'department': ('Engineering', 'Sales', 'Finance', 'People')[i % 4]}) + '\n')
+
+def count_profiles(domain):
+    count, scan_args = 0, {'TableName': PROFILES_TABLE}
+    while True:
+        response = dynamodb_client.scan(**scan_args)
+        count += sum(1 for item in response['Items'] if item['email']['S'].endswith('@' + domain))
+        if not response.get('LastEvaluatedKey'):
+            return count
+        scan_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def run(label, workdir, users, workers, rate, **kwargs):
+    domain = re.sub(r'[^a-z0-9]+', '-', label.lower()) + '.example.com'
+    input_path = os.path.join(workdir, f'{domain}.jsonl')
+    write_users(input_path, users, domain)
+    resilience.get_dependency('cognito').bucket.configure(rate)
+    checkpoint_path = input_path + '.checkpoint.json'
+    started = time.perf_counter()
+    checkpoint = provision(input_path, checkpoint_path, workers=workers, **kwargs)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {checkpoint['records'] / elapsed:8.1f} users/s  created={checkpoint['created']} "
+          f"failed={checkpoint['failed']} profiles={count_profiles(domain)} errors={checkpoint['errorCodes']}")
+    return input_path, checkpoint_path, domain
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bulk user provisioning on local backends.')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=40.0, help='simulated per-call latency')
+    args = parser.parse_args()
+    cognito_client.raw.latency = dynamodb_client.raw.latency = args.latency_ms / 1000.0
+
+    with tempfile.TemporaryDirectory() as workdir:
+        unlimited = 10000.0
+        for workers in (1, 4, 16, 32):
+            run(f'{workers} workers, no rate cap', workdir, args.users, workers, unlimited)
+        run('16 workers, 25 req/s quota', workdir, min(args.users, 500), 16, 25.0)
+
+        invalid = cognito_client.inject_faults('InvalidParameterException', rate=0.01, operations={'AdminCreateUser'})
+        throttled = cognito_client.inject_faults('TooManyRequestsException', rate=0.05, operations={'AdminCreateUser'})
+        run('16 workers, 1% invalid + 5% 429', workdir, args.users, 16, unlimited)
+        cognito_client.clear_faults(invalid)
+        cognito_client.clear_faults(throttled)
+
+        # Interrupt after two windows, then resume from the checkpoint
+        first_run = min(args.users, 500)
+        input_path, checkpoint_path, domain = run('interrupted after 2 windows', workdir, args.users, 16, unlimited,
+                                                  limit=first_run)
+        started = time.perf_counter()
+        checkpoint = provision(input_path, checkpoint_path, workers=16)
+        resumed = checkpoint['records'] - first_run
+        print(f"{'resumed from checkpoint':<34} {resumed / (time.perf_counter() - started):8.1f}"
+              f" users/s  records={checkpoint['records']} profiles={count_profiles(domain)}")
+
+if __name__ == '__main__':
+    main()
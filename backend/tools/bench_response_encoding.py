@@ -0,0 +1,88 @@
+# tools/bench_response_encoding.py
+# JSON against MessagePack response bodies for document and leave listings of realistic sizes:
+# wire bytes (what the client receives), Lambda payload bytes (MessagePack travels base64-encoded
+# between Lambda and API Gateway), server encode time (the whole get_response call) and client
+# decode time. MessagePack is only measured when the msgpack package is installed (as in Lambda,
+# where the API answers JSON without it).
+#
+#   python backend/tools/bench_response_encoding.py [--sizes 10 100 1000 5000] [--rounds 20]
+import argparse
+import base64
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import get_response, negotiated, msgpack_module
+
+def documents(n):
+    today = date.today()
+    rows = []
+    for i in range(n):
+        key = f'user-00042/{uuid.uuid4()}-payslip-{i:04d}.pdf'
+        rows.append({'userId': 'user-00042', 'documentId': str(uuid.uuid4()), 'fileName': f'payslip-{i:04d}.pdf',
+                     'fileType': 'application/pdf', 'fileSize': 48000 + i * 37,
+                     'uploadDate': (today - timedelta(days=i)).isoformat(), 's3Key': key,
+                     's3Bucket': 'f13tech-hrms-documents',
+                     'downloadUrl': f'https://f13tech-hrms-documents.s3.amazonaws.com/{key}'})
+    return {'documents': rows}
+
+def leaves(n):
+    today = date.today()
+    rows = []
+    for i in range(n):
+        start = today - timedelta(days=3 * i)
+        rows.append({'userId': f'user-{i % 40:05d}', 'leaveId': str(uuid.uuid4()),
+                     'leaveType': ('Annual', 'Sick', 'Comp')[i % 3], 'startDate': start.isoformat(),
+                     'endDate': (start + timedelta(days=i % 5)).isoformat(),
+                     'status': ('Pending', 'Approved', 'Rejected')[i % 3], 'reason': 'Family event',
+                     'pendingApproverId': 'user-00001', 'submittedAt': f'{start.isoformat()}T09:30:00Z'})
+    return {'leaves': rows, 'nextToken': None}
+
+def median_ms(fn, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def respond(body, accept):
+    return negotiated(lambda event, context: get_response(200, body))({'headers': {'Accept': accept}}, None)
+
+def measure(label, body, accept, decode, rounds):
+    response = respond(body, accept)
+    payload = response['body'].encode('ascii' if response.get('isBase64Encoded') else 'utf-8')
+    wire = base64.b64decode(payload) if response.get('isBase64Encoded') else payload
+    assert decode(wire) == body
+    encode_ms = median_ms(lambda: respond(body, accept), rounds)
+    decode_ms = median_ms(lambda: decode(wire), rounds)
+    print(f"  {label:<24} wire {len(wire) / 1024:8.1f} KB  payload {len(payload) / 1024:8.1f} KB  "
+          f"encode {encode_ms:7.2f}ms  decode {decode_ms:7.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON against MessagePack response encoding.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    msgpack = msgpack_module()
+    if not msgpack:
+        print("msgpack is not installed: responses are always JSON, only JSON is measured")
+    for name, build in (('documents', documents), ('leaves', leaves)):
+        for size in args.sizes:
+            body = build(size)
+            print(f"{name} x{size}")
+            measure('json', body, 'application/json', json.loads, args.rounds)
+            if msgpack:
+                measure('msgpack', body, 'application/msgpack', lambda wire: msgpack.unpackb(wire, raw=False),
+                        args.rounds)
+
+if __name__ == '__main__':
+    main()
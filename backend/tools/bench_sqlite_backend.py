@@ -0,0 +1,114 @@
+# tools/bench_sqlite_backend.py
+# Single-node throughput of the SQLite storage backend (sqlite_backend.py) for mixed traffic
+# through the real handlers: GET /profile, GET /leaves, GET /documents?fields=..., POST /leaves,
+# POST /feedback and POST /profile from a pool of concurrent callers, next to the in-memory
+# stand-in as the no-I/O reference. Each backend runs in its own process (the backend is
+# chosen when common_utils is imported).
+#
+#   python backend/tools/bench_sqlite_backend.py [--users 1000] [--requests 20000] [--threads 1 8 32]
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def seed(users, per_user):
+    from common_utils import batch_write_all, storage
+    from bench_storage_layout import user_items
+    writes = {}
+    for user in users:
+        for entity, attributes in user_items(user, per_user, per_user, per_user):
+            writes.setdefault(storage.table(entity), []).append(
+                {'PutRequest': {'Item': storage.item(entity, attributes)}})
+    for table, requests in writes.items():
+        batch_write_all(table, requests)
+
+LEAVES_FROM = date(2027, 1, 4) # After the seeded leaves
+_leaves = itertools.count() # Every submitted leave gets its own dates, so none is rejected as an overlap
+
+def leave_body():
+    start = LEAVES_FROM + timedelta(days=2 * next(_leaves))
+    return {'leaveType': 'Annual', 'startDate': start.isoformat(), 'endDate': start.isoformat(), 'reason': 'Trip'}
+
+def operations():
+    import document_manager
+    import feedback_manager
+    import leave_manager
+    import profile_manager
+    return [ # (weight, name, handler, query parameters, body or a function returning one)
+        (30, 'GET /profile', profile_manager.get_profile, {}, None),
+        (25, 'GET /leaves', leave_manager.get_leaves, {}, None),
+        (25, 'GET /documents', document_manager.get_documents, {'fields': 'fileName,uploadDate'}, None),
+        (8, 'POST /leaves', leave_manager.submit_leave, {}, leave_body),
+        (7, 'POST /feedback', feedback_manager.submit_feedback, {}, {'feedback': 'Great demo', 'timestamp': '2026-05-01'}),
+        (5, 'POST /profile', profile_manager.update_profile, {},
+         {'empId': 'E1', 'name': 'Updated Name', 'email': 'u@example.com', 'department': 'Engineering'}),
+    ]
+
+def run_backend(args):
+    """Runs the load against the backend selected by the environment and prints one line per thread count."""
+    sys.path.insert(0, BACKEND_DIR)
+    users = [f'user-{i:05d}' for i in range(args.users)]
+    seed(users, args.items)
+    ops = operations()
+    weights = [op[0] for op in ops]
+    rnd = random.Random(7)
+    plan = [(rnd.choices(ops, weights)[0], rnd.choice(users)) for _ in range(args.requests)]
+
+    def call(entry):
+        (_, name, handler, params, body), user = entry
+        event = {'queryStringParameters': dict(params), 'requestContext': {'authorizer': {'claims': {'sub': user}}}}
+        if body is not None:
+            event['body'] = json.dumps(body() if callable(body) else body)
+        started = time.perf_counter()
+        status = handler(event, None)['statusCode']
+        return name, status, (time.perf_counter() - started) * 1000
+
+    for threads in args.threads:
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for name, status, latency in pool.map(call, plan):
+                latencies.append(latency)
+                errors += status >= 400
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        print(f"{args.backend:<7} {threads:>3} threads  {len(plan) / elapsed:8.0f} req/s  "
+              f"p50={statistics.median(latencies):6.2f}ms  p99={latencies[int(len(latencies) * 0.99) - 1]:6.2f}ms  "
+              f"errors={errors}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark mixed handler traffic on the SQLite backend.')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=5, help='leaves, feedback and documents per user')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--backend', choices=('sqlite', 'memory'), help='run one backend in this process')
+    parser.add_argument('--db', help='SQLite file (default: a temporary file)')
+    args = parser.parse_args()
+
+    if args.backend:
+        run_backend(args)
+        return
+    print(f"{args.users} users, {args.requests} requests: 80% reads (profile, leaves, documents), 20% writes")
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in ('memory', 'sqlite'):
+            env = dict(os.environ, HRMS_LOCAL_BACKENDS='1')
+            env.pop('HRMS_SQLITE_PATH', None)
+            if backend == 'sqlite':
+                env['HRMS_SQLITE_PATH'] = args.db or os.path.join(tmp, 'hrms.db')
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--backend', backend,
+                            '--users', str(args.users), '--items', str(args.items), '--requests', str(args.requests),
+                            '--threads', *map(str, args.threads)], env=env, check=True)
+
+if __name__ == '__main__':
+    main()
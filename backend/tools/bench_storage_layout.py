@@ -0,0 +1,75 @@
+# tools/bench_storage_layout.py
+# Compares reading a user's full record (profile, leaves, feedback, documents) in the
+# per-entity-table layout and the single-table layout on the local DynamoDB stand-in:
+# latency and DynamoDB requests per record.
+#
+#   python backend/tools/bench_storage_layout.py [--users 200] [--latency-ms 5]
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import dynamodb_client, batch_write_all, get_user_record, LAYOUTS
+
+def user_items(user_id, leaves, feedback, documents):
+    """Yields (entity, attributes) for one synthetic user."""
+    yield 'profile', {'userId': {'S': user_id}, 'name': {'S': f'Name {user_id}'}, 'department': {'S': 'Engineering'},
+                      'email': {'S': f'{user_id}@example.com'}, 'empId': {'S': user_id.upper()}}
+    for i in range(leaves):
+        yield 'leave', {'userId': {'S': user_id}, 'leaveId': {'S': f'leave-{i:04d}'}, 'leaveType': {'S': 'Annual'},
+                        'startDate': {'S': '2026-03-02'}, 'endDate': {'S': '2026-03-06'}, 'status': {'S': 'Approved'},
+                        'reason': {'S': 'Family trip'}, 'submittedAt': {'S': '2026-02-01T09:00:00Z'}}
+    for i in range(feedback):
+        yield 'feedback', {'userId': {'S': user_id}, 'feedbackId': {'S': f'fb-{i:04d}'},
+                           'feedback': {'S': 'Consistently strong delivery. ' * 4}, 'timestamp': {'S': '2026-01-15'}}
+    for i in range(documents):
+        yield 'document', {'userId': {'S': user_id}, 'documentId': {'S': f'doc-{i:04d}'},
+                           'fileName': {'S': f'payslip-{i}.pdf'}, 'fileType': {'S': 'application/pdf'},
+                           'fileSize': {'N': '48213'}, 'uploadDate': {'S': '2026-01-31'},
+                           's3Key': {'S': f'{user_id}/doc-{i}.pdf'}, 's3Bucket': {'S': 'hrms-docs'},
+                           'downloadUrl': {'S': f'https://hrms-docs.s3.amazonaws.com/{user_id}/doc-{i}.pdf'}}
+
+def load(users, leaves, feedback, documents):
+    for layout in LAYOUTS.values():
+        writes = {}
+        for user in users:
+            for entity, attributes in user_items(user, leaves, feedback, documents):
+                writes.setdefault(layout.table(entity), []).append(
+                    {'PutRequest': {'Item': layout.item(entity, attributes)}})
+        for table, requests in writes.items():
+            batch_write_all(table, requests)
+
+def measure(layout, users):
+    latencies = []
+    dynamodb_client.request_counts.clear()
+    for user in users:
+        started = time.perf_counter()
+        record = get_user_record(user, layout=layout)
+        latencies.append((time.perf_counter() - started) * 1000)
+    requests = sum(dynamodb_client.request_counts.values()) / len(users)
+    items = 1 + len(record['leave']) + len(record['feedback']) + len(record['document'])
+    print(f"{layout.name + '-table layout':<20} p50={statistics.median(latencies):6.2f}ms  "
+          f"mean={statistics.mean(latencies):6.2f}ms  requests/record={requests:.2f}  "
+          f"items/record={items}  {dict(dynamodb_client.request_counts)}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare full-record reads across storage layouts.')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--leaves', type=int, default=12)
+    parser.add_argument('--feedback', type=int, default=8)
+    parser.add_argument('--documents', type=int, default=6)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='simulated per-request latency')
+    args = parser.parse_args()
+
+    users = [f'user-{i:05d}' for i in range(args.users)]
+    load(users, args.leaves, args.feedback, args.documents)
+    dynamodb_client.raw.latency = args.latency_ms / 1000.0
+    for layout in (LAYOUTS['multi'], LAYOUTS['single']):
+        measure(layout, users)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# tools/bench_timeline.py
+# /me/timeline (lazy readers + k-way merge, timeline.py) against what clients did before: query
+# all leaves, feedback and documents of the user and sort them. Users with growing histories
+# are seeded on the local stand-ins with a simulated per-call latency; for each history size the
+# first page and a page deep in the feed are timed, with the DynamoDB calls and items read.
+# The stand-in has no 1 MB page limit, so fetch-all needs more calls against DynamoDB than shown.
+#
+#   python backend/tools/bench_timeline.py [--histories 60 600 6000] [--limit 20] [--latency-ms 2]
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('HRMS_LOCAL_BACKENDS', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import dynamodb_client, batch_write_all, storage, ENTITY_ID_ATTRIBUTES
+from timeline import TIMELINE_INDEXES, read_timeline
+
+def seed(user_id, history):
+    writes, now = {}, datetime(2026, 1, 1)
+    for i in range(history):
+        entity = ('leave', 'feedback', 'document')[i % 3]
+        item = {'userId': {'S': user_id}, ENTITY_ID_ATTRIBUTES[entity]: {'S': f'{entity}-{i:06d}'},
+                TIMELINE_INDEXES[entity][1]: {'S': (now - timedelta(hours=7 * i)).strftime('%Y-%m-%dT%H:%M:%SZ')},
+                'note': {'S': 'Some text carried by the item, like a reason or a file name.'}}
+        writes.setdefault(storage.table(entity), []).append({'PutRequest': {'Item': storage.item(entity, item)}})
+    for table, requests in writes.items():
+        batch_write_all(table, requests)
+
+def fetch_all_and_sort(user_id, limit, skip):
+    items = []
+    for entity, (_, attribute) in TIMELINE_INDEXES.items():
+        query_args = storage.query_args(entity, user_id)
+        while True:
+            response = dynamodb_client.query(**query_args)
+            items.extend((item[attribute]['S'], entity, item) for item in response.get('Items', []))
+            if not response.get('LastEvaluatedKey'):
+                break
+            query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    items.sort(key=lambda entry: entry[0], reverse=True)
+    return items[skip:skip + limit]
+
+def cursor_at(user_id, limit, skip):
+    """The cursor of the page starting `skip` items into the feed."""
+    cursor = None
+    for _ in range(skip // limit):
+        _, cursor, _ = read_timeline(user_id, limit, cursor)
+    return cursor
+
+def timed(fn, rounds):
+    latencies = []
+    for _ in range(rounds):
+        dynamodb_client.raw.request_counts.clear()
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies), sum(dynamodb_client.raw.request_counts.values())
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the merged timeline against fetching everything and sorting.')
+    parser.add_argument('--histories', type=int, nargs='+', default=[60, 600, 6000], help='items per user')
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=2.0, help='simulated per-call DynamoDB latency')
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    for history in args.histories:
+        user_id = f'user-{history}'
+        seed(user_id, history)
+        dynamodb_client.raw.latency = args.latency_ms / 1000.0
+        for label, skip in (('first page', 0), ('page 3', 2 * args.limit)):
+            if skip >= history:
+                continue
+            cursor = cursor_at(user_id, args.limit, skip)
+            all_ms, all_calls = timed(lambda: fetch_all_and_sort(user_id, args.limit, skip), args.rounds)
+            merged_ms, merged_calls = timed(lambda: read_timeline(user_id, args.limit, cursor), args.rounds)
+            expected = [item[ENTITY_ID_ATTRIBUTES[entity]]['S']
+                        for _, entity, item in fetch_all_and_sort(user_id, args.limit, skip)]
+            page, _, readers = read_timeline(user_id, args.limit, cursor)
+            same = [entry[ENTITY_ID_ATTRIBUTES[entry['type']]] for entry in page] == expected
+            print(f"history={history:<6} {label:<10} fetch-all+sort {all_ms:7.1f}ms ({all_calls} calls, {history} items)  "
+                  f"merged {merged_ms:5.1f}ms ({merged_calls} calls, {sum(r.items_read for r in readers.values())} items)"
+                  f"  same page {same}")
+        dynamodb_client.raw.latency = 0
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+# tools/build_artifacts.py
+# Builds one deployment zip per handler module from backend/ (the only source of truth; the
+# Others/ and auth_lambda_package_* copies are not used). Each zip holds just the handler's
+# import closure within backend/, with bytecode precompiled, and is byte-for-byte reproducible:
+# entries are sorted, timestamps and permissions are fixed and the .pyc files use hash-based
+# invalidation instead of source mtimes.
+#
+#   python backend/tools/build_artifacts.py [--out build/lambda] [--sourceless]
+#   sam deploy -t build/lambda/template.yaml ...
+#
+# The output directory gets functions/<module>.zip, manifest.json (functions, files, sizes and
+# sha256 per zip) and a copy of template.yaml whose CodeUri entries point at the zips.
+# Bytecode is only loaded by the interpreter version that wrote it, so run the build with the
+# Python version of the functions' Runtime (python3.9); otherwise the .pyc files are skipped.
+import argparse
+import ast
+import hashlib
+import io
+import json
+import os
+import py_compile
+import re
+import sys
+import tempfile
+import zipfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE = os.path.join(BACKEND_DIR, 'template.yaml')
+
+# Only imported for local runs and benchmarks (HRMS_LOCAL_BACKENDS=1) or on-prem storage
+# (HRMS_SQLITE_PATH), never in Lambda
+DEV_ONLY_MODULES = {'local_backends', 'sqlite_backend'}
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+RESOURCE_LINE = re.compile(r'^  ([A-Za-z0-9]+):\s*(#.*)?$')
+HANDLER_LINE = re.compile(r'^\s+Handler:\s*([A-Za-z0-9_]+)\.([A-Za-z0-9_]+)')
+CODE_URI_LINE = re.compile(r'^(\s+CodeUri:\s*)(\S+)(.*)$')
+RUNTIME_LINE = re.compile(r'^\s+Runtime:\s*python(\d+)\.(\d+)')
+
+def template_functions(template_path=TEMPLATE):
+    """{logical function name: (handler module, runtime version tuple or None)} from the SAM template."""
+    functions, resource = {}, None
+    with open(template_path) as f:
+        for line in f:
+            match = RESOURCE_LINE.match(line)
+            if match:
+                resource = match.group(1)
+                continue
+            match = HANDLER_LINE.match(line)
+            if match and resource:
+                functions[resource] = (match.group(1), functions.get(resource, (None, None))[1])
+                continue
+            match = RUNTIME_LINE.match(line)
+            if match and resource:
+                functions[resource] = (functions.get(resource, (None, None))[0],
+                                       (int(match.group(1)), int(match.group(2))))
+    return {name: value for name, value in functions.items() if value[0]}
+
+def _imported_names(path):
+    with open(path) as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in ast.walk(tree): # Includes imports inside functions and if-blocks
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name.split('.')[0]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            yield node.module.split('.')[0]
+
+def import_closure(module, include_dev=False):
+    """Backend modules `module` needs at runtime (itself included), in a stable order.
+
+    Anything that isn't a module in backend/ (stdlib, boto3 from the Lambda runtime) is left out.
+    """
+    closure, pending = set(), [module]
+    while pending:
+        name = pending.pop()
+        if name in closure or (name in DEV_ONLY_MODULES and not include_dev):
+            continue
+        path = os.path.join(BACKEND_DIR, f'{name}.py')
+        if not os.path.exists(path):
+            continue
+        closure.add(name)
+        pending.extend(_imported_names(path))
+    return sorted(closure)
+
+def _bytecode(module):
+    """.pyc bytes for a backend module, compiled by this interpreter."""
+    with tempfile.TemporaryDirectory() as tmp:
+        target = os.path.join(tmp, 'out.pyc')
+        py_compile.compile(os.path.join(BACKEND_DIR, f'{module}.py'), cfile=target, doraise=True,
+                           invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+        with open(target, 'rb') as f:
+            return f.read()
+
+def artifact_files(modules, precompile=True, sourceless=False):
+    """{archive path: bytes} for a set of backend modules."""
+    files = {}
+    cache_tag = sys.implementation.cache_tag
+    for module in modules:
+        if sourceless:
+            files[f'{module}.pyc'] = _bytecode(module)
+            continue
+        with open(os.path.join(BACKEND_DIR, f'{module}.py'), 'rb') as f:
+            files[f'{module}.py'] = f.read()
+        if precompile:
+            # Unchecked-hash bytecode is used without stat()ing or hashing the source on import
+            files[f'__pycache__/{module}.{cache_tag}.pyc'] = _bytecode(module)
+    return files
+
+def write_zip(path, files):
+    """Writes a reproducible zip: same files in, same bytes out."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+        for name in sorted(files):
+            info = zipfile.ZipInfo(name, date_time=ZIP_DATE)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.create_system = 3 # Unix, so external_attr is read as a mode
+            info.external_attr = 0o100644 << 16
+            archive.writestr(info, files[name])
+    data = buffer.getvalue()
+    with open(path, 'wb') as f:
+        f.write(data)
+    return hashlib.sha256(data).hexdigest(), len(data)
+
+def rewrite_template(template_path, code_uris, out_path):
+    """Copies the template with each function's CodeUri replaced by its artifact path."""
+    lines, resource = [], None
+    with open(template_path) as f:
+        for line in f:
+            match = RESOURCE_LINE.match(line)
+            if match:
+                resource = match.group(1)
+            match = CODE_URI_LINE.match(line.rstrip('\n'))
+            if match and resource in code_uris:
+                line = f'{match.group(1)}{code_uris[resource]}{match.group(3)}\n'
+            lines.append(line)
+    with open(out_path, 'w') as f:
+        f.writelines(lines)
+
+def build(out_dir, precompile=True, sourceless=False, include_dev=False, check_runtime=True, template_path=TEMPLATE):
+    functions = template_functions(template_path)
+    runtimes = {runtime for _, runtime in functions.values() if runtime}
+    if check_runtime and (precompile or sourceless) and runtimes and runtimes != {sys.version_info[:2]}:
+        wanted = ', '.join(f'python{major}.{minor}' for major, minor in sorted(runtimes))
+        if sourceless:
+            sys.exit(f"--sourceless needs the functions' runtime ({wanted}); this is "
+                     f"python{sys.version_info[0]}.{sys.version_info[1]}")
+        print(f"Skipping bytecode: functions run {wanted} but this is "
+              f"python{sys.version_info[0]}.{sys.version_info[1]} (its .pyc files would be ignored)")
+        precompile = False
+
+    os.makedirs(os.path.join(out_dir, 'functions'), exist_ok=True)
+    manifest, code_uris = {}, {}
+    for module in sorted({module for module, _ in functions.values()}):
+        if not os.path.exists(os.path.join(BACKEND_DIR, f'{module}.py')):
+            sys.exit(f"Handler module {module} not found in {BACKEND_DIR}")
+        modules = import_closure(module, include_dev=include_dev)
+        files = artifact_files(modules, precompile=precompile, sourceless=sourceless)
+        relative = f'functions/{module}.zip'
+        sha256, size = write_zip(os.path.join(out_dir, relative), files)
+        names = sorted(name for name, (handler_module, _) in functions.items() if handler_module == module)
+        manifest[module] = {'zip': relative, 'sha256': sha256, 'zipBytes': size,
+                            'unzippedBytes': sum(len(data) for data in files.values()),
+                            'modules': modules, 'files': sorted(files), 'functions': names}
+        for name in names:
+            code_uris[name] = relative
+        print(f"{relative:<34} {size:>7} bytes  {len(files):>2} files  modules={','.join(modules)}")
+
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    rewrite_template(template_path, code_uris, os.path.join(out_dir, 'template.yaml'))
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description='Build reproducible per-module Lambda zips from backend/.')
+    parser.add_argument('--out', default=os.path.join(os.path.dirname(BACKEND_DIR), 'build', 'lambda'))
+    parser.add_argument('--no-pyc', action='store_true', help='ship sources only')
+    parser.add_argument('--sourceless', action='store_true', help='ship .pyc files only (smaller, no source in tracebacks)')
+    parser.add_argument('--include-dev', action='store_true',
+                        help='also package local_backends and sqlite_backend (for local benchmarks)')
+    args = parser.parse_args()
+    build(args.out, precompile=not args.no_pyc, sourceless=args.sourceless, include_dev=args.include_dev)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+# tools/collapse_profiles.py
+# Folds the profiles stored by profiling.py into collapsed stacks, one file per route, ready for
+# flamegraph.pl, speedscope or inferno: "<route>.folded" with lines "frame;frame;frame <microseconds>".
+# Stack-sampler captures add samples x PROFILE_INTERVAL_MS per stack. cProfile captures only record
+# caller -> callee edges, so their stacks are rebuilt by sharing each function's own time among
+# its callers by cumulative time (approximate where a function is reached along several paths).
+# Reads PROFILE_DIR (or --dir) when set, else the S3 bucket; only the route and date partitions
+# asked for are listed. Prints per route the captures, their total and slowest time, and the
+# frames with the most self time.
+#
+#   python backend/tools/collapse_profiles.py [--dir /var/lib/hrms/profiles] [--route "GET /documents"]
+#       [--since 2026-10-01] [--until 2026-10-19] [--trigger slow] [--out profiles-folded]
+import argparse
+import base64
+import gzip
+import json
+import marshal
+import os
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import s3_client
+from profiling import frame_name, route_slug, MAX_STACK_DEPTH, PROFILE_BUCKET, PROFILE_DIR, PROFILE_PREFIX
+
+def list_keys(bucket, prefix):
+    args = {'Bucket': bucket, 'Prefix': prefix}
+    while True:
+        response = s3_client.list_objects_v2(**args)
+        for obj in response.get('Contents', []):
+            yield obj['Key']
+        if not response.get('IsTruncated'):
+            return
+        args['ContinuationToken'] = response['NextContinuationToken']
+
+def list_files(directory, prefix):
+    root = os.path.join(directory, *prefix.rstrip('/').split('/'))
+    for path, _, files in os.walk(root):
+        for name in files:
+            if name.endswith('.json.gz'):
+                yield os.path.relpath(os.path.join(path, name), directory).replace(os.sep, '/')
+
+def in_range(key, since, until):
+    """Whether a capture key's date= partition is within [since, until]."""
+    for part in key.split('/'):
+        if part.startswith('date='):
+            day = date.fromisoformat(part[len('date='):])
+            return (since is None or day >= since) and (until is None or day <= until)
+    return False
+
+def pstats_stacks(stats, min_share=0.001):
+    """{(func, ..., func) root first: seconds} rebuilt from cProfile stats (callers -> callees only).
+
+    A function's own time spent on calls from each caller is spread over that caller's paths in
+    proportion to the cumulative time the caller was reached through each of them.
+    """
+    memo, in_progress = {}, set()
+
+    def paths(func):
+        if func in memo:
+            return memo[func]
+        in_progress.add(func)
+        callers = {c: v for c, v in stats[func][4].items() if c in stats and c not in in_progress}
+        total = sum(v[3] for v in callers.values())
+        result = []
+        if total > 0:
+            for caller, (_, _, _, cumulative) in callers.items():
+                for path, share in paths(caller):
+                    weight = share * cumulative / total
+                    if weight >= min_share and len(path) < MAX_STACK_DEPTH:
+                        result.append((path + (func,), weight))
+        in_progress.discard(func)
+        memo[func] = result or [((func,), 1.0)]
+        return memo[func]
+
+    stacks = Counter()
+    for func, (_, _, own, _, callers) in stats.items():
+        edges = [(caller, edge[2]) for caller, edge in callers.items() if caller in stats and caller != func]
+        if not edges:
+            stacks[(func,)] += own
+        for caller, own_from_caller in edges:
+            for path, share in paths(caller):
+                stacks[path + (func,)] += own_from_caller * share
+    return stacks
+
+def capture_stacks(capture):
+    """{collapsed stack: microseconds} of one stored capture."""
+    if 'pstats' in capture:
+        stats = marshal.loads(base64.b64decode(capture['pstats']))
+        return {';'.join(frame_name(f[0], f[2]) for f in path): seconds * 1e6
+                for path, seconds in pstats_stacks(stats).items()}
+    return {stack: samples * capture['intervalMs'] * 1000 for stack, samples in capture['stacks'].items()}
+
+def main():
+    parser = argparse.ArgumentParser(description='Fold stored handler profiles into collapsed stacks per route.')
+    parser.add_argument('--dir', default=PROFILE_DIR, help='local capture directory (default PROFILE_DIR, else S3)')
+    parser.add_argument('--bucket', default=PROFILE_BUCKET)
+    parser.add_argument('--prefix', default=PROFILE_PREFIX)
+    parser.add_argument('--route', help='only this route, e.g. "GET /documents" or GET_documents')
+    parser.add_argument('--since', type=date.fromisoformat, help='first capture date (YYYY-MM-DD)')
+    parser.add_argument('--until', type=date.fromisoformat, help='last capture date (YYYY-MM-DD)')
+    parser.add_argument('--trigger', choices=('slow', 'sampled'), help='only captures kept for this reason')
+    parser.add_argument('--out', default='profiles-folded', help='directory for the <route>.folded files')
+    parser.add_argument('--top', type=int, default=5, help='frames with the most self time to print per route')
+    args = parser.parse_args()
+
+    prefix = args.prefix + (f'route={route_slug(args.route)}/' if args.route else '')
+    if args.dir:
+        keys = [k for k in list_files(args.dir, prefix) if in_range(k, args.since, args.until)]
+        def load(key):
+            with open(os.path.join(args.dir, *key.split('/')), 'rb') as f:
+                return json.loads(gzip.decompress(f.read()))
+    else:
+        keys = [k for k in list_keys(args.bucket, prefix) if in_range(k, args.since, args.until)]
+        def load(key):
+            return json.loads(gzip.decompress(s3_client.get_object(Bucket=args.bucket, Key=key)['Body'].read()))
+
+    folded, captures = defaultdict(Counter), defaultdict(list)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        for capture in pool.map(load, keys):
+            if args.trigger and capture['trigger'] != args.trigger:
+                continue
+            folded[capture['route']].update(capture_stacks(capture))
+            captures[capture['route']].append(capture)
+
+    os.makedirs(args.out, exist_ok=True)
+    for route in sorted(folded):
+        path = os.path.join(args.out, f'{route_slug(route)}.folded')
+        with open(path, 'w') as f:
+            for stack, us in sorted(folded[route].items()):
+                if round(us) > 0:
+                    f.write(f'{stack} {round(us)}\n')
+        own = Counter()
+        for stack, us in folded[route].items():
+            own[stack.rsplit(';', 1)[-1]] += us / 1000
+        slowest = max(captures[route], key=lambda capture: capture['durationMs'])
+        print(f"{route}: {len(captures[route])} profiles, {sum(c['durationMs'] for c in captures[route]):.0f} ms, "
+              f"slowest {slowest['durationMs']:.0f} ms ({slowest['requestId']}) -> {path}")
+        for frame, ms in own.most_common(args.top):
+            print(f"  {ms:9.1f} ms  {frame}")
+    if not folded:
+        print(f"No profiles found under {args.dir or 's3://' + args.bucket}/{prefix}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# tools/migrate_single_table.py
+# Online migration of profiles, leaves, feedback and documents from the per-entity tables to
+# the single-table layout (HRMS_Main, see common_utils):
+#
+#   1. Deploy with StorageLayout=dual: reads stay on the old tables, every write also goes to HRMS_Main.
+#   2. python backend/tools/migrate_single_table.py copy
+#      Copies existing items; conditional puts never overwrite an item already dual-written.
+#   3. python backend/tools/migrate_single_table.py verify [--repair]
+#      Compares both layouts item by item; --repair re-copies mismatches and deletes orphans.
+#      Re-run until it reports no differences (live writes can race a repair).
+#   4. Deploy with StorageLayout=single, then run tools/backfill_leave_aggregates.py once.
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import dynamodb_client, batch_get_all, batch_write_all, LAYOUTS, ENTITY_ID_ATTRIBUTES, MAIN_TABLE
+
+SOURCE, TARGET = LAYOUTS['multi'], LAYOUTS['single']
+ENTITIES = ('profile', 'leave', 'feedback', 'document')
+
+def scan_items(scan_args, segment, total_segments):
+    """Yields pages of items from one parallel-scan segment."""
+    scan_args = dict(scan_args, Segment=segment, TotalSegments=total_segments, ConsistentRead=True)
+    while True:
+        response = dynamodb_client.scan(**scan_args)
+        yield response.get('Items', [])
+        if not response.get('LastEvaluatedKey'):
+            return
+        scan_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def _ids(entity, item):
+    id_attribute = ENTITY_ID_ATTRIBUTES[entity]
+    return item['userId']['S'], item[id_attribute]['S'] if id_attribute else None
+
+def copy_item(entity, item):
+    """Puts one source item into HRMS_Main unless it's already there; returns True if copied."""
+    try:
+        dynamodb_client.put_item(TableName=MAIN_TABLE, Item=TARGET.item(entity, item),
+                                 ConditionExpression='attribute_not_exists(PK)')
+        return True
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        return False # Dual-written (or copied) already; the dual-written copy is at least as new
+
+def copy(segments, workers):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for entity in ENTITIES:
+            started, copied, skipped = time.perf_counter(), 0, 0
+            for segment in range(segments):
+                for page in scan_items(SOURCE.scan_args(entity), segment, segments):
+                    for was_copied in pool.map(lambda item: copy_item(entity, item), page):
+                        copied, skipped = copied + was_copied, skipped + (not was_copied)
+            print(f"{entity:<9} copied={copied} already-present={skipped} ({time.perf_counter() - started:.1f}s)")
+
+def _differences(entity, segment, segments):
+    """(missing or different in HRMS_Main, orphaned in HRMS_Main) for one scan segment of each side."""
+    changed = []
+    for page in scan_items(SOURCE.scan_args(entity), segment, segments):
+        keys = [TARGET.key(entity, *_ids(entity, item)) for item in page]
+        stored = {(i['PK']['S'], i['SK']['S']): i for i in batch_get_all(MAIN_TABLE, keys, consistent=True)}
+        for item in page:
+            expected = TARGET.item(entity, item)
+            if stored.get((expected['PK']['S'], expected['SK']['S'])) != expected:
+                changed.append(item)
+    orphans = []
+    for page in scan_items(TARGET.scan_args(entity), segment, segments):
+        keys = [SOURCE.key(entity, *_ids(entity, item)) for item in page]
+        present = {_ids(entity, i) for i in batch_get_all(SOURCE.table(entity), keys, consistent=True)}
+        orphans.extend(item for item in page if _ids(entity, item) not in present)
+    return changed, orphans
+
+def verify(segments, repair):
+    clean = True
+    for entity in ENTITIES:
+        changed, orphans = [], []
+        for segment in range(segments):
+            segment_changed, segment_orphans = _differences(entity, segment, segments)
+            changed.extend(segment_changed)
+            orphans.extend(segment_orphans)
+        print(f"{entity:<9} missing-or-different={len(changed)} orphaned={len(orphans)}")
+        if not changed and not orphans:
+            continue
+        clean = False
+        for item in changed[:5]:
+            print(f"          e.g. {SOURCE.key(entity, *_ids(entity, item))}")
+        if repair:
+            batch_write_all(MAIN_TABLE, [{'PutRequest': {'Item': TARGET.item(entity, item)}} for item in changed] +
+                            [{'DeleteRequest': {'Key': {'PK': o['PK'], 'SK': o['SK']}}} for o in orphans])
+            print(f"          repaired {len(changed) + len(orphans)} items")
+    return clean
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate HRMS entities to the single-table layout.')
+    parser.add_argument('command', choices=('copy', 'verify'))
+    parser.add_argument('--segments', type=int, default=4, help='parallel scan segments per table')
+    parser.add_argument('--workers', type=int, default=16, help='concurrent conditional puts (copy)')
+    parser.add_argument('--repair', action='store_true', help='fix the differences verify finds')
+    args = parser.parse_args()
+    if args.command == 'copy':
+        copy(args.segments, args.workers)
+    elif not verify(args.segments, args.repair) and not args.repair:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
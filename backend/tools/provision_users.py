@@ -0,0 +1,212 @@
+# tools/provision_users.py
+# Admin bulk provisioning: creates Cognito users (AdminCreateUser) and their HRMS_Profiles
+# rows from a CSV or JSON-lines file, e.g. when onboarding an acquired company.
+#
+# The file is read as a stream in windows of --batch-size records. Each window's Cognito
+# calls run on a bounded thread pool whose size (--workers) and request rate (--rate) should
+# stay within the user pool's AdminCreateUser quota; the window's profile rows are then
+# written with BatchWriteItem while the next window's Cognito calls are in flight.
+# After every window a checkpoint records how many records are fully done, so an interrupted
+# run continues where it stopped. Users that already exist (e.g. created just before a crash)
+# are looked up instead of re-created; their profile row is only written if they have none,
+# never overwritten. A managerId is applied through org_manager.set_manager, so the org closure
+# table follows the managerId of the stored profile (also for existing users, which repairs a
+# run interrupted between the two writes).
+# Failed records are appended to <checkpoint>.errors.jsonl as JSON lines with their original
+# fields, so that file can be fed back in after fixing the cause.
+#
+#   python backend/tools/provision_users.py users.csv [--workers 8] [--rate 25] [--suppress-invite]
+#
+# Input fields: email (required), name, empId, department, managerId (a Cognito sub).
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import resilience
+from common_utils import (cognito_client, dynamodb_client, batch_write_all, utc_now_iso, storage, mirror_storage,
+                          COGNITO_USER_POOL_ID)
+from org_manager import set_manager, get_manager_id, OrgHierarchyError, OrgGuardContentionError
+
+PROFILE_FIELDS = ('empId', 'name', 'department', 'managerId')
+
+def read_records(path):
+    """Yields one dict per user from a .csv (with a header row) or JSON-lines file, without loading it whole."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            for row in csv.DictReader(f):
+                yield {k.strip(): (v or '').strip() for k, v in row.items() if k}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def load_checkpoint(path, input_path):
+    """Returns the saved progress for input_path, or a fresh one."""
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('input') != os.path.abspath(input_path):
+            raise SystemExit(f"Checkpoint {path} belongs to {checkpoint.get('input')}; pass a different --checkpoint.")
+        return checkpoint
+    return {'input': os.path.abspath(input_path), 'records': 0, 'created': 0, 'existing': 0, 'failed': 0}
+
+def save_checkpoint(path, checkpoint):
+    """Writes the checkpoint atomically so a crash never leaves a half-written file."""
+    checkpoint['updatedAt'] = utc_now_iso()
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(temp_path, path)
+
+def _sub(attributes):
+    return next(a['Value'] for a in attributes if a['Name'] == 'sub')
+
+def create_user(record, suppress_invite=False):
+    """Creates (or finds) the Cognito user for one record; returns (status, sub or error details)."""
+    email = str(record.get('email') or '').strip().lower()
+    if not email:
+        return 'failed', {'code': 'MissingEmail', 'message': 'Record has no email.'}
+    attributes = [{'Name': 'email', 'Value': email}, {'Name': 'email_verified', 'Value': 'true'}]
+    if record.get('name'):
+        attributes.append({'Name': 'name', 'Value': str(record['name'])})
+    create_args = {'UserPoolId': COGNITO_USER_POOL_ID, 'Username': email, 'UserAttributes': attributes,
+                   'DesiredDeliveryMediums': ['EMAIL']}
+    if suppress_invite:
+        create_args['MessageAction'] = 'SUPPRESS'
+    try:
+        try:
+            response = cognito_client.admin_create_user(**create_args)
+            return 'created', _sub(response['User']['Attributes'])
+        except cognito_client.exceptions.UsernameExistsException:
+            response = cognito_client.admin_get_user(UserPoolId=COGNITO_USER_POOL_ID, Username=email)
+            return 'existing', _sub(response['UserAttributes'])
+    except resilience.DependencyUnavailableError as e:
+        code = resilience.error_code(e.cause) if e.cause else None
+        return 'failed', {'code': code or 'DependencyUnavailable', 'message': str(e)}
+    except Exception as e:
+        return 'failed', {'code': resilience.error_code(e) or type(e).__name__, 'message': str(e)}
+
+def profile_item(sub, record):
+    item = {'userId': {'S': sub}, 'email': {'S': str(record['email']).strip().lower()}}
+    for field in PROFILE_FIELDS:
+        if record.get(field):
+            item[field] = {'S': str(record[field])}
+    return item
+
+def put_profile_if_absent(profile):
+    """Writes a profile item unless the user already has one; returns the profile as stored."""
+    stored = profile
+    for layout in filter(None, (storage, mirror_storage)):
+        try:
+            dynamodb_client.put_item(TableName=layout.table('profile'), Item=layout.item('profile', profile),
+                                     ConditionExpression='attribute_not_exists(userId)',
+                                     ReturnValuesOnConditionCheckFailure='ALL_OLD')
+        except dynamodb_client.exceptions.ConditionalCheckFailedException as e:
+            if layout is storage:
+                stored = layout.attributes(e.response.get('Item') or profile)
+    return stored
+
+def write_profiles(profiles, new_users):
+    """Stores the window's profiles and links them into the org hierarchy.
+
+    Users created in this run can't have a profile yet, so theirs are batch-written; users that
+    already existed only get one if they have none. Returns {userId: (error code, message)}
+    for the users whose manager could not be set.
+    """
+    created = [p for p in profiles if p['userId']['S'] in new_users]
+    for layout in filter(None, (storage, mirror_storage)):
+        batch_write_all(layout.table('profile'), [{'PutRequest': {'Item': layout.item('profile', p)}} for p in created])
+    stored = created + [put_profile_if_absent(p) for p in profiles if p['userId']['S'] not in new_users]
+
+    failures = {}
+    for profile in stored: # One at a time: manager changes are serialized on the org guard anyway
+        user_id, manager_id = profile['userId']['S'], profile.get('managerId', {}).get('S')
+        if not manager_id and (user_id in new_users or not get_manager_id(user_id)):
+            continue # No manager to add or remove
+        try:
+            set_manager(user_id, manager_id)
+        except (OrgHierarchyError, OrgGuardContentionError, resilience.DependencyUnavailableError) as e:
+            failures[user_id] = (type(e).__name__, str(e) or 'Manager change kept conflicting with others.')
+    return failures
+
+def provision(input_path, checkpoint_path, workers=8, batch_size=250, suppress_invite=False, limit=None):
+    """Provisions every record not yet covered by the checkpoint; returns the final checkpoint."""
+    checkpoint = load_checkpoint(checkpoint_path, input_path)
+    records = itertools.islice(read_records(input_path), checkpoint['records'], None)
+    if limit is not None:
+        records = itertools.islice(records, limit)
+    errors_path = f'{checkpoint_path}.errors.jsonl'
+    error_codes = Counter()
+
+    def finish(window, results, write):
+        manager_failures = write.result() # Profile rows must be stored before the checkpoint moves past them
+        with open(errors_path, 'a', encoding='utf-8') as errors:
+            for (line, record), (status, detail) in zip(window, results):
+                if status != 'failed' and detail in manager_failures:
+                    code, message = manager_failures[detail]
+                    status, detail = 'failed', {'code': code, 'message': f'User {detail} stored, manager not set: {message}'}
+                if status == 'failed':
+                    error_codes[detail['code']] += 1
+                    errors.write(json.dumps(dict(record, _line=line, _error=detail['code'],
+                                                 _message=detail['message'])) + '\n')
+                checkpoint[status] += 1
+        checkpoint['records'] += len(window)
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, ThreadPoolExecutor(max_workers=1) as writer:
+        pending = None # (window, results, write future) awaiting its checkpoint
+        start_line = checkpoint['records'] + 1
+        while True:
+            window = list(zip(itertools.count(start_line), itertools.islice(records, batch_size)))
+            if not window:
+                break
+            start_line += len(window)
+            results = list(pool.map(lambda entry: create_user(entry[1], suppress_invite), window))
+            if pending:
+                finish(*pending)
+            profiles = [profile_item(detail, record)
+                        for (_, record), (status, detail) in zip(window, results) if status != 'failed']
+            new_users = {detail for status, detail in results if status == 'created'}
+            pending = (window, results, writer.submit(write_profiles, profiles, new_users))
+        if pending:
+            finish(*pending)
+    checkpoint['errorCodes'] = dict(error_codes)
+    return checkpoint
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-create Cognito users and HRMS profiles from a file.')
+    parser.add_argument('input', help='.csv with a header row, or JSON lines')
+    parser.add_argument('--checkpoint', help='progress file (default: <input>.checkpoint.json)')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent AdminCreateUser calls')
+    parser.add_argument('--rate', type=float, default=25.0,
+                        help='AdminCreateUser requests/second; keep below the user pool quota')
+    parser.add_argument('--batch-size', type=int, default=250, help='records per checkpoint window')
+    parser.add_argument('--suppress-invite', action='store_true', help="don't send Cognito's invitation email")
+    args = parser.parse_args()
+
+    resilience.get_dependency('cognito').bucket.configure(args.rate)
+    checkpoint_path = args.checkpoint or f'{args.input}.checkpoint.json'
+    already_done = load_checkpoint(checkpoint_path, args.input)['records']
+    if already_done:
+        print(f"Resuming after {already_done} records from {checkpoint_path}")
+    started = time.perf_counter()
+    checkpoint = provision(args.input, checkpoint_path, workers=args.workers, batch_size=args.batch_size,
+                           suppress_invite=args.suppress_invite)
+    elapsed = time.perf_counter() - started
+    processed = checkpoint['records'] - already_done
+    print(f"Processed {processed} records in {elapsed:.1f}s ({processed / max(elapsed, 1e-9):.1f}/s): "
+          f"{checkpoint['created']} created, {checkpoint['existing']} already existed, {checkpoint['failed']} failed")
+    if checkpoint['errorCodes']:
+        print(f"Failures this run by error code: {checkpoint['errorCodes']} (details in {checkpoint_path}.errors.jsonl)")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
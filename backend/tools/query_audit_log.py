@@ -0,0 +1,100 @@
+# tools/query_audit_log.py
+# Streams the audit log objects written by audit.py for a time range and prints the events
+# that match as NDJSON. Only the hour partitions in the range are listed, and objects are
+# fetched in parallel, each decompressed and filtered line by line as it streams in (only the
+# matching events are kept).
+# Objects are keyed by their first event, so partitions from --lookback-hours before --since
+# are read too (a batch can hold events recorded after it was started).
+#
+#   python backend/tools/query_audit_log.py --since 2026-10-19T09:00 [--until ...] [--actor ID]
+#       [--action leave.submit] [--target ID] [--limit 100]
+import argparse
+import gzip
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import s3_client
+from audit import AUDIT_BUCKET, AUDIT_PREFIX
+
+def parse_time(value):
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def hour_prefixes(prefix, since, until):
+    """The partition prefixes of every hour from since to until (inclusive)."""
+    hour = since.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    while hour <= until:
+        yield f'{prefix}year={hour:%Y}/month={hour:%m}/day={hour:%d}/hour={hour:%H}/'
+        hour += timedelta(hours=1)
+
+def list_keys(bucket, prefix):
+    args = {'Bucket': bucket, 'Prefix': prefix}
+    while True:
+        response = s3_client.list_objects_v2(**args)
+        for obj in response.get('Contents', []):
+            yield obj['Key']
+        if not response.get('IsTruncated'):
+            return
+        args['ContinuationToken'] = response['NextContinuationToken']
+
+def iter_events(bucket, key):
+    """Decompresses one audit object as it is read and yields its events."""
+    with gzip.GzipFile(fileobj=s3_client.get_object(Bucket=bucket, Key=key)['Body']) as stream:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+def matcher(since, until, actor=None, action=None, target=None):
+    def matches(event):
+        ts = parse_time(event['ts'])
+        if not since <= ts <= until:
+            return False
+        if actor and event.get('actor') != actor:
+            return False
+        if action and event.get('action') != action:
+            return False
+        if target:
+            targets = event.get('target')
+            return target in targets if isinstance(targets, list) else targets == target
+        return True
+    return matches
+
+def query(bucket, prefix, since, until, matches, lookback_hours=1, workers=8):
+    """Yields the matching events of every object in the range, object by object in key order."""
+    keys = [key for hour in hour_prefixes(prefix, since - timedelta(hours=lookback_hours), until)
+            for key in list_keys(bucket, hour)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for events in pool.map(lambda key: [e for e in iter_events(bucket, key) if matches(e)], keys):
+            yield from events
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the compressed NDJSON audit log in S3.')
+    parser.add_argument('--since', required=True, help='ISO time (UTC unless an offset is given)')
+    parser.add_argument('--until', help='ISO time (default: now)')
+    parser.add_argument('--actor')
+    parser.add_argument('--action', help='e.g. profile.update, leave.submit, leave.decide')
+    parser.add_argument('--target', help='id of the profile, leave, feedback or document acted on')
+    parser.add_argument('--limit', type=int, default=0, help='stop after this many events (0 = all)')
+    parser.add_argument('--bucket', default=AUDIT_BUCKET)
+    parser.add_argument('--prefix', default=AUDIT_PREFIX)
+    parser.add_argument('--lookback-hours', type=int, default=1)
+    args = parser.parse_args()
+
+    since = parse_time(args.since)
+    until = parse_time(args.until) if args.until else datetime.now(timezone.utc)
+    matches = matcher(since, until, args.actor, args.action, args.target)
+    count = 0
+    for event in query(args.bucket, args.prefix, since, until, matches, args.lookback_hours):
+        print(json.dumps(event, separators=(',', ':')))
+        count += 1
+        if count == args.limit:
+            break
+    print(f"{count} events", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+# tools/rebuild_org_closure.py
+# Bulk (re)build of HRMS_OrgClosure from the managerId attributes in HRMS_Profiles.
+# Used for the initial load and to repair drift; day-to-day manager changes go through
+# org_manager.set_manager, which updates the closure table incrementally.
+#
+#   python backend/tools/rebuild_org_closure.py [--purge] [--dry-run] [--workers 8]
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common_utils import dynamodb_client, batch_write_all, storage, ORG_CLOSURE_TABLE
+from org_manager import closure_item
+
+def load_manager_map():
+    """Scans HRMS_Profiles and returns {userId: managerId or None}."""
+    managers = {}
+    scan_args = dict(storage.scan_args('profile'), ProjectionExpression='userId, managerId')
+    while True:
+        response = dynamodb_client.scan(**scan_args)
+        for item in response.get('Items', []):
+            managers[item['userId']['S']] = item.get('managerId', {}).get('S') or None
+        if not response.get('LastEvaluatedKey'):
+            return managers
+        scan_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def closure_rows(managers):
+    """Yields (ancestorId, descendantId, depth) for every pair, walking the tree breadth-first from its roots.
+
+    Each employee's ancestor list is its manager's list plus the manager, so the walk is
+    O(number of closure rows). Returns the set of employees that could not be reached from
+    a root (i.e. that sit on a reporting cycle) via StopIteration.value.
+    """
+    children = defaultdict(list)
+    roots = []
+    for user_id, manager_id in managers.items():
+        if manager_id and manager_id != user_id:
+            children[manager_id].append(user_id)
+            if manager_id not in managers:
+                roots.append(manager_id) # Referenced manager without a profile row
+        else:
+            roots.append(user_id)
+
+    visited = set()
+    queue = deque((root, ()) for root in dict.fromkeys(roots))
+    while queue:
+        user_id, ancestors = queue.popleft()
+        if user_id in visited:
+            continue
+        visited.add(user_id)
+        yield user_id, user_id, 0
+        for depth, ancestor_id in enumerate(reversed(ancestors), start=1):
+            yield ancestor_id, user_id, depth
+        path = ancestors + (user_id,)
+        for child in children.get(user_id, ()):
+            queue.append((child, path))
+    return set(managers) - visited
+
+def purge_closure_table():
+    """Deletes every row currently in the closure table."""
+    scan_args = {'TableName': ORG_CLOSURE_TABLE, 'ProjectionExpression': 'ancestorId, descendantKey'}
+    deleted = 0
+    while True:
+        response = dynamodb_client.scan(**scan_args)
+        keys = response.get('Items', [])
+        batch_write_all(ORG_CLOSURE_TABLE, [{'DeleteRequest': {'Key': k}} for k in keys])
+        deleted += len(keys)
+        if not response.get('LastEvaluatedKey'):
+            return deleted
+        scan_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def rebuild(managers, workers=8, dry_run=False, chunk_size=500):
+    """Writes all closure rows for the given manager map; returns (rows, unreachable employees)."""
+    rows = closure_rows(managers)
+    written = 0
+    unreachable = set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        chunk = []
+        while True:
+            try:
+                ancestor_id, descendant_id, depth = next(rows)
+            except StopIteration as done:
+                unreachable = done.value or set()
+                break
+            manager_id = managers.get(descendant_id) if depth == 0 else None # managerId pointer on depth-0 rows
+            item = closure_item(ancestor_id, descendant_id, depth, manager_id if manager_id != descendant_id else None)
+            chunk.append({'PutRequest': {'Item': item}})
+            if len(chunk) == chunk_size:
+                if not dry_run:
+                    futures.append(pool.submit(batch_write_all, ORG_CLOSURE_TABLE, chunk))
+                written += len(chunk)
+                chunk = []
+        if chunk and not dry_run:
+            futures.append(pool.submit(batch_write_all, ORG_CLOSURE_TABLE, chunk))
+        written += len(chunk)
+        for future in futures:
+            future.result() # Surface write errors
+    return written, unreachable
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the HRMS org closure table from profile managerIds.')
+    parser.add_argument('--purge', action='store_true', help='delete existing closure rows first')
+    parser.add_argument('--dry-run', action='store_true', help='compute rows without writing them')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent BatchWriteItem workers')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    managers = load_manager_map()
+    print(f"Loaded {len(managers)} profiles in {time.perf_counter() - started:.1f}s")
+    if args.purge and not args.dry_run:
+        print(f"Purged {purge_closure_table()} existing closure rows")
+    written, unreachable = rebuild(managers, workers=args.workers, dry_run=args.dry_run)
+    print(f"{'Computed' if args.dry_run else 'Wrote'} {written} closure rows in {time.perf_counter() - started:.1f}s")
+    if unreachable:
+        print(f"Warning: {len(unreachable)} employees sit on a reporting cycle and were skipped: "
+              f"{sorted(unreachable)[:20]}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# tools/reconcile_document_usage.py
+# Check of the per-user document usage counters (document_manager.py) against what is actually
+# stored in S3: for every user with a counter or a document, the objects under "<userId>/" are
+# totalled with ListObjectsV2 and compared with bytesUsed/documentCount. Differences are reported;
+# with --repair a counter is set to the S3 totals, conditional on it not having changed since it
+# was read (an upload in between makes that user wait for the next run). Users with documents
+# whose upload hasn't been processed yet are skipped. The same check runs on a schedule
+# (ReconcileDocumentUsageFunction in template.yaml); this is the manual run.
+#
+#   python backend/tools/reconcile_document_usage.py [--workers 8] [--repair] [--tolerance-bytes 0]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document_manager import reconcile_usage
+
+def main():
+    parser = argparse.ArgumentParser(description='Check per-user document usage counters against S3.')
+    parser.add_argument('--workers', type=int, default=8, help='users listed concurrently')
+    parser.add_argument('--tolerance-bytes', type=int, default=0, help='ignore byte differences up to this size')
+    parser.add_argument('--repair', action='store_true', help='set drifted counters to the S3 totals')
+    args = parser.parse_args()
+
+    started = time.time()
+    result = reconcile_usage(repair=args.repair, tolerance_bytes=args.tolerance_bytes, workers=args.workers)
+    for user_id, counter, (stored, objects) in result['drifted']:
+        used, count = counter or (0, 0)
+        print(f"{user_id}: counter {used} bytes / {count} documents, S3 {stored} bytes / {objects} objects "
+              f"(drift {used - stored:+d} bytes)")
+    if result['conflicts']:
+        print(f"{result['conflicts']} counters changed while reconciling, left for the next run")
+    print(f"Checked {result['users']} users in {time.time() - started:.1f}s ({result['pending']} with uploads "
+          f"being processed skipped): {len(result['drifted'])} drifted"
+          + (f", {result['repaired']} repaired" if args.repair else ''))
+    if result['drifted'] and not args.repair:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
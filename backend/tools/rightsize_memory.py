@@ -0,0 +1,288 @@
+# tools/rightsize_memory.py
+# Recommends a MemorySize per function in template.yaml. Each function runs in its own
+# interpreter (so its RSS is its own) against the local stand-ins seeded with a representative
+# data set, replaying typical events: median CPU time and wall time of warm invocations, then a
+# few invocations under the memory_profile.py hook for peak heap, max RSS and top allocation sites.
+#
+# Lambda gives a function CPU in proportion to its memory (one full vCPU at 1769 MB), so the
+# duration at each size is modelled as cpu_ms * max(1, 1769 / MB) + io_ms, where io_ms (wall
+# minus CPU time) is the simulated AWS latency. The stand-ins' CPU time stands in for botocore's
+# request serialization (the Cognito stand-in also signs tokens in-process, so the login and
+# refresh routes overstate CPU). Sizes below max RSS plus --headroom are ruled out (add
+# --extra-mb for boto3, which the stand-ins don't load); among the rest the recommendation
+# minimizes balance * cost + (1 - balance) * duration, each normalized by its maximum, like
+# AWS Lambda Power Tuning's "balanced" strategy (--balance 1 = cheapest, 0 = fastest).
+#
+#   python backend/tools/rightsize_memory.py [--latency-ms 5] [--invocations 30] [--functions LeaveGetFunction ...]
+import argparse
+import json
+import math
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from build_artifacts import TEMPLATE, RESOURCE_LINE, HANDLER_LINE
+
+MEMORY_SIZES = (128, 256, 384, 512, 768, 1024, 1536, 1769, 2048)
+FULL_VCPU_MB = 1769
+PRICE_PER_GB_SECOND = 0.0000166667 # x86, us-east-1
+PRICE_PER_REQUEST = 0.0000002
+MEMORY_SIZE_LINE = re.compile(r'^\s+MemorySize:\s*(\d+)')
+
+def function_handlers(template_path=TEMPLATE):
+    """{logical function name: (handler 'module.function', configured MemorySize)} from the SAM template."""
+    functions, resource, default_memory = {}, None, None
+    with open(template_path) as f:
+        for line in f:
+            match = RESOURCE_LINE.match(line)
+            if match:
+                resource = match.group(1)
+                continue
+            match = MEMORY_SIZE_LINE.match(line)
+            if match:
+                if resource == 'Function': # Globals
+                    default_memory = int(match.group(1))
+                elif resource in functions:
+                    functions[resource] = (functions[resource][0], int(match.group(1)))
+                continue
+            match = HANDLER_LINE.match(line)
+            if match and resource:
+                functions[resource] = (f'{match.group(1)}.{match.group(2)}', None)
+    return {name: (handler, memory or default_memory) for name, (handler, memory) in functions.items()}
+
+# ----------------------------------------------------------------------
+# Child process: seed, replay, measure one handler
+# ----------------------------------------------------------------------
+def seed(pool_size):
+    """Seeds a representative data set; returns {handler name: event factory(i)}."""
+    from common_utils import cognito_client, dynamodb_client, batch_write_all, storage, LEAVES_TABLE
+    from bench_storage_layout import user_items
+    from org_manager import set_manager
+    import auth_handler
+    import leave_manager
+
+    def claims_event(user_id, body=None, params=None):
+        event = {'requestContext': {'authorizer': {'claims': {'sub': user_id}}},
+                 'queryStringParameters': params or {}}
+        if body is not None:
+            event['body'] = json.dumps(body)
+        return event
+
+    employee, manager = 'employee-0', 'manager-0'
+    reports = [f'report-{i:03d}' for i in range(30)]
+    writes = {}
+    for user, counts in [(employee, (60, 30, 40)), (manager, (5, 5, 5))] + [(r, (2, 1, 1)) for r in reports]:
+        for entity, attributes in user_items(user, *counts):
+            writes.setdefault(storage.table(entity), []).append(
+                {'PutRequest': {'Item': storage.item(entity, attributes)}})
+    for table, requests in writes.items():
+        batch_write_all(table, requests)
+    for chain in (('manager-3', None), ('manager-2', 'manager-3'), ('manager-1', 'manager-2'), (manager, 'manager-1')):
+        set_manager(*chain)
+    for user in [employee] + reports:
+        set_manager(user, manager)
+
+    stream = dynamodb_client.raw.enable_stream(LEAVES_TABLE)
+    pending = []
+    for i in range(pool_size):
+        report = reports[i % len(reports)]
+        start = date(2026, 3, 9) + timedelta(weeks=i // len(reports)) # Overlapping leaves are rejected
+        response = leave_manager.submit_leave(claims_event(report, {
+            'leaveType': 'Annual', 'startDate': start.isoformat(), 'endDate': (start + timedelta(days=4)).isoformat(),
+            'reason': 'Trip'}), None)
+        pending.append((report, json.loads(response['body'])['leaveId']))
+
+    password = 'Rightsize-password-1'
+    cognito_client.sign_up(ClientId='local', Username='member@example.com', Password=password)
+    cognito_client.raw.users['member@example.com']['confirmed'] = True
+    login = json.loads(auth_handler.login_user({'body': json.dumps(
+        {'email': 'member@example.com', 'password': password})}, None)['body'])
+    for i in range(pool_size):
+        cognito_client.sign_up(ClientId='local', Username=f'unconfirmed-{i}@example.com', Password=password)
+    records = list(stream)
+
+    def job_records(i, size=10): # A job queue batch of approver notifications
+        return {'Records': [{'messageId': f'job-{i}-{n}', 'receiptHandle': f'job-{i}-{n}#local', 'body': json.dumps({
+            'type': 'leave.submitted', 'payload': {
+                'userId': report, 'leaveId': leave_id, 'approverId': manager, 'leaveType': 'Annual',
+                'startDate': '2026-03-09', 'endDate': '2026-03-13', 'reason': 'Trip'}}),
+            'attributes': {'ApproximateReceiveCount': '1'}}
+            for n, (report, leave_id) in enumerate(pending[(i * size) % len(pending):][:size])]}
+
+    return {
+        'auth_handler.register_user': lambda i: {'body': json.dumps(
+            {'email': f'new-{i}@example.com', 'password': password})},
+        'auth_handler.login_user': lambda i: {'body': json.dumps({'email': 'member@example.com', 'password': password})},
+        'auth_handler.confirm_signup': lambda i: {'body': json.dumps(
+            {'email': f'unconfirmed-{i}@example.com', 'code': '123456'})},
+        'auth_handler.resend_code': lambda i: {'body': json.dumps({'email': f'unconfirmed-{i}@example.com'})},
+        'auth_handler.refresh_session': lambda i: {'body': json.dumps({'refreshToken': login['refreshToken']})},
+        'profile_manager.get_profile': lambda i: claims_event(employee),
+        'profile_manager.update_profile': lambda i: claims_event(employee, {
+            'empId': 'E0', 'name': f'Employee {i}', 'email': 'e0@example.com', 'department': 'Engineering'}),
+        'profile_manager.get_full_record': lambda i: claims_event(employee),
+        'profile_manager.get_profiles_batch': lambda i: claims_event(manager, {
+            'userIds': [report for report, _ in pending[:100]]}),
+        'leave_manager.submit_leave': lambda i: claims_event(employee, {
+            'leaveType': 'Sick', 'startDate': (date(2026, 4, 1) + timedelta(days=3 * i)).isoformat(),
+            'endDate': (date(2026, 4, 2) + timedelta(days=3 * i)).isoformat(), 'reason': 'Flu'}),
+        'leave_manager.get_leaves': lambda i: claims_event(employee),
+        'leave_manager.get_approval_queue': lambda i: claims_event(manager),
+        'leave_manager.update_leave_status': lambda i: claims_event(manager, {
+            'decision': 'Approved', 'leaves': [{'employeeId': pending[i][0], 'leaveId': pending[i][1]}]}),
+        'feedback_manager.submit_feedback': lambda i: claims_event(employee, {'feedback': 'Great quarter',
+                                                                              'timestamp': '2026-04-01'}),
+        'feedback_manager.get_feedback': lambda i: claims_event(employee),
+        'document_manager.upload_document': lambda i: claims_event(employee, {
+            'fileName': 'payslip.pdf', 'fileType': 'application/pdf', 'fileSize': 48213, 'uploadDate': '2026-04-01'}),
+        'document_manager.get_documents': lambda i: claims_event(employee),
+        'document_manager.get_document_usage': lambda i: claims_event(employee),
+        'timeline.get_timeline': lambda i: claims_event(employee, params={'limit': '20'}),
+        'staffing_coverage.get_coverage': lambda i: claims_event(manager, params={'from': '2026-03-01', 'to': '2026-05-31'}),
+        'org_manager.get_direct_reports': lambda i: claims_event(manager),
+        'org_manager.get_all_reports': lambda i: claims_event('manager-3'),
+        'org_manager.get_management_chain': lambda i: claims_event(employee),
+        'leave_reports.get_leave_summary': lambda i: claims_event(manager, params={'month': '2026-03'}),
+        'job_worker.process_jobs': job_records,
+        'leave_reports.process_leave_stream': lambda i: {
+            'Records': records[(i * 25) % len(records):(i * 25) % len(records) + 25]},
+    }
+
+def measure(handler_name, invocations, traced, latency_ms):
+    """Replays one handler; returns its measurements (run in a fresh interpreter)."""
+    import importlib
+    import io
+    import contextlib
+    import memory_profile
+    from common_utils import cognito_client, dynamodb_client, s3_client, sqs_client, ses_client
+
+    warmup = 3
+    with contextlib.redirect_stdout(io.StringIO()):
+        events = seed(warmup + invocations + traced)
+    if handler_name not in events:
+        return {'handler': handler_name, 'error': 'no representative event'}
+    module, function = handler_name.rsplit('.', 1)
+    try:
+        handler = getattr(importlib.import_module(module), function)
+    except AttributeError:
+        return {'handler': handler_name, 'error': 'handler not found'}
+    for client in (cognito_client, dynamodb_client, s3_client, sqs_client, ses_client):
+        client.raw.latency = latency_ms / 1000.0
+
+    cpu, wall, statuses = [], [], {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(warmup + invocations):
+            event = events[handler_name](i)
+            started_cpu, started = time.thread_time(), time.perf_counter()
+            response = handler(event, None)
+            if i >= warmup:
+                cpu.append((time.thread_time() - started_cpu) * 1000)
+                wall.append((time.perf_counter() - started) * 1000)
+                status = response.get('statusCode', 200) if isinstance(response, dict) else 200
+                statuses[status] = statuses.get(status, 0) + 1
+        profiles = [memory_profile.profile_invocation(handler_name, handler, events[handler_name](i), None)[1]
+                    for i in range(warmup + invocations, warmup + invocations + traced)]
+    worst = max(profiles, key=lambda p: p['PeakTracedKB'])
+    return {
+        'handler': handler_name,
+        'cpu_ms': statistics.median(cpu),
+        'io_ms': max(0.0, statistics.median(wall) - statistics.median(cpu)),
+        'peak_traced_kb': worst['PeakTracedKB'],
+        'max_rss_mb': memory_profile.max_rss_mb(),
+        'top_sites': worst['topSites'][:3],
+        'statuses': statuses,
+    }
+
+# ----------------------------------------------------------------------
+# Model and report
+# ----------------------------------------------------------------------
+def modelled(result, memory_mb):
+    """(duration ms, cost per million invocations in USD) at a memory size."""
+    duration = result['cpu_ms'] * max(1.0, FULL_VCPU_MB / memory_mb) + result['io_ms']
+    billed = math.ceil(duration)
+    cost = memory_mb / 1024 * billed / 1000 * PRICE_PER_GB_SECOND + PRICE_PER_REQUEST
+    return duration, cost * 1e6
+
+def recommend(result, balance, headroom, extra_mb=0):
+    """(recommended size, {size: (duration, cost)}) for one function's measurements."""
+    floor = (result['max_rss_mb'] + extra_mb) * (1 + headroom)
+    curve = {size: modelled(result, size) for size in MEMORY_SIZES if size >= floor}
+    if not curve:
+        return None, curve
+    max_duration = max(d for d, _ in curve.values())
+    max_cost = max(c for _, c in curve.values())
+    best = min(curve, key=lambda size: balance * curve[size][1] / max_cost +
+               (1 - balance) * curve[size][0] / max_duration)
+    return best, curve
+
+def run_child(handler_name, args):
+    env = dict(os.environ, HRMS_LOCAL_BACKENDS='1', MEMORY_PROFILE_EMIT='false')
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', handler_name,
+                             '--invocations', str(args.invocations), '--traced', str(args.traced),
+                             '--latency-ms', str(args.latency_ms)],
+                            env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        return {'handler': handler_name, 'error': output.stderr.strip().splitlines()[-1]}
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Recommend a Lambda MemorySize per function from local replays.')
+    parser.add_argument('--functions', nargs='*', help='logical function names (default: all in template.yaml)')
+    parser.add_argument('--invocations', type=int, default=30, help='timed warm invocations per function')
+    parser.add_argument('--traced', type=int, default=5, help='invocations under tracemalloc per function')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='simulated per-call AWS latency')
+    parser.add_argument('--balance', type=float, default=0.5, help='1 = cheapest, 0 = fastest')
+    parser.add_argument('--headroom', type=float, default=0.25, help='spare memory required above max RSS')
+    parser.add_argument('--extra-mb', type=float, default=0.0, help='memory to add to the measured RSS')
+    parser.add_argument('--json', action='store_true', help='print the measurements and curves as JSON')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.invocations, args.traced, args.latency_ms)))
+        return
+
+    functions = function_handlers()
+    names = args.functions or list(functions)
+    report = []
+    print(f"{'Function':<34} {'now':>5} {'cpu':>7} {'io':>6} {'rss':>6} {'peak':>7}  "
+          f"{'ms@now':>7} {'ms@best':>7} {'$/M@now':>8} {'$/M@best':>8}  best")
+    for name in names:
+        handler, current = functions[name]
+        result = dict(run_child(handler, args), function=name, configured_mb=current)
+        if 'error' in result:
+            print(f"{name:<34} skipped: {result['error']}")
+            report.append(result)
+            continue
+        best, curve = recommend(result, args.balance, args.headroom, args.extra_mb)
+        now_duration, now_cost = modelled(result, current)
+        best_duration, best_cost = curve[best] if best else (float('nan'), float('nan'))
+        print(f"{name:<34} {current:>5} {result['cpu_ms']:6.2f}ms {result['io_ms']:5.1f}ms {result['max_rss_mb']:5.0f}M "
+              f"{result['peak_traced_kb']:6.0f}K  {now_duration:7.1f} {best_duration:7.1f} {now_cost:8.3f} "
+              f"{best_cost:8.3f}  {best or 'n/a'}")
+        report.append(dict(result, recommended_mb=best,
+                           curve={size: {'ms': round(d, 2), 'usd_per_million': round(c, 4)}
+                                  for size, (d, c) in curve.items()}))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print("\nTop allocation sites (largest traced invocation):")
+    for result in report:
+        if result.get('top_sites'):
+            sites = ', '.join(f"{s['site']} {s['kb']}K" for s in result['top_sites'])
+            print(f"  {result['function']:<34} {sites}")
+    print("\ntemplate.yaml (per function, under Properties):")
+    for result in report:
+        if result.get('recommended_mb') and result['recommended_mb'] != result['configured_mb']:
+            print(f"  {result['function']}: MemorySize: {result['recommended_mb']}")
+
+if __name__ == '__main__':
+    main()
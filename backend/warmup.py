@@ -0,0 +1,96 @@
+# warmup.py (Warm-up pings: return early, but leave the container ready for real traffic)
+# Scheduled pings (an EventBridge schedule, serverless-plugin-warmup, or {"warmup": true}) used
+# to reach the real handlers, which failed on the missing body without priming anything. Every
+# handler entry point is wrapped in @handles_warmup: a warm-up event runs warm_up() and returns
+# {"warmed": true, ...} without calling the handler. warm_up():
+#   1. makes one cheap call per AWS client (DynamoDB GetItem of a missing profile, S3
+#      ListObjectsV2 with MaxKeys=1, Cognito AdminGetUser of a missing user), which builds the
+#      request serializers and response parsers and opens the TLS connection the client's pool
+#      then keeps alive for the next request,
+#   2. loads botocore's operation models (the API schemas) of every operation the handlers call,
+#   3. loads the Cognito JWKS into the token verifier,
+#   4. reads hot profiles into the profile cache: WARMUP_PROFILE_IDS (comma-separated) and any
+#      "profileIds" listed in the ping.
+# Each step is timed and a failing step is logged without failing the ping. With provisioned
+# concurrency Lambda runs the module init ahead of traffic and sends no ping, so warm_up() also
+# runs at import when AWS_LAMBDA_INITIALIZATION_TYPE is provisioned-concurrency.
+import functools
+import json
+import os
+import time
+from common_utils import (get_response, cognito_client, dynamodb_client, s3_client, token_verifier, storage,
+                          load_profile, S3_BUCKET_NAME, COGNITO_USER_POOL_ID)
+
+WARMUP_SOURCES = ('serverless-plugin-warmup', 'hrms.warmup')
+WARMUP_PROFILE_IDS = [u.strip() for u in os.environ.get('WARMUP_PROFILE_IDS', '').split(',') if u.strip()]
+MAX_WARMUP_PROFILES = 100
+# Operation models to load up front, per client (API names as in the AWS docs)
+CLIENT_OPERATIONS = {
+    'dynamodb': ('GetItem', 'PutItem', 'UpdateItem', 'DeleteItem', 'Query', 'Scan', 'BatchGetItem',
+                 'BatchWriteItem', 'TransactWriteItems'),
+    's3': ('PutObject', 'GetObject', 'HeadObject', 'DeleteObject', 'ListObjectsV2'),
+    'cognito': ('SignUp', 'ConfirmSignUp', 'ResendConfirmationCode', 'InitiateAuth', 'AdminGetUser',
+                'AdminCreateUser'),
+}
+WARMUP_KEY = '__warmup__'
+
+def is_warmup_event(event):
+    """True for a warm-up ping rather than a real request."""
+    if not isinstance(event, dict):
+        return False
+    if event.get('warmup') is True or event.get('source') in WARMUP_SOURCES:
+        return True
+    return event.get('source') == 'aws.events' and event.get('detail-type') == 'Scheduled Event'
+
+def _ping_clients():
+    dynamodb_client.get_item(TableName=storage.table('profile'), Key=storage.key('profile', WARMUP_KEY))
+    s3_client.list_objects_v2(Bucket=S3_BUCKET_NAME, Prefix=WARMUP_KEY, MaxKeys=1)
+    try:
+        cognito_client.admin_get_user(UserPoolId=COGNITO_USER_POOL_ID, Username=WARMUP_KEY)
+    except cognito_client.exceptions.UserNotFoundException:
+        pass
+
+def _load_operation_models():
+    for name, client in (('dynamodb', dynamodb_client), ('s3', s3_client), ('cognito', cognito_client)):
+        service_model = getattr(getattr(client.raw, 'meta', None), 'service_model', None) # None on the stand-ins
+        if service_model:
+            for operation in CLIENT_OPERATIONS[name]:
+                service_model.operation_model(operation)
+
+def _load_profiles(user_ids):
+    for user_id in user_ids[:MAX_WARMUP_PROFILES]:
+        load_profile(user_id)
+
+def warm_up(profile_ids=()):
+    """Initializes clients, schemas, JWKS and hot profiles; returns {step: milliseconds or error}."""
+    started = time.perf_counter()
+    profiles = list(dict.fromkeys(list(WARMUP_PROFILE_IDS) + list(profile_ids)))
+    steps = (('clients', _ping_clients), ('schemas', _load_operation_models), ('jwks', token_verifier.load_jwks),
+             ('profiles', lambda: _load_profiles(profiles)))
+    timings = {}
+    for name, step in steps:
+        step_started = time.perf_counter()
+        try:
+            step()
+            timings[name] = round((time.perf_counter() - step_started) * 1000, 2)
+        except Exception as e:
+            print(f"Warm-up step {name} failed: {e}")
+            timings[name] = f'failed: {e}'
+    timings['totalMs'] = round((time.perf_counter() - started) * 1000, 2)
+    timings['profilesLoaded'] = min(len(profiles), MAX_WARMUP_PROFILES)
+    print(f"Warm-up finished: {json.dumps(timings)}")
+    return timings
+
+def handles_warmup(handler):
+    """Decorator for handler entry points: answers warm-up pings after warm_up(), without running the handler."""
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if is_warmup_event(event):
+            profile_ids = event.get('profileIds') or []
+            return get_response(200, {'warmed': True, 'timings': warm_up(profile_ids if isinstance(profile_ids, list)
+                                                                         else [])})
+        return handler(event, context)
+    return wrapper
+
+if os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE') == 'provisioned-concurrency':
+    warm_up()
@@ -8,6 +8,7 @@ const API_BASE_URL = 'https://l4fi5f9bxk.execute-api.us-east-1.amazonaws.com/Tes
 const App = () => {
     // Authentication State
     const [userId, setUserId] = useState(null); // Represents the authenticated user's ID (Cognito Sub)
+    const [session, setSession] = useState(null); // { idToken, accessToken, refreshToken, expiresIn } from login/refresh
     const [isLoggedIn, setIsLoggedIn] = useState(false);
     const [showSignup, setShowSignup] = useState(false); // To toggle between login/signup forms
     const [loading, setLoading] = useState(true); // Initial app loading (for full screen spinner)
@@ -141,6 +142,33 @@ const App = () => {
         fetchUserData(); // Call the fetch function
     }, [isLoggedIn, userId]); // Dependency array: re-run when isLoggedIn or userId changes
 
+    // Renew tokens shortly before they expire using the refresh token (no password prompt)
+    useEffect(() => {
+        if (!session || !session.refreshToken) return;
+        const refreshInMs = Math.max(session.expiresIn - 60, 5) * 1000;
+        const timer = setTimeout(async () => {
+            try {
+                const response = await fetch(`${API_BASE_URL}/auth/refresh`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ refreshToken: session.refreshToken }),
+                });
+                if (response.ok) {
+                    const data = await response.json();
+                    setSession({ ...data, refreshToken: session.refreshToken });
+                } else {
+                    console.error('Session refresh failed:', await response.text());
+                    setSession(null);
+                    setIsLoggedIn(false);
+                    setUserId(null);
+                }
+            } catch (error) {
+                console.error('Session refresh error:', error);
+            }
+        }, refreshInMs);
+        return () => clearTimeout(timer);
+    }, [session]);
+
     // --- Authentication Handlers ---
     const handleLogin = async (e) => {
         e.preventDefault(); // Prevent default form submission behavior
@@ -159,6 +187,7 @@ const App = () => {
                 // Assuming your backend returns a userId (Cognito 'sub' claim) on successful login
                 // In a real app, you'd store data.idToken in localStorage/sessionStorage for persistent sessions.
                 setUserId(data.userId); // Set the userId state
+                setSession(data); // Keep tokens so the session can be refreshed before expiry
                 setIsLoggedIn(true); // Update login status
                 setAuthMessage({ text: 'Login successful!', type: 'success' });
             } else {
@@ -299,6 +328,7 @@ const App = () => {
         setAuthLoading(true); // Indicate loading while logging out
         // In a real application, you would also clear any stored tokens (JWTs) from localStorage/sessionStorage.
         setUserId(null); // Clear userId
+        setSession(null); // Drop tokens (stops the refresh timer)
         setIsLoggedIn(false); // Set logged out state
         // Clear all form inputs for a fresh start on next login/signup
         setLoginEmail('');